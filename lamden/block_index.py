@@ -0,0 +1,380 @@
+from lamden.logger.base import get_logger
+import os
+import json
+import struct
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterable, Union
+
+
+class ChainMetadata:
+    # Persisted summary of a block directory so startup doesn't have to walk every block file.
+    FIELDS = ('total_blocks', 'latest_block_num', 'latest_block_hash', 'lowest_block_num')
+
+    # Record: [length: u32][crc32: u32][JSON payload], zero padded to one disk sector.
+    HEADER = struct.Struct('>II')
+    RECORD_SIZE = 512
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.total_blocks = 0
+        self.latest_block_num = None
+        self.latest_block_hash = None
+        self.lowest_block_num = None
+
+    @staticmethod
+    def path_for(root: str) -> str:
+        # Kept beside the directory, not inside it, so directory walks never see it.
+        return f'{os.path.abspath(str(root))}.meta'
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                record = f.read(self.RECORD_SIZE)
+        except FileNotFoundError:
+            return False
+
+        if len(record) < self.HEADER.size:
+            return False
+
+        length, crc = self.HEADER.unpack_from(record)
+        payload = record[self.HEADER.size:self.HEADER.size + length]
+
+        # A torn or foreign record reads as no metadata, which falls back to a full scan.
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            return False
+
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return False
+
+        for field in self.FIELDS:
+            setattr(self, field, data.get(field))
+
+        self.total_blocks = int(self.total_blocks or 0)
+        return True
+
+    def save(self) -> None:
+        # Overwrites one fixed size, checksummed record in place. Renaming a new file over the old one on every
+        # block write makes ext4 flush it each time, a single pwrite doesn't.
+        payload = json.dumps(self.to_dict()).encode()
+        record = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        if len(record) > self.RECORD_SIZE:
+            raise ValueError(f'Chain metadata record is larger than {self.RECORD_SIZE} bytes.')
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, record.ljust(self.RECORD_SIZE, b'\x00'), 0)
+        finally:
+            os.close(fd)
+
+    def delete(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BlockJournal:
+    # Append-only log of the blocks the writer wrote or deleted, kept beside the blocks directory. Other processes
+    # reading the same chain (ie. the webserver) replay what's new in it to keep their index current without walking the
+    # directory again. The writer starts a new file whenever it rebuilds and once it gets large, a reader that sees a new
+    # file rebuilds its index from the directory.
+    #
+    # Line: '+<block_num>\n' for a write, '-<block_num>\n' for a delete.
+    MAX_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        # inode of the file read so far and how much of it has been replayed
+        self.file_id = None
+        self.read_offset = 0
+
+    @staticmethod
+    def path_for(root: str) -> str:
+        return f'{os.path.abspath(str(root))}.journal'
+
+    def position(self) -> tuple:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+
+        return stat.st_ino, stat.st_size
+
+    def seek(self, position: tuple) -> None:
+        self.file_id, self.read_offset = position
+
+    def append(self, block_num: int, added: bool) -> int:
+        # Returns the size of the journal after the write.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, f'{"+" if added else "-"}{block_num}\n'.encode())
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    def rotate(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        open(tmp_path, 'wb').close()
+        os.replace(tmp_path, self.path)
+
+        self.seek(self.position())
+
+    def read_changes(self) -> Union[list, None]:
+        # (block_num, added) for every complete line appended since the last call, None if the file was replaced.
+        position = self.position()
+        if position == (self.file_id, self.read_offset):
+            return []
+
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.file_id or stat.st_size < self.read_offset:
+                return None
+
+            f.seek(self.read_offset)
+            data = f.read(stat.st_size - self.read_offset)
+
+        complete = data.rfind(b'\n') + 1
+        self.read_offset += complete
+
+        changes = []
+        for line in data[:complete].splitlines():
+            try:
+                changes.append((int(line[1:]), line[:1] == b'+'))
+            except ValueError:
+                continue
+
+        return changes
+
+
+class BlockIndex:
+    # Sorted list of every block number in a block directory and the ChainMetadata derived from it.
+    #
+    # The process writing the chain records its own writes and deletes, which saves the metadata and journals them.
+    # Readers (ie. the webserver) never save either, refresh() replays the writer's journal into their index instead.
+    # Every change to the index, recorded or replayed, goes through _apply().
+    def __init__(self, root: str, list_block_nums: Callable[[], Iterable[int]],
+                 read_block_hash: Callable[[int], Union[str, None]], on_changed: Callable = None,
+                 read_only: bool = False):
+        self.root = os.path.abspath(root)
+        self.list_block_nums = list_block_nums
+        self.read_block_hash = read_block_hash
+        # Called with the block numbers a refresh picked up from the writer, or None if any block may have changed.
+        self.on_changed = on_changed
+        self.read_only = read_only
+
+        self.block_nums = None
+        self.lock = threading.RLock()
+        self.build_thread = None
+
+        self.metadata = ChainMetadata(path=ChainMetadata.path_for(self.root))
+        self.journal = BlockJournal(path=BlockJournal.path_for(self.root))
+
+        self.log = get_logger('BLOCK INDEX')
+
+    @property
+    def building(self) -> bool:
+        build_thread = self.build_thread
+        return build_thread is not None and build_thread.is_alive()
+
+    def start(self) -> None:
+        # Trust the persisted metadata and verify it against the disk in the background, only walking
+        # the directory up front when there is no metadata to start from.
+        if self._root_has_entries() and self.metadata.load():
+            self.build_thread = threading.Thread(target=self._verify_metadata, daemon=True)
+            self.build_thread.start()
+        else:
+            self.rebuild()
+
+    def get(self) -> list:
+        # The up to date index, waits for the startup build if it is still walking the directory.
+        self._wait_for_build()
+        self.refresh()
+        return self.block_nums
+
+    def refresh(self) -> None:
+        # Brings the index current: builds it on first use and, in a reader, replays what the writer journaled since the
+        # last call. One stat when nothing changed, nothing at all in the writer.
+        if self.building:
+            # the build replays the journal once its walk is done
+            return
+
+        if self.block_nums is None:
+            self.rebuild()
+            return
+
+        if not self.read_only:
+            return
+
+        with self.lock:
+            changes = self.journal.read_changes()
+            if changes is None:
+                # the writer started a new journal, it may be missing changes the old one had
+                self._build()
+            elif len(changes) > 0:
+                self._apply(changes=changes)
+
+        if changes is None:
+            self._changed(block_nums=None)
+        elif len(changes) > 0:
+            self._changed(block_nums=[block_num for block_num, _ in changes])
+
+    def rebuild(self) -> None:
+        # Walks the directory again, ie. after a flush. Readers following the old journal switch to the directory.
+        self._wait_for_build()
+
+        with self.lock:
+            self._build()
+
+            if not self.read_only:
+                self.journal.rotate()
+
+        self._changed(block_nums=None)
+
+    def record(self, block_num: int, added: bool) -> None:
+        # A write or delete by this process. Readers pick it up from the journal.
+        self.get()
+
+        with self.lock:
+            self._apply(changes=[(block_num, added)])
+
+            if self.journal.append(block_num=block_num, added=added) > self.journal.MAX_BYTES:
+                self.journal.rotate()
+
+    def contains(self, block_num: int) -> bool:
+        block_nums = self.get()
+        position = bisect_left(block_nums, block_num)
+        return position < len(block_nums) and block_nums[position] == block_num
+
+    def find_next(self, block_num: int) -> Union[int, None]:
+        block_nums = self.get()
+        position = bisect_right(block_nums, block_num)
+        return block_nums[position] if position < len(block_nums) else None
+
+    def find_previous(self, block_num: int) -> Union[int, None]:
+        block_nums = self.get()
+        position = bisect_left(block_nums, block_num)
+        return block_nums[position - 1] if position > 0 else None
+
+    def find_range(self, start: int = None, end: int = None) -> list:
+        block_nums = self.get()
+
+        lower = 0 if start is None else bisect_left(block_nums, start)
+        upper = len(block_nums) if end is None else bisect_right(block_nums, end)
+
+        return block_nums[lower:upper]
+
+    def latest_block_num(self) -> Union[int, None]:
+        # The metadata answers while the startup build is still checking it.
+        if not self.building:
+            self.refresh()
+
+        return self.metadata.latest_block_num
+
+    def latest_block_hash(self) -> Union[str, None]:
+        if self.latest_block_num() is None:
+            return None
+
+        return self.metadata.latest_block_hash
+
+    def total_blocks(self) -> int:
+        return self.metadata.total_blocks
+
+    def _root_has_entries(self) -> bool:
+        if not os.path.isdir(self.root):
+            return False
+
+        with os.scandir(self.root) as entries:
+            return next(entries, None) is not None
+
+    def _wait_for_build(self) -> None:
+        build_thread = self.build_thread
+        if build_thread is not None and build_thread is not threading.current_thread():
+            build_thread.join()
+
+    def _verify_metadata(self) -> None:
+        persisted = self.metadata.to_dict()
+
+        try:
+            self._build()
+        except Exception as err:
+            self.log.error(f'Failed to verify chain metadata for {self.root}: {err}')
+            return
+
+        if persisted != self.metadata.to_dict():
+            self.log.warning(f'Chain metadata for {self.root} was stale and has been rebuilt: '
+                             f'{persisted} -> {self.metadata.to_dict()}')
+
+            # the journal may be missing the same changes, readers following it switch to the directory
+            if not self.read_only:
+                self.journal.rotate()
+
+    def _build(self) -> None:
+        with self.lock:
+            # Anything journaled after this point may have been missed by the walk and is replayed below.
+            journal_position = self.journal.position()
+
+            block_nums = sorted(self.list_block_nums()) if os.path.isdir(self.root) else []
+
+            self.journal.seek(journal_position)
+            changes = self.journal.read_changes()
+            if changes is None:
+                # started over during the walk, everything in the new file happened after it began
+                self.journal.seek((self.journal.position()[0], 0))
+                changes = self.journal.read_changes() or []
+
+            self.block_nums = block_nums
+            self._apply(changes=changes, rehash=True)
+
+    def _apply(self, changes: list, rehash: bool = False) -> None:
+        # Replays (block_num, added) changes onto the index and updates the metadata derived from it.
+        block_nums = self.block_nums
+        latest_block_num = self.metadata.latest_block_num
+
+        for block_num, added in changes:
+            position = bisect_left(block_nums, block_num)
+            exists = position < len(block_nums) and block_nums[position] == block_num
+            if added and not exists:
+                block_nums.insert(position, block_num)
+            elif not added and exists:
+                del block_nums[position]
+
+            # Rewriting the latest block can change its hash.
+            rehash = rehash or block_num == latest_block_num
+
+        metadata = self.metadata
+        previous = metadata.to_dict()
+
+        metadata.total_blocks = len(block_nums)
+        metadata.lowest_block_num = block_nums[0] if block_nums else None
+        metadata.latest_block_num = block_nums[-1] if block_nums else None
+
+        if rehash or metadata.latest_block_num != previous['latest_block_num']:
+            metadata.latest_block_hash = None if not block_nums else self.read_block_hash(block_nums[-1])
+
+        if metadata.to_dict() != previous or not os.path.isdir(self.root):
+            self._save_metadata()
+
+    def _save_metadata(self) -> None:
+        # A reader's metadata is only ever its view of what the writer saved, writing it back could undo the writer's.
+        if self.read_only:
+            return
+
+        if os.path.isdir(self.root):
+            self.metadata.save()
+        else:
+            self.metadata.delete()
+
+    def _changed(self, block_nums: Union[list, None]) -> None:
+        if self.on_changed is not None:
+            self.on_changed(block_nums)
@@ -2,10 +2,11 @@ from contracting.db.encoder import decode
 from lamden.crypto.wallet import Wallet
 from lamden.logger.base import get_logger
 from lamden.nodes.base import Node
+from lamden.sockets.tx_handoff import TxHandoffReceiver, get_tx_handoff_path
 from lamden.storage import STORAGE_HOME
 
 from lamden.utils.add_block_num_to_state import AddBlockNum
-from lamden.utils.migrate_blocks_dir import MigrateFiles
+from lamden.utils.migrate_blocks_dir import MigrateFiles, RebuildIndexes
 
 import argparse
 import asyncio
@@ -100,6 +101,15 @@ def release_all_state_locks(contract_state_path: str):
                 shutil.rmtree(dir_path)
                 print(f"Removed Lock on state: {dir_path}")
 
+def get_tx_handoff():
+    # Set LAMDEN_TX_IPC_PATH, for both the node and the webserver, to have the webserver hand txs over on a unix socket
+    tx_handoff_path = get_tx_handoff_path()
+    if tx_handoff_path is None:
+        return None
+
+    logger.info(f'Receiving txs from the webserver on {tx_handoff_path}')
+    return TxHandoffReceiver(ipc_path=tx_handoff_path)
+
 def start_node(args):
     sk = bytes.fromhex(os.environ['LAMDEN_SK'])
     wallet = Wallet(seed=sk)
@@ -140,7 +150,8 @@ def start_node(args):
         private_network=get_private_network_ip(),
         run_catchup=run_catchup,
         run_validation=run_validation,
-        safe_block_num=safe_block_num
+        safe_block_num=safe_block_num,
+        tx_handoff=get_tx_handoff()
     )
 
     loop = asyncio.get_event_loop()
@@ -202,7 +213,8 @@ def join_network(args):
         rollback_point=rollback_point,
         run_catchup=run_catchup,
         run_validation=run_validation,
-        safe_block_num=safe_block_num
+        safe_block_num=safe_block_num,
+        tx_handoff=get_tx_handoff()
     )
 
     loop = asyncio.get_event_loop()
@@ -248,6 +260,16 @@ def migrate_storage():
 
         logger.info("Completed Adding Block Numbers to State! \n")
 
+    index_rebuild = RebuildIndexes(storage_path=STORAGE_HOME)
+    pending = index_rebuild.pending()
+
+    if pending:
+        logger.warning(f"Rebuilding {', '.join(pending)} from stored blocks....")
+
+        index_rebuild.start()
+
+        logger.info("Completed Rebuilding Indexes! \n")
+
 def main():
     parser = argparse.ArgumentParser(description="Lamden Commands", prog='lamden')
     setup_lamden_parser(parser)
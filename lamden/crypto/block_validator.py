@@ -1,7 +1,7 @@
 from iso8601 import parse_date
 from lamden.crypto.canonical import create_proof_message_from_proof, block_hash_from_block, tx_hash_from_tx, format_dictionary, tx_result_hash_from_tx_result_object, hash_genesis_block_state_changes
 from contracting.db.encoder import encode
-from lamden.crypto.wallet import verify
+from lamden.crypto.wallet import verify, verify_many
 from lamden.utils import hlc
 from copy import deepcopy
 
@@ -498,21 +498,28 @@ def verify_genesis_origin_signature(block: dict) -> bool:
         return False
 
 def verify_proofs(block: dict, old_block: bool = False) -> bool:
-    tx_result = block.get('processed')
-    rewards = block.get('rewards')
-    hlc_timestamp = block.get('hlc_timestamp')
+    if old_block:
+        #if not verify_proof_signature_old(proof=proof, tx_result=tx_result, rewards=rewards, hlc_timestamp=hlc_timestamp):
+        return True
 
-    proofs = block.get('proofs')
+    try:
+        # every proof signs the same tx_result_hash, hash it once and check all the signatures together
+        tx_result_hash = tx_result_hash_from_tx_result_object(
+            tx_result=block.get('processed'),
+            hlc_timestamp=block.get('hlc_timestamp'),
+            rewards=block.get('rewards')
+        )
 
-    for proof in proofs:
-        if old_block:
-            #if not verify_proof_signature_old(proof=proof, tx_result=tx_result, rewards=rewards, hlc_timestamp=hlc_timestamp):
-            return True
-        else:
-            if not verify_proof_signature(proof=proof, tx_result=tx_result, rewards=rewards, hlc_timestamp=hlc_timestamp):
-                return False
+        signatures = [(
+            proof.get('signer'),
+            create_proof_message_from_proof(tx_result_hash=tx_result_hash, proof=proof),
+            proof.get('signature')
+        ) for proof in block.get('proofs')]
+    except Exception as err:
+        print(err)
+        return False
 
-    return True
+    return all(verify_many(signatures))
 
 def verify_proof_signature(proof: dict, tx_result: str, rewards=[], hlc_timestamp=str) -> bool:
     try:
@@ -211,6 +211,17 @@ def create_proof_message_from_proof(proof: dict, tx_result_hash: str) -> str:
 
     return message
 
+def proof_batch_leaves(solutions: list) -> list:
+    # One leaf per tx in a proof batch, binding the result hash and the signer's own proof of it to the HLC
+    return [
+        '{}{}{}'.format(solution['hlc_timestamp'], solution['tx_result_hash'], solution['signature']).encode()
+        for solution in solutions
+    ]
+
+def create_proof_batch_message(root: str, members_list_hash: str, num_of_members: int) -> str:
+    # prefixed so a batch signature can never pass for the proof of a single tx
+    return 'batch' + root + members_list_hash + str(num_of_members)
+
 def create_hash_512(string: str):
     h = hashlib.sha3_512()
     h.update('{}'.format(string).encode())
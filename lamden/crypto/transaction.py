@@ -5,6 +5,7 @@ from lamden.formatting import check_format, rules, primatives
 from contracting.db.encoder import encode, decode
 from lamden import storage
 from lamden.crypto import wallet
+from lamden.crypto.verifier import get_signature_verifier
 from contracting.client import ContractingClient
 from lamden.logger.base import get_logger
 log = get_logger('TRANSACTION')
@@ -131,21 +132,43 @@ def check_tx_keys(tx):
     return all(keys_are_valid) and len(keys) == len(list(rules.TRANSACTION_PAYLOAD_RULES.keys()))
 
 
-def check_tx_formatting(tx: dict, expected_processor: str):
+def check_tx_formatting(tx: dict, expected_processor: str, signature_valid: bool = None):
+    # signature_valid is passed in when the signature has already been verified with the rest of a batch
     if not check_tx_keys(tx) or not check_format(tx, rules.TRANSACTION_RULES):
         raise TransactionFormattingError
 
-    if not wallet.verify(
-            tx['payload']['sender'],
-            encode(tx['payload']),
-            tx['metadata']['signature']
-    ):
+    if signature_valid is None:
+        signature_valid = tx_signature_is_valid(tx)
+
+    if not signature_valid:
         raise TransactionSignatureInvalid
 
     if tx['payload']['processor'] != expected_processor:
         raise TransactionProcessorInvalid
 
 
+def tx_signature_is_valid(tx: dict) -> bool:
+    return wallet.verify(
+        tx['payload']['sender'],
+        encode(tx['payload']),
+        tx['metadata']['signature']
+    )
+
+
+def tx_signatures(txs: list) -> list:
+    return [(tx['payload']['sender'], encode(tx['payload']), tx['metadata']['signature']) for tx in txs]
+
+
+def tx_signatures_are_valid(txs: list) -> list:
+    # Verifies the signatures of a batch of well formatted txs on the signature verifier's pool.
+    return get_signature_verifier().verify_many(tx_signatures(txs))
+
+
+async def tx_signatures_are_valid_async(txs: list) -> list:
+    # Same as tx_signatures_are_valid without blocking the event loop while the pool works.
+    return await get_signature_verifier().verify_many_async(tx_signatures(txs))
+
+
 def get_nonces(sender, processor, driver: storage.NonceStorage):
     nonce = driver.get_nonce(
         processor=processor,
@@ -184,15 +207,19 @@ def get_new_pending_nonce(tx_nonce, nonce, pending_nonce, strict=True, tx_per_bl
 
     return expected_nonce
 
-def check_nonce(tx: dict, nonces: storage.NonceStorage):
+def check_nonce(tx: dict, nonces: storage.NonceStorage, batch_nonces: dict = None):
+    # batch_nonces holds the nonces of txs accepted earlier in the same batch by (sender, processor)
     tx_nonce = tx['payload']['nonce']
     tx_processor = tx['payload']['processor']
     tx_sender = tx['payload']['sender']
 
-    current_nonce = nonces.get_nonce(
-        sender=tx_sender,
-        processor=tx_processor
-    )
+    if batch_nonces is not None and (tx_sender, tx_processor) in batch_nonces:
+        current_nonce = batch_nonces[(tx_sender, tx_processor)]
+    else:
+        current_nonce = nonces.get_nonce(
+            sender=tx_sender,
+            processor=tx_processor
+        )
 
     valid = current_nonce is None or tx_nonce > current_nonce
 
@@ -280,6 +307,10 @@ def transaction_is_valid(transaction, expected_processor, client: ContractingCli
     balance = client.get_var(contract='currency', variable='balances', arguments=[sender], mark=False)
     stamp_rate = client.get_var(contract='stamp_cost', variable='S', arguments=['value'], mark=False)
 
+    check_stamps_and_contract_name(transaction=transaction, balance=balance, stamp_rate=stamp_rate)
+
+
+def check_stamps_and_contract_name(transaction, balance, stamp_rate):
     contract = transaction['payload']['contract']
     func = transaction['payload']['function']
     stamps_supplied = transaction['payload']['stamps_supplied']
@@ -306,6 +337,75 @@ def transaction_is_valid(transaction, expected_processor, client: ContractingCli
     contract_name_is_valid(contract, func, name)
 
 
+def transactions_are_valid(transactions: list, expected_processor, client: ContractingClient,
+                           nonces: storage.NonceStorage) -> list:
+    # Runs the transaction_is_valid checks on a batch of txs. Signatures are verified in parallel and the stamp rate
+    # and each sender's balance are only looked up once. Nonces of txs accepted earlier in the batch count, so a sender
+    # can submit several txs at once.
+    # Returns one entry per tx, None if it's valid or the TransactionException class it failed with.
+    results, formatted = check_transactions_format(transactions)
+    signatures_valid = dict(zip(formatted, tx_signatures_are_valid([transactions[i] for i in formatted])))
+
+    return check_formatted_transactions(transactions=transactions, expected_processor=expected_processor, client=client,
+                                        nonces=nonces, results=results, signatures_valid=signatures_valid)
+
+
+async def transactions_are_valid_async(transactions: list, expected_processor, client: ContractingClient,
+                                       nonces: storage.NonceStorage) -> list:
+    # transactions_are_valid for the event loop, the signatures are verified without blocking it. The nonces are only
+    # checked once they are, so batches validated at the same time still see each other's nonces.
+    results, formatted = check_transactions_format(transactions)
+    signatures_valid = dict(zip(formatted, await tx_signatures_are_valid_async([transactions[i] for i in formatted])))
+
+    return check_formatted_transactions(transactions=transactions, expected_processor=expected_processor, client=client,
+                                        nonces=nonces, results=results, signatures_valid=signatures_valid)
+
+
+def check_transactions_format(transactions: list) -> tuple:
+    # Returns the results with TransactionFormattingError set for the malformed txs and the indexes of the others
+    results = [None] * len(transactions)
+
+    formatted = []
+    for i, tx in enumerate(transactions):
+        if isinstance(tx, dict) and check_tx_keys(tx) and check_format(tx, rules.TRANSACTION_RULES):
+            formatted.append(i)
+        else:
+            results[i] = TransactionFormattingError
+
+    return results, formatted
+
+
+def check_formatted_transactions(transactions: list, expected_processor, client: ContractingClient,
+                                 nonces: storage.NonceStorage, results: list, signatures_valid: dict) -> list:
+    # The rest of the checks on the well formatted txs, signatures_valid maps their indexes to their signature result
+    stamp_rate = None
+    balances = {}
+    batch_nonces = {}
+
+    for i in signatures_valid:
+        tx = transactions[i]
+        sender = tx['payload']['sender']
+
+        try:
+            check_tx_formatting(tx, expected_processor, signature_valid=signatures_valid[i])
+            check_nonce(tx=tx, nonces=nonces, batch_nonces=batch_nonces)
+
+            if stamp_rate is None:
+                stamp_rate = client.get_var(contract='stamp_cost', variable='S', arguments=['value'], mark=False) or 0
+            if sender not in balances:
+                balances[sender] = client.get_var(contract='currency', variable='balances', arguments=[sender], mark=False)
+
+            check_stamps_and_contract_name(transaction=tx, balance=balances[sender], stamp_rate=stamp_rate)
+
+        except TransactionException as e:
+            results[i] = type(e)
+            continue
+
+        batch_nonces[(sender, tx['payload']['processor'])] = tx['payload']['nonce']
+
+    return results
+
+
 # Run through all tests
 def transaction_is_valid_no_stale(transaction, expected_processor, client: ContractingClient, nonces: storage.NonceStorage, strict=True,
                          tx_per_block=15, timeout=60):
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from lamden.crypto import wallet
+from lamden.crypto.block_validator import verify_block
+from lamden.logger.base import get_logger
+
+# Verifies signatures on a pool of worker processes so a node flooded with work, solutions or catchup blocks
+# doesn't spend its event loop checking them one by one. Each worker keeps its own cache of parsed verify keys.
+
+# Batches smaller than this are verified inline, shipping them to a worker costs more than they take
+POOL_MIN_BATCH = 16
+# Most signatures sent to a worker at once
+CHUNK_SIZE = 256
+
+
+def verify_block_batch(blocks: list) -> list:
+    # Runs in a worker, [(block, old_block)] -> [result of verify_block]
+    return [verify_block(block=block, old_block=old_block) for block, old_block in blocks]
+
+
+class SignatureVerifier:
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+
+        self.log = get_logger('SIGNATURE VERIFIER')
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # spawn so workers don't inherit the node's sockets and event loop
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+        return self.pool
+
+    def chunks(self, items: list, size: int = CHUNK_SIZE) -> list:
+        # spread small batches over all the workers instead of handing them to one
+        size = max(1, min(size, -(-len(items) // self.workers)))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def run_chunked(self, fn, items: list) -> list:
+        try:
+            return [result for chunk in self.get_pool().map(fn, self.chunks(items)) for result in chunk]
+        except BrokenProcessPool as err:
+            self.log.error(f'Verification pool broke, verifying inline: {err}')
+            self.pool = None
+            return fn(items)
+
+    async def run_chunked_async(self, fn, items: list) -> list:
+        loop = asyncio.get_running_loop()
+
+        try:
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(self.get_pool(), fn, chunk) for chunk in self.chunks(items)
+            ])
+        except BrokenProcessPool as err:
+            self.log.error(f'Verification pool broke, verifying inline: {err}')
+            self.pool = None
+            return fn(items)
+
+        return [result for chunk in chunks for result in chunk]
+
+    def verify_many(self, signatures: list) -> list:
+        # [(vk, msg, signature)] -> [bool]
+        # Blocks until the pool is done, code running on the event loop should await verify_many_async instead.
+        signatures = list(signatures)
+
+        results, pending = self.check_cache(signatures=signatures)
+        if len(pending) > 0:
+            to_verify = [signatures[i] for i in pending]
+
+            if len(to_verify) < POOL_MIN_BATCH:
+                pending_results = wallet.verify_many(to_verify)
+            else:
+                pending_results = self.run_chunked(wallet.verify_many, to_verify)
+
+            self.cache_results(signatures=signatures, results=results, pending=pending, pending_results=pending_results)
+
+        return results
+
+    async def verify_many_async(self, signatures: list) -> list:
+        signatures = list(signatures)
+
+        results, pending = self.check_cache(signatures=signatures)
+        if len(pending) > 0:
+            to_verify = [signatures[i] for i in pending]
+
+            if len(to_verify) < POOL_MIN_BATCH:
+                pending_results = wallet.verify_many(to_verify)
+            else:
+                pending_results = await self.run_chunked_async(wallet.verify_many, to_verify)
+
+            self.cache_results(signatures=signatures, results=results, pending=pending, pending_results=pending_results)
+
+        return results
+
+    def check_cache(self, signatures: list) -> tuple:
+        # Workers have their own caches, so signatures this process already verified are answered here instead.
+        # Returns the results so far and the positions that still need verifying.
+        results = []
+        pending = []
+        for i, (vk, msg, signature) in enumerate(signatures):
+            try:
+                cached = wallet.verified_signatures.contains(vk=vk, msg=msg, signature=signature)
+            except Exception:
+                cached = False
+
+            results.append(cached)
+            if not cached:
+                pending.append(i)
+
+        return results, pending
+
+    def cache_results(self, signatures: list, results: list, pending: list, pending_results: list) -> None:
+        for i, valid in zip(pending, pending_results):
+            results[i] = valid
+            if valid:
+                vk, msg, signature = signatures[i]
+                wallet.verified_signatures.add(vk=vk, msg=msg, signature=signature)
+
+    async def verify_async(self, vk: str, msg: str, signature: str) -> bool:
+        results = await self.verify_many_async([(vk, msg, signature)])
+        return results[0]
+
+    def verify_blocks(self, blocks: list, old_blocks: list) -> list:
+        # Runs verify_block on every block, old_blocks holds the old_block flag of each.
+        items = list(zip(blocks, old_blocks))
+
+        if len(items) == 0:
+            return []
+
+        return self.run_chunked(verify_block_batch, items)
+
+    async def verify_block_async(self, block: dict, old_block: bool = False) -> bool:
+        results = await self.run_chunked_async(verify_block_batch, [(block, old_block)])
+        return results[0]
+
+    def stop(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+
+
+signature_verifier = None
+
+
+def get_signature_verifier() -> SignatureVerifier:
+    # One pool shared by the whole node, started the first time something is verified through it
+    global signature_verifier
+
+    if signature_verifier is None:
+        signature_verifier = SignatureVerifier()
+
+    return signature_verifier
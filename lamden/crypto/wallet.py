@@ -2,23 +2,135 @@ import nacl
 import nacl.encoding
 import nacl.signing
 from zmq.utils import z85
+import hashlib
+import os
 import secrets
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from . import zbase
 
 
+# Parsed keys of recent signers, most signatures come from the same few nodes and senders
+VERIFY_KEY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=VERIFY_KEY_CACHE_SIZE)
+def get_verify_key(vk: str) -> nacl.signing.VerifyKey:
+    return nacl.signing.VerifyKey(bytes.fromhex(vk))
+
+
+# Most successful verifications remembered, entries are 32 byte digests
+VERIFIED_SIGNATURE_CACHE_SIZE = 100_000
+# Set to verify every signature from scratch, even ones already verified
+PARANOID_SIGNATURES_ENV = 'LAMDEN_PARANOID_SIGNATURES'
+
+
+class VerifiedSignatureCache:
+    # LRU set of (vk, msg, signature) that verified successfully. The same signatures are checked again and again as
+    # txs, work and proofs pass through the webserver, processors and block validation, a hit skips the Ed25519 work.
+    # Only digests are kept, so a cached entry can only be matched by the exact same vk, msg and signature.
+
+    def __init__(self, max_entries: int = VERIFIED_SIGNATURE_CACHE_SIZE, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(vk: str, msg: str, signature: str) -> bytes:
+        h = hashlib.blake2b(digest_size=32)
+        for part in (vk, signature, msg):
+            part = part.encode()
+            h.update(len(part).to_bytes(8, 'big'))
+            h.update(part)
+        return h.digest()
+
+    def contains(self, vk: str, msg: str, signature: str) -> bool:
+        if not self.enabled or self.max_entries <= 0:
+            return False
+
+        key = self.key(vk=vk, msg=msg, signature=signature)
+
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return False
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, vk: str, msg: str, signature: str) -> None:
+        if not self.enabled or self.max_entries <= 0:
+            return
+
+        key = self.key(vk=vk, msg=msg, signature=signature)
+
+        with self.lock:
+            self.entries[key] = None
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0
+            }
+
+
+verified_signatures = VerifiedSignatureCache(enabled=not os.environ.get(PARANOID_SIGNATURES_ENV))
+
+
 def verify(vk: str, msg: str, signature: str):
-    vk = bytes.fromhex(vk)
-    msg = msg.encode()
-    signature = bytes.fromhex(signature)
+    if verified_signatures.contains(vk=vk, msg=msg, signature=signature):
+        return True
+
+    msg_bytes = msg.encode()
+    signature_bytes = bytes.fromhex(signature)
 
-    vk = nacl.signing.VerifyKey(vk)
+    verify_key = get_verify_key(vk)
     try:
-        vk.verify(msg, signature)
+        verify_key.verify(msg_bytes, signature_bytes)
     except nacl.exceptions.BadSignatureError:
         return False
+
+    verified_signatures.add(vk=vk, msg=msg, signature=signature)
     return True
 
 
+def verify_many(signatures: list) -> list:
+    # Checks a list of (vk, msg, signature), anything that can't be verified counts as invalid.
+    results = []
+    for vk, msg, signature in signatures:
+        try:
+            results.append(verify(vk=vk, msg=msg, signature=signature))
+        except Exception:
+            results.append(False)
+    return results
+
+
 class Wallet:
     def __init__(self, seed=None):
         if isinstance(seed, str):
@@ -11,17 +11,19 @@ from typing import List
 from lamden.utils import hlc
 from lamden.utils.retrieve_ips import IPFetcher
 from lamden.peer import Peer, ACTION_HELLO, ACTION_PING, ACTION_GET_BLOCK, ACTION_GET_LATEST_BLOCK, ACTION_GET_NEXT_BLOCK, ACTION_GET_PREV_BLOCK, ACTION_GET_NETWORK_MAP, ACTION_GET_NEXT_MEMBER_HISTORY
+from lamden.peer import ACTION_GET_BLOCKS_RANGE, ACTION_GET_MEMBER_HISTORY_RANGE, RANGE_MAX_COUNT, RANGE_MAX_BYTES, encode_range_payload
 
 from lamden.crypto.wallet import Wallet
 from lamden.storage import BlockStorage, BLOCK_0
 
 from lamden.logger.base import get_logger
 
-from contracting.db.encoder import encode, decode
+from contracting.db.encoder import encode
 from contracting.db.driver import ContractDriver
 
 from lamden.sockets.publisher import Publisher
 from lamden.sockets.router import Router
+from lamden.sockets.wire import SUPPORTED_WIRE_VERSIONS, encode_message, decode_message, wire_version_of
 
 WORK_SERVICE = 'work'
 CONSENSUS_SERVICE = 'consensus'
@@ -32,6 +34,9 @@ GET_ALL_PEERS = "get_all_peers"
 
 EXCEPTION_PORT_NUM_NOT_INT = "port_num must be type int."
 
+# blocks read ahead from disk while building a range reply
+RANGE_PREFETCH = 8
+
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 class Processor:
@@ -283,6 +288,7 @@ class Network:
         self.log('info', f'Adding new peer "{peer_vk[:8]}" @ {ip}')
         peer = self.create_peer(ip=ip, vk=peer_vk)
         self.peers[peer_vk] = peer
+        self.refresh_publisher_wire_version()
         self.start_peer(vk=peer_vk)
 
     def create_peer(self, ip: str, vk: str) -> Peer:
@@ -323,6 +329,26 @@ class Network:
     def delete_peer(self, peer_vk: str) -> None:
 
         self.peers.pop(peer_vk, None)
+        self.refresh_publisher_wire_version()
+
+    def refresh_publisher_wire_version(self) -> None:
+        # Every subscriber gets the same published message, so it can only go out in the binary format once all the
+        # peers have agreed to it in hello. Peers not verified yet haven't, which keeps old nodes joining on JSON.
+        versions = [peer.wire_version for peer in self.peer_list]
+
+        if len(versions) > 0 and None not in versions:
+            self.publisher.wire_version = min(versions)
+        else:
+            self.publisher.wire_version = None
+
+    def peers_take_compact_contenders(self) -> bool:
+        # Solutions are published to every peer alike, so they can only be compact once all the peers take them.
+        peers = self.peer_list
+        return len(peers) > 0 and all(peer.compact_contenders for peer in peers)
+
+    def peers_take_proof_batches(self) -> bool:
+        peers = self.peer_list
+        return len(peers) > 0 and all(peer.proof_batches for peer in peers)
 
     def get_peer_by_ip(self, ip: str) -> [Peer, None]:
         for peer in self.peers.values():
@@ -403,6 +429,8 @@ class Network:
         if not peer:
             return
 
+        self.refresh_publisher_wire_version()
+
         ip = peer.request_address
 
         self.publisher.announce_new_peer_connection(ip=ip, vk=peer_vk)
@@ -507,23 +535,99 @@ class Network:
     def get_node_list(self) -> list:
         return self.driver.driver.get('masternodes.S:members') or []
 
-    def hello_response(self, challenge: str = None) -> str:
+    def hello_response(self, challenge: str = None, wire_version: int = None) -> (str, bytes):
         latest_block_info = self.get_latest_block_info()
 
-        block_num = latest_block_info.get('number')
-        block_hash = latest_block_info.get('hash')
-        hlc_timestamp = latest_block_info.get("hlc_timestamp")
-
         try:
             challenge_response = self.wallet.sign(challenge)
         except:
             challenge_response = ""
 
-        return '{"response":"%s", "challenge_response": "%s","latest_block_number": %d, "latest_block_hash": "%s", "latest_hlc_timestamp": "%s"}' % (ACTION_HELLO, challenge_response, block_num, block_hash, hlc_timestamp)
+        return encode_message({
+            'response': ACTION_HELLO,
+            'challenge_response': challenge_response,
+            'latest_block_number': latest_block_info.get('number'),
+            'latest_block_hash': latest_block_info.get('hash'),
+            'latest_hlc_timestamp': latest_block_info.get('hlc_timestamp'),
+            # lets the peer switch to the binary wire format with us
+            'wire': SUPPORTED_WIRE_VERSIONS,
+            # we only need the proof of a peer's solution, not the full result
+            'compact_contenders': True,
+            # and proofs for many txs under one signature
+            'proof_batches': True,
+            # our Router echoes request ids, so the peer can have many requests in flight with us
+            'request_ids': True
+        }, wire_version)
+
+    def build_range_reply(self, action: str, msg: dict, wire_version: int = None) -> tuple:
+        # Returns the (header, compressed payload) of a range reply, (None, None) if the request is malformed.
+        # Items are added in order until the count or byte limit is reached, the first one is always sent so a single
+        # large block can't stall whoever is asking.
+        start = msg.get('start_block_num')
+        end = msg.get('end_block_num')
+        limit = msg.get('limit') or RANGE_MAX_COUNT
+        max_bytes = msg.get('max_bytes') or RANGE_MAX_BYTES
+        reverse = msg.get('reverse', False)
+
+        for value in [start, end]:
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                return None, None
+
+        if not isinstance(limit, int) or not isinstance(max_bytes, int) or not isinstance(reverse, bool):
+            return None, None
+
+        limit = max(1, min(limit, RANGE_MAX_COUNT))
+        max_bytes = max(1, min(max_bytes, RANGE_MAX_BYTES))
+
+        if action == ACTION_GET_BLOCKS_RANGE:
+            items = self.block_storage.get_blocks_range(start=start, end=end, limit=limit + 1, reverse=reverse,
+                                                        prefetch=RANGE_PREFETCH)
+        else:
+            member_history = self.block_storage.member_history
+            block_nums = member_history.find_block_nums(start=start, end=end)
+            if reverse:
+                block_nums.reverse()
+            items = (member_history.find_block(block_num=block_num) for block_num in block_nums[:limit + 1])
+
+        encoded_items = []
+        size = 0
+        more = False
 
-    async def router_callback(self, ident_vk_bytes: bytes, ident_vk_string: str, msg: str) -> None:
         try:
-            msg = decode(msg)
+            for item in items:
+                if item is None:
+                    continue
+
+                if len(encoded_items) == limit:
+                    more = True
+                    break
+
+                if action == ACTION_GET_BLOCKS_RANGE and self.block_storage.is_genesis_block(block=item):
+                    item['genesis'] = []
+
+                encoded_item = encode(item)
+
+                if len(encoded_items) > 0 and size + len(encoded_item) + 1 > max_bytes:
+                    more = True
+                    break
+
+                encoded_items.append(encoded_item)
+                size += len(encoded_item) + 1
+        finally:
+            # stops the prefetch reads still in flight
+            items.close()
+
+        header = encode_message({'response': action, 'count': len(encoded_items), 'more': more}, wire_version)
+
+        return header, encode_range_payload(encoded_items=encoded_items)
+
+    async def router_callback(self, ident_vk_bytes: bytes, ident_vk_string: str, msg: (str, bytes),
+                              request_id: bytes = None) -> None:
+        # replies go back in whichever format the request came in
+        wire_version = wire_version_of(msg)
+
+        try:
+            msg = decode_message(msg)
             action: str = msg.get('action')
         except Exception as err:
             self.log('error', str(err))
@@ -533,7 +637,8 @@ class Network:
             self.router.send_msg(
                 ident_vk_bytes=ident_vk_bytes,
                 to_vk=ident_vk_string,
-                msg_str=encode({"response": "ping", "from": ident_vk_string})
+                request_id=request_id,
+                msg_str=encode_message({"response": "ping", "from": ident_vk_string, 'request_ids': True}, wire_version)
             )
 
         if action == ACTION_HELLO:
@@ -543,7 +648,8 @@ class Network:
             self.router.send_msg(
                 ident_vk_bytes=ident_vk_bytes,
                 to_vk=ident_vk_string,
-                msg_str=self.hello_response(challenge=challenge)
+                request_id=request_id,
+                msg_str=self.hello_response(challenge=challenge, wire_version=wire_version)
             )
 
             if not self.peers.get(ident_vk_string):
@@ -551,15 +657,18 @@ class Network:
 
         if action == ACTION_GET_LATEST_BLOCK:
             latest_block_info = self.get_latest_block_info()
-            block_num = latest_block_info.get('number')
-            block_hash = latest_block_info.get('hash')
-            hlc_timestamp = latest_block_info.get("hlc_timestamp")
 
-            resp_msg = ('{"response": "%s", "latest_block_number": %d, "latest_block_hash": "%s", "latest_hlc_timestamp": "%s"}' % (ACTION_GET_LATEST_BLOCK, block_num, block_hash, hlc_timestamp))
+            resp_msg = encode_message({
+                'response': ACTION_GET_LATEST_BLOCK,
+                'latest_block_number': latest_block_info.get('number'),
+                'latest_block_hash': latest_block_info.get('hash'),
+                'latest_hlc_timestamp': latest_block_info.get('hlc_timestamp')
+            }, wire_version)
 
             self.router.send_msg(
                 ident_vk_bytes=ident_vk_bytes,
                 to_vk=ident_vk_string,
+                request_id=request_id,
                 msg_str=resp_msg
             )
             self.log('info', f'Sent back latest block info: {latest_block_info}')
@@ -587,34 +696,63 @@ class Network:
                     block_num = block_info.get('number')
                     self.log('info', f'{action}: sent block num {block_num} to {ident_vk_string[0:8]}')
 
-                encoded_block_info = encode(block_info)
-
                 self.router.send_msg(
                     ident_vk_bytes=ident_vk_bytes,
                     to_vk=ident_vk_string,
-                    msg_str=('{"response": "%s", "block_info": %s}' % (action, encoded_block_info))
+                    request_id=request_id,
+                    msg_str=encode_message({'response': action, 'block_info': block_info}, wire_version)
                 )
 
         if action == ACTION_GET_NEXT_MEMBER_HISTORY:
             block_num = str(msg.get('block_num', None))
 
             member_history_info = self.block_storage.member_history.find_next_block(block_num=block_num)
-            encoded_member_history_info = encode(member_history_info)
 
             self.router.send_msg(
                 ident_vk_bytes=ident_vk_bytes,
                 to_vk=ident_vk_string,
-                msg_str=('{"response": "%s", "member_history_info": %s}' % (ACTION_GET_NEXT_MEMBER_HISTORY, encoded_member_history_info))
+                request_id=request_id,
+                msg_str=encode_message({
+                    'response': ACTION_GET_NEXT_MEMBER_HISTORY,
+                    'member_history_info': member_history_info
+                }, wire_version)
             )
 
-        if action == ACTION_GET_NETWORK_MAP:
-            node_list = encode(self.make_network_map())
+        if action == ACTION_GET_BLOCKS_RANGE or action == ACTION_GET_MEMBER_HISTORY_RANGE:
+            # reading and compressing a range is slow enough to stall the loop, build it on a thread
+            loop = asyncio.get_running_loop()
+            header, payload = await loop.run_in_executor(None, self.build_range_reply, action, msg, wire_version)
+
+            if header is None:
+                self.log('warning', f'Bad {action} request from {ident_vk_string[0:8]}: {msg}')
+                # answer anyway so the caller falls back right away instead of waiting out its timeout
+                self.router.send_msg(
+                    ident_vk_bytes=ident_vk_bytes,
+                    to_vk=ident_vk_string,
+                    request_id=request_id,
+                    msg_str=encode_message({'response': action, 'error': 'Malformed range request.'}, wire_version)
+                )
+                return
+
+            self.router.send_multipart_msg(
+                ident_vk_bytes=ident_vk_bytes,
+                to_vk=ident_vk_string,
+                request_id=request_id,
+                msg_str=header,
+                parts=[payload]
+            )
+            self.log('info', f'{action}: sent {len(payload)} bytes to {ident_vk_string[0:8]}')
 
-            resp_msg = ('{"response": "%s", "network_map": %s}' % (ACTION_GET_NETWORK_MAP, node_list))
+        if action == ACTION_GET_NETWORK_MAP:
+            resp_msg = encode_message({
+                'response': ACTION_GET_NETWORK_MAP,
+                'network_map': self.make_network_map()
+            }, wire_version)
 
             self.router.send_msg(
                 ident_vk_bytes=ident_vk_bytes,
                 to_vk=ident_vk_string,
+                request_id=request_id,
                 msg_str=resp_msg
             )
 
@@ -31,11 +31,13 @@ from lamden.nodes.processors import work, block_contender
 from lamden.nodes.processors.block_consensus import BlockConsensus
 from lamden.nodes.processors.processor import Processor
 from lamden.nodes.filequeue import FileQueue
+from lamden.nodes.proof_batcher import ProofBatcher
 from lamden.nodes.hlc import HLC_Clock
 from lamden.crypto.canonical import tx_hash_from_tx, block_from_tx_results, recalc_block_info, create_proof_message_from_tx_results, tx_result_hash_from_tx_result_object, hash_members_list
 from lamden.crypto.transaction import get_nonces
 from lamden.nodes.events import Event, EventWriter
 from lamden.crypto.block_validator import verify_block
+from lamden.crypto.verifier import get_signature_verifier
 from typing import List
 from lamden.nodes.catchup import CatchupHandler
 from lamden.nodes.missing_blocks import MissingBlocksHandler
@@ -70,7 +72,7 @@ class Node:
                  consensus_percent=None, nonces=None, genesis_block=None, metering=False,
                  tx_queue=None, socket_ports=None, reconnect_attempts=5, join=False, event_writer=None,
                  private_network=False, hardcoded_peers=False, rollback_point=None, run_catchup=True,
-                 safe_block_num=None, run_validation=True):
+                 safe_block_num=None, run_validation=True, tx_handoff=None):
 
         self.wallet = wallet
 
@@ -90,6 +92,11 @@ class Node:
         }
 
         self.tx_queue = tx_queue if tx_queue is not None else FileQueue()
+        # most txs taken off the file queue per pass of check_tx_queue
+        self.tx_queue_batch_size = 100
+        # optional TxHandoffReceiver the webserver sends txs to directly, the file queue is the fallback
+        self.tx_handoff = tx_handoff
+        self.check_tx_handoff_task = None
         self.pause_tx_queue_checking = False
 
         self.driver = driver if driver is not None else ContractDriver()
@@ -195,6 +202,11 @@ class Node:
             nonces=self.nonces
         )
 
+        self.proof_batcher = ProofBatcher(
+            wallet=self.wallet,
+            publish=self.publish_solution
+        )
+
         self.block_contender = block_contender.Block_Contender(
             testing=self.testing,
             debug=self.debug,
@@ -321,6 +333,9 @@ class Node:
 
             loop = asyncio.get_event_loop()
             self.check_for_tx_task = loop.create_task(self.check_tx_queue())
+            if self.tx_handoff is not None:
+                self.tx_handoff.start()
+                self.check_tx_handoff_task = loop.create_task(self.check_tx_handoff())
             self.connectivity_check_task = loop.create_task(self.connectivity_check())
 
             # Run catchup unless this was a rollback
@@ -369,11 +384,16 @@ class Node:
         await self.cancel_checking_all_queues()
 
         await self.stop_connectivity_check()
+        await self.stop_check_tx_handoff_task()
 
+        self.proof_batcher.stop()
         await self.network.stop()
         self.system_monitor.stop()
         await self.system_monitor.stopping()
 
+        self.validation_queue.multiprocess_consensus.stop()
+        get_signature_verifier().stop()
+
         self.started = False
 
         self.log.info("!!!!!! STOPPED NODE !!!!!!")
@@ -515,27 +535,77 @@ class Node:
         self.pause_tx_queue_checking = False
 
     async def check_tx_queue(self):
+        # The file queue is written by the webserver process so there is nothing to wait on, poll it while it's empty
+        # but drain it in batches without sleeping in between.
         while self.running and not self.pause_tx_queue_checking:
-            if len(self.tx_queue) > 0:
-                self.log.debug("Calling Check TX File Queue")
-                tx_from_file = self.tx_queue.pop(0)
+            if self.tx_handoff is None:
+                txs_from_file = self.tx_queue.pop_many(n=self.tx_queue_batch_size)
+            else:
+                # records of txs already taken from the handoff are skipped without being read
+                txs_from_file = self.tx_queue.pop_many(
+                    n=self.tx_queue_batch_size,
+                    skip=lambda tx_id: not self.tx_handoff.is_first_copy(tx_id=tx_id)
+                )
+
+            if len(txs_from_file) > 0:
+                self.log.debug(f"Got {len(txs_from_file)} txs from TX File Queue")
+
+            for tx_from_file in txs_from_file:
                 # TODO sometimes the tx info taken off the filequeue is None, investigate
                 self.log.info(f'GOT TX FROM FILE {tx_from_file}')
                 if tx_from_file is not None:
-                    tx_message = self.make_tx_message(tx=tx_from_file)
+                    self.add_new_tx(tx=tx_from_file)
 
-                    #if tx_message.get('hlc_timestamp') < HARDCODE_NETWORK_START:
-                    #    self.log.warning("Received tx before network start date.")
-                    #    return
+            self.debug_loop_counter['file_check'] = self.debug_loop_counter['file_check'] + 1
+            await asyncio.sleep(0 if len(txs_from_file) > 0 else 0.1)
 
-                    # send the tx to the rest of the network
-                    asyncio.ensure_future(self.network.publisher.async_publish(topic_str=WORK_SERVICE, msg_dict=tx_message))
+    def add_new_tx(self, tx: dict, tx_hash: str = None):
+        tx_message = self.make_tx_message(tx=tx, tx_hash=tx_hash)
 
-                    # add this tx the processing queue so we can process it
-                    self.main_processing_queue.append(tx=tx_message)
+        #if tx_message.get('hlc_timestamp') < HARDCODE_NETWORK_START:
+        #    self.log.warning("Received tx before network start date.")
+        #    return
 
-            self.debug_loop_counter['file_check'] = self.debug_loop_counter['file_check'] + 1
-            await asyncio.sleep(0.1)
+        # send the tx to the rest of the network
+        asyncio.ensure_future(self.network.publisher.async_publish(topic_str=WORK_SERVICE, msg_dict=tx_message))
+
+        # add this tx the processing queue so we can process it
+        self.main_processing_queue.append(tx=tx_message)
+
+    async def check_tx_handoff(self):
+        # Txs the webserver handed over directly, already validated and hashed.
+        while self.running:
+            try:
+                tx, tx_hash, tx_id = await self.tx_handoff.recv()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                self.log.error(f'[check_tx_handoff] {err}')
+                await asyncio.sleep(0.1)
+                continue
+
+            if tx is None:
+                continue
+
+            if self.pause_tx_queue_checking:
+                # its file queue copy is picked up once checking resumes
+                continue
+
+            if not self.tx_handoff.is_first_copy(tx_id=tx_id):
+                continue
+
+            self.log.info(f'GOT TX FROM HANDOFF {tx_hash}')
+            self.add_new_tx(tx=tx, tx_hash=tx_hash)
+
+    async def stop_check_tx_handoff_task(self):
+        if self.check_tx_handoff_task is not None:
+            self.check_tx_handoff_task.cancel()
+            await asyncio.gather(self.check_tx_handoff_task, return_exceptions=True)
+
+        self.check_tx_handoff_task = None
+
+        if self.tx_handoff is not None:
+            self.tx_handoff.stop()
 
     async def stop_check_tx_queue_task(self):
         if self.check_for_tx_task is not None:
@@ -590,7 +660,7 @@ class Node:
                 self.main_processing_queue.stop_processing()
 
             self.debug_loop_counter['main'] = self.debug_loop_counter['main'] + 1
-            await asyncio.sleep(0.1)
+            await self.main_processing_queue.wait_until_ready(timeout=self.main_processing_queue.READY_TIMEOUT)
 
         self.log.info(f'Exited Check Main Processing Queue.')
 
@@ -607,7 +677,7 @@ class Node:
                 #self.log.debug('[END] check_validation_queue')
 
             self.debug_loop_counter['validation'] = self.debug_loop_counter['validation'] + 1
-            await asyncio.sleep(0.1)
+            await self.validation_queue.wait_until_ready(timeout=self.validation_queue.READY_TIMEOUT)
 
         self.log.info(f'Exited Check Validation Queue.')
 
@@ -679,11 +749,11 @@ class Node:
 
     def store_solution_and_send_to_network(self, processing_results):
         processing_results = json.loads(encode(processing_results))
-        self.send_solution_to_network(processing_results=processing_results)
+        tx_result_hash = self.make_result_hash_from_processing_results(processing_results=processing_results)
 
-        processing_results['proof']['tx_result_hash'] = self.make_result_hash_from_processing_results(
-            processing_results=processing_results
-        )
+        self.send_solution_to_network(processing_results=processing_results, tx_result_hash=tx_result_hash)
+
+        processing_results['proof']['tx_result_hash'] = tx_result_hash
         self.validation_queue.append(
             processing_results=processing_results
         )
@@ -696,8 +766,27 @@ class Node:
             rewards=processing_results['rewards']
         )
 
-    def send_solution_to_network(self, processing_results):
-        asyncio.ensure_future(self.network.publisher.async_publish(topic_str=CONTENDER_SERVICE, msg_dict=processing_results))
+    def send_solution_to_network(self, processing_results, tx_result_hash: str = None):
+        if tx_result_hash is not None and self.network.peers_take_proof_batches():
+            # sent with the rest of the proofs from this window under one signature
+            self.proof_batcher.add(
+                hlc_timestamp=processing_results['hlc_timestamp'],
+                proof=dict(processing_results['proof'], tx_result_hash=tx_result_hash)
+            )
+            return
+
+        if tx_result_hash is not None and self.network.peers_take_compact_contenders():
+            # Every peer works out its own result, so all it needs from us is which one we signed. A peer whose
+            # result loses gets the minted block from the network instead.
+            processing_results = {
+                'hlc_timestamp': processing_results['hlc_timestamp'],
+                'proof': dict(processing_results['proof'], tx_result_hash=tx_result_hash)
+            }
+
+        self.publish_solution(msg=processing_results)
+
+    def publish_solution(self, msg: dict):
+        asyncio.ensure_future(self.network.publisher.async_publish(topic_str=CONTENDER_SERVICE, msg_dict=msg))
 
     def soft_apply_current_state(self, hlc_timestamp):
         try:
@@ -706,10 +795,10 @@ class Node:
         except Exception as err:
             self.log.error(err)
 
-    def make_tx_message(self, tx):
+    def make_tx_message(self, tx, tx_hash: str = None):
         hlc_timestamp = self.hlc_clock.get_new_hlc_timestamp()
 
-        tx_hash = tx_hash_from_tx(tx=tx)
+        tx_hash = tx_hash or tx_hash_from_tx(tx=tx)
 
         signature = self.wallet.sign(f'{tx_hash}{hlc_timestamp}')
 
@@ -972,6 +1061,10 @@ class Node:
 
         gc.collect()
 
+        # consensus moved on, txs waiting in the main processing queue may be ready or already in consensus
+        if self.main_processing_queue is not None:
+            self.main_processing_queue.notify()
+
         # check to see if we need to process any missing blocks.
         asyncio.ensure_future(self.missing_blocks_handler.run())
 
@@ -5,17 +5,21 @@ from lamden.logger.base import get_logger
 from lamden import storage
 from lamden.network import Network
 from lamden.peer import Peer
-from lamden.crypto.block_validator import verify_block
+from lamden.crypto.verifier import get_signature_verifier
 
 from contracting.db.driver import ContractDriver
 from contracting.db.encoder import convert_dict
 
 from random import choice
 
+# blocks sourced and verified ahead of the one being written
+CATCHUP_WINDOW = 32
+
 
 class CatchupHandler:
     def __init__(self, network: Network, contract_driver: ContractDriver, block_storage: storage.BlockStorage,
-                 nonce_storage: storage.NonceStorage, hardcoded_peers: bool = False):
+                 nonce_storage: storage.NonceStorage, hardcoded_peers: bool = False, write_batch_size: int = 100,
+                 window: int = CATCHUP_WINDOW):
         self.current_thread = threading.current_thread()
 
         self.network = network
@@ -25,6 +29,8 @@ class CatchupHandler:
 
         self.hardcoded_peers = hardcoded_peers
         self.safe_block_num = -1
+        self.write_batch_size = write_batch_size
+        self.window = window
 
         self.catchup_peers = []
         self.temp_block_storage = []
@@ -84,40 +90,230 @@ class CatchupHandler:
 
             self.process_block(block=latest_network_block)
 
-            current_block_number = latest_network_block.get('number')
-            current_block_previous = latest_network_block.get('previous')
-            while True:
-                # get the previous block
-                block = await self.get_previous_block(block_num=current_block_number)
-
-                if block is None:
-                    break
+            await self.catchup_blocks(start_block=latest_network_block, stop_at=my_current_height)
 
-                block_num = int(block.get('number'))
+        self.network.refresh_approved_peers_in_cred_provider()
+        self.log.warning('Catchup Complete!')
 
-                if block_num == 0:
-                    self.log.info('Genesis Block Reached.')
-                    break
+        self.running = False
 
-                if block.get('hash') != current_block_previous:
-                    self.log.error('Block chain breakdown. Hash mismatch. Exiting catchup.')
+    async def catchup_blocks(self, start_block: dict, stop_at: int) -> None:
+        # Walks back from start_block until stop_at or genesis as a pipeline:
+        #   1. a lead peer is asked for the next self.window blocks back in one range request. Each has to hash link
+        #      to the block after it, which the quorum sourced start_block anchors, so they need no quorum of their own.
+        #      If the lead can't serve ranges each block is sourced from all peers (51% hash quorum) instead.
+        #   2. up to self.window of those blocks are verified on the signature verifier's pool at the same time
+        #   3. blocks are written newest first, each checked to be the previous of the last, in write batches
+        # If the lead peer led the walk off the chain or served a block that doesn't verify, it's restarted from the
+        # last written block with the next peer.
+        pending = asyncio.Queue(maxsize=self.window)
+        lead_index = 0
+        walker = self.start_block_walker(start_block=start_block, stop_at=stop_at, lead_index=lead_index, pending=pending)
+
+        expected_hash = start_block.get('previous')
+        current_block = start_block
+
+        # Commit catchup blocks in batches, one grouped fsync per batch
+        batch_opened = self.block_storage.begin_write_batch()
+        # Blocks come newest first, their state history is recorded oldest first once the walk is done
+        history_deferred = self.block_storage.begin_deferred_state_history()
+        blocks_in_batch = 0
+
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
                     break
 
-                if block_num == my_current_height:
+                try:
+                    block = await task
+                    bad_block = False
+                except Exception as err:
+                    # the lead peer served a block that didn't pass validation, don't trust the rest of its walk
+                    self.log.error(f'Catchup got a bad block after block {current_block.get("number")}: {err}')
+                    block = None
+                    bad_block = True
+
+                if not bad_block:
+                    if block is None:
+                        break
+
+                    block_num = int(block.get('number'))
+
+                    if block_num == 0:
+                        self.log.info('Genesis Block Reached.')
+                        break
+
+                    bad_block = block.get('hash') != expected_hash
+
+                if bad_block:
+                    lead_index += 1
+                    if lead_index >= len(self.catchup_peers):
+                        self.log.error('Block chain breakdown. No peer left to catchup from. Exiting catchup.')
+                        break
+
+                    self.log.warning(f'Catchup walked off the chain after block {current_block.get("number")}, restarting.')
+                    await self.stop_block_walker(walker=walker, pending=pending)
+                    walker = self.start_block_walker(
+                        start_block=current_block,
+                        stop_at=stop_at,
+                        lead_index=lead_index,
+                        pending=pending
+                    )
+                    continue
+
+                if block_num == stop_at:
                     self.log.info('Caught Up to latest.')
                     break
 
                 self.process_block(block=block)
+                blocks_in_batch += 1
 
-                current_block_number = block.get('number')
-                current_block_previous = block.get('previous')
+                if batch_opened and blocks_in_batch >= self.write_batch_size:
+                    self.block_storage.commit_write_batch()
+                    batch_opened = self.block_storage.begin_write_batch()
+                    blocks_in_batch = 0
 
-                await asyncio.sleep(0.05)
+                expected_hash = block.get('previous')
+                current_block = block
+        finally:
+            await self.stop_block_walker(walker=walker, pending=pending)
 
-        self.network.refresh_approved_peers_in_cred_provider()
-        self.log.warning('Catchup Complete!')
+            if batch_opened:
+                self.block_storage.commit_write_batch()
 
-        self.running = False
+            if history_deferred:
+                self.block_storage.commit_deferred_state_history()
+
+    def start_block_walker(self, start_block: dict, stop_at: int, lead_index: int, pending: asyncio.Queue) -> asyncio.Future:
+        lead_peer = self.catchup_peers[lead_index % len(self.catchup_peers)] if len(self.catchup_peers) > 0 else None
+
+        return asyncio.ensure_future(self.walk_previous_blocks(
+            block_num=int(start_block.get('number')),
+            stop_at=stop_at,
+            lead_peer=lead_peer,
+            pending=pending
+        ))
+
+    async def stop_block_walker(self, walker: asyncio.Future, pending: asyncio.Queue) -> None:
+        walker.cancel()
+        await asyncio.gather(walker, return_exceptions=True)
+
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def walk_previous_blocks(self, block_num: int, stop_at: int, lead_peer: Peer, pending: asyncio.Queue) -> None:
+        # Queues a task sourcing each block before block_num, newest first, and a None once there are no more.
+        use_ranges = True
+
+        try:
+            while True:
+                blocks = None
+                if use_ranges:
+                    blocks = await self.get_previous_blocks(lead_peer=lead_peer, block_num=block_num, stop_at=stop_at)
+                    # older peers don't serve ranges, don't wait on them again
+                    use_ranges = blocks is not None
+
+                if blocks:
+                    for block in blocks:
+                        await pending.put(asyncio.ensure_future(self.verify_sourced_block(block=block)))
+
+                    block_num = int(blocks[-1].get('number'))
+                    if block_num == 0 or block_num == stop_at:
+                        break
+
+                    continue
+
+                previous_block_num = await self.get_previous_block_number(lead_peer=lead_peer, block_num=block_num)
+
+                if previous_block_num is None:
+                    # lead peer couldn't say, source this one from all peers before carrying on
+                    task = asyncio.ensure_future(self.source_verified_block(fetch_type='previous', block_num=block_num))
+                    await pending.put(task)
+
+                    block = await task
+                    if block is None:
+                        break
+
+                    previous_block_num = int(block.get('number'))
+                else:
+                    task = asyncio.ensure_future(self.source_verified_block(fetch_type='specific', block_num=previous_block_num))
+                    await pending.put(task)
+
+                if previous_block_num == 0 or previous_block_num == stop_at:
+                    break
+
+                block_num = previous_block_num
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            self.log.error(f'Catchup stopped walking back at block {block_num}: {err}')
+
+        await pending.put(None)
+
+    async def get_previous_blocks(self, lead_peer: Peer, block_num: int, stop_at: int) -> (list, None):
+        # Up to self.window blocks before block_num from the lead peer, newest first. None if it can't serve ranges.
+        if lead_peer is None:
+            return None
+
+        try:
+            blocks = await lead_peer.get_blocks_range(
+                start_block_num=max(int(stop_at), 0),
+                end_block_num=int(block_num) - 1,
+                limit=self.window,
+                reverse=True
+            )
+        except Exception:
+            return None
+
+        if not isinstance(blocks, list):
+            return None
+
+        # anything out of order is cut off here, the hash chain check catches the rest
+        previous_blocks = []
+        for block in blocks:
+            try:
+                number = int(block.get('number'))
+            except Exception:
+                break
+
+            if number >= block_num or number < stop_at:
+                break
+
+            if len(previous_blocks) > 0 and number >= int(previous_blocks[-1].get('number')):
+                break
+
+            previous_blocks.append(block)
+
+        return previous_blocks
+
+    async def get_previous_block_number(self, lead_peer: Peer, block_num: int):
+        if lead_peer is None:
+            return None
+
+        try:
+            res = await lead_peer.get_previous_block(block_num=block_num)
+            return int(res['block_info']['number'])
+        except Exception:
+            return None
+
+    async def source_verified_block(self, fetch_type: str, block_num: int) -> dict:
+        # Sources a block by hash quorum, then verifies only the agreed block
+        block = await self.source_block_from_peers(fetch_type=fetch_type, block_num=block_num, verify=False)
+        return await self.verify_sourced_block(block=block)
+
+    async def verify_sourced_block(self, block: dict) -> dict:
+        if block is None or int(block.get('number')) == 0:
+            return block
+
+        old_block = int(block.get('number')) <= self.safe_block_num
+        if not await get_signature_verifier().verify_block_async(block=block, old_block=old_block):
+            raise ValueError(f'Block {block.get("number")} from peers did not pass block validation.')
+
+        return block
 
     async def get_highest_network_block(self) -> dict:
         block = await self.source_block_from_peers(fetch_type='latest')
@@ -131,7 +327,7 @@ class CatchupHandler:
     async def get_previous_block(self, block_num: str) -> dict:
         return await self.source_block_from_peers(block_num=int(block_num), fetch_type='previous')
 
-    async def source_block_from_peers(self, fetch_type: str, block_num: int = 0) -> dict:
+    async def source_block_from_peers(self, fetch_type: str, block_num: int = 0, verify: bool = True) -> dict:
         block_counts = {}
         consensus_reached = False
         consensus_block = None
@@ -158,9 +354,9 @@ class CatchupHandler:
                     res_block_num = res_block.get('number')
                     res_block_hash = res_block.get('hash')
 
-                    if int(res_block_num) != 0 and fetch_type != 'latest':
+                    if verify and int(res_block_num) != 0 and fetch_type != 'latest':
                         old_block = int(res_block_num) <= self.safe_block_num
-                        verify_block(block=res_block, old_block=old_block)
+                        await get_signature_verifier().verify_block_async(block=res_block, old_block=old_block)
 
                     block_counts[res_block_hash] = block_counts.get(res_block_hash, 0) + 1
                     if block_counts[res_block_hash] / len(self.catchup_peers) > 0.51:
@@ -169,7 +365,8 @@ class CatchupHandler:
                 except Exception as err:
                     peer = future.__peer__
                     self.log.info(f'Error while processing block from {peer.server_vk} {err}')
-                    self.catchup_peers.remove(peer)  # remove the unresponsive peer
+                    if peer in self.catchup_peers:
+                        self.catchup_peers.remove(peer)  # remove the unresponsive peer
                     self.log.info(f'removed {peer.server_vk} from catchup list. peers left {len(self.catchup_peers)}')
 
         self.log.info(f'Done sourcing block... Block found {consensus_block is not None}.')
@@ -1,78 +1,308 @@
+from collections import deque
 from contracting.db.encoder import decode
 from lamden.logger.base import get_logger
 from pathlib import Path
+import fcntl
 import os
 import pathlib
 import shutil
-import uuid
+import struct
+import zlib
 
 STORAGE_HOME = pathlib.Path().home().joinpath('.lamden')
 
 class FileQueue:
+    # Durable FIFO spool shared by the webserver (appending) and the node (popping), which run in different processes.
+    #
+    # Txs are appended as records to one log file, a record's position in the log is its sequence number so order is
+    # strict. Appends hold an exclusive flock for the single write, so a record is only ever partial if its writer
+    # died, and that torn tail is cut off the next time the log is read. The consumer's position is kept in a small
+    # offset file, written in place after each pop, and the log is truncated once it has been fully consumed.
+    #
+    # Record: [length: u32][crc32: u32][tx]
+    # Offset: [generation: u64][offset: u64][crc32: u32], generation is bumped whenever the log is truncated.
+    #
+    # A record's id, "generation:offset", is returned on append so another copy of its tx can be matched to it, and
+    # pop_many can skip records by id without reading them.
     EXTENSION = '.tx'
+    LOG_FILENAME = 'txq.log'
+    OFFSET_FILENAME = 'txq.offset'
+
+    RECORD_HEADER = struct.Struct('>II')
+    OFFSET = struct.Struct('>QQ')
+    OFFSET_CRC = struct.Struct('>I')
+
+    # only truncate the drained log once it's grown this big, so a queue that keeps emptying doesn't churn
+    COMPACT_SIZE = 1024 * 1024
 
     def __init__(self, root=None, write_bytes=True):
         self.log = get_logger("TX QUEUE")
-        self.file_mode = 'wb' if write_bytes else 'w'
+        # txs are always stored as bytes now, str txs are encoded on append
+        self.write_bytes = write_bytes
         self.root = Path(root) if root is not None else STORAGE_HOME
         self.txq = self.root.joinpath('txq')
-        self.temp_txq = self.root.joinpath('temp_txq')
+        self.log_path = self.txq.joinpath(self.LOG_FILENAME)
+        self.offset_path = self.txq.joinpath(self.OFFSET_FILENAME)
+
+        self.log_fd = None
+        self.offset_fd = None
+        self.__reset_index(generation=None)
 
         self.__build_directories()
+        self.__migrate_legacy_files()
+
+    def __reset_index(self, generation):
+        # (offset, length) of every unconsumed record read so far, and how far the log has been read
+        self.records = deque()
+        self.scanned_to = 0
+        self.generation = generation
+        self.offset = 0
 
     def append(self, tx):
-        if tx is None:
-            return
+        ids = self.append_many(txs=[tx])
+        return ids[0] if len(ids) > 0 else None
 
-        filename = str(uuid.uuid4()) + self.EXTENSION
-        temp_filepath = self.temp_txq.joinpath(filename)
-        final_filepath = self.txq.joinpath(filename)
+    def append_many(self, txs):
+        # Queues txs in order with a single write, returns the id of each record written.
+        records = []
+        for tx in txs:
+            if tx is None:
+                continue
 
-        with open(temp_filepath, self.file_mode) as f:
-            f.write(tx)
+            if isinstance(tx, str):
+                tx = tx.encode()
 
-        os.rename(temp_filepath, final_filepath)
+            records.append(self.RECORD_HEADER.pack(len(tx), zlib.crc32(tx)) + tx)
 
-    def pop(self, idx):
-        files = sorted(self.txq.iterdir(), key=os.path.getmtime)
+        if len(records) == 0:
+            return []
+
+        self.__reopen_if_removed()
+        fcntl.flock(self.log_fd, fcntl.LOCK_EX)
         try:
-            file = files.pop(idx)
-        except IndexError as err:
-            self.log.debug(err)
+            # the log is only truncated with the lock held, so this is where the records land
+            generation = self.__read_generation()
+            offset = os.fstat(self.log_fd).st_size
+            os.write(self.log_fd, b''.join(records))
+        finally:
+            fcntl.flock(self.log_fd, fcntl.LOCK_UN)
+
+        ids = []
+        for record in records:
+            ids.append(self.record_id(generation=generation, offset=offset))
+            offset += len(record)
+
+        return ids
+
+    @staticmethod
+    def record_id(generation, offset):
+        return f'{generation}:{offset}'
+
+    def pop(self, idx=0):
+        if idx != 0:
+            raise ValueError('FileQueue is strictly FIFO, it can only pop the first tx.')
+
+        txs = self.pop_many(n=1)
+
+        if len(txs) == 0:
+            self.log.debug('pop from empty queue')
             return None
 
-        with open(file) as f:
-            data = decode(f.read())
+        return txs[0]
+
+    def pop_many(self, n, skip=None):
+        # Pops up to n txs in order and records the new position once for all of them. Records whose id skip returns
+        # True for are consumed without being read.
+        self.__catch_up()
+
+        txs = []
+        while len(self.records) > 0 and len(txs) < n:
+            offset, length = self.records.popleft()
+            self.offset = offset + self.RECORD_HEADER.size + length
 
-        os.remove(file)
+            if skip is not None and skip(self.record_id(generation=self.generation, offset=offset)):
+                continue
 
-        return data
+            txs.append(self.__read_tx(offset=offset, length=length))
+
+        if len(txs) > 0:
+            self.__write_offset(generation=self.generation, offset=self.offset)
+
+            if len(self.records) == 0 and self.offset >= self.COMPACT_SIZE:
+                self.__compact()
+
+        return txs
 
     def flush(self):
+        self.__close()
+
         if self.txq.is_dir():
             shutil.rmtree(self.txq)
-        if self.temp_txq.is_dir():
-            shutil.rmtree(self.temp_txq)
 
+        self.__reset_index(generation=None)
         self.__build_directories()
         self.log.debug(f'Flushed TX queue at \'{self.root}\'')
 
     def __len__(self):
-        try:
-            return len(list(self.txq.iterdir()))
-        except FileNotFoundError:
-            return 0
+        self.__catch_up()
+        return len(self.records)
 
     def __getitem__(self, key):
-        files = sorted(self.txq.iterdir(), key=os.path.getmtime)
-        file = files[key]
+        self.__catch_up()
+
+        offset, length = self.records[key]
+        return self.__read_tx(offset=offset, length=length)
+
+    def __del__(self):
+        self.__close()
+
+    def __read_tx(self, offset, length):
+        data = os.pread(self.log_fd, length, offset + self.RECORD_HEADER.size)
+
+        try:
+            return decode(data.decode())
+        except Exception as err:
+            self.log.error(f'Could not decode tx at offset {offset}: {err}')
+            return None
+
+    def __catch_up(self):
+        # Brings the in memory index up to date with the consumer offset and anything appended since the last call,
+        # only new records are read.
+        self.__reopen_if_removed()
+        generation, offset = self.__read_offset()
+
+        if generation != self.generation:
+            self.__reset_index(generation=generation)
 
-        with open(file) as f:
-            data = decode(f.read())
+        self.offset = offset
 
-        return data
+        size = os.fstat(self.log_fd).st_size
+        if size < self.scanned_to:
+            # truncated under us
+            self.__reset_index(generation=generation)
+            self.offset = offset
+
+        self.scanned_to = max(self.scanned_to, self.offset)
+        self.__scan(size=size)
+
+        while len(self.records) > 0 and self.records[0][0] < self.offset:
+            self.records.popleft()
+
+    def __scan(self, size):
+        while self.scanned_to < size:
+            header = os.pread(self.log_fd, self.RECORD_HEADER.size, self.scanned_to)
+            length, crc = self.RECORD_HEADER.unpack(header) if len(header) == self.RECORD_HEADER.size else (0, None)
+            end = self.scanned_to + self.RECORD_HEADER.size + length
+
+            if crc is not None and end <= size and zlib.crc32(os.pread(self.log_fd, length, end - length)) == crc:
+                self.records.append((self.scanned_to, length))
+                self.scanned_to = end
+                continue
+
+            # Either a writer is part way through this record or one died while writing it. Writers hold the lock
+            # for the whole write, so if it's still torn once we have the lock the rest of the log is garbage.
+            fcntl.flock(self.log_fd, fcntl.LOCK_EX)
+            try:
+                current_size = os.fstat(self.log_fd).st_size
+                if current_size > size:
+                    size = current_size
+                    continue
+
+                self.log.error(f'Dropping {size - self.scanned_to} bytes of torn tx records from {self.log_path}')
+                os.ftruncate(self.log_fd, self.scanned_to)
+                return
+            finally:
+                fcntl.flock(self.log_fd, fcntl.LOCK_UN)
+
+    def __compact(self):
+        # Everything has been consumed, empty the log. Holding the lock keeps appends out while checking nothing
+        # new arrived.
+        fcntl.flock(self.log_fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.log_fd).st_size != self.offset:
+                return
+
+            os.ftruncate(self.log_fd, 0)
+            self.__write_offset(generation=self.generation + 1, offset=0)
+            self.__reset_index(generation=self.generation + 1)
+        finally:
+            fcntl.flock(self.log_fd, fcntl.LOCK_UN)
+
+    def __read_offset(self):
+        stored = self.__read_stored_offset()
+        if stored is not None:
+            return stored
+
+        # never written, or caught mid write
+        if self.generation is None:
+            return 0, 0
+        return self.generation, self.offset
+
+    def __read_generation(self):
+        # Called with the lock held, the generation can't change but the consumer can be part way through writing
+        # its offset.
+        for i in range(100):
+            stored = self.__read_stored_offset()
+            if stored is not None:
+                return stored[0]
+
+            if os.fstat(self.offset_fd).st_size == 0:
+                return 0
+
+        return self.generation or 0
+
+    def __read_stored_offset(self):
+        data = os.pread(self.offset_fd, self.OFFSET.size + self.OFFSET_CRC.size, 0)
+
+        if len(data) == self.OFFSET.size + self.OFFSET_CRC.size:
+            values, (crc, ) = data[:self.OFFSET.size], self.OFFSET_CRC.unpack(data[self.OFFSET.size:])
+            if zlib.crc32(values) == crc:
+                return self.OFFSET.unpack(values)
+
+        return None
+
+    def __write_offset(self, generation, offset):
+        values = self.OFFSET.pack(generation, offset)
+        os.pwrite(self.offset_fd, values + self.OFFSET_CRC.pack(zlib.crc32(values)), 0)
+
+    def __migrate_legacy_files(self):
+        # Older versions wrote one file per tx, queue any that are left in the order they were written.
+        legacy_files = sorted(self.txq.glob(f'*{self.EXTENSION}'), key=os.path.getmtime)
+
+        for file in legacy_files:
+            try:
+                with open(file, 'rb') as f:
+                    self.append(f.read())
+                os.remove(file)
+            except FileNotFoundError:
+                # the other process sharing this queue migrated it
+                continue
+
+        temp_txq = self.root.joinpath('temp_txq')
+        if temp_txq.is_dir():
+            shutil.rmtree(temp_txq)
+
+    def __reopen_if_removed(self):
+        # another FileQueue on the same root flushed it
+        if os.fstat(self.log_fd).st_nlink == 0 or os.fstat(self.offset_fd).st_nlink == 0:
+            self.__close()
+            self.__reset_index(generation=None)
+            self.__build_directories()
+
+    def __close(self):
+        for fd in [getattr(self, 'log_fd', None), getattr(self, 'offset_fd', None)]:
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+        self.log_fd = None
+        self.offset_fd = None
 
     def __build_directories(self):
         self.root.mkdir(parents=True, exist_ok=True)
         self.txq.mkdir(parents=True, exist_ok=True)
-        self.temp_txq.mkdir(parents=True, exist_ok=True)
+
+        self.log_fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self.offset_fd = os.open(self.offset_path, os.O_RDWR | os.O_CREAT, 0o644)
@@ -14,6 +14,7 @@ from lamden.crypto.wallet import Wallet, verify
 from contracting.stdlib.bridge.decimal import ContractingDecimal
 from lamden.nodes.base import FileQueue
 from lamden.nodes.missing_blocks import MissingBlocksWriter
+from lamden.sockets.tx_handoff import TxHandoffSender, get_tx_handoff_path
 
 import ssl
 import asyncio
@@ -30,6 +31,11 @@ import os
 
 log = get_logger("MN-WebServer")
 
+STATE_AT_MAX_QUERIES = 500
+STATE_AT_MAX_CHANGES = 1_000
+# Most txs one /batch request can submit, the request body is also bound by REQUEST_MAX_SIZE
+BATCH_MAX_TXS = 500
+
 class NonceEncoder(_json.JSONEncoder):
     def default(self, o, *args, **kwargs):
         if isinstance(o, dict):
@@ -57,6 +63,7 @@ class WebServer:
                  blocks: storage.BlockStorage, nonces: storage.NonceStorage=None,
                  missing_blocks_writer: MissingBlocksWriter = None,
                  queue=None,
+                 tx_handoff: TxHandoffSender = None,
                  port=8080, ssl_port=443, ssl_enabled=False,
                  ssl_cert_file='~/.ssh/server.csr',
                  ssl_key_file='~/.ssh/server.key',
@@ -88,6 +95,8 @@ class WebServer:
         self.wallet = wallet
         self.queue = queue if queue is not None else FileQueue()
         self.max_queue_len = max_queue_len
+        # optional direct line to the node, txs go through the file queue when it's missing or the node isn't there
+        self.tx_handoff = tx_handoff
 
         self.port = port
 
@@ -107,6 +116,7 @@ class WebServer:
 
         # Add Routes
         self.app.add_route(self.submit_transaction, '/', methods=['POST', 'OPTIONS'])
+        self.app.add_route(self.submit_batch, '/batch', methods=['POST', 'OPTIONS'])
         self.app.add_route(self.ping, '/ping', methods=['GET', 'OPTIONS'])
         self.app.add_route(self.get_id, '/id', methods=['GET'])
         self.app.add_route(self.get_nonce, '/nonce/<vk>', methods=['GET'])
@@ -132,6 +142,9 @@ class WebServer:
         # TX Route
         self.app.add_route(self.get_tx, '/tx', methods=['GET'])
 
+        # Historical State Route
+        self.app.add_route(self.get_state_at, '/state_at', methods=['GET', 'POST', 'OPTIONS'])
+
         # Missing Blocks Route
         self.app.add_route(self.report_missing_blocks, '/report_missing_blocks', methods=['POST', 'OPTIONS'])
 
@@ -298,18 +311,94 @@ class WebServer:
             value=tx['payload']['nonce']
         )
 
-        # Add TX to the processing queue
-        self.queue.append(request.body)
-        log.error('Added to q')
-
         # Return the TX hash to the user so they can track it
         tx_hash = tx_hash_from_tx(tx)
 
+        # Add TX to the processing queue, the hand off only gets it to the node sooner
+        tx_id = self.queue.append(request.body)
+        if self.tx_handoff is not None:
+            self.tx_handoff.send(tx_bytes=request.body, tx_hash=tx_hash, tx_id=tx_id)
+        log.error('Added to q')
+
         return response.json({
             'success': 'Transaction successfully submitted to the network.',
             'hash': tx_hash
         }, headers={'Access-Control-Allow-Origin': '*'})
 
+    # Submit many TXs in one request, validated together and queued with one write
+    async def submit_batch(self, request):
+        log.debug(f'New batch request: {request}')
+
+        if request.method == "OPTIONS":
+            return response.text("",headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': "origin, content-type"
+            })
+
+        queue_space = self.max_queue_len - len(self.queue)
+        if queue_space <= 0:
+            return response.json({'error': "Queue full. Resubmit shortly."}, status=503,
+                                 headers={'Access-Control-Allow-Origin': '*'})
+
+        txs = decode(request.body)
+        if not isinstance(txs, list):
+            return response.json({'error': 'Malformed request body. Expected a list of transactions.'},
+                                 headers={'Access-Control-Allow-Origin': '*'})
+
+        if len(txs) > BATCH_MAX_TXS:
+            return response.json({'error': f'Too many transactions. Max {BATCH_MAX_TXS} per batch.'},
+                                 headers={'Access-Control-Allow-Origin': '*'})
+
+        errors = await transaction.transactions_are_valid_async(
+            transactions=txs,
+            expected_processor=self.wallet.verifying_key,
+            client=self.client,
+            nonces=self.nonces
+        )
+
+        # other batches may have been queued while the signatures were verified
+        queue_space = self.max_queue_len - len(self.queue)
+
+        results = []
+        to_queue = []
+
+        for tx, error in zip(txs, errors):
+            try:
+                tx_hash = tx_hash_from_tx(tx)
+            except Exception:
+                tx_hash = None
+
+            if error is None and len(to_queue) >= queue_space:
+                results.append({'error': "Queue full. Resubmit shortly.", 'hash': tx_hash})
+                continue
+
+            if error is not None:
+                log.error(f'Tx has error: {error}')
+                results.append(dict(transaction.EXCEPTION_MAP[error], hash=tx_hash))
+                continue
+
+            self.nonces.set_nonce(
+                sender=tx['payload']['sender'],
+                processor=tx['payload']['processor'],
+                value=tx['payload']['nonce']
+            )
+
+            to_queue.append((encode(tx).encode(), tx_hash))
+
+            results.append({
+                'success': 'Transaction successfully submitted to the network.',
+                'hash': tx_hash
+            })
+
+        # Add all the accepted TXs to the processing queue at once
+        tx_ids = self.queue.append_many(txs=[tx_bytes for tx_bytes, _ in to_queue])
+
+        if self.tx_handoff is not None:
+            for (tx_bytes, tx_hash), tx_id in zip(to_queue, tx_ids):
+                self.tx_handoff.send(tx_bytes=tx_bytes, tx_hash=tx_hash, tx_id=tx_id)
+
+        return response.json({'results': results}, headers={'Access-Control-Allow-Origin': '*'})
+
     # Network Status
     async def ping(self, request):
         return response.json({'status': 'online'}, headers={'Access-Control-Allow-Origin': '*'})
@@ -496,8 +585,68 @@ class WebServer:
             return response.json({'error': 'Transaction not found.'}, status=400,
                                  headers={'Access-Control-Allow-Origin': '*'})
 
+        # Enclosing block's number, hash and hlc_timestamp, None for txs stored before the tx index existed.
+        tx['block'] = self.blocks.get_tx_block(_hash)
+
         return response.json(tx, dumps=encode, headers={'Access-Control-Allow-Origin': '*'})
 
+    async def get_state_at(self, request):
+        if request.method == "OPTIONS":
+            return response.text("", headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': "origin, content-type"
+            })
+
+        try:
+            if request.method == 'POST':
+                body = request.json
+
+                if body is None or not isinstance(body.get('queries'), list):
+                    raise ValueError('Body must be JSON with a list of queries.')
+
+                queries = [(query['key'], int(query['num'])) for query in body.get('queries')]
+
+            else:
+                contract = request.args.get('contract')
+
+                if contract is not None:
+                    start = request.args.get('start')
+                    end = request.args.get('end')
+                    limit = min(int(request.args.get('limit', STATE_AT_MAX_CHANGES)), STATE_AT_MAX_CHANGES)
+
+                    changes = self.blocks.get_contract_changes(
+                        contract=contract,
+                        start=None if start is None else int(start),
+                        end=None if end is None else int(end),
+                        limit=limit
+                    )
+
+                    return response.json({'contract': contract, 'changes': changes}, dumps=encode,
+                                         headers={'Access-Control-Allow-Origin': '*'})
+
+                keys = request.args.getlist('key')
+                num = request.args.get('num')
+
+                if not keys or num is None:
+                    raise ValueError('Provide a key and a block num, or a contract.')
+
+                queries = [(key, int(num)) for key in keys]
+
+            if len(queries) > STATE_AT_MAX_QUERIES:
+                raise ValueError(f'At most {STATE_AT_MAX_QUERIES} queries per request.')
+
+        except (ValueError, TypeError, KeyError, AttributeError) as err:
+            return response.json({'error': str(err)}, status=400, headers={'Access-Control-Allow-Origin': '*'})
+
+        try:
+            states = self.blocks.get_states_at(queries=queries)
+        except storage.StateHistoryUnavailable as err:
+            # The node is still rebuilding the state history of blocks stored before it was kept
+            return response.json({'error': str(err), 'available_from': str(self.blocks.state_history_floor())},
+                                 status=503, headers={'Access-Control-Allow-Origin': '*'})
+
+        return response.json({'states': states}, dumps=encode, headers={'Access-Control-Allow-Origin': '*'})
+
     async def get_constitution(self, request):
         self.client.raw_driver.clear_pending_state()
 
@@ -602,14 +751,17 @@ if __name__ == '__main__':
     # These will be the topics that are sent from the event server
     topics = ["new_block", "block_reorg", "upgrade", "network_error", "sync_blocks", "out_of_sync", "confirmed_block"]
 
+    tx_handoff_path = get_tx_handoff_path()
+
     webserver = WebServer(
         contracting_client=ContractingClient(submission_filename=sync.DEFAULT_SUBMISSION_PATH),
         driver=storage.ContractDriver(),
-        blocks=storage.BlockStorage(),
+        blocks=storage.BlockStorage(read_only=True),
         wallet=wallet,
         port=port,
         event_service_port=event_port,
-        topics=topics
+        topics=topics,
+        tx_handoff=TxHandoffSender(ipc_path=tx_handoff_path) if tx_handoff_path else None
     )
 
     webserver.app.run(host='0.0.0.0', port=webserver.port, debug=webserver.debug, access_log=webserver.access_log)
@@ -1,4 +1,4 @@
-from lamden.storage import BlockStorage
+from lamden.storage import BlockStorage, BLOCK_RANGE_PREFETCH
 from lamden.network import Network
 from lamden.logger.base import get_logger
 from lamden.crypto.canonical import hash_members_list
@@ -32,6 +32,22 @@ class MemberHistoryHandler:
                 'number': -1
             }
 
+        # take as much history as the peers agree on in range requests, then finish one item at a time
+        while member_history is not None:
+            history_items = await self.source_history_range_from_peers(block_num=int(member_history.get('number')))
+
+            if len(history_items) == 0:
+                break
+
+            for history_item in history_items:
+                self.log.info(f'Member History change added at block {history_item.get("number")}.')
+                self.block_storage.member_history.set(
+                    block_num=history_item.get('number'),
+                    members_list=history_item.get('members_list')
+                )
+
+            member_history = history_items[-1]
+
         while member_history is not None:
             block_num = member_history.get('number')
 
@@ -52,13 +68,9 @@ class MemberHistoryHandler:
         if self.block_storage.member_history.has_history():
             self.block_storage.member_history.purge()
 
-        block = self.block_storage.get_next_block(v=-1)
-
-        while block is not None:
+        for block in self.block_storage.get_blocks_range(prefetch=BLOCK_RANGE_PREFETCH):
             self.process_from_block(block=block)
 
-            block = self.block_storage.get_next_block(v=int(block.get('number')))
-
     def process_from_block(self, block: dict):
         if self.block_storage.is_genesis_block(block=block):
             state_changes = block['genesis']
@@ -80,6 +92,53 @@ class MemberHistoryHandler:
 
         return history_item
 
+    async def source_history_range_from_peers(self, block_num: int) -> list:
+        # Asks every peer for the history after block_num in one range request. Items are taken in order for as long
+        # as more than 51% of the peers sent the same one, signed by themselves. Peers that can't serve ranges just
+        # don't count towards that, so an older network gets an empty list and the caller falls back.
+        timeout = 5
+
+        async def get_range(peer):
+            try:
+                items = await asyncio.wait_for(
+                    peer.get_member_history_range(start_block_num=max(int(block_num) + 1, 0)),
+                    timeout=timeout
+                )
+            except Exception:
+                return []
+
+            agreed = []
+            for item in items or []:
+                if not self.block_storage.member_history.verify_signature(data=item, vk=peer.server_vk):
+                    self.log.warning(f'Peer {peer.server_vk} providing improperly signed members history info.')
+                    break
+
+                agreed.append((str(item.get('number')), hash_members_list(item.get('members_list', [])), item))
+
+            return agreed
+
+        if len(self.peers) == 0:
+            return []
+
+        peer_items = await asyncio.gather(*[get_range(peer) for peer in self.peers])
+
+        history_items = []
+        for position in range(max(len(items) for items in peer_items)):
+            consensus_counts = {}
+            for items in peer_items:
+                if position < len(items):
+                    key = items[position][:2]
+                    consensus_counts[key] = consensus_counts.get(key, 0) + 1
+
+            key, count = max(consensus_counts.items(), key=lambda kv: kv[1])
+            if count / len(self.peers) <= 0.51:
+                break
+
+            history_items.append(next(items[position][2] for items in peer_items
+                                      if position < len(items) and items[position][:2] == key))
+
+        return history_items
+
     async def source_history_from_peers(self, fetch_type: str, block_num: int = 0) -> dict:
         consensus_counts = {}
         consensus_reached = False
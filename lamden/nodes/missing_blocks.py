@@ -1,7 +1,7 @@
 from lamden import storage
 from contracting.db.encoder import convert_dict, encode
 from copy import deepcopy
-from lamden.crypto.block_validator import verify_block
+from lamden.crypto.verifier import get_signature_verifier
 from lamden.crypto.wallet import Wallet
 from contracting.db.driver import ContractDriver
 from lamden.network import Network
@@ -10,6 +10,7 @@ from lamden.nodes.events import Event, EventWriter
 from lamden.logger.base import get_logger
 from lamden.peer import Peer
 
+from bisect import bisect_right
 from random import choice
 import os
 import json
@@ -106,7 +107,7 @@ class MissingBlocksHandler:
 
                 # If this is the genesis block then return it
                 # OR if the block is valid, return it.
-                if int(block_num) == 0 or verify_block(block=block, old_block=int(block_num) <= self.safe_block_num):
+                if int(block_num) == 0 or await self._verify_block(block=block):
                     return block
 
                 raise ValueError(f'{block.get("number")} from {peer_vk}')
@@ -119,6 +120,52 @@ class MissingBlocksHandler:
 
         return None
 
+    async def _source_blocks_range_from_peer(self, block_nums: list) -> dict:
+        # Gets as many of block_nums as a random peer has through range requests, each starting at the next block
+        # still wanted. Returns the verified ones by number, the rest are left to _source_block_from_peers.
+        wanted_set = set(int(block_num) for block_num in block_nums if int(block_num) > 0)
+        wanted = sorted(wanted_set)
+        peer_list = self.network.get_all_connected_peers()
+
+        if len(wanted) == 0 or len(peer_list) == 0:
+            return {}
+
+        random_peer: Peer = choice(peer_list)
+        blocks = {}
+        position = 0
+
+        while position < len(wanted):
+            try:
+                res = await random_peer.get_blocks_range(start_block_num=wanted[position], end_block_num=wanted[-1])
+                received = {int(block.get('number')): block for block in res or []}
+            except Exception as err:
+                self.log.error(f'Could not get blocks range from peer {random_peer.server_vk}: {err}')
+                break
+
+            if len(received) == 0:
+                break
+
+            found = [block for block_num, block in received.items() if block_num in wanted_set and block_num not in blocks]
+            results = await asyncio.gather(*[self._verify_block(block=block) for block in found])
+
+            for block, valid in zip(found, results):
+                if valid:
+                    blocks[int(block.get('number'))] = block
+
+            next_position = bisect_right(wanted, max(received))
+            if next_position <= position:
+                break
+
+            position = next_position
+
+        return blocks
+
+    async def _verify_block(self, block: dict) -> bool:
+        return await get_signature_verifier().verify_block_async(
+            block=block,
+            old_block=int(block.get('number')) <= self.safe_block_num
+        )
+
     def _safe_set_state_changes_and_rewards(self, block: dict) -> None:
         state_changes = block['processed'].get('state', [])
         rewards = block.get('rewards', [])
@@ -231,10 +278,17 @@ class MissingBlocksHandler:
         return valid_missing_blocks_list
 
     async def process_missing_blocks(self, missing_block_numbers_list: list = None):
-        for block_num in missing_block_numbers_list:
-            block = await self._source_block_from_peers(block_num=int(block_num))
-            if block is not None:
-                self.process_block(block=block)
+        # fetch in as few round trips as a peer allows, then go one by one for anything it didn't have
+        range_blocks = await self._source_blocks_range_from_peer(block_nums=missing_block_numbers_list)
+
+        with self.block_storage.write_batch():
+            for block_num in missing_block_numbers_list:
+                block = range_blocks.get(int(block_num))
+                if block is None:
+                    block = await self._source_block_from_peers(block_num=int(block_num))
+
+                if block is not None:
+                    self.process_block(block=block)
 
     def process_block(self, block):
         block_num: str = block.get('number')
@@ -301,11 +355,11 @@ class MissingBlocksHandler:
                     'signature': signature
                 }
 
-                # Delete the block currently in storage
-                self.block_storage.remove_block(v=next_block_number)
-
-                # Store the new corrected version
-                self.block_storage.store_block(block=next_block)
+                # Replace the block currently in storage with the corrected version as one write batch so a crash
+                # in between is caught on restart
+                with self.block_storage.write_batch(block_numbers=[next_block_number]):
+                    self.block_storage.remove_block(v=next_block_number)
+                    self.block_storage.store_block(block=next_block)
 
                 # Sent reorg event
                 self._write_reorg_event(block=next_block)
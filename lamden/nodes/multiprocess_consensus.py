@@ -1,61 +1,153 @@
 import asyncio
 import multiprocessing
-from time import time
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from lamden.nodes.determine_consensus import DetermineConsensus
 
 from lamden.logger.base import get_logger
 
+# Checks consensus for many HLCs at once on a pool of worker processes that lives as long as the node. Jobs are sent
+# as tuples of result hashes, never the dicts of proofs and results they came from.
+#
+# Job:    (hlc_timestamp, (result hash of each solution, ...), index of our solution or -1, last_check_info flags)
+# Result: (hlc_timestamp, consensus result)
+
+# Number of consensus workers, unset or 0 checks everything in the node's process. Tallying an HLC in process takes
+# 5-20us for 4-100 solutions, about what packing it into a job and reading back its result costs, so the pool is off
+# unless it's configured.
+CONSENSUS_WORKERS_ENV = 'LAMDEN_CONSENSUS_WORKERS'
+# Fewer HLCs than this are checked in process even with workers, the round trip to the pool alone is over 1ms
+POOL_MIN_HLCS = 1000
+# Most HLCs sent to a worker at once
+CHUNK_SIZE = 1000
+
+# Stands in for our vk in the solutions a worker rebuilds, the workers don't know it
+MY_SOLUTION_KEY = -1
+
+
+class WorkerIdentity:
+    verifying_key = MY_SOLUTION_KEY
+
+
+def consensus_workers() -> int:
+    try:
+        return max(int(os.environ[CONSENSUS_WORKERS_ENV]), 0)
+    except (KeyError, ValueError):
+        return 0
+
+
+def make_consensus_job(hlc_timestamp: str, results: dict, my_vk: str) -> tuple:
+    solutions = results.get('solutions')
+    last_check_info = results.get('last_check_info')
+
+    my_index = -1
+    for i, node_vk in enumerate(solutions):
+        if node_vk == my_vk:
+            my_index = i
+            break
+
+    return (
+        hlc_timestamp,
+        tuple(solutions.values()),
+        my_index,
+        last_check_info.get('ideal_consensus_possible', False),
+        last_check_info.get('eager_consensus_possible', False)
+    )
+
+
+def check_consensus_batch(consensus_percent, num_of_participants: int, jobs: list) -> list:
+    # Runs in a worker, the solutions are rebuilt in the order they were received so ties break the same way
+    determine_consensus = DetermineConsensus(consensus_percent=lambda: consensus_percent, my_wallet=WorkerIdentity)
+
+    results = []
+    for hlc_timestamp, result_hashes, my_index, ideal_consensus_possible, eager_consensus_possible in jobs:
+        solutions = {MY_SOLUTION_KEY if i == my_index else i: result_hash for i, result_hash in enumerate(result_hashes)}
+
+        results.append((hlc_timestamp, determine_consensus.check_consensus(
+            solutions=solutions,
+            num_of_participants=num_of_participants,
+            last_check_info={
+                'ideal_consensus_possible': ideal_consensus_possible,
+                'eager_consensus_possible': eager_consensus_possible
+            }
+        )))
+
+    return results
+
 
 class MultiProcessConsensus:
-    def __init__(self, consensus_percent, my_wallet, get_peers_for_consensus):
+    def __init__(self, consensus_percent, my_wallet, get_peers_for_consensus, workers: int = None,
+                 pool_min_hlcs: int = POOL_MIN_HLCS):
         self.log = get_logger('MultiProcessConsensus')
 
+        self.consensus_percent = consensus_percent
         self.determine_consensus = DetermineConsensus(
             consensus_percent=consensus_percent,
             my_wallet=my_wallet
         )
+        self.my_vk = my_wallet.verifying_key
 
         self.get_peers_for_consensus = get_peers_for_consensus
 
+        self.workers = consensus_workers() if workers is None else workers
+        self.pool_min_hlcs = pool_min_hlcs
+        self.pool = None
+
         self.all_consensus_results = {}
 
         self.running = False
 
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # spawn so workers don't inherit the node's sockets and event loop
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+        return self.pool
+
+    def use_pool(self, num_of_hlcs: int) -> bool:
+        return self.workers > 0 and num_of_hlcs >= self.pool_min_hlcs
+
+    def chunks(self, jobs: list) -> list:
+        # spread the jobs over all the workers instead of handing them to one
+        size = max(1, min(CHUNK_SIZE, -(-len(jobs) // max(self.workers, 1))))
+        return [jobs[i:i + size] for i in range(0, len(jobs), size)]
 
     async def start(self, validation_results):
         self.running = True
 
         try:
             self.all_consensus_results = {}
-            processes = []
             num_of_peers = len(self.get_peers_for_consensus())
 
-            for hlc_timestamp in validation_results:
-                parent_conn, child_conn = multiprocessing.Pipe()
-                results = validation_results[hlc_timestamp]
-                p = multiprocessing.Process(
-                    target=self.run_it,
-                    args=[results, num_of_peers, child_conn]
-                )
-                processes.append({
-                    'parent_conn': parent_conn,
-                    'child_conn': child_conn,
-                    'process': p,
-                    'hlc_timestamp': hlc_timestamp
-                })
-
-            for process_info in processes:
-                process = process_info.get('process')
-                process.start()
-
-            await self.check_all(processes)
-
-            for process_info in processes:
-                process = process_info.get('process')
-                process.terminate()
-                process.join()
-
+            if not self.use_pool(num_of_hlcs=len(validation_results)):
+                for hlc_timestamp in validation_results:
+                    results = validation_results[hlc_timestamp]
+                    self.all_consensus_results[hlc_timestamp] = self.determine_consensus.check_consensus(
+                        solutions=results.get('solutions'),
+                        num_of_participants=num_of_peers,
+                        last_check_info=results.get('last_check_info')
+                    )
+
+                return self.all_consensus_results
+
+            jobs = [
+                make_consensus_job(hlc_timestamp=hlc_timestamp, results=validation_results[hlc_timestamp], my_vk=self.my_vk)
+                for hlc_timestamp in validation_results
+            ]
+
+            # read here, it's a callable on the node that can't go to the workers
+            results = await self.check_on_pool(
+                consensus_percent=self.consensus_percent(),
+                num_of_peers=num_of_peers,
+                jobs=jobs
+            )
+
+            self.all_consensus_results = dict(results)
             return self.all_consensus_results
 
         except Exception as err:
@@ -65,48 +157,26 @@ class MultiProcessConsensus:
         finally:
             self.running = False
 
-    async def check(self, process_info):
-        hlc_timestamp = process_info.get('hlc_timestamp')
-        parent_conn = process_info.get('parent_conn')
-
-        start_time = time()
-        self.all_consensus_results[hlc_timestamp] = None
-
-        done = False
-        timeout = False
-        while not done and not timeout:
-            if parent_conn.poll():
-                self.all_consensus_results[hlc_timestamp] = parent_conn.recv()
-                done = True
-            else:
-                if time() - start_time > 0.1:
-                    timeout = True
-                else:
-                    await asyncio.sleep(0.01)
-
-    async def check_all(self, processes):
-        tasks = [asyncio.ensure_future(self.check(process_info)) for process_info in processes]
-        await asyncio.wait(tasks)
-
-    def run_it(self, results, num_of_peers, child_conn):
-        loop = asyncio.get_event_loop()
-        asyncio.set_event_loop(loop)
-
-        solutions = results.get('solutions')
-        last_check_info = results.get('last_check_info')
-        consensus_results = self.determine_consensus.check_consensus(
-            solutions,
-            num_of_peers,
-            last_check_info
-        )
-        child_conn.send(consensus_results)
+    async def check_on_pool(self, consensus_percent, num_of_peers: int, jobs: list) -> list:
+        loop = asyncio.get_running_loop()
 
         try:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()
-        except RuntimeError as e:
-            print(e)
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(self.get_pool(), check_consensus_batch, consensus_percent, num_of_peers, chunk)
+                for chunk in self.chunks(jobs)
+            ])
+        except BrokenProcessPool as err:
+            self.log.error(f'Consensus pool broke, checking in process: {err}')
+            self.pool = None
+            return check_consensus_batch(consensus_percent, num_of_peers, jobs)
+
+        return [result for chunk in chunks for result in chunk]
 
     async def wait_for_done(self):
         while self.running:
             await asyncio.sleep(0.5)
+
+    def stop(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
@@ -1,6 +1,7 @@
 import time
 import datetime
 import hashlib
+import heapq
 import math
 
 from contracting.stdlib.bridge.time import Datetime
@@ -18,6 +19,13 @@ from threading import Lock
 
 GLOBAL_LOCK = Lock()
 
+
+class QueuedTx(dict):
+    # A queued tx message that orders by hlc_timestamp so the queue can be kept as a heap of plain dicts.
+    def __lt__(self, other):
+        return self['hlc_timestamp'] < other['hlc_timestamp']
+
+
 class TxProcessingQueue(ProcessingQueue):
     def __init__(self, client, driver, wallet, hlc_clock, processing_delay, stop_node, check_if_already_has_consensus,
                  get_last_hlc_in_consensus, pause_all_queues, unpause_all_queues, reprocess, metering=False, testing=False, debug=False):
@@ -56,6 +64,9 @@ class TxProcessingQueue(ProcessingQueue):
         self.append_history = []
         self.currently_processing_hlc = ""
 
+        # self.queue is a heap ordered by hlc_timestamp, queued_hlcs mirrors it for O(1) duplicate checks.
+        self.queued_hlcs = set()
+
     def append(self, tx):
         if not self.allow_append:
             return
@@ -78,26 +89,35 @@ class TxProcessingQueue(ProcessingQueue):
                 self.append_history.append(tx)
 
             tx['timestamp'] = time.time()
-            super().append(tx)
-            self.sort_queue()
+            self.push(tx=tx)
+            self.notify()
+
+    def push(self, tx):
+        heapq.heappush(self.queue, QueuedTx(tx))
+        self.queued_hlcs.add(tx['hlc_timestamp'])
+
+    def pop(self) -> dict:
+        tx = dict(heapq.heappop(self.queue))
+        self.queued_hlcs.discard(tx['hlc_timestamp'])
+        return tx
 
     def flush(self):
         super().flush()
+        self.queued_hlcs = set()
 
     def sort_queue(self):
-        # sort the main processing queue by hlc_timestamp
+        # sort the main processing queue by hlc_timestamp, a sorted list is also a valid heap
         self.queue.sort(key=lambda x: x['hlc_timestamp'])
 
     def filter_queue(self):
-        # filter the main processing to remove hlc that are already in consensus
+        # Lazily drop HLCs that are already in consensus. They are the smallest in the heap, so only the top is
+        # popped until it is newer than consensus.
         last_hlc_in_consensus = self.get_last_hlc_in_consensus()
-        self.queue = [tx for tx in self.queue if tx.get('hlc_timestamp') > last_hlc_in_consensus]
+        while len(self.queue) > 0 and self.queue[0]['hlc_timestamp'] <= last_hlc_in_consensus:
+            self.pop()
 
     def hlc_already_in_queue(self, hlc_timestamp):
-        for tx in self.queue:
-            if tx['hlc_timestamp'] == hlc_timestamp:
-                return True
-        return False
+        return hlc_timestamp in self.queued_hlcs
 
     def hlc_earlier_than_consensus(self, hlc_timestamp):
         return hlc_timestamp < self.get_last_hlc_in_consensus()
@@ -114,7 +134,7 @@ class TxProcessingQueue(ProcessingQueue):
             return
 
         # Pop it out of the main processing queue
-        tx = self.queue.pop(0)
+        tx = self.pop()
 
         self.currently_processing_hlc = tx['hlc_timestamp']
 
@@ -126,6 +146,10 @@ class TxProcessingQueue(ProcessingQueue):
 
         # If the transaction has been held for enough time then process it.
         if time_in_queue > time_delay:
+            # whatever is behind this tx can be looked at as soon as it's done
+            if len(self.queue) > 0:
+                self.notify()
+
             '''
             if self.debug:
                 self.log.debug(json.dumps({
@@ -160,8 +184,9 @@ class TxProcessingQueue(ProcessingQueue):
                 # self.log.debug('[STOP] process_main_queue - 3')
                 return processing_results
         else:
-            # else, put it back in queue
-            self.queue.insert(0, tx)
+            # else, put it back in queue and check again once its hold time is up
+            self.push(tx=tx)
+            self.notify_in(delay=time_delay - time_in_queue)
             # self.log.debug('[STOP] process_main_queue - 4')
             return None
 
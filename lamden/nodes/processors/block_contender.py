@@ -1,6 +1,8 @@
 from lamden.crypto.wallet import verify
+from lamden.crypto.verifier import get_signature_verifier
 from lamden.logger.base import get_logger
-from lamden.crypto.canonical import tx_result_hash_from_tx_result_object, create_proof_message_from_proof
+from lamden.crypto.canonical import tx_result_hash_from_tx_result_object, create_proof_message_from_proof, \
+    proof_batch_leaves, create_proof_batch_message, verify_merkle_tree
 from lamden.network import Network
 from lamden.nodes.processors.processor import Processor
 
@@ -54,6 +56,60 @@ def valid_message_payload(msg):
 
     return True
 
+def valid_compact_message_payload(msg):
+    # Nodes that know all their peers take them only send the proof of the result they got, every node has its own
+    # full result and the minted block is fetched if the one in consensus isn't it.
+    if not isinstance(msg, dict) or 'tx_result' in msg:
+        return False
+
+    if not isinstance(msg.get('hlc_timestamp'), str):
+        return False
+
+    proof = msg.get('proof')
+    if not isinstance(proof, dict):
+        return False
+
+    if not isinstance(proof.get("signature"), str):
+        return False
+
+    if not isinstance(proof.get("signer"), str):
+        return False
+
+    if not isinstance(proof.get("tx_result_hash"), str):
+        return False
+
+    return True
+
+def valid_batch_message_payload(msg):
+    # A node's proofs for every tx it processed in a window, signed once over their merkle root
+    if not isinstance(msg, dict):
+        return False
+
+    batch = msg.get('batch')
+    if not isinstance(batch, dict):
+        return False
+
+    for key in ['signer', 'signature', 'root', 'members_list_hash']:
+        if not isinstance(batch.get(key), str):
+            return False
+
+    if not isinstance(batch.get('num_of_members'), int):
+        return False
+
+    solutions = batch.get('solutions')
+    if not isinstance(solutions, list) or len(solutions) == 0:
+        return False
+
+    for solution in solutions:
+        if not isinstance(solution, dict):
+            return False
+
+        for key in ['hlc_timestamp', 'tx_result_hash', 'signature']:
+            if not isinstance(solution.get(key), str):
+                return False
+
+    return True
+
 class Block_Contender(Processor):
     def __init__(self, validation_queue, get_block_by_hlc, wallet, network: Network, debug=False, testing=False):
 
@@ -74,6 +130,13 @@ class Block_Contender(Processor):
         self.debug_recieved_solutions = []
 
     async def process_message(self, msg):
+        if valid_batch_message_payload(msg=msg):
+            await self.process_batch_message(msg=msg)
+            return
+
+        if valid_compact_message_payload(msg=msg):
+            await self.process_compact_message(msg=msg)
+            return
 
         # Make sure the message has the correct properties to process
         if not valid_message_payload(msg=msg):
@@ -103,13 +166,50 @@ class Block_Contender(Processor):
             rewards=rewards
         )
 
-        if not self.validate_message_signature(tx_result_hash=tx_result_hash, proof=proof):
+        if not await self.validate_message_signature_async(tx_result_hash=tx_result_hash, proof=proof):
             self.log.error(f"Could not verify message signature {msg['proof']}")
             return
 
         # tack on the tx_result_hash to the proof for this node
         msg['proof']['tx_result_hash'] = tx_result_hash
 
+        self.append_solution(msg=msg)
+
+    async def process_compact_message(self, msg):
+        proof = msg['proof']
+
+        if not self.network.peer_is_voted_in(proof['signer']):
+            self.log.error(f"{proof['signer'][:8]} is not in the consensus group. Ignoring solution!")
+            return
+
+        # the signature is over the result hash, so the signer can't claim a result it didn't sign
+        if not await self.validate_message_signature_async(tx_result_hash=proof['tx_result_hash'], proof=proof):
+            self.log.error(f"Could not verify message signature {msg['proof']}")
+            return
+
+        self.append_solution(msg=msg)
+
+    async def process_batch_message(self, msg):
+        batch = msg['batch']
+
+        if not self.network.peer_is_voted_in(batch['signer']):
+            self.log.error(f"{batch['signer'][:8]} is not in the consensus group. Ignoring proof batch!")
+            return
+
+        if not verify_merkle_tree(proof_batch_leaves(solutions=batch['solutions']), batch['root']):
+            self.log.error(f"Proof batch from {batch['signer'][:8]} does not match its root {batch['root']}")
+            return
+
+        # one signature covers every solution in the batch
+        if not await self.validate_batch_signature_async(batch=batch):
+            self.log.error(f"Could not verify proof batch signature from {batch['signer'][:8]}")
+            return
+
+        self.validation_queue.append_batch(batch=batch)
+
+    def append_solution(self, msg):
+        hlc_timestamp = msg['hlc_timestamp']
+
         if hlc_timestamp < self.validation_queue.last_hlc_in_consensus:
             block = self.get_block_by_hlc(hlc_timestamp=hlc_timestamp)
             if block is not None:
@@ -130,5 +230,35 @@ class Block_Contender(Processor):
         except Exception:
             return False
 
+    async def validate_message_signature_async(self, tx_result_hash, proof):
+        # Same as validate_message_signature but verified on the signature verifier's pool
+        try:
+            msg = create_proof_message_from_proof(
+                tx_result_hash=tx_result_hash,
+                proof=proof
+            )
+            return await get_signature_verifier().verify_async(
+                vk=proof['signer'],
+                msg=msg,
+                signature=proof['signature']
+            )
+        except Exception:
+            return False
+
+    async def validate_batch_signature_async(self, batch):
+        try:
+            msg = create_proof_batch_message(
+                root=batch['root'],
+                members_list_hash=batch['members_list_hash'],
+                num_of_members=batch['num_of_members']
+            )
+            return await get_signature_verifier().verify_async(
+                vk=batch['signer'],
+                msg=msg,
+                signature=batch['signature']
+            )
+        except Exception:
+            return False
+
     def sent_from_processor(self, message):
         return message['tx_message']['sender'] == message['tx_result']['transaction']['payload']['processor']
\ No newline at end of file
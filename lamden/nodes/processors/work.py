@@ -1,6 +1,7 @@
 from lamden.logger.base import get_logger
 from lamden.nodes.processors.processor import Processor
 from lamden.crypto.wallet import verify
+from lamden.crypto.verifier import get_signature_verifier
 from lamden.crypto.canonical import tx_hash_from_tx
 from contracting.db.driver import ContractDriver
 from lamden.crypto.transaction import check_nonce
@@ -90,7 +91,7 @@ class WorkValidator(Processor):
             # TODO Probably should never happen as this filtering should probably be handled at the router level
             return
         
-        if not self.valid_signature(message=msg):
+        if not await self.valid_signature_async(message=msg):
             self.log.error(f'Invalid signature received in transaction from master {msg["sender"][:8]}')
             print(f'[WORK] Invalid signature received in transaction from master {msg["sender"][:8]}')
             return
@@ -135,6 +136,20 @@ class WorkValidator(Processor):
             return False
         return False
 
+    async def valid_signature_async(self, message: dict) -> bool:
+        # Same as valid_signature but verified on the signature verifier's pool
+        try:
+            tx_hash = tx_hash_from_tx(tx=message['tx'])
+            msg = f'{tx_hash}{message["hlc_timestamp"]}'
+
+            return await get_signature_verifier().verify_async(
+                vk=message['sender'],
+                msg=msg,
+                signature=message['signature']
+            )
+        except Exception:
+            return False
+
     def sent_from_processor(self, message: dict):
         return message['tx']['payload']['processor'] == message.get('sender')
 
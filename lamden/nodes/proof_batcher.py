@@ -0,0 +1,95 @@
+import asyncio
+from lamden.crypto.canonical import merklize, proof_batch_leaves, create_proof_batch_message
+from lamden.crypto.wallet import Wallet
+from lamden.logger.base import get_logger
+
+# Sends the proofs of this node's solutions in signed batches, so under load peers check one signature for every tx
+# processed in a window instead of one per tx.
+#
+# The first proof after a quiet spell goes out on its own straight away, the ones that come in while its window is
+# open are held back and sent together when it closes. A single tx never waits, a busy node sends a batch per window.
+
+# How long proofs are held back after a batch was sent
+PROOF_BATCH_WINDOW = 0.05
+# Most proofs in one batch, a full batch is sent without waiting for the window
+PROOF_BATCH_SIZE = 256
+
+
+class ProofBatcher:
+    def __init__(self, wallet: Wallet, publish, window: float = PROOF_BATCH_WINDOW, max_size: int = PROOF_BATCH_SIZE):
+        self.wallet = wallet
+        # called with each batch message
+        self.publish = publish
+
+        self.window = window
+        self.max_size = max_size
+
+        self.pending = []
+        # (members_list_hash, num_of_members) every proof in the pending batch was made with
+        self.members = None
+        self.window_timer = None
+
+        self.log = get_logger('PROOF BATCHER')
+
+    def add(self, hlc_timestamp: str, proof: dict) -> None:
+        members = (proof['members_list_hash'], proof['num_of_members'])
+
+        # the batch is signed for one set of members, don't mix proofs made before and after it changed
+        if self.members is not None and members != self.members and len(self.pending) > 0:
+            self.send()
+
+        self.members = members
+        self.pending.append({
+            'hlc_timestamp': hlc_timestamp,
+            'tx_result_hash': proof['tx_result_hash'],
+            'signature': proof['signature']
+        })
+
+        if self.window_timer is None or len(self.pending) >= self.max_size:
+            self.send()
+
+    def send(self) -> None:
+        if self.window_timer is not None:
+            self.window_timer.cancel()
+            self.window_timer = None
+
+        if len(self.pending) == 0:
+            return
+
+        solutions = self.pending
+        self.pending = []
+
+        members_list_hash, num_of_members = self.members
+        root = merklize(proof_batch_leaves(solutions=solutions))[0]
+
+        self.publish({
+            'batch': {
+                'signer': self.wallet.verifying_key,
+                'signature': self.wallet.sign(create_proof_batch_message(
+                    root=root,
+                    members_list_hash=members_list_hash,
+                    num_of_members=num_of_members
+                )),
+                'root': root,
+                'members_list_hash': members_list_hash,
+                'num_of_members': num_of_members,
+                'solutions': solutions
+            }
+        })
+
+        try:
+            self.window_timer = asyncio.get_event_loop().call_later(self.window, self.window_closed)
+        except RuntimeError as err:
+            self.log.error(f'Could not open a batch window, sending proofs one by one: {err}')
+
+    def window_closed(self) -> None:
+        self.window_timer = None
+        # anything held back goes now, which opens the next window
+        self.send()
+
+    def stop(self) -> None:
+        self.send()
+
+        if self.window_timer is not None:
+            self.window_timer.cancel()
+            self.window_timer = None
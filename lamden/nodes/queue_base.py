@@ -1,6 +1,10 @@
 import asyncio
 
 class ProcessingQueue:
+    # Longest a loop waiting on wait_until_ready sleeps without a signal, a safety net for anything that changes
+    # readiness without calling notify.
+    READY_TIMEOUT = 1
+
     def __init__(self):
         self.running = False
         self.paused = False
@@ -9,6 +13,11 @@ class ProcessingQueue:
 
         self.queue = []
 
+        # Readiness signal for the loop processing this queue, created on the loop that first waits on it.
+        self.ready_event = None
+        self.ready_loop = None
+        self.ready_timer = None
+
     def __len__(self):
         return len(self.queue)
 
@@ -23,12 +32,14 @@ class ProcessingQueue:
 
     def stop(self):
         self.running = False
+        self.notify()
 
     def pause(self):
         self.paused = True
 
     def unpause(self):
         self.paused = False
+        self.notify()
 
     def disable_append(self):
         self.allow_append = False
@@ -54,11 +65,74 @@ class ProcessingQueue:
         while self.currently_processing:
             await asyncio.sleep(0.1)
 
+    def notify(self):
+        # Wakes the loop waiting on this queue. Safe to call from any thread and before anything has waited.
+        if self.ready_event is None:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.ready_loop:
+            self.ready_event.set()
+        elif not self.ready_loop.is_closed():
+            self.ready_loop.call_soon_threadsafe(self.ready_event.set)
+
+    def notify_in(self, delay: float):
+        # Wakes the waiting loop after delay seconds, used when an item is only held back for a while. Only the
+        # earliest pending wake up is kept.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        when = loop.time() + max(delay, 0)
+
+        if self.ready_timer is not None:
+            if self.ready_timer.when() <= when:
+                return
+            self.ready_timer.cancel()
+
+        self.ready_timer = loop.call_at(when, self._ready_timer_expired)
+
+    def _ready_timer_expired(self):
+        self.ready_timer = None
+        self.notify()
+
+    async def wait_until_ready(self, timeout: float = None) -> bool:
+        # Returns True when woken by notify, False if timeout passed first. Always yields to the event loop so a
+        # queue that stays ready can't starve other tasks.
+        loop = asyncio.get_running_loop()
+
+        if self.ready_loop is not loop:
+            if self.ready_timer is not None:
+                self.ready_timer.cancel()
+                self.ready_timer = None
+
+            self.ready_event = asyncio.Event()
+            self.ready_loop = loop
+
+        if self.ready_event.is_set():
+            await asyncio.sleep(0)
+        else:
+            try:
+                await asyncio.wait_for(self.ready_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        ready = self.ready_event.is_set()
+        self.ready_event.clear()
+
+        return ready
+
     def flush(self):
         self.queue = []
 
     def append(self, item):
         self.queue.append(item)
+        self.notify()
 
     async def process_next(self):
         raise NotImplementedError
\ No newline at end of file
@@ -122,9 +122,10 @@ class RollbackBlocksHandler:
 
         latest_block = self.block_storage.get_latest_block()
 
-        while int(latest_block.get('number')) > int(rollback_point):
-            self.block_storage.remove_block(latest_block.get('number'))
-            latest_block = self.block_storage.get_latest_block()
+        with self.block_storage.write_batch():
+            while int(latest_block.get('number')) > int(rollback_point):
+                self.block_storage.remove_block(latest_block.get('number'))
+                latest_block = self.block_storage.get_latest_block()
 
     def purge_current_state(self):
         self.contract_driver.flush()
@@ -139,10 +140,12 @@ class RollbackBlocksHandler:
         self._safe_set_state_changes_and_rewards(block=genesis_block)
 
     def process_all_blocks(self):
-        current_block = self.block_storage.get_latest_block()
         last_print_time = time.time()
 
-        while self.block_storage.is_genesis_block(current_block) is False:
+        for current_block in self.block_storage.get_blocks_range(reverse=True, prefetch=storage.BLOCK_RANGE_PREFETCH):
+            if self.block_storage.is_genesis_block(current_block):
+                break
+
             current_block_num = current_block.get('number')
 
             # Check if it has been more than 60 seconds since last print
@@ -152,5 +155,3 @@ class RollbackBlocksHandler:
 
             self._safe_set_state_changes_and_rewards(block=current_block)
             self._save_nonce_information(block=current_block)
-
-            current_block = self.block_storage.get_previous_block(v=int(current_block_num))
\ No newline at end of file
@@ -2,6 +2,7 @@ import psutil
 import asyncio
 import json
 from lamden.logger.base import get_logger
+from lamden.crypto.wallet import verified_signatures
 from datetime import datetime
 import threading
 
@@ -57,7 +58,8 @@ class SystemUsage:
             'RAM_usage_percent': self.get_ram_usage_pct(),
             'RAM_total': int(self.get_ram_total() / 1024 / 1024),
             'Swap_usage': int(self.get_swap_usage() / 1024 / 1024),
-            'Swap_total': int(self.get_swap_total() / 1024 / 1024)
+            'Swap_total': int(self.get_swap_total() / 1024 / 1024),
+            'Verified_signature_cache': verified_signatures.stats()
         }))
 
         self.last_print = datetime.now()
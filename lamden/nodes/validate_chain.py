@@ -1,11 +1,14 @@
-from lamden.storage import BlockStorage
+from lamden.storage import BlockStorage, BLOCK_RANGE_PREFETCH
 from contracting.db.driver import ContractDriver
 from lamden.logger.base import get_logger
 from lamden.crypto.block_validator import verify_block
+from lamden.crypto.verifier import get_signature_verifier
 
 import threading
 
 VALIDATION_HEIGHT = '__validation_height'
+# blocks verified together on the signature verifier's pool
+VALIDATION_BATCH_SIZE = 100
 
 class ValidateChainHandler:
     def __init__(self, block_storage: BlockStorage, contract_driver: ContractDriver):
@@ -59,29 +62,37 @@ class ValidateChainHandler:
 
     def process_all_blocks(self, starting_block_num: int):
         previous_block = self.block_storage.get_block(v=starting_block_num)
-        block = self.block_storage.get_next_block(v=starting_block_num)
 
-        while block is not None:
+        blocks = []
+        for block in self.block_storage.get_blocks_range(start=int(starting_block_num) + 1, prefetch=BLOCK_RANGE_PREFETCH):
+            blocks.append(block)
+
+            if len(blocks) >= VALIDATION_BATCH_SIZE:
+                previous_block = self.process_blocks(blocks=blocks, previous_block=previous_block)
+                blocks = []
+
+        if len(blocks) > 0:
+            self.process_blocks(blocks=blocks, previous_block=previous_block)
+
+    def process_blocks(self, blocks: list, previous_block: dict) -> dict:
+        # Verifies the signatures and proofs of all the blocks at once on the signature verifier's pool, then
+        # checks and saves them in order. Returns the last block.
+        old_blocks = [int(block.get('number')) <= self.safe_block_num for block in blocks]
+        results = get_signature_verifier().verify_blocks(blocks=blocks, old_blocks=old_blocks)
+
+        for block, valid in zip(blocks, results):
             block_num = block.get('number')
 
             # Validate current block signatures and proofs
-            self.validate_block(block=block)
+            assert valid, f"block number {block_num} did not pass block validation."
             self.validate_previous_hash(block=block, previous_block=previous_block)
             self.validate_consensus(block=block)
             self.save_member_history(block=block)
             self.set_validation_height(block_num=block_num)
 
-            # Validate new block's previous hash
-            next_block = self.block_storage.get_next_block(v=int(block_num))
-
-            if next_block is not None:
-                next_block_previous_hash = next_block.get('previous')
-
-                assert block.get('hash') == next_block_previous_hash, f'BLOCK CHAIN BROKEN: {next_block.get("number")} has bad previous hash.'
-
             previous_block = block
-            block = next_block
 
+        return previous_block
 
     def validate_block(self, block: dict) -> None:
         block_num = block.get("number")
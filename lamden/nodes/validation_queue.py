@@ -6,11 +6,81 @@ from lamden.nodes.determine_consensus import DetermineConsensus
 from lamden.nodes.multiprocess_consensus import MultiProcessConsensus
 from lamden.storage import BlockStorage
 from lamden.crypto.wallet import Wallet
+from lamden.crypto.canonical import create_proof_message_from_proof
+from lamden.crypto.verifier import get_signature_verifier
 from lamden.hlcpy import hlc_timestamp_to_nanos
 import time
+from bisect import bisect_left, insort
 from contracting.db.driver import ContractDriver
 
 
+class SortedResults(dict):
+    # validation_results keyed by hlc_timestamp. Keeps the HLCs in a sorted list so the earliest is always hlcs[0],
+    # and tracks which HLCs are dirty, meaning their consensus could have changed since they were last checked.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hlcs = sorted(self.keys())
+        self.dirty = set(self.hlcs)
+
+    def __setitem__(self, hlc_timestamp, value):
+        if hlc_timestamp not in self:
+            insort(self.hlcs, hlc_timestamp)
+            self.dirty.add(hlc_timestamp)
+        super().__setitem__(hlc_timestamp, value)
+
+    def __delitem__(self, hlc_timestamp):
+        super().__delitem__(hlc_timestamp)
+        del self.hlcs[bisect_left(self.hlcs, hlc_timestamp)]
+        self.dirty.discard(hlc_timestamp)
+
+    def pop(self, hlc_timestamp, *default):
+        if hlc_timestamp not in self:
+            if default:
+                return default[0]
+            raise KeyError(hlc_timestamp)
+
+        value = super().__getitem__(hlc_timestamp)
+        del self[hlc_timestamp]
+        return value
+
+    def popitem(self):
+        hlc_timestamp = self.hlcs[-1] if self.hlcs else None
+        if hlc_timestamp is None:
+            raise KeyError('popitem(): dictionary is empty')
+        return hlc_timestamp, self.pop(hlc_timestamp)
+
+    def setdefault(self, hlc_timestamp, default=None):
+        if hlc_timestamp not in self:
+            self[hlc_timestamp] = default
+        return super().__getitem__(hlc_timestamp)
+
+    def update(self, *args, **kwargs):
+        for hlc_timestamp, value in dict(*args, **kwargs).items():
+            self[hlc_timestamp] = value
+
+    def clear(self):
+        super().clear()
+        self.hlcs = []
+        self.dirty = set()
+
+    def copy(self):
+        return SortedResults(self)
+
+    def prune_before(self, hlc_timestamp):
+        # drops every HLC earlier than hlc_timestamp
+        position = bisect_left(self.hlcs, hlc_timestamp)
+        for earlier_hlc_timestamp in self.hlcs[:position]:
+            super().__delitem__(earlier_hlc_timestamp)
+            self.dirty.discard(earlier_hlc_timestamp)
+        del self.hlcs[:position]
+
+    def take_dirty(self) -> list:
+        # returns the dirty HLCs in order and marks them clean
+        dirty = sorted(self.dirty)
+        self.dirty = set()
+        return dirty
+
+
 class ValidationQueue(ProcessingQueue):
     def __init__(self, driver: ContractDriver, consensus_percent, wallet, hard_apply_block, stop_node, get_block_by_hlc,
                  get_block_from_network, blocks, testing=False, debug=False):
@@ -19,10 +89,17 @@ class ValidationQueue(ProcessingQueue):
         self.log = get_logger("VALIDATION QUEUE")
 
         # The main dict for storing results from other nodes
-        self.validation_results = dict()
+        self.validation_results = SortedResults()
+        # (number of peers, consensus percent) HLCs were last checked against, they all need a recheck when it changes
+        self.last_consensus_params = None
         self.started_checking = dict()
         self.last_checked = dict()
         self.checking_timeout = 30
+        # how soon to ask the network again for a block in consensus that it hasn't served us yet
+        self.block_retry_delay = 1
+        # how many times to ask before giving up on it and letting catchup sort it out
+        self.max_block_retries = 30
+        self.block_retries = dict()
 
         # Store confirmed solutions that I haven't got to yet
         self.last_hlc_in_consensus = ""
@@ -60,7 +137,31 @@ class ValidationQueue(ProcessingQueue):
 
         self.checking = False
 
-    def append(self, processing_results):
+    @property
+    def validation_results(self) -> SortedResults:
+        return self._validation_results
+
+    @validation_results.setter
+    def validation_results(self, validation_results: dict):
+        if not isinstance(validation_results, SortedResults):
+            validation_results = SortedResults(validation_results)
+        self._validation_results = validation_results
+
+    def mark_dirty(self, hlc_timestamp):
+        if hlc_timestamp in self.validation_results:
+            self.validation_results.dirty.add(hlc_timestamp)
+
+    def take_dirty_hlcs(self) -> list:
+        # The HLCs whose consensus could have changed since they were last checked, either because they got a new
+        # solution or because the peers or consensus percent changed.
+        consensus_params = (len(self.get_peers_for_consensus()), self.determine_consensus.consensus_percent())
+        if consensus_params != self.last_consensus_params:
+            self.last_consensus_params = consensus_params
+            self.validation_results.dirty.update(self.validation_results.hlcs)
+
+        return self.validation_results.take_dirty()
+
+    def append(self, processing_results, verified: bool = True):
         if not self.allow_append:
             return
 
@@ -81,6 +182,8 @@ class ValidationQueue(ProcessingQueue):
             self.validation_results[hlc_timestamp]['solutions'] = {}
             self.validation_results[hlc_timestamp]['proofs'] = {}
             self.validation_results[hlc_timestamp]['result_lookup'] = {}
+            # signers whose proof signature hasn't been checked on its own, it came in a proof batch
+            self.validation_results[hlc_timestamp]['unverified_proofs'] = set()
             self.validation_results[hlc_timestamp]['last_consensus_result'] = {}
             self.validation_results[hlc_timestamp]['last_check_info'] = {
                 'ideal_consensus_possible': True,
@@ -121,9 +224,39 @@ class ValidationQueue(ProcessingQueue):
         self.validation_results[hlc_timestamp]['solutions'][node_vk] = result_hash
         self.validation_results[hlc_timestamp]['proofs'][node_vk] = processing_results["proof"]
 
-        if self.validation_results[hlc_timestamp]['result_lookup'].get(result_hash) is None:
+        unverified_proofs = self.validation_results[hlc_timestamp].setdefault('unverified_proofs', set())
+        if verified:
+            unverified_proofs.discard(node_vk)
+        else:
+            unverified_proofs.add(node_vk)
+
+        # compact solutions only carry the proof, the full result comes from our own or from a full solution
+        has_result = processing_results.get('tx_result') is not None
+        if has_result and self.validation_results[hlc_timestamp]['result_lookup'].get(result_hash) is None:
             self.validation_results[hlc_timestamp]['result_lookup'][result_hash] = processing_results
 
+        # a new solution can complete consensus
+        self.mark_dirty(hlc_timestamp=hlc_timestamp)
+        self.notify()
+
+    def append_batch(self, batch):
+        # Credits the signer's solution to every HLC in a proof batch whose root signature was verified. The proof of
+        # each tx in it is only checked if it goes into a block, see get_proofs_from_results.
+        for solution in batch['solutions']:
+            self.append(
+                processing_results={
+                    'hlc_timestamp': solution['hlc_timestamp'],
+                    'proof': {
+                        'signature': solution['signature'],
+                        'signer': batch['signer'],
+                        'members_list_hash': batch['members_list_hash'],
+                        'num_of_members': batch['num_of_members'],
+                        'tx_result_hash': solution['tx_result_hash']
+                    }
+                },
+                verified=False
+            )
+
     async def process_next(self):
         if len(self.validation_results) > 0:
             next_hlc_timestamp = self[0]
@@ -141,6 +274,23 @@ class ValidationQueue(ProcessingQueue):
                 self.log.info(f'Done Processing, Queue Length now {len(self.validation_results)} ')
 
     async def process_all(self):
+        earliest_hlc_timestamp = self[0]
+
+        await self.process_earliest()
+
+        next_hlc_timestamp = self[0]
+        if next_hlc_timestamp is None:
+            return
+
+        if next_hlc_timestamp != earliest_hlc_timestamp:
+            # moved on, the next HLC may already be in consensus
+            self.notify()
+        else:
+            # still waiting on solutions, make sure we wake up in time to check the timeout
+            started_checking = self.started_checking.get(next_hlc_timestamp, time.time())
+            self.notify_in(delay=self.checking_timeout - (time.time() - started_checking))
+
+    async def process_earliest(self):
         # 1) Sort validation results object to get the earlist HLC
         # 2) Run consensus on that HLC
         # 3) Process the earliest if in consensus
@@ -160,8 +310,13 @@ class ValidationQueue(ProcessingQueue):
                 self.log.error(f"{next_hlc_timestamp} <= {self.last_hlc_in_consensus}")
                 return
 
-            for hlc_timestamp in self.validation_results.keys():
-                self.check_one(hlc_timestamp=hlc_timestamp)
+            # only recheck HLCs whose consensus could have changed, on the consensus pool if there are enough of them
+            dirty_hlcs = self.take_dirty_hlcs()
+            if self.multiprocess_consensus.use_pool(num_of_hlcs=len(dirty_hlcs)):
+                await self.check_all(dirty_hlcs=dirty_hlcs)
+            else:
+                for hlc_timestamp in dirty_hlcs:
+                    self.check_one(hlc_timestamp=hlc_timestamp)
 
             #await self.check_all()
 
@@ -229,14 +384,25 @@ class ValidationQueue(ProcessingQueue):
 
         #self.log.debug('[STOP] check_one')
 
-    async def check_all(self):
+    async def check_all(self, dirty_hlcs: list = None):
         if self.checking:
+            # put them back for the next check
+            for hlc_timestamp in dirty_hlcs or []:
+                self.mark_dirty(hlc_timestamp=hlc_timestamp)
             return
 
         self.checking = True
 
+        if dirty_hlcs is None:
+            dirty_hlcs = self.take_dirty_hlcs()
+
         try:
-            results_not_in_consensus = self.results_not_in_consensus
+            results_not_in_consensus = {}
+            for hlc_timestamp in dirty_hlcs:
+                results = self.get_validation_result(hlc_timestamp=hlc_timestamp)
+                if results is not None and not self.hlc_has_consensus(hlc_timestamp=hlc_timestamp):
+                    results_not_in_consensus[hlc_timestamp] = results
+
             if len(results_not_in_consensus) == 0:
                 self.checking = False
                 return
@@ -255,6 +421,10 @@ class ValidationQueue(ProcessingQueue):
         except Exception as err:
             self.log.error(err)
             print(err)
+
+            # they were never checked
+            for hlc_timestamp in dirty_hlcs:
+                self.mark_dirty(hlc_timestamp=hlc_timestamp)
         finally:
             self.checking = False
 
@@ -294,7 +464,7 @@ class ValidationQueue(ProcessingQueue):
     @property
     def results_not_in_consensus(self):
         results = {}
-        for hlc_timestamp in self.validation_results.keys():
+        for hlc_timestamp in self.validation_results.hlcs:
             if not self.hlc_has_consensus(hlc_timestamp=hlc_timestamp):
                 results[hlc_timestamp] = self.validation_results[hlc_timestamp]
         return results
@@ -323,9 +493,7 @@ class ValidationQueue(ProcessingQueue):
         return last_check_info['eager_consensus_possible']
 
     def later_consensus_exists(self, hlc_timestamp: str) -> bool:
-        hlc_list = self.validation_results.keys()
-        hlc_list = list(filter(lambda x: x != hlc_timestamp, hlc_list))
-        hlc_list.sort()
+        hlc_list = list(filter(lambda x: x != hlc_timestamp, self.validation_results.hlcs))
 
         for hlc in hlc_list:
             if self.hlc_has_consensus(hlc_timestamp=hlc):
@@ -358,9 +526,8 @@ class ValidationQueue(ProcessingQueue):
 
 
     def is_earliest_hlc(self, hlc_timestamp):
-        hlc_list = sorted(self.validation_results.keys())
         try:
-            return hlc_timestamp == hlc_list[0]
+            return hlc_timestamp == self.validation_results.hlcs[0]
         except:
             return False
 
@@ -385,6 +552,7 @@ class ValidationQueue(ProcessingQueue):
                     # Set the possible consensus flags back to True
                     self.validation_results[hlc]['last_check_info']['ideal_consensus_possible'] = True
                     self.validation_results[hlc]['last_check_info']['eager_consensus_possible'] = True
+                    self.mark_dirty(hlc_timestamp=hlc)
 
                     # TODO: should we clean results lookup here as well?
 
@@ -397,6 +565,10 @@ class ValidationQueue(ProcessingQueue):
         return results.get('last_check_info', {})
 
     def get_proofs_from_results(self, hlc_timestamp):
+        proofs = self.get_proofs_in_consensus(hlc_timestamp=hlc_timestamp)
+        return self.drop_invalid_batched_proofs(hlc_timestamp=hlc_timestamp, proofs=proofs)
+
+    def get_proofs_in_consensus(self, hlc_timestamp):
         results = self.validation_results.get(hlc_timestamp)
         last_consensus_result = self.get_last_consensus_result(hlc_timestamp=hlc_timestamp)
         consensus_solution = last_consensus_result.get('solution')
@@ -415,6 +587,60 @@ class ValidationQueue(ProcessingQueue):
 
         return proofs
 
+    def get_batched_proofs(self, hlc_timestamp, proofs):
+        unverified_proofs = self.validation_results[hlc_timestamp].get('unverified_proofs', set())
+        return [proof for proof in proofs if proof.get('signer') in unverified_proofs]
+
+    def get_proof_signatures(self, proofs):
+        return [(
+            proof['signer'],
+            create_proof_message_from_proof(tx_result_hash=proof['tx_result_hash'], proof=proof),
+            proof['signature']
+        ) for proof in proofs]
+
+    async def verify_batched_proofs(self, hlc_timestamp):
+        # Checks the batched proofs of an HLC in consensus on the verifier's pool before its block is minted, so
+        # get_proofs_from_results doesn't have to check them on the event loop.
+        if self.validation_results.get(hlc_timestamp) is None:
+            return
+
+        proofs = self.get_proofs_in_consensus(hlc_timestamp=hlc_timestamp)
+        batched = self.get_batched_proofs(hlc_timestamp=hlc_timestamp, proofs=proofs)
+
+        if len(batched) == 0:
+            return
+
+        results = await get_signature_verifier().verify_many_async(self.get_proof_signatures(proofs=batched))
+
+        if self.validation_results.get(hlc_timestamp) is None:
+            # flushed while we waited
+            return
+
+        self.drop_failed_proofs(hlc_timestamp=hlc_timestamp, proofs=proofs, batched=batched, results=results)
+
+    def drop_invalid_batched_proofs(self, hlc_timestamp, proofs):
+        # Every proof in a block has to verify on its own, so the ones that came in a batch are checked before they
+        # go in one. A bad one means its signer signed a batch it shouldn't have.
+        batched = self.get_batched_proofs(hlc_timestamp=hlc_timestamp, proofs=proofs)
+
+        if len(batched) == 0:
+            return proofs
+
+        results = get_signature_verifier().verify_many(self.get_proof_signatures(proofs=batched))
+        return self.drop_failed_proofs(hlc_timestamp=hlc_timestamp, proofs=proofs, batched=batched, results=results)
+
+    def drop_failed_proofs(self, hlc_timestamp, proofs, batched, results):
+        unverified_proofs = self.validation_results[hlc_timestamp].get('unverified_proofs', set())
+        invalid = []
+        for proof, valid in zip(batched, results):
+            unverified_proofs.discard(proof['signer'])
+            if not valid:
+                self.log.error(f"Dropping invalid proof from {proof['signer'][:8]}'s batch for {hlc_timestamp}")
+                self.validation_results[hlc_timestamp]['proofs'].pop(proof['signer'], None)
+                invalid.append(proof)
+
+        return [proof for proof in proofs if proof not in invalid]
+
     def get_validation_result(self, hlc_timestamp):
         return self.validation_results.get(hlc_timestamp)
 
@@ -453,12 +679,38 @@ class ValidationQueue(ProcessingQueue):
         return my_solution == consensus_solution
 
     async def commit_consensus_block(self, hlc_timestamp: str = None, block: dict = None):
-        if hlc_timestamp is not None:
+        if hlc_timestamp is not None and block is None:
             # Get the tx results for this timestamp
             processing_results = self.get_consensus_results(hlc_timestamp=hlc_timestamp)
 
-            # Hard apply these results on the driver
-            new_block = await self.hard_apply_block(processing_results=processing_results)
+            if processing_results:
+                await self.verify_batched_proofs(hlc_timestamp=hlc_timestamp)
+
+                # Hard apply these results on the driver
+                new_block = await self.hard_apply_block(processing_results=processing_results)
+            else:
+                # Only got compact solutions for the result in consensus, so it isn't ours. The nodes that had it
+                # mint the block, get it from them.
+                block = await self.get_block_from_network(hlc_timestamp=hlc_timestamp)
+
+                if block is None:
+                    retries = self.block_retries.get(hlc_timestamp, 0) + 1
+
+                    if retries >= self.max_block_retries:
+                        # we're out of consensus with the network, drop it like any HLC that timed out. Catchup runs
+                        # when the next block doesn't follow from ours.
+                        self.log.error(f'Network never served block for {hlc_timestamp} in consensus after {retries} attempts, dropping it.')
+                        self.flush_hlc(hlc_timestamp=hlc_timestamp)
+                        self.driver.rollback()
+                        return
+
+                    # keep the HLC in consensus and ask again shortly
+                    self.block_retries[hlc_timestamp] = retries
+                    self.log.warning(f'No result or block for {hlc_timestamp} in consensus yet, retrying ({retries}/{self.max_block_retries}).')
+                    self.notify_in(delay=self.block_retry_delay)
+                    return
+
+                self.driver.rollback()
 
         if block is not None:
             hlc_timestamp = block.get('hlc_timestamp')
@@ -481,6 +733,7 @@ class ValidationQueue(ProcessingQueue):
             self.validation_results.pop(hlc_timestamp, None)
             self.started_checking.pop(hlc_timestamp, None)
             self.last_checked.pop(hlc_timestamp, None)
+            self.block_retries.pop(hlc_timestamp, None)
         except Exception as err:
             self.log.error(f'[flush_hlc] {err}')
 
@@ -513,9 +766,7 @@ class ValidationQueue(ProcessingQueue):
 
     def prune_earlier_results(self, consensus_hlc_timestamp):
         # TODO Prune pending delta
-        for hlc_timestamp in list(self.validation_results):
-            if hlc_timestamp < consensus_hlc_timestamp:
-                self.validation_results.pop(hlc_timestamp, None)
+        self.validation_results.prune_before(hlc_timestamp=consensus_hlc_timestamp)
 
     def clean_results_lookup(self, hlc_timestamp):
         validation_results = self.validation_results.get(hlc_timestamp)
@@ -541,7 +792,7 @@ class ValidationQueue(ProcessingQueue):
         return self.driver.driver.get(f'masternodes.S:members') or []
 
     def get_key_list(self):
-        return [key for key in self.validation_results.keys()]
+        return list(self.validation_results.hlcs)
 
     def __setitem__(self, key, value):
         raise ReferenceError
@@ -551,8 +802,6 @@ class ValidationQueue(ProcessingQueue):
 
     def __getitem__(self, index):
         try:
-            hlcs_to_process = self.get_key_list()
-            hlcs_to_process.sort()
-            return hlcs_to_process[index]
+            return self.validation_results.hlcs[index]
         except IndexError:
             return None
@@ -1,4 +1,4 @@
-import json
+import zlib
 
 from lamden.logger.base import get_logger
 import asyncio
@@ -9,13 +9,14 @@ from lamden.crypto.challenges import create_challenge, verify_challenge
 from lamden.sockets.request import Request, Result
 from lamden.sockets.subscriber import Subscriber
 from lamden.sockets.publisher import TOPIC_NEW_PEER_CONNECTION, TOPIC_PEER_SHUTDOWN
+from lamden.sockets.wire import SUPPORTED_WIRE_VERSIONS, encode_message, decode_message, negotiate_wire_version
 
 from typing import Callable
 from urllib.parse import urlparse
 import threading
 import time
 
-from contracting.db.encoder import decode, encode
+from contracting.db.encoder import decode
 
 SUBSCRIPTIONS = ["work", TOPIC_NEW_PEER_CONNECTION, TOPIC_PEER_SHUTDOWN, "contenders", "health", "consensus"]
 
@@ -27,6 +28,33 @@ ACTION_GET_NEXT_BLOCK = "get_next_block"
 ACTION_GET_PREV_BLOCK = "get_previous_block"
 ACTION_GET_NEXT_MEMBER_HISTORY = "get_next_member_history"
 ACTION_GET_NETWORK_MAP = "get_network_map"
+ACTION_GET_BLOCKS_RANGE = "get_blocks_range"
+ACTION_GET_MEMBER_HISTORY_RANGE = "get_member_history_range"
+
+# Most items and uncompressed bytes a range reply will carry, the reply says if there were more
+RANGE_MAX_COUNT = 500
+RANGE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def encode_range_payload(encoded_items: list) -> bytes:
+    # Range replies carry their items as one zlib compressed JSON list in the frame after the header
+    return zlib.compress(('[' + ','.join(encoded_items) + ']').encode())
+
+
+def decode_range_payload(payload: bytes, max_bytes: int = RANGE_MAX_BYTES) -> list:
+    # Refuses to inflate past max_bytes so a peer can't hand us a zip bomb
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(payload, max_bytes)
+
+    if decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError('Range payload is too large or truncated.')
+
+    items = decode(data.decode())
+
+    if not isinstance(items, list):
+        raise ValueError('Range payload is not a list.')
+
+    return items
 
 class Peer:
     def __init__(self, ip: str, server_vk: str, local_wallet: Wallet, get_network_ip: Callable,
@@ -73,6 +101,12 @@ class Peer:
         self.reconnecting = False
         self.connected_callback = connected_callback
 
+        # binary wire version agreed on in hello, None until then and for peers that only speak JSON
+        self.wire_version = None
+        # whether the peer said in hello that it takes solutions with only the proof, and proofs in signed batches
+        self.compact_contenders = False
+        self.proof_batches = False
+
         self.request = None
         self.subscriber = None
 
@@ -96,6 +130,8 @@ class Peer:
             'get_block': 15000,
             'get_next_block': 15000,
             'get_network_map': 15000,
+            'get_blocks_range': 15000,
+            'get_member_history_range': 15000,
             'gossip_new_block': 10000
         }
 
@@ -289,6 +325,12 @@ class Peer:
         if res is not None and res.get('success') and self.running:
             response_type = res.get('response')
             if response_type == 'hello':
+                self.wire_version = negotiate_wire_version(res.get('wire'))
+                self.compact_contenders = res.get('compact_contenders') is True
+                self.proof_batches = res.get('proof_batches') is True
+                if self.request is not None:
+                    self.request.multiplex = res.get('request_ids') is True
+
                 self.store_latest_block_info(
                     latest_block_num=int(res.get('latest_block_number')),
                     latest_hlc_timestamp=res.get('latest_hlc_timestamp')
@@ -327,7 +369,7 @@ class Peer:
             return
 
         try:
-            msg_str = decode(msg)
+            msg_str = decode_message(msg)
             topic_str = topic.decode("utf-8")
 
         except Exception as err:
@@ -365,6 +407,9 @@ class Peer:
 
         self.reconnecting = True
 
+        # the peer may come back running code whose Router can't take request ids
+        self.request.multiplex = False
+
         while not self.connected:
             if not self.running:
                 self.reconnecting = False
@@ -374,6 +419,7 @@ class Peer:
 
             if res:
                 self.connected = True
+                self.request.multiplex = res.get('request_ids') is True
             else:
                 self.log('info', f'Could not ping {self.request_address}. Attempting to reconnect...')
 
@@ -401,6 +447,9 @@ class Peer:
         self.connected = False
         self.verified = False
         self.reconnecting = False
+        self.wire_version = None
+        self.compact_contenders = False
+        self.proof_batches = False
         self.request = None
         self.subscriber = None
 
@@ -420,7 +469,8 @@ class Peer:
 
     async def hello(self) -> (dict, None):
         challenge = create_challenge()
-        msg_obj = {'action': ACTION_HELLO, 'ip': self.get_network_ip(), 'challenge': challenge}
+        msg_obj = {'action': ACTION_HELLO, 'ip': self.get_network_ip(), 'challenge': challenge,
+                   'wire': SUPPORTED_WIRE_VERSIONS}
         msg_json = await self.send_request(msg_obj=msg_obj, timeout=self.timeouts.get(ACTION_HELLO), attempts=1)
         if msg_json:
             msg_json['challenge'] = challenge
@@ -471,6 +521,53 @@ class Peer:
         msg_json = await self.send_request(msg_obj=msg_obj, attempts=3, timeout=self.timeouts.get(ACTION_GET_NEXT_MEMBER_HISTORY))
         return msg_json
 
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        # Blocks with start <= number <= end, latest first if reverse. The peer caps how many it sends, so the list
+        # can stop short of end. None if the peer didn't answer or can't serve ranges.
+        msg_json = await self.get_range(action=ACTION_GET_BLOCKS_RANGE, start_block_num=start_block_num,
+                                        end_block_num=end_block_num, limit=limit, reverse=reverse, max_bytes=max_bytes)
+        return None if msg_json is None else msg_json.get('blocks')
+
+    async def get_member_history_range(self, start_block_num: int = None, end_block_num: int = None,
+                                       limit: int = None, max_bytes: int = None) -> (list, None):
+        msg_json = await self.get_range(action=ACTION_GET_MEMBER_HISTORY_RANGE, start_block_num=start_block_num,
+                                        end_block_num=end_block_num, limit=limit, max_bytes=max_bytes)
+        return None if msg_json is None else msg_json.get('member_history')
+
+    async def get_range(self, action: str, start_block_num: int = None, end_block_num: int = None,
+                        limit: int = None, reverse: bool = False, max_bytes: int = None) -> (dict, None):
+        msg_obj = {
+            'action': action,
+            'start_block_num': int(start_block_num) if start_block_num is not None else None,
+            'end_block_num': int(end_block_num) if end_block_num is not None else None,
+            'limit': limit,
+            'reverse': reverse,
+            'max_bytes': max_bytes
+        }
+        msg_json = await self.send_request(msg_obj=msg_obj, attempts=1, timeout=self.timeouts.get(action))
+
+        if not isinstance(msg_json, dict) or msg_json.get('response') != action:
+            return None
+
+        if msg_json.get('error') is not None:
+            self.log('warning', f'{action} refused by {self.server_vk[:8]}: {msg_json.get("error")}')
+            return None
+
+        parts = msg_json.pop('parts', [])
+        if len(parts) != 1:
+            self.log('error', f'{action} reply from {self.server_vk[:8]} has {len(parts)} payload frames.')
+            return None
+
+        try:
+            items = decode_range_payload(payload=parts[0])
+        except Exception as err:
+            self.log('error', f'Could not decode {action} reply from {self.server_vk[:8]}: {err}')
+            return None
+
+        msg_json['blocks' if action == ACTION_GET_BLOCKS_RANGE else 'member_history'] = items
+        return msg_json
+
     async def get_network_map(self) -> (dict, None):
         msg_obj = {'action': ACTION_GET_NETWORK_MAP}
         msg_json = await self.send_request(msg_obj=msg_obj, timeout=self.timeouts.get(ACTION_GET_NETWORK_MAP), attempts=3)
@@ -480,9 +577,12 @@ class Peer:
         if self.request is None:
             raise AttributeError("Request socket not setup.")
 
+        # requests are always dicts, checking that is all the old json.dumps round trip was for
+        if not isinstance(msg_obj, dict):
+            return None
+
         try:
-            json.dumps(msg_obj)
-            str_msg = encode(msg_obj)
+            str_msg = encode_message(msg_obj, self.wire_version)
         except Exception:
             return None
 
@@ -494,12 +594,14 @@ class Peer:
         if isinstance(result.response, bytes):
             if result.success:
                 self.connected = True
-                msg_json = decode(result.response)
+                msg_json = decode_message(result.response)
 
                 if msg_json is None:
                     return None
                 else:
                     msg_json['success'] = result.success
+                    if result.parts:
+                        msg_json['parts'] = result.parts
                     return msg_json
             else:
                 if result.error:
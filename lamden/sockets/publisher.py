@@ -2,7 +2,7 @@ import zmq
 import zmq.asyncio
 import asyncio
 from lamden.logger.base import get_logger
-from contracting.db.encoder import encode
+from lamden.sockets.wire import encode_message
 import threading
 
 EXCEPTION_NO_ADDRESS_INFO = "Publisher has no address information."
@@ -27,6 +27,10 @@ class Publisher():
 
         self.ctx = ctx or zmq.asyncio.Context().instance()
 
+        # Binary wire version messages are published in, a PUB socket can't pick per subscriber so this stays None
+        # (JSON) until every peer has said in hello that it reads the binary format.
+        self.wire_version = None
+
         self.running = False
 
         try:
@@ -124,9 +128,11 @@ class Publisher():
         if not isinstance(msg_dict, dict):
             raise TypeError(EXCEPTION_MSG_NOT_DICT)
 
-        self.log('info', f'Publishing ({topic_str}): {msg_dict}')
+        msg = encode_message(msg_dict, self.wire_version)
+        msg_bytes = msg.encode() if isinstance(msg, str) else msg
 
-        msg_bytes = encode(msg_dict).encode()
+        # not the message itself, formatting a whole contender for the log costs half as much again as encoding it
+        self.log('info', f'Publishing ({topic_str}): {len(msg_bytes)} bytes')
 
         self.send_multipart_message(topic_bytes=topic_str.encode('UTF-8'), msg_bytes=msg_bytes)
 
@@ -1,4 +1,5 @@
 import asyncio
+import itertools
 import threading
 
 import zmq
@@ -10,27 +11,22 @@ from typing import Callable
 
 ATTRIBUTE_ERROR_TO_ADDRESS_NOT_NONE = "to_address property cannot be none."
 
-class Lock:
-    def __init__(self):
-        self.lock = False
-
-    async def __aenter__(self):
-        while self.lock:
-            await asyncio.sleep(0)
-
-        self.lock = True
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self.lock = False
-
-
 class Result:
-    def __init__(self, success, response=None, error=None):
+    def __init__(self, success, response=None, error=None, parts=None):
         self.success = success
         self.response = response
         self.error = error
+        # frames that came after the response, replies like block ranges carry their payload here
+        self.parts = parts or []
 
 class Request():
+    # Requests go out on one DEALER socket per peer. Once the peer's hello says its Router echoes request ids
+    # (multiplex), each request is tagged with its own id so any number of them can be in flight at once, and a single
+    # receive loop hands each reply to the request waiting on its id. Until then requests use the framing of the old
+    # REQ socket, one at a time, as older Routers only take that.
+    #
+    # Request: [b'', request_id, msg]         legacy: [b'', msg]
+    # Reply:   [b'', request_id, response, *parts]   legacy: [b'', response, *parts]
     def __init__(self, to_address: str, server_curve_vk: int = None, local_wallet: Wallet = None, ctx: zmq.Context = None,
                  local_ip: str = None, reconnect_callback: Callable = None):
         self.current_thread = threading.current_thread()
@@ -48,7 +44,14 @@ class Request():
 
         self.socket = None
         self.pollin = None
-        self.lock = Lock()
+
+        # futures of the requests in flight by request id, None for the one legacy request
+        self.pending = {}
+        self.request_ids = itertools.count()
+        self.receive_task = None
+
+        self.multiplex = False
+        self.lock = asyncio.Lock()
 
     @property
     def is_running(self) -> bool:
@@ -84,7 +87,7 @@ class Request():
             return False
 
     def create_socket(self) -> None:
-        self.socket = self.ctx.socket(zmq.REQ)
+        self.socket = self.ctx.socket(zmq.DEALER)
 
     def set_socket_options(self) -> None:
         pass
@@ -106,17 +109,26 @@ class Request():
     def connect_socket(self) -> None:
         self.socket.connect(self.to_address)
 
-    def send_string(self, str_msg: str) -> None:
+    def next_request_id(self) -> bytes:
+        return str(next(self.request_ids)).encode()
+
+    def send_string(self, str_msg: (str, bytes), request_id: bytes = None) -> None:
         if not self.socket:
             raise AttributeError("Socket has not been created.")
 
         if not self.socket_is_bound():
             raise AttributeError("Socket is not bound to an address.")
 
-        if not isinstance(str_msg, str):
+        # JSON messages are strings, binary wire messages are already bytes
+        if isinstance(str_msg, str):
+            str_msg = str_msg.encode()
+        elif not isinstance(str_msg, bytes):
             raise TypeError("Message Must be string.")
 
-        return self.socket.send_string(str_msg)
+        if request_id is None:
+            return self.socket.send_multipart([b'', str_msg])
+
+        return self.socket.send_multipart([b'', request_id, str_msg])
 
     async def message_waiting(self, poll_time: int) -> bool:
         try:
@@ -140,59 +152,107 @@ class Request():
 
         self.connect_socket()
 
-    async def send(self, str_msg: str, timeout: int = 2500, attempts: int = 3) -> Result:
+    async def send(self, str_msg: (str, bytes), timeout: int = 2500, attempts: int = 3) -> Result:
+        if self.multiplex:
+            return await self.send_attempts(str_msg=str_msg, timeout=timeout, attempts=attempts)
+
         async with self.lock:
-            error = None
-            connection_attempts = 0
+            return await self.send_attempts(str_msg=str_msg, timeout=timeout, attempts=attempts)
 
-            while connection_attempts < attempts:
+    async def send_attempts(self, str_msg: (str, bytes), timeout: int, attempts: int) -> Result:
+        error = None
+        connection_attempts = 0
 
-                self.log('info', f'Attempt {connection_attempts + 1}/{attempts} to {self.to_address}; sending {str_msg}')
+        while connection_attempts < attempts:
 
-                if not self.running:
-                    break
+            self.log('info', f'Attempt {connection_attempts + 1}/{attempts} to {self.to_address}; sending {str_msg}')
 
-                try:
-                    self.send_string(str_msg=str_msg)
+            if not self.running:
+                break
 
-                    if await self.message_waiting(poll_time=timeout):
+            request_id = self.next_request_id() if self.multiplex else None
+            reply = asyncio.get_running_loop().create_future()
+            self.pending[request_id] = reply
 
-                        response = await self.socket.recv()
+            try:
+                self.start_receiving()
+                self.send_string(str_msg=str_msg, request_id=request_id)
+
+                response, *parts = await asyncio.wait_for(reply, timeout=timeout / 1000)
+
+                #self.log('info', '%s received: %s' % (self.id, response))
+
+                return Result(success=True, response=response, parts=parts)
+
+            except asyncio.TimeoutError:
+                self.log('warning', f'No response from {self.to_address} in poll time.')
 
-                        #self.log('info', '%s received: %s' % (self.id, response))
+                if request_id is None:
+                    # a late legacy reply can't be told apart from the next one, drop it with the socket
+                    self.reconnect_socket()
 
-                        return Result(success=True, response=response)
+            except zmq.ZMQError as err:
+                if err.errno == zmq.ETERM:
+                    self.log('error', f'Interrupted: {err.strerror}')
+                    break  # Interrupted
 
-                    else:
-                        self.log('warning', f'No response from {self.to_address} in poll time.')
-                        self.reconnect_socket()
+                else:
+                    self.log('error', err.strerror)
+                    error = err.strerror
 
-                except zmq.ZMQError as err:
-                    if err.errno == zmq.ETERM:
-                        self.log('error', f'Interrupted: {err.strerror}')
-                        break  # Interrupted
+            except TypeError as err:
+                self.log('error', err)
+                error = str(err)
+                break
 
-                    else:
-                        self.log('error', err.strerror)
-                        error = err.strerror
+            except Exception as err:
+                self.log('error', err)
+                error = str(err)
 
-                except TypeError as err:
-                    self.log('error', err)
-                    error = str(err)
-                    break
+            finally:
+                self.pending.pop(request_id, None)
 
-                except Exception as err:
-                    self.log('error', err)
-                    error = str(err)
+            connection_attempts += 1
 
-                connection_attempts += 1
+            await asyncio.sleep(0)
+
+        if not error:
+            error = f'Request Socket Error: Failed to receive response after {attempts} attempts each waiting {timeout}ms'
 
-                await asyncio.sleep(0)
+        return Result(success=False, error=error)
 
-            if not error:
-                error = f'Request Socket Error: Failed to receive response after {attempts} attempts each waiting {timeout}ms'
+    def start_receiving(self) -> None:
+        if self.receive_task is None or self.receive_task.done():
+            self.receive_task = asyncio.ensure_future(self.receive_responses(socket=self.socket))
 
-            return Result(success=False, error=error)
+    async def receive_responses(self, socket: zmq.Socket) -> None:
+        # Replies to requests that already timed out have nobody waiting on them and are dropped.
+        while self.running and socket is self.socket:
+            try:
+                frames = await socket.recv_multipart()
+            except zmq.ZMQError as err:
+                # the next request starts receiving again
+                if not socket.closed and err.errno != zmq.ETERM:
+                    self.log('error', err.strerror)
+                break
+
+            if self.multiplex:
+                if len(frames) < 3:
+                    self.log('warning', f'Dropping malformed reply from {self.to_address}.')
+                    continue
+
+                _, request_id, *response = frames
+            else:
+                if len(frames) < 2:
+                    self.log('warning', f'Dropping malformed reply from {self.to_address}.')
+                    continue
+
+                _, *response = frames
+                request_id = None
+
+            future = self.pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_result(response)
 
     def reconnect_socket(self):
         self.close_socket()
@@ -207,6 +267,15 @@ class Request():
         self.connect_socket()
 
     def close_socket(self) -> None:
+        if self.receive_task is not None:
+            self.receive_task.cancel()
+            self.receive_task = None
+
+        # nothing will answer these now, fail them instead of letting them wait out their timeouts
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f'Request socket to {self.to_address} closed.'))
+
         if self.socket:
             try:
                 self.socket.setsockopt(zmq.LINGER, 0)
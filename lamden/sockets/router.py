@@ -20,7 +20,7 @@ EXCEPTION_IP_NOT_TYPE_STR = "ip must be type string."
 EXCEPTION_PORT_NOT_TYPE_INT = "port must be type int."
 EXCEPTION_TO_VK_NOT_STRING = "to_vk is not type str."
 EXCEPTION_IDENT_VK_BYTES_NOT_BYTES = "ident_vk_bytes is not type bytes"
-EXCEPTION_MSG_NOT_STRING = "msg_str is not type str."
+EXCEPTION_MSG_NOT_STRING = "msg_str is not type str or bytes."
 
 class CredentialsProvider(object):
     def __init__(self, network_ip: str = None):
@@ -248,7 +248,16 @@ class Router():
         while self.should_check:
             if await self.has_message(timeout_ms=self.poll_time_ms):
                 multi_message = await self.socket.recv_multipart()
-                ident_vk_bytes, empty, msg = multi_message
+
+                # REQ peers send [ident, b'', msg], DEALER peers add the request id they want echoed on the reply
+                if len(multi_message) == 3:
+                    ident_vk_bytes, empty, msg = multi_message
+                    request_id = None
+                elif len(multi_message) == 4:
+                    ident_vk_bytes, empty, request_id, msg = multi_message
+                else:
+                    self.log('warning', f'Dropping malformed message with {len(multi_message)} frames.')
+                    continue
 
                 try:
                     ident_vk_string = json.loads(ident_vk_bytes.decode('UTF-8'))
@@ -260,7 +269,8 @@ class Router():
                 asyncio.ensure_future(self.message_callback(
                     ident_vk_bytes=ident_vk_bytes,
                     ident_vk_string=ident_vk_string,
-                    msg=msg
+                    msg=msg,
+                    request_id=request_id
                 ))
             else:
                 await asyncio.sleep(0.01)
@@ -273,7 +283,7 @@ class Router():
             self.log('info', f'should check {self.should_check}, task_check_for_messages.done(): {self.task_check_for_messages.done()}')
             self.log('info', f'currently approved in cred manager: {self.cred_provider.approved_keys}')
 
-    def send_msg(self, ident_vk_bytes: bytes, to_vk: str, msg_str: str):
+    def send_msg(self, ident_vk_bytes: bytes, to_vk: str, msg_str: (str, bytes), request_id: bytes = None):
         if not self.socket:
             raise AttributeError(EXCEPTION_NO_SOCKET)
 
@@ -283,24 +293,54 @@ class Router():
         if not isinstance(ident_vk_bytes, bytes):
             raise AttributeError(EXCEPTION_IDENT_VK_BYTES_NOT_BYTES)
 
-        if not isinstance(msg_str, str):
+        if not isinstance(msg_str, (str, bytes)):
             raise AttributeError(EXCEPTION_MSG_NOT_STRING)
 
         asyncio.ensure_future(self.async_send(
             ident_vk_bytes=ident_vk_bytes,
             to_vk=to_vk,
-            msg_str=msg_str
+            msg_str=msg_str,
+            request_id=request_id
         ))
 
-    async def async_send(self, ident_vk_bytes: bytes, to_vk: str, msg_str: str):
+    async def async_send(self, ident_vk_bytes: bytes, to_vk: str, msg_str: (str, bytes), parts: list = None,
+                         request_id: bytes = None):
+        envelope = [ident_vk_bytes, b''] if request_id is None else [ident_vk_bytes, b'', request_id]
+
+        # binary wire replies are already bytes
+        msg_bytes = msg_str.encode("UTF-8") if isinstance(msg_str, str) else msg_str
+
         try:
-            await self.socket.send_multipart([ident_vk_bytes, b'', msg_str.encode("UTF-8")])
+            await self.socket.send_multipart(envelope + [msg_bytes] + list(parts or []))
             #self.log('info', f'Sent message back to {to_vk[:8]}. {msg_str}')
         except Exception as err:
             #self.log('error', f'error sending multipart message back to {to_vk[:8]}. {ident_vk_bytes} {msg_str}')
             self.log('error', err)
 
 
+    def send_multipart_msg(self, ident_vk_bytes: bytes, to_vk: str, msg_str: (str, bytes), parts: list,
+                           request_id: bytes = None):
+        # Like send_msg, with raw frames after the message for payloads that shouldn't be JSON strings
+        if not self.socket:
+            raise AttributeError(EXCEPTION_NO_SOCKET)
+
+        if not isinstance(to_vk, str):
+            raise AttributeError(EXCEPTION_TO_VK_NOT_STRING)
+
+        if not isinstance(ident_vk_bytes, bytes):
+            raise AttributeError(EXCEPTION_IDENT_VK_BYTES_NOT_BYTES)
+
+        if not isinstance(msg_str, (str, bytes)):
+            raise AttributeError(EXCEPTION_MSG_NOT_STRING)
+
+        asyncio.ensure_future(self.async_send(
+            ident_vk_bytes=ident_vk_bytes,
+            to_vk=to_vk,
+            msg_str=msg_str,
+            parts=parts,
+            request_id=request_id
+        ))
+
     def refresh_cred_provider_vks(self, vk_list: list = []) -> None:
         for vk in vk_list:
             self.cred_provider.add_key(vk=vk)
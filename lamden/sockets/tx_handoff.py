@@ -0,0 +1,129 @@
+import zmq
+import zmq.asyncio
+import os
+from collections import OrderedDict
+from contracting.db.encoder import decode
+from lamden.logger.base import get_logger
+
+# Hands txs the masternode webserver has already validated straight to the node over a unix socket, so they don't
+# wait on the node's next pass over the file queue. Every tx is still written to the file queue first: a tx buffered
+# in the socket is lost if either process dies, the file queue copy is what makes a submitted tx survive that. Each
+# tx is handed off with the id of its file queue record, the node keeps whichever copy reaches it first and skips the
+# other without decoding it.
+
+TX_HANDOFF_PATH_ENV = 'LAMDEN_TX_IPC_PATH'
+
+# txs the sender will buffer for a connected node, past that the file queue copy is the only one
+SEND_HWM = 10_000
+# ms to keep trying to deliver buffered txs when the sender is closed
+SEND_LINGER = 1000
+# record ids of txs the receiver remembers until their second copy comes through
+MAX_UNMATCHED_TXS = 100_000
+
+
+def ipc_address(ipc_path: str) -> str:
+    return f'ipc://{os.path.abspath(ipc_path)}'
+
+
+def get_tx_handoff_path():
+    return os.environ.get(TX_HANDOFF_PATH_ENV) or None
+
+
+class TxHandoffSender:
+    # Webserver side. Sockets are created lazily per process as the webserver may fork workers after construction.
+    def __init__(self, ipc_path: str, ctx: zmq.Context = None):
+        self.address = ipc_address(ipc_path)
+        self.ctx = ctx
+        self.socket = None
+        self.pid = None
+
+        self.log = get_logger('TX HANDOFF')
+
+    def get_socket(self) -> zmq.Socket:
+        if self.socket is None or self.pid != os.getpid():
+            ctx = self.ctx or zmq.Context.instance()
+            self.socket = ctx.socket(zmq.PUSH)
+            # only queue txs once the node is connected, otherwise send fails right away
+            self.socket.setsockopt(zmq.IMMEDIATE, 1)
+            self.socket.setsockopt(zmq.SNDHWM, SEND_HWM)
+            self.socket.setsockopt(zmq.LINGER, SEND_LINGER)
+            self.socket.connect(self.address)
+            self.pid = os.getpid()
+
+        return self.socket
+
+    def send(self, tx_bytes: bytes, tx_hash: str, tx_id: str) -> bool:
+        # tx_id is the id of the tx's file queue record. Returns False if the tx could not be handed off, the node then
+        # only gets its file queue copy.
+        try:
+            self.get_socket().send_multipart([tx_hash.encode(), tx_id.encode(), tx_bytes], flags=zmq.NOBLOCK)
+            return True
+        except zmq.Again:
+            return False
+        except zmq.ZMQError as err:
+            self.log.error(f'Could not hand off tx {tx_hash}: {err}')
+            return False
+
+    def stop(self) -> None:
+        if self.socket is not None and self.pid == os.getpid():
+            self.socket.close()
+        self.socket = None
+
+
+class TxHandoffReceiver:
+    # Node side, binds the unix socket the webserver connects to.
+    def __init__(self, ipc_path: str, ctx: zmq.asyncio.Context = None):
+        self.ipc_path = ipc_path
+        self.address = ipc_address(ipc_path)
+        self.ctx = ctx or zmq.asyncio.Context().instance()
+        self.socket = None
+
+        # ids of txs taken from the handoff or the file queue whose other copy hasn't come through yet
+        self.unmatched = OrderedDict()
+
+        self.log = get_logger('TX HANDOFF')
+
+    @property
+    def is_running(self) -> bool:
+        return self.socket is not None and not self.socket.closed
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.ipc_path)), exist_ok=True)
+
+        self.socket = self.ctx.socket(zmq.PULL)
+        self.socket.bind(self.address)
+
+        self.log.info(f'Listening for txs on {self.address}')
+
+    async def recv(self) -> tuple:
+        # (tx, tx_hash, tx_id), tx is None if it couldn't be decoded
+        tx_hash, tx_id, tx_bytes = await self.socket.recv_multipart()
+
+        try:
+            tx = decode(tx_bytes.decode())
+        except Exception as err:
+            self.log.error(f'Could not decode handed off tx: {err}')
+            tx = None
+
+        return tx, tx_hash.decode(), tx_id.decode()
+
+    def is_first_copy(self, tx_id: str) -> bool:
+        # A tx comes from both the handoff and the file queue, False for the second of the two. The copy that never
+        # arrives (a failed send) leaves its id behind, the oldest are forgotten past MAX_UNMATCHED_TXS.
+        if tx_id in self.unmatched:
+            del self.unmatched[tx_id]
+            return False
+
+        self.unmatched[tx_id] = None
+        if len(self.unmatched) > MAX_UNMATCHED_TXS:
+            self.unmatched.popitem(last=False)
+
+        return True
+
+    def stop(self) -> None:
+        if self.socket is not None:
+            self.socket.close(linger=0)
+        self.socket = None
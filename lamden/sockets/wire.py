@@ -0,0 +1,383 @@
+import decimal
+from contracting.db.encoder import encode, decode, Encoder
+from contracting.stdlib.bridge.decimal import ContractingDecimal
+from contracting.stdlib.bridge.time import Datetime, Timedelta
+
+# Binary envelope for messages between nodes, used instead of contracting's JSON encoding once both sides have said
+# in hello that they understand it. It carries everything encode/decode do and decodes to the same objects, but hex
+# strings (hashes, signatures, vks) go as the raw bytes they stand for and numbers as varints.
+#
+# Message: [0x00][version: u8][value]
+# Value:   [tag: u8][body], ints are zigzag varints and strings / byte strings are [length: varint][bytes]
+#
+# JSON text never starts with a NUL byte, so either encoding can be told apart by its first byte and receivers don't
+# need to know which one the sender picked.
+
+WIRE_VERSION = 1
+SUPPORTED_WIRE_VERSIONS = [WIRE_VERSION]
+
+MAGIC = b'\x00'
+HEADER_SIZE = 2
+
+# nesting deeper than this is rejected when decoding instead of blowing the stack
+MAX_DEPTH = 64
+# only hex strings at least this long are sent as raw bytes, shorter ones don't save enough to be worth checking
+MIN_HEX_LENGTH = 32
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_STR = 4
+TAG_HEX = 5
+TAG_BYTES = 6
+TAG_LIST = 7
+TAG_DICT = 8
+TAG_DECIMAL = 9
+TAG_DATETIME = 10
+TAG_TIMEDELTA = 11
+
+json_encoder = Encoder()
+
+
+def negotiate_wire_version(versions) -> (int, None):
+    # Highest version both sides support, None to stay on JSON.
+    if not isinstance(versions, list):
+        return None
+
+    common = [v for v in versions if isinstance(v, int) and not isinstance(v, bool) and v in SUPPORTED_WIRE_VERSIONS]
+    return max(common) if common else None
+
+
+def wire_version_of(data) -> (int, None):
+    # Version of a binary message, None if it's JSON.
+    if isinstance(data, (bytes, bytearray)) and len(data) >= HEADER_SIZE and data[:1] == MAGIC:
+        return data[1]
+    return None
+
+
+def encode_message(msg, wire_version: int = None):
+    # bytes in the binary format when a version was negotiated, otherwise the JSON str the nodes always sent
+    if wire_version is None:
+        return encode(msg)
+
+    if wire_version not in SUPPORTED_WIRE_VERSIONS:
+        raise ValueError(f'Unsupported wire version {wire_version}.')
+
+    buffer = bytearray(MAGIC)
+    buffer.append(wire_version)
+
+    try:
+        pack_value(buffer, msg)
+    except TypeError:
+        # e.g. non string keys, which JSON turns into strings, receivers read either format so send it as JSON
+        return encode(msg)
+
+    return bytes(buffer)
+
+
+def decode_message(data):
+    # Decodes either format, None if it can't be decoded like contracting's decode.
+    wire_version = wire_version_of(data)
+
+    if wire_version is None:
+        return decode(data)
+
+    if wire_version not in SUPPORTED_WIRE_VERSIONS:
+        return None
+
+    try:
+        value, offset = unpack_value(bytes(data), HEADER_SIZE, 0)
+    except (ValueError, IndexError, UnicodeDecodeError, decimal.InvalidOperation, OverflowError):
+        return None
+
+    if offset != len(data):
+        return None
+
+    return value
+
+
+def pack_varint(buffer: bytearray, n: int) -> None:
+    while n > 0x7f:
+        buffer.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buffer.append(n)
+
+
+def pack_int(buffer: bytearray, n: int) -> None:
+    # zigzag so small negatives stay small, Python ints have no fixed width so neither does this
+    n = n * 2 if n >= 0 else -n * 2 - 1
+    if n < 0x80:
+        buffer.append(n)
+    else:
+        pack_varint(buffer, n)
+
+
+def pack_bytes(buffer: bytearray, tag: int, data: bytes) -> None:
+    buffer.append(tag)
+    pack_varint(buffer, len(data))
+    buffer += data
+
+
+def pack_str(buffer: bytearray, s: str) -> None:
+    if len(s) >= MIN_HEX_LENGTH and len(s) % 2 == 0:
+        try:
+            raw = bytes.fromhex(s)
+        except ValueError:
+            raw = None
+
+        # fromhex also takes upper case and spaces, those have to stay strings to come back the same
+        if raw is not None and raw.hex() == s:
+            pack_bytes(buffer, TAG_HEX, raw)
+            return
+
+    pack_bytes(buffer, TAG_STR, s.encode())
+
+
+def pack_none(buffer: bytearray, value) -> None:
+    buffer.append(TAG_NONE)
+
+
+def pack_bool(buffer: bytearray, value: bool) -> None:
+    buffer.append(TAG_TRUE if value else TAG_FALSE)
+
+
+def pack_int_value(buffer: bytearray, value: int) -> None:
+    buffer.append(TAG_INT)
+    pack_int(buffer, value)
+
+
+def pack_dict(buffer: bytearray, value: dict) -> None:
+    buffer.append(TAG_DICT)
+    pack_varint(buffer, len(value))
+    for k, v in value.items():
+        if k.__class__ is not str:
+            raise TypeError(f'Dictionary keys must be strings, not {type(k).__name__}.')
+        pack_str(buffer, k)
+        PACKERS.get(v.__class__, pack_other)(buffer, v)
+
+
+def pack_list(buffer: bytearray, value: list) -> None:
+    buffer.append(TAG_LIST)
+    pack_varint(buffer, len(value))
+    for item in value:
+        PACKERS.get(item.__class__, pack_other)(buffer, item)
+
+
+def pack_raw_bytes(buffer: bytearray, value: bytes) -> None:
+    pack_bytes(buffer, TAG_BYTES, bytes(value))
+
+
+def pack_float(buffer: bytearray, value: float) -> None:
+    # JSON writes floats as they are and decodes them as ContractingDecimal
+    pack_bytes(buffer, TAG_DECIMAL, repr(value).encode())
+
+
+def pack_decimal(buffer: bytearray, value) -> None:
+    # same precision fixing encode applies
+    pack_bytes(buffer, TAG_DECIMAL, json_encoder.default(value)['__fixed__'].encode())
+
+
+def pack_datetime(buffer: bytearray, value) -> None:
+    buffer.append(TAG_DATETIME)
+    for field in [value.year, value.month, value.day, value.hour, value.minute, value.second, value.microsecond]:
+        pack_int(buffer, field)
+
+
+def pack_timedelta(buffer: bytearray, value) -> None:
+    buffer.append(TAG_TIMEDELTA)
+    pack_int(buffer, value._timedelta.days)
+    pack_int(buffer, value._timedelta.seconds)
+
+
+def pack_other(buffer: bytearray, value) -> None:
+    # Subclasses and the types contracting matches by class name, the exact types are dispatched on in PACKERS.
+    if isinstance(value, bool):
+        pack_bool(buffer, value)
+    elif isinstance(value, int):
+        pack_int_value(buffer, value)
+    elif isinstance(value, str):
+        pack_str(buffer, value)
+    elif isinstance(value, dict):
+        pack_dict(buffer, value)
+    elif isinstance(value, (list, tuple)):
+        pack_list(buffer, value)
+    elif isinstance(value, (bytes, bytearray)):
+        pack_raw_bytes(buffer, value)
+    elif isinstance(value, float):
+        pack_float(buffer, value)
+    elif value.__class__.__name__ in (ContractingDecimal.__name__, decimal.Decimal.__name__):
+        pack_decimal(buffer, value)
+    elif value.__class__.__name__ == Datetime.__name__:
+        pack_datetime(buffer, value)
+    elif value.__class__.__name__ == Timedelta.__name__:
+        pack_timedelta(buffer, value)
+    else:
+        raise TypeError(f'Object of type {type(value).__name__} can not be sent on the wire.')
+
+
+PACKERS = {
+    type(None): pack_none,
+    bool: pack_bool,
+    int: pack_int_value,
+    str: pack_str,
+    dict: pack_dict,
+    list: pack_list,
+    tuple: pack_list,
+    bytes: pack_raw_bytes,
+    bytearray: pack_raw_bytes,
+    float: pack_float,
+    ContractingDecimal: pack_decimal,
+    decimal.Decimal: pack_decimal,
+    Datetime: pack_datetime,
+    Timedelta: pack_timedelta,
+}
+
+
+def pack_value(buffer: bytearray, value) -> None:
+    PACKERS.get(value.__class__, pack_other)(buffer, value)
+
+
+def unpack_varint(data: bytes, offset: int) -> tuple:
+    n = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, offset
+        shift += 7
+        if shift > 4096:
+            raise ValueError('Varint too long.')
+
+
+def unpack_int(data: bytes, offset: int) -> tuple:
+    n = data[offset]
+    if n < 0x80:
+        offset += 1
+    else:
+        n, offset = unpack_varint(data, offset)
+    return (n >> 1) ^ -(n & 1), offset
+
+
+def unpack_raw(data: bytes, offset: int) -> tuple:
+    length = data[offset]
+    if length < 0x80:
+        offset += 1
+    else:
+        length, offset = unpack_varint(data, offset)
+
+    end = offset + length
+    if end > len(data):
+        raise ValueError('Truncated message.')
+    return data[offset:end], end
+
+
+def unpack_none(data: bytes, offset: int, depth: int) -> tuple:
+    return None, offset
+
+
+def unpack_false(data: bytes, offset: int, depth: int) -> tuple:
+    return False, offset
+
+
+def unpack_true(data: bytes, offset: int, depth: int) -> tuple:
+    return True, offset
+
+
+def unpack_int_value(data: bytes, offset: int, depth: int) -> tuple:
+    return unpack_int(data, offset)
+
+
+def unpack_str(data: bytes, offset: int, depth: int) -> tuple:
+    length = data[offset]
+    if length < 0x80:
+        # short strings are nearly all of them, skip the general length decoding
+        end = offset + 1 + length
+        if end > len(data):
+            raise ValueError('Truncated message.')
+        return data[offset + 1:end].decode(), end
+
+    raw, offset = unpack_raw(data, offset)
+    return raw.decode(), offset
+
+
+def unpack_hex(data: bytes, offset: int, depth: int) -> tuple:
+    raw, offset = unpack_raw(data, offset)
+    return raw.hex(), offset
+
+
+def unpack_bytes(data: bytes, offset: int, depth: int) -> tuple:
+    return unpack_raw(data, offset)
+
+
+def unpack_list(data: bytes, offset: int, depth: int) -> tuple:
+    if depth >= MAX_DEPTH:
+        raise ValueError('Message nested too deep.')
+
+    count, offset = unpack_varint(data, offset)
+    items = []
+    for _ in range(count):
+        item, offset = UNPACKERS[data[offset]](data, offset + 1, depth + 1)
+        items.append(item)
+    return items, offset
+
+
+def unpack_dict(data: bytes, offset: int, depth: int) -> tuple:
+    if depth >= MAX_DEPTH:
+        raise ValueError('Message nested too deep.')
+
+    count, offset = unpack_varint(data, offset)
+    d = {}
+    for _ in range(count):
+        tag = data[offset]
+        if tag == TAG_STR:
+            length = data[offset + 1]
+            if length < 0x80:
+                end = offset + 2 + length
+                if end > len(data):
+                    raise ValueError('Truncated message.')
+                key = data[offset + 2:end].decode()
+                offset = end
+            else:
+                key, offset = unpack_str(data, offset + 1, depth)
+        elif tag == TAG_HEX:
+            key, offset = unpack_hex(data, offset + 1, depth)
+        else:
+            raise ValueError('Dictionary keys must be strings.')
+
+        d[key], offset = UNPACKERS[data[offset]](data, offset + 1, depth + 1)
+    return d, offset
+
+
+def unpack_decimal(data: bytes, offset: int, depth: int) -> tuple:
+    raw, offset = unpack_raw(data, offset)
+    return ContractingDecimal(raw.decode()), offset
+
+
+def unpack_datetime(data: bytes, offset: int, depth: int) -> tuple:
+    fields = []
+    for _ in range(7):
+        field, offset = unpack_int(data, offset)
+        fields.append(field)
+    return Datetime(*fields), offset
+
+
+def unpack_timedelta(data: bytes, offset: int, depth: int) -> tuple:
+    days, offset = unpack_int(data, offset)
+    seconds, offset = unpack_int(data, offset)
+    return Timedelta(days=days, seconds=seconds), offset
+
+
+def unpack_unknown(data: bytes, offset: int, depth: int) -> tuple:
+    raise ValueError(f'Unknown tag {data[offset - 1]}.')
+
+
+# indexed by tag
+UNPACKERS = [unpack_none, unpack_false, unpack_true, unpack_int_value, unpack_str, unpack_hex, unpack_bytes, unpack_list,
+             unpack_dict, unpack_decimal, unpack_datetime, unpack_timedelta] + [unpack_unknown] * 244
+
+
+def unpack_value(data: bytes, offset: int, depth: int) -> tuple:
+    return UNPACKERS[data[offset]](data, offset + 1, depth)
@@ -2,6 +2,7 @@ from contracting import config
 from contracting.db.driver import ContractDriver, FSDriver
 from contracting.db.encoder import encode, decode
 from contracting.stdlib.bridge.decimal import ContractingDecimal
+from lamden.block_index import BlockIndex
 from lamden.crypto.canonical import hash_members_list, create_hash_512
 from lamden.crypto.wallet import Wallet, verify
 from lamden.logger.base import get_logger
@@ -10,7 +11,16 @@ import os
 import pathlib
 import shutil
 import json
+import lzma
+import re
+import struct
 import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from typing import List, Any, Union
 
 LATEST_BLOCK_HASH_KEY = '__latest_block.hash'
@@ -23,9 +33,284 @@ BLOCK_0 = {
 
 MAX_BLOCK = '99999999999999999999'
 
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+WRITE_BATCH_MARKER_FILENAME = 'write_batch.pending'
+STATE_HISTORY_MARKER_FILENAME = 'state_history.pending'
+# Lowest block the state history / tx index cover, 0 once they cover the whole chain
+STATE_HISTORY_FLOOR_FILENAME = 'state_history.floor'
+TX_INDEX_FLOOR_FILENAME = 'tx_index.floor'
+
+BLOCK_CACHE_MAX_ENTRIES = 1_000
+BLOCK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+BLOCK_RANGE_PREFETCH = 8
+
+# Opt-in on-disk compression for blocks and txs: None, 'zlib' or 'lzma'.
+BLOCK_COMPRESSION_ENV = 'LAMDEN_BLOCK_COMPRESSION'
+COMPRESSION_DICTIONARY_FILENAME = 'compression.zdict'
+# zlib only looks back 32KB, a larger preset dictionary is never used.
+COMPRESSION_DICTIONARY_MAX_BYTES = 32 * 1024
+
+
+class StateHistoryUnavailable(Exception):
+    pass
+
+
+def fsync_paths(paths, root: str) -> None:
+    # fsync every file in paths, then every directory from the file up to root once.
+    root = os.path.abspath(root)
+    directories = set()
+
+    for path in paths:
+        path = os.path.abspath(path)
+
+        if os.path.isfile(path) and not os.path.islink(path):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        directory = os.path.dirname(path)
+        while directory.startswith(root) and directory not in directories:
+            directories.add(directory)
+            if directory == root:
+                break
+            directory = os.path.dirname(directory)
+
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class BlockCodec:
+    # Serializes blocks and txs for disk. Compressed data starts with a header plain JSON never can, so the
+    # format is detected per file and stores holding both old JSON files and compressed ones read fine.
+    #
+    # Header: [MAGIC][kind: 1 byte], followed for KIND_ZLIB_DICT by the crc32 of the dictionary as u32.
+    MAGIC = b'\x00LC'
+    KIND_ZLIB = b'z'
+    KIND_LZMA = b'x'
+    KIND_ZLIB_DICT = b'd'
+    DICTIONARY_ID = struct.Struct('>I')
+
+    COMPRESSIONS = (None, 'zlib', 'lzma')
+
+    # Keys and short string values. Hashes, signatures and wallet keys are 64+ hex chars and never repeat across files.
+    DICTIONARY_TOKEN = re.compile(rb'"[^"\\]{1,48}"\s*:\s*|"[^"\\]{1,48}"')
+
+    def __init__(self, compression: str = None, dictionary: bytes = None, level: int = None):
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f'Unknown compression {compression!r}, expected one of {self.COMPRESSIONS}.')
+
+        self.compression = compression
+        self.level = level
+
+        # The dictionary is always used to read, but only zlib writes with it.
+        self.dictionary = dictionary or None
+        self.dictionary_id = zlib.crc32(dictionary) if dictionary else None
+
+    @classmethod
+    def from_dictionary_file(cls, dictionary_path: str, compression: str = None, level: int = None):
+        dictionary = None
+        if dictionary_path is not None and os.path.isfile(dictionary_path):
+            with open(dictionary_path, 'rb') as f:
+                dictionary = f.read()
+
+        return cls(compression=compression, dictionary=dictionary, level=level)
+
+    @staticmethod
+    def is_compressed(data: bytes) -> bool:
+        return data.startswith(BlockCodec.MAGIC)
+
+    def encode(self, data: dict) -> bytes:
+        return self.compress(json.dumps(data).encode())
+
+    def decode(self, data: bytes) -> dict:
+        return json.loads(self.decompress(data))
+
+    def compress(self, payload: bytes) -> bytes:
+        if self.compression is None:
+            return payload
+
+        if self.compression == 'lzma':
+            return self.MAGIC + self.KIND_LZMA + lzma.compress(payload, preset=self.level)
+
+        level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+
+        if self.dictionary is None:
+            return self.MAGIC + self.KIND_ZLIB + zlib.compress(payload, level)
+
+        compressor = zlib.compressobj(level, zdict=self.dictionary)
+        return self.MAGIC + self.KIND_ZLIB_DICT + self.DICTIONARY_ID.pack(self.dictionary_id) + \
+            compressor.compress(payload) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        if not self.is_compressed(data):
+            return data
+
+        kind = data[len(self.MAGIC):len(self.MAGIC) + 1]
+        body = data[len(self.MAGIC) + 1:]
+
+        try:
+            if kind == self.KIND_ZLIB:
+                return zlib.decompress(body)
+
+            if kind == self.KIND_LZMA:
+                return lzma.decompress(body)
+
+            if kind == self.KIND_ZLIB_DICT:
+                dictionary_id = self.DICTIONARY_ID.unpack_from(body)[0]
+                if dictionary_id != self.dictionary_id:
+                    raise ValueError(f'Data was compressed with dictionary {dictionary_id:08x} which is not loaded.')
+
+                decompressor = zlib.decompressobj(zdict=self.dictionary)
+                return decompressor.decompress(body[self.DICTIONARY_ID.size:]) + decompressor.flush()
+        except (zlib.error, lzma.LZMAError, struct.error) as err:
+            raise ValueError(f'Corrupt compressed data: {err}')
+
+        raise ValueError(f'Unknown compression kind {kind!r}.')
+
+    @classmethod
+    def train_dictionary(cls, samples, max_bytes: int = COMPRESSION_DICTIONARY_MAX_BYTES) -> bytes:
+        # zlib has no trainer, so build a preset dictionary from the JSON fragments that recur across samples.
+        # Fragments are ranked by the bytes they would save and the best go last, where matches are cheapest.
+        counts = Counter()
+        for sample in samples:
+            counts.update(set(cls.DICTIONARY_TOKEN.findall(sample)))
+
+        tokens = sorted((token for token, count in counts.items() if count > 1),
+                        key=lambda token: (counts[token] * len(token), token), reverse=True)
+
+        selected = []
+        size = 0
+        for token in tokens:
+            if size + len(token) > max_bytes:
+                continue
+            selected.append(token)
+            size += len(token)
+
+        return b''.join(reversed(selected))
+
+
+class BlockCache:
+    # LRU cache of filled blocks (block + processed tx) keyed by block number, with a hash -> number lookup.
+    # Blocks are held as JSON text so every hit hands back a fresh dict that callers are free to mutate.
+
+    def __init__(self, max_entries: int = BLOCK_CACHE_MAX_ENTRIES, max_bytes: int = BLOCK_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.entries = OrderedDict()
+        self.hashes = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, block_num) -> Union[dict, None]:
+        with self.lock:
+            entry = self.entries.get(int(block_num))
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(int(block_num))
+            self.hits += 1
+
+        return json.loads(entry[1])
+
+    def peek(self, block_num) -> Union[dict, None]:
+        # Like get but leaves the hit / miss counters and the LRU order alone, for reads that stream past the cache.
+        with self.lock:
+            entry = self.entries.get(int(block_num))
+
+        return None if entry is None else json.loads(entry[1])
+
+    def get_by_hash(self, block_hash: str) -> Union[dict, None]:
+        with self.lock:
+            block_num = self.hashes.get(block_hash)
+
+        if block_num is None:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        return self.get(block_num)
+
+    def put(self, block: dict, encoded_block: str = None) -> None:
+        if self.max_entries <= 0:
+            return
+
+        if encoded_block is None:
+            encoded_block = json.dumps(block)
+
+        if len(encoded_block) > self.max_bytes:
+            return
+
+        block_num = int(block.get('number'))
+
+        with self.lock:
+            self._remove(block_num)
+
+            self.entries[block_num] = (block.get('hash'), encoded_block)
+            self.hashes[block.get('hash')] = block_num
+            self.total_bytes += len(encoded_block)
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, block_num) -> None:
+        with self.lock:
+            self._remove(int(block_num))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hashes.clear()
+            self.total_bytes = 0
+
+    def _remove(self, block_num: int) -> None:
+        entry = self.entries.pop(block_num, None)
+
+        if entry is None:
+            return
+
+        block_hash, encoded_block = entry
+        if self.hashes.get(block_hash) == block_num:
+            del self.hashes[block_hash]
+
+        self.total_bytes -= len(encoded_block)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0
+            }
+
 
 class BlockStorage:
-    def __init__(self, root=None, block_diver=None):
+    def __init__(self, root=None, block_diver=None, cache_max_entries: int = BLOCK_CACHE_MAX_ENTRIES,
+                 cache_max_bytes: int = BLOCK_CACHE_MAX_BYTES, compression: str = None,
+                 compression_level: int = None, read_only: bool = False):
         self.current_thread = threading.current_thread()
         self.log = get_logger(f'[{self.current_thread.name}][BlockStorage]')
         self.root = pathlib.Path(root) if root is not None else STORAGE_HOME
@@ -33,17 +318,53 @@ class BlockStorage:
         self.blocks_dir = self.root.joinpath('blocks')
         self.blocks_alias_dir = self.root.joinpath('block_alias')
         self.txs_dir = self.root.joinpath('txs')
+        self.tx_index_dir = self.root.joinpath('tx_index')
         self.member_history_dir = self.root.joinpath('member_history')
         self.state_history_dir = self.root.joinpath('state_history')
 
         self.__build_directories()
 
-        self.block_driver = block_diver or FSBlockDriver(root=self.blocks_dir)
-        self.block_alias_driver = FSHashStorageDriver(root=self.blocks_alias_dir)
-        self.tx_driver = FSHashStorageDriver(root=self.txs_dir)
-        self.member_history = FSMemberHistory(root=self.member_history_dir)
+        if compression is None:
+            compression = os.environ.get(BLOCK_COMPRESSION_ENV) or None
+
+        self.compression_dictionary_path = self.root.joinpath(COMPRESSION_DICTIONARY_FILENAME)
+        self.codec = BlockCodec.from_dictionary_file(
+            dictionary_path=self.compression_dictionary_path,
+            compression=compression,
+            level=compression_level
+        )
+
+        # read_only for processes that read a chain another process writes, ie. the webserver
+        self.read_only = read_only
+
+        self.block_driver = block_diver or FSBlockDriver(root=self.blocks_dir, codec=self.codec, read_only=read_only)
+        self.block_alias_driver = FSHashStorageDriver(root=self.blocks_alias_dir, codec=self.codec)
+        self.tx_driver = FSHashStorageDriver(root=self.txs_dir, codec=self.codec)
+        self.tx_index = FSTxIndex(root=self.tx_index_dir)
+        self.member_history = FSMemberHistory(root=self.member_history_dir, read_only=read_only)
         self.state_history = FSStateHistory(root=self.state_history_dir)
 
+        self.block_cache = BlockCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        self.block_driver.on_blocks_changed = self.__blocks_changed
+
+        self.write_batch_marker = self.root.joinpath(WRITE_BATCH_MARKER_FILENAME)
+        self.write_batch_blocks = None
+        self.write_batch_paths = None
+
+        self.incomplete_batch_blocks = self.__recover_write_batch()
+
+        self.state_history_marker = self.root.joinpath(STATE_HISTORY_MARKER_FILENAME)
+        self.deferred_history_blocks = None
+
+        self.__recover_deferred_state_history()
+
+        self.state_history_floor_path = self.root.joinpath(STATE_HISTORY_FLOOR_FILENAME)
+        self.tx_index_floor_path = self.root.joinpath(TX_INDEX_FLOOR_FILENAME)
+
+        # Stores written before the state history / tx index were kept only have them for new blocks until rebuilt
+        for floor_path in (self.state_history_floor_path, self.tx_index_floor_path):
+            if not self.read_only and not floor_path.exists():
+                self.__write_index_floor(path=floor_path, floor=self.__untracked_floor())
 
         self.log.info(f'Initialized block & tx storage at \'{self.root}\', {self.total_blocks()} existing blocks found.')
 
@@ -52,9 +373,17 @@ class BlockStorage:
         self.blocks_dir.mkdir(exist_ok=True, parents=True)
         self.blocks_alias_dir.mkdir(exist_ok=True, parents=True)
         self.txs_dir.mkdir(exist_ok=True, parents=True)
+        self.tx_index_dir.mkdir(exist_ok=True, parents=True)
         self.member_history_dir.mkdir(exist_ok=True, parents=True)
         self.state_history_dir.mkdir(exist_ok=True, parents=True)
 
+    def __state_changes(self, block: dict, tx: dict = None) -> list:
+        # Every state write of a block in the order it was applied, rewards go after the tx state.
+        if self.is_genesis_block(block=block):
+            return block.get('genesis') or []
+
+        return ((tx or {}).get('state') or []) + (block.get('rewards') or [])
+
     def __cull_tx(self, block):
         # Pops all transactions from the block and replaces them with the hash only for storage space
         # Returns the data and hashes for storage in a different folder. Block is modified in place
@@ -68,14 +397,232 @@ class BlockStorage:
         hash_symlink_name = block.get('hash')
 
         filename = self.block_driver.write_block(block=block)
+
+        if self.block_driver.indexes_hashes:
+            return
+
         file_path = self.block_driver.get_file_path(block_num=filename)
         self.block_alias_driver.write_symlink(
             hash_str=hash_symlink_name,
             link_to=file_path
         )
 
+        self.__track_batch_paths(
+            file_path,
+            os.path.join(self.block_alias_driver.get_directory(hash_symlink_name), hash_symlink_name)
+        )
+
     def __write_tx(self, tx_hash, tx):
         self.tx_driver.write_file(hash_str=tx_hash, data=tx)
+        self.__track_batch_paths(os.path.join(self.tx_driver.get_directory(tx_hash), tx_hash))
+
+    def __write_tx_index(self, tx_hash, block_num):
+        self.__track_batch_paths(self.tx_index.set_block_num(hash_str=tx_hash, block_num=block_num))
+
+    def __track_batch_paths(self, *paths):
+        if self.write_batch_paths is not None:
+            self.write_batch_paths.update(paths)
+
+    def __track_batch_block(self, block_num):
+        if self.write_batch_blocks is None or str(block_num) in self.write_batch_blocks:
+            return
+
+        self.write_batch_blocks.append(str(block_num))
+
+        with open(self.write_batch_marker, 'a') as f:
+            f.write(f'{block_num}\n')
+
+    def __recover_write_batch(self) -> list:
+        # A leftover marker means the process died inside a write batch. Any block it lists that is not fully
+        # on disk gets removed so catchup / missing blocks can fetch it again.
+        # For a reader the marker is most likely a batch the writer is still in the middle of, that's not ours to undo.
+        if self.read_only or not self.write_batch_marker.exists():
+            return []
+
+        with open(self.write_batch_marker) as f:
+            block_numbers = [line.strip() for line in f if line.strip()]
+
+        incomplete = self.__remove_incomplete_blocks(block_numbers=block_numbers)
+
+        # The batch's blocks may have reached the disk without their line in a state history marker, record them all.
+        state_history_marker = self.root.joinpath(STATE_HISTORY_MARKER_FILENAME)
+        if state_history_marker.exists():
+            with open(state_history_marker, 'a') as f:
+                f.write(''.join(f'{block_num}\n' for block_num in block_numbers))
+
+        os.remove(self.write_batch_marker)
+
+        self.log.warning(
+            f'Found an uncommitted write batch covering {len(block_numbers)} blocks, '
+            f'{len(incomplete)} incomplete: {incomplete}'
+        )
+
+        return incomplete
+
+    def __block_is_complete(self, block_num: str) -> bool:
+        block = self.block_driver.find_block(block_num=block_num)
+
+        if block is None:
+            return False
+
+        if self.is_genesis_block(block=block):
+            return True
+
+        try:
+            return self.get_tx(block.get('processed')) is not None
+        except Exception:
+            return False
+
+    def __remove_incomplete_blocks(self, block_numbers: list) -> list:
+        incomplete = []
+
+        for block_num in block_numbers:
+            if self.__block_is_complete(block_num=block_num):
+                continue
+
+            incomplete.append(block_num)
+            self.block_cache.invalidate(block_num=block_num)
+
+            if self.block_driver.block_exists(block_num=block_num):
+                self.block_driver.delete_block(block_num=block_num)
+
+        return incomplete
+
+    def begin_write_batch(self, block_numbers: list = None) -> bool:
+        # Returns False if a batch is already open, the writes then become part of that batch.
+        if self.write_batch_blocks is not None:
+            for block_num in block_numbers or []:
+                self.__track_batch_block(block_num=block_num)
+            return False
+
+        self.write_batch_blocks = []
+        self.write_batch_paths = set()
+
+        with open(self.write_batch_marker, 'w') as f:
+            for block_num in block_numbers or []:
+                self.write_batch_blocks.append(str(block_num))
+                f.write(f'{block_num}\n')
+
+        fsync_paths(paths=[self.write_batch_marker], root=self.root)
+
+        return True
+
+    def commit_write_batch(self, verify: bool = False) -> None:
+        if self.write_batch_blocks is None:
+            return
+
+        try:
+            if verify:
+                self.__remove_incomplete_blocks(block_numbers=self.write_batch_blocks)
+
+            self.block_driver.sync()
+            fsync_paths(paths=self.write_batch_paths, root=self.root)
+        finally:
+            self.write_batch_blocks = None
+            self.write_batch_paths = None
+
+        os.remove(self.write_batch_marker)
+        fsync_paths(paths=[self.write_batch_marker], root=self.root)
+
+    @contextmanager
+    def write_batch(self, block_numbers: list = None):
+        opened = self.begin_write_batch(block_numbers=block_numbers)
+
+        try:
+            yield
+        except Exception:
+            if opened:
+                self.commit_write_batch(verify=True)
+            raise
+
+        if opened:
+            self.commit_write_batch()
+
+    def __blocks_changed(self, block_nums: Union[list, None]) -> None:
+        # Another process wrote or deleted these blocks, ie. the node rolled back a block this webserver has cached.
+        if block_nums is None:
+            self.block_cache.clear()
+            return
+
+        for block_num in block_nums:
+            self.block_cache.invalidate(block_num=block_num)
+
+    def begin_deferred_state_history(self) -> bool:
+        # While open, store_block only notes the block and its state history is written when this is committed, oldest
+        # block first. Blocks stored newest first (catchup) would otherwise each rewrite the whole history file of
+        # every key they touch, in order they are all appends. Returns False if already open.
+        if self.deferred_history_blocks is not None:
+            return False
+
+        self.deferred_history_blocks = set()
+        open(self.state_history_marker, 'w').close()
+
+        return True
+
+    def commit_deferred_state_history(self) -> None:
+        if self.deferred_history_blocks is None:
+            return
+
+        block_numbers = self.deferred_history_blocks
+        self.deferred_history_blocks = None
+
+        self.__save_state_histories(block_numbers=block_numbers)
+
+        os.remove(self.state_history_marker)
+
+    @contextmanager
+    def deferred_state_history(self):
+        opened = self.begin_deferred_state_history()
+
+        try:
+            yield
+        finally:
+            if opened:
+                self.commit_deferred_state_history()
+
+    def __defer_state_history(self, block_num) -> None:
+        if int(block_num) in self.deferred_history_blocks:
+            return
+
+        self.deferred_history_blocks.add(int(block_num))
+
+        with open(self.state_history_marker, 'a') as f:
+            f.write(f'{block_num}\n')
+
+        # synced with the block it stands for
+        self.__track_batch_paths(str(self.state_history_marker))
+
+    def __save_state_histories(self, block_numbers) -> None:
+        # Records the state history of stored blocks oldest first, blocks removed in the meantime are skipped.
+        for block_num in sorted(block_numbers):
+            block = self.block_driver.find_block(block_num=str(block_num))
+            if block is None:
+                continue
+
+            tx = None
+            if not self.is_genesis_block(block=block):
+                try:
+                    tx = self.get_tx(block.get('processed'))
+                except FileNotFoundError:
+                    continue
+                if tx is None:
+                    continue
+
+            self.__save_state_history(block=block, tx=tx)
+
+    def __recover_deferred_state_history(self) -> None:
+        # A leftover marker means the process stopped before writing the state history of the blocks it lists.
+        if self.read_only or not self.state_history_marker.exists():
+            return
+
+        with open(self.state_history_marker) as f:
+            block_numbers = set(int(line) for line in f if line.strip().isdigit())
+
+        self.__save_state_histories(block_numbers=block_numbers)
+
+        os.remove(self.state_history_marker)
+
+        self.log.warning(f'Recorded the deferred state history of {len(block_numbers)} blocks.')
 
     def __fill_block(self, block):
         tx_hash = block.get('processed')
@@ -99,16 +646,31 @@ class BlockStorage:
             shutil.rmtree(self.blocks_dir)
         if self.txs_dir.is_dir():
             shutil.rmtree(self.txs_dir)
+        if self.tx_index_dir.is_dir():
+            shutil.rmtree(self.tx_index_dir)
         if self.blocks_alias_dir.is_dir():
             shutil.rmtree(self.blocks_alias_dir)
+        if self.state_history_dir.is_dir():
+            shutil.rmtree(self.state_history_dir)
 
         self.__build_directories()
+        self.block_cache.clear()
+
+        self.__write_index_floor(path=self.state_history_floor_path, floor=0)
+        self.__write_index_floor(path=self.tx_index_floor_path, floor=0)
+
+        if isinstance(self.block_driver, (FSBlockDriver, SegmentLogBlockDriver)):
+            self.block_driver.build_index()
         self.log.debug(f'Flushed block & tx storage at \'{self.root}\'')
 
     def store_block(self, block):
         encoded_block = encode(block)
         block = json.loads(encoded_block)
 
+        self.__track_batch_block(block_num=block.get('number'))
+        self.block_cache.invalidate(block_num=block.get('number'))
+
+        tx = None
         if not self.is_genesis_block(block=block):
 
             tx, tx_hash = self.__cull_tx(block)
@@ -117,9 +679,83 @@ class BlockStorage:
                 raise ValueError('Block has no transaction information or malformed tx data.')
 
             self.__write_tx(tx_hash, tx)
+            self.__write_tx_index(tx_hash, block.get('number'))
 
         self.__write_block(block)
 
+        if self.deferred_history_blocks is not None:
+            self.__defer_state_history(block_num=block.get('number'))
+        else:
+            self.__save_state_history(block=block, tx=tx)
+
+        # The encoded block is exactly what get_block would rebuild from disk, so the freshest block is cached for free
+        self.block_cache.put(block=block, encoded_block=encoded_block)
+
+    def __save_state_history(self, block: dict, tx: dict = None) -> None:
+        state_changes = self.__state_changes(block=block, tx=tx)
+
+        self.state_history.save_state_changes(
+            keys=[change.get('key') for change in state_changes],
+            values=[change.get('value') for change in state_changes],
+            block_num=block.get('number')
+        )
+
+    def rebuild_state_history(self) -> None:
+        # Rebuilds the state history from the stored chain, for stores written before it was kept.
+        self.__write_index_floor(path=self.state_history_floor_path, floor=self.__untracked_floor())
+
+        if self.state_history_dir.is_dir():
+            shutil.rmtree(self.state_history_dir)
+        self.state_history_dir.mkdir(exist_ok=True, parents=True)
+
+        for block in self.get_blocks_range(prefetch=BLOCK_RANGE_PREFETCH):
+            self.__save_state_history(block=block, tx=block.get('processed'))
+
+        self.__write_index_floor(path=self.state_history_floor_path, floor=0)
+
+    def state_history_floor(self) -> int:
+        # Lowest block the state history is complete from. While a deferral is pending none of it can be trusted.
+        if self.state_history_marker.exists():
+            return self.__untracked_floor()
+
+        return self.__read_index_floor(path=self.state_history_floor_path)
+
+    def tx_index_floor(self) -> int:
+        # Lowest block the tx index is complete from.
+        return self.__read_index_floor(path=self.tx_index_floor_path)
+
+    def __untracked_floor(self) -> int:
+        # Floor for an index missing every stored block, 0 for an empty store.
+        latest_block_num = self.get_latest_block_number()
+        return 0 if latest_block_num is None else int(latest_block_num) + 1
+
+    def __read_index_floor(self, path) -> int:
+        try:
+            with open(path) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            # not written by the writer yet
+            return self.__untracked_floor()
+
+    def __write_index_floor(self, path, floor: int) -> None:
+        if self.read_only:
+            return
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(floor))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def store_blocks(self, blocks: list) -> None:
+        # Stores all blocks with a single grouped fsync and a commit marker covering the whole list.
+        block_numbers = [block.get('number') for block in blocks]
+
+        with self.write_batch(block_numbers=block_numbers):
+            for block in blocks:
+                self.store_block(block=block)
+
     def remove_block(self, v=None):
         if v is None:
             return None
@@ -138,9 +774,87 @@ class BlockStorage:
         block_hash = block.get('hash')
         tx_hash = block.get('processed')
 
+        self.__track_batch_block(block_num=block_num)
+        self.block_cache.invalidate(block_num=block_num)
+
+        try:
+            tx = self.get_tx(tx_hash)
+        except FileNotFoundError:
+            tx = None
+
+        self.state_history.remove_state_changes(
+            keys=[change.get('key') for change in self.__state_changes(block=block, tx=tx)],
+            block_num=block_num
+        )
+
         self.block_driver.delete_block(block_num=block_num)
-        self.block_alias_driver.remove_symlink(hash_str=block_hash)
+        if not self.block_driver.indexes_hashes:
+            self.block_alias_driver.remove_symlink(hash_str=block_hash)
         self.tx_driver.delete_file(hash_str=tx_hash)
+        self.tx_index.delete_block_num(hash_str=tx_hash, block_num=block_num)
+
+        if isinstance(self.block_driver, FSBlockDriver):
+            self.__track_batch_paths(self.block_driver.get_file_path(block_num=block_num.zfill(64)))
+        self.__track_batch_paths(os.path.join(self.tx_driver.get_directory(tx_hash), tx_hash))
+        self.__track_batch_paths(os.path.join(self.tx_index.get_directory(tx_hash), tx_hash))
+
+    def __get_filled_block(self, block_num, cache: bool = True) -> Union[dict, None]:
+        self.block_driver.catch_up()
+
+        # Reads that don't fill the cache (ie. range reads) don't count towards its hit rate either.
+        block = self.block_cache.get(block_num=block_num) if cache else self.block_cache.peek(block_num=block_num)
+        if block is not None:
+            return block
+
+        block = self.block_driver.find_block(block_num=str(block_num))
+
+        if block is None:
+            return None
+
+        if not self.is_genesis_block(block=block):
+            self.__fill_block(block)
+
+        if cache:
+            self.block_cache.put(block=block)
+
+        return block
+
+    def get_blocks_range(self, start: int = None, end: int = None, limit: int = None, reverse: bool = False,
+                         prefetch: int = 0):
+        # Yields filled blocks with start <= number <= end in chain order (latest first if reverse).
+        # With prefetch > 0 the next blocks are read ahead on a thread pool while the caller works on the current one.
+        # Blocks read here are not added to the block cache so a full chain pass doesn't evict the hot blocks.
+        block_nums = self.block_driver.find_block_nums(start=start, end=end)
+
+        if reverse:
+            block_nums.reverse()
+
+        if limit is not None:
+            block_nums = block_nums[:limit]
+
+        if prefetch <= 0:
+            for block_num in block_nums:
+                block = self.__get_filled_block(block_num=block_num, cache=False)
+                if block is not None:
+                    yield block
+            return
+
+        block_nums = iter(block_nums)
+
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            pending = deque(
+                executor.submit(self.__get_filled_block, block_num, False) for block_num in islice(block_nums, prefetch)
+            )
+
+            while pending:
+                block = pending.popleft().result()
+
+                block_num = next(block_nums, None)
+                if block_num is not None:
+                    pending.append(executor.submit(self.__get_filled_block, block_num, False))
+
+                if block is not None:
+                    yield block
 
     def get_block(self, v=None):
         if v is None:
@@ -153,17 +867,27 @@ class BlockStorage:
 
         try:
             int(v)
-            block = self.block_driver.find_block(block_num=v)
+            block = self.__get_filled_block(block_num=v)
         except ValueError:
-            block = self.block_alias_driver.get_file(hash_str=v)
+            self.block_driver.catch_up()
+            block = self.block_cache.get_by_hash(block_hash=v)
+
+            if block is None:
+                if self.block_driver.indexes_hashes:
+                    block = self.block_driver.find_block_by_hash(block_hash=v)
+                else:
+                    block = self.block_alias_driver.get_file(hash_str=v)
+
+                if block is not None and not self.is_genesis_block(block=block):
+                    self.__fill_block(block)
+
+                if block is not None:
+                    self.block_cache.put(block=block)
 
         if block is None:
             self.log.error(f'Block \'{v}\' was not found in storage.')
             return None
 
-        if not self.is_genesis_block(block=block):
-            self.__fill_block(block)
-
         return block
 
     def get_previous_block(self, v):
@@ -176,15 +900,12 @@ class BlockStorage:
             if not isinstance(v, int) or v < 0:
                 return None
 
-        block = self.block_driver.find_previous_block(block_num=str(v))
+        block_num = self.block_driver.find_previous_block_num(block_num=str(v))
 
-        if block is None:
+        if block_num is None:
             return None
 
-        if not self.is_genesis_block(block=block):
-            self.__fill_block(block)
-
-        return block
+        return self.__get_filled_block(block_num=block_num)
 
     def get_next_block(self, v):
         if v is None:
@@ -196,69 +917,71 @@ class BlockStorage:
             if not isinstance(v, int):
                 return None
 
-        block = self.block_driver.find_next_block(block_num=str(v))
+        block_num = self.block_driver.find_next_block_num(block_num=str(v))
 
-        if not block:
+        if block_num is None:
             return None
 
-        if not self.is_genesis_block(block=block):
-            self.__fill_block(block)
-
-        return block
+        return self.__get_filled_block(block_num=block_num)
 
     def get_latest_block(self) -> dict:
-        block = self.block_driver.find_previous_block(block_num=MAX_BLOCK)
+        block_num = self.block_driver.find_previous_block_num(block_num=MAX_BLOCK)
 
-        if not block:
+        if block_num is None:
             return None
 
-        if not self.is_genesis_block(block=block):
-            self.__fill_block(block)
-
-        return block
+        return self.__get_filled_block(block_num=block_num)
 
     def get_latest_block_number(self) -> int:
-        block = self.block_driver.find_previous_block(block_num=MAX_BLOCK)
-
-        try:
-            block_num = block.get('number', None)
-            if isinstance(block_num, str):
-                return int(block_num)
-            else:
-                return None
-        except AttributeError:
-            return None
+        return self.block_driver.get_latest_block_num()
 
     def get_latest_block_hash(self) -> str:
-        block = self.block_driver.find_previous_block(block_num=MAX_BLOCK)
-
-        try:
-            return block.get('hash', None)
-        except AttributeError:
-            return None
+        return self.block_driver.get_latest_block_hash()
 
     def get_tx(self, h):
         tx = self.tx_driver.get_file(hash_str=h)
         return tx
 
-    def get_later_blocks(self, hlc_timestamp):
-        later_blocks = []
-        while True:
-            if len(later_blocks) == 0:
-                block_num = str(hlc.nanos_from_hlc_timestamp(hlc_timestamp=hlc_timestamp))
-            else:
-                block_num = later_blocks[-1].get('number')
+    def get_tx_block_num(self, h) -> Union[int, None]:
+        return self.tx_index.get_block_num(hash_str=h)
 
-            block = self.block_driver.find_next_block(block_num=str(block_num))
+    def get_tx_block(self, h) -> Union[dict, None]:
+        # Metadata of the block holding tx h, found through the tx index and read without its tx.
+        block_num = self.get_tx_block_num(h)
+        if block_num is None:
+            return None
 
-            if block is None:
-                break
+        block = self.block_driver.find_block(block_num=str(block_num))
+        if block is None:
+            return None
+
+        return {
+            'number': block.get('number'),
+            'hash': block.get('hash'),
+            'hlc_timestamp': block.get('hlc_timestamp')
+        }
+
+    def rebuild_tx_index(self) -> None:
+        # Rebuilds the tx index from the stored chain, for stores written before it was kept.
+        self.__write_index_floor(path=self.tx_index_floor_path, floor=self.__untracked_floor())
+
+        if self.tx_index_dir.is_dir():
+            shutil.rmtree(self.tx_index_dir)
+        self.tx_index_dir.mkdir(exist_ok=True, parents=True)
+
+        for block_num in self.block_driver.find_block_nums():
+            block = self.block_driver.find_block(block_num=str(block_num))
+
+            if block is None or self.is_genesis_block(block=block) or not isinstance(block.get('processed'), str):
+                continue
 
-            self.__fill_block(block=block)
-            later_blocks.append(block)
+            self.tx_index.set_block_num(hash_str=block.get('processed'), block_num=block_num)
 
-        later_blocks = sorted(later_blocks, key=lambda x: x['number'])
-        return later_blocks
+        self.__write_index_floor(path=self.tx_index_floor_path, floor=0)
+
+    def get_later_blocks(self, hlc_timestamp):
+        block_num = hlc.nanos_from_hlc_timestamp(hlc_timestamp=hlc_timestamp)
+        return list(self.get_blocks_range(start=block_num + 1))
 
     def set_previous_hash(self, block: dict):
         old_previous_hash = block.get('previous')
@@ -267,6 +990,9 @@ class BlockStorage:
         new_previous_block_hash = previous_block.get('hash')
         block['previous'] = new_previous_block_hash
 
+        if self.block_driver.indexes_hashes:
+            return
+
         if not self.block_alias_driver.is_symlink_valid(hash_str=old_previous_hash):
             self.block_alias_driver.remove_symlink(hash_str=old_previous_hash)
 
@@ -279,35 +1005,74 @@ class BlockStorage:
 
         return self.member_history.verify_member(block_num=block_num, vk=vk)
 
-    def get_previous_state_value(self, key: str, block_num: str):
-        previous_change = self.state_history.get_previous_change(
-            key=key,
-            block_num=block_num
-        )
-
-        if not previous_change:
+    def __find_state_value(self, key: str, block_num: int):
+        # Fallback for history entries recorded without their value, reads the block that made the change.
+        block = self.get_block(v=block_num)
+        if block is None:
             return None
 
-        block = self.get_block(v=int(block_num))
-        value = None
+        # The last write to a key wins.
+        for state_change in reversed(self.__state_changes(block=block, tx=block.get('processed'))):
+            if state_change.get('key') == key:
+                return state_change.get('value')
 
-        if self.is_genesis_block(block):
-            state_changes = block.get('genesis', [])
-            rewards = []
-        else:
-            state_changes = block['processed'].get('state', [])
-            rewards = block.get('rewards', [])
+        return None
 
-        for state_change in state_changes:
-            if state_change.get('key') == key:
-                value = state_change.get('value')
+    def __resolve_state(self, key: str, state: Union[tuple, None]):
+        if state is None:
+            return None, None
 
-        for reward in rewards:
-            if reward.get('key') == key:
-                value = reward.get('value')
+        changed_at, value = state
+        if value is FSStateHistory.VALUE_NOT_INDEXED:
+            value = self.__find_state_value(key=key, block_num=changed_at)
 
+        return changed_at, value
+
+    def get_previous_state_value(self, key: str, block_num: str):
+        _, value = self.__resolve_state(
+            key=key,
+            state=self.state_history.get_previous_state(key=key, block_num=block_num)
+        )
         return value
 
+    def get_state_at(self, key: str, block_num: str):
+        # Value of key as of the end of block block_num, None if it hadn't been set by then.
+        _, value = self.__resolve_state(
+            key=key,
+            state=self.state_history.get_state_at(key=key, block_num=block_num)
+        )
+        return value
+
+    def get_states_at(self, queries: list) -> list:
+        # Batched point in time lookups, queries are (key, block_num) pairs. Raises StateHistoryUnavailable if an
+        # answer could depend on blocks the state history doesn't cover yet.
+        floor = self.state_history_floor()
+        states = self.state_history.get_states_at(queries=[(key, int(block_num)) for key, block_num in queries])
+        results = []
+
+        for (key, block_num), state in zip(queries, states):
+            # Only a change at or above the floor proves nothing uncovered came after it
+            if floor > 0 and (state is None or state[0] < floor):
+                raise StateHistoryUnavailable(f'State history unavailable below block {floor}.')
+
+            changed_at, value = self.__resolve_state(key=key, state=state)
+            results.append({
+                'key': key,
+                'block_num': str(block_num),
+                'changed_at': None if changed_at is None else str(changed_at),
+                'value': value
+            })
+
+        return results
+
+    def get_contract_changes(self, contract: str, start: int = None, end: int = None, limit: int = None) -> list:
+        return [
+            {'block_num': str(block_num), 'key': key, 'value': value}
+            for block_num, key, value in self.state_history.get_contract_changes(
+                contract=contract, start=start, end=end, limit=limit
+            )
+        ]
+
 # TODO: remove pending nonces if we end up getting rid of them.
 # TODO: move to component responsible for state maintenance.
 NONCE_FILENAME = '__n'
@@ -404,6 +1169,25 @@ def get_latest_block_height(driver: ContractDriver):
 class BlockDriver:
     # The BlockStorage class will handle encoding and decoding. Store and return blocks as JSON strings.
 
+    # Drivers that can resolve a block by its hash themselves don't need the block_alias symlinks.
+    indexes_hashes = False
+
+    # Called with the numbers of blocks another process wrote or deleted once the driver has caught up with them, or
+    # None if any block may have changed. BlockStorage drops them from its cache.
+    on_blocks_changed = None
+
+    def catch_up(self) -> None:
+        # Picks up blocks another process wrote or deleted, drivers that can't see those have nothing to do.
+        pass
+
+    def _blocks_changed(self, block_nums: Union[list, None]) -> None:
+        if self.on_blocks_changed is not None:
+            self.on_blocks_changed(block_nums)
+
+    def find_block_by_hash(self, block_hash: str) -> dict:
+        # This method will take a block hash and return that block
+        raise NotImplementedError("Subclasses must implement this method.")
+
     def find_block(self, block_num: str) -> dict:
         # This method will take a block number and return that block and the next x amount of blocks
         raise NotImplementedError("Subclasses must implement this method.")
@@ -440,6 +1224,31 @@ class BlockDriver:
         # This method will take a block number and return the next block
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def find_previous_block_num(self, block_num: str) -> Union[int, None]:
+        # This method will take a block number and return the number of the previous block without reading it
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def find_next_block_num(self, block_num: str) -> Union[int, None]:
+        # This method will take a block number and return the number of the next block without reading it
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def find_block_nums(self, start: int = None, end: int = None) -> list:
+        # This method will return the sorted block numbers from start to end inclusive, None meaning unbounded
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def get_latest_block_num(self) -> Union[int, None]:
+        # Returns the highest stored block number, drivers that track it themselves should override this
+        return self.find_previous_block_num(block_num=MAX_BLOCK)
+
+    def get_latest_block_hash(self) -> Union[str, None]:
+        # Returns the hash of the highest stored block, drivers that track it themselves should override this
+        block_num = self.get_latest_block_num()
+        if block_num is None:
+            return None
+
+        block = self.find_block(block_num=str(block_num))
+        return block.get('hash') if isinstance(block, dict) else None
+
     def find_next_blocks(self, block_num: str, amount_of_blocks: int) -> list:
         # This method will take a block number and return the next x amount of blocks
         raise NotImplementedError("Subclasses must implement this method.")
@@ -452,24 +1261,69 @@ class BlockDriver:
         # Returns the total current block count
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def sync(self) -> None:
+        # Flushes buffered writes to durable storage. File per block drivers are synced by BlockStorage.
+        pass
+
 class FSBlockDriver(BlockDriver):
 
-    def __init__(self, root: str, initialize: bool = True):
+    def __init__(self, root: str, initialize: bool = True, codec: BlockCodec = None, read_only: bool = False):
         self.root = os.path.abspath(root)
-        self.total_files = 0
         self.initialized = False
 
-        self.minute = 60_000_000_000
-        self.hour = 3_600_000_000_000
-        self.day = 86_400_000_000_000
-        self.year = 31_536_000_000_000_000
+        self.codec = codec or BlockCodec()
+
+        # Sorted list of every block number on disk and the chain metadata derived from it. Only the process writing
+        # the chain saves its metadata and journal, readers (ie. the webserver) follow them.
+        self.index = BlockIndex(
+            root=self.root,
+            list_block_nums=self._list_block_nums,
+            read_block_hash=self._read_block_hash,
+            on_changed=self._blocks_changed,
+            read_only=read_only
+        )
+
+        self.minute = 60_000_000_000
+        self.hour = 3_600_000_000_000
+        self.day = 86_400_000_000_000
+        self.year = 31_536_000_000_000_000
+
+        if initialize:
+            self._initialize()
+
+    def _initialize(self):
+        self.index.start()
+        self.initialized = True
+
+    @property
+    def total_files(self) -> int:
+        return self.index.total_blocks()
+
+    def build_index(self) -> None:
+        self.index.rebuild()
+
+    def catch_up(self) -> None:
+        self.index.refresh()
+
+    def _list_block_nums(self):
+        for entry in self._iterate_files(self.root):
+            try:
+                yield int(entry.name)
+            except ValueError:
+                continue
+
+    def _read_block_hash(self, block_num: int) -> Union[str, None]:
+        block = self._read_block_num(block_num=block_num)
+        return block.get('hash') if isinstance(block, dict) else None
 
-        if initialize:
-            self._initialize()
+    def _read_block_num(self, block_num: int) -> dict:
+        return self._get_file_content(file_path=self.get_file_path(block_num=str(block_num).zfill(64)))
 
-    def _initialize(self):
-        self.total_files = self.get_total_blocks()
-        self.initialized = True
+    def get_latest_block_num(self) -> Union[int, None]:
+        return self.index.latest_block_num()
+
+    def get_latest_block_hash(self) -> Union[str, None]:
+        return self.index.latest_block_hash()
 
     def _find_directories(self, block_num: int) -> list:
         dir_levels = [self.year, self.day, self.hour, self.minute]
@@ -484,8 +1338,8 @@ class FSBlockDriver(BlockDriver):
 
     def _get_file_content(self, file_path: str) -> dict:
         try:
-            with open(file_path) as file:
-                return json.loads(file.read())
+            with open(file_path, 'rb') as file:
+                return self.codec.decode(file.read())
         except FileNotFoundError:
             return None
         except Exception as err:
@@ -555,17 +1409,16 @@ class FSBlockDriver(BlockDriver):
         block_num = str(block.get('number')).zfill(64)
         file_path = self.get_file_path(block_num)
 
-        if not os.path.exists(file_path):
-            self.total_files += 1
-
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        with open(file_path, 'w') as f:
+        with open(file_path, 'wb') as f:
             try:
-                json.dump(block, f)
+                f.write(self.codec.encode(block))
             except Exception as err:
                 print(err)
 
+        self.index.record(block_num=int(block_num), added=True)
+
         return block_num
 
     def write_blocks(self, block_list: list) -> None:
@@ -575,16 +1428,21 @@ class FSBlockDriver(BlockDriver):
     def move_block(self, src_file, block_num: str) -> None:
         src_path = str(src_file)
         dst_path = self.get_file_path(block_num)
+
         os.makedirs(os.path.dirname(dst_path), exist_ok=True)
         shutil.move(src_path, dst_path)
 
+        self.index.record(block_num=int(block_num), added=True)
+
         return dst_path
 
     def delete_block(self, block_num: str) -> None:
         file_path = self.get_file_path(block_num.zfill(64))
+
         if os.path.exists(file_path):
             os.remove(file_path)
-            self.total_files -= 1
+
+        self.index.record(block_num=int(block_num), added=False)
 
         self._remove_empty_dirs(starting_dir=os.path.dirname(file_path))
 
@@ -600,60 +1458,436 @@ class FSBlockDriver(BlockDriver):
     def find_blocks(self, block_list: list) -> list:
         return [self.find_block(block_num=block_num) for block_num in block_list if self.find_block(block_num=block_num)]
 
+    def find_next_block_num(self, block_num: str) -> Union[int, None]:
+        return self.index.find_next(block_num=int(block_num))
+
+    def find_previous_block_num(self, block_num: str) -> Union[int, None]:
+        return self.index.find_previous(block_num=int(block_num))
+
+    def find_block_nums(self, start: int = None, end: int = None) -> list:
+        return self.index.find_range(
+            start=None if start is None else int(start),
+            end=None if end is None else int(end)
+        )
+
     def find_next_block(self, block_num: str) -> dict:
-        block_num_filled = str(block_num).zfill(64)
-        block_path = self.get_file_path(block_num_filled)
-        current_directory = os.path.dirname(block_path)
+        next_block_num = self.find_next_block_num(block_num=block_num)
 
-        if os.path.exists(current_directory):
-            try:
-                files = sorted(os.listdir(current_directory), key=lambda x: int(x.split('_')[0]))
-            except FileNotFoundError:
-                return None
+        if next_block_num is None:
+            return None
+
+        return self._read_block_num(block_num=next_block_num)
+
+    def find_previous_block(self, block_num: str) -> dict:
+        previous_block_num = self.find_previous_block_num(block_num=block_num)
+
+        if previous_block_num is None:
+            return None
+
+        return self._read_block_num(block_num=previous_block_num)
+
+    def find_next_blocks(self, block_num: str, amount_of_blocks: int) -> list:
+        blocks = [self.find_block(block_num=block_num)]
+        for _ in range(amount_of_blocks):
+            next_block = self.find_next_block(blocks[-1].get('number'))
+            if next_block is None:
+                break
+            blocks.append(next_block)
+        return blocks
+
+    def find_previous_blocks(self, block_num: str, amount_of_blocks: int) -> list:
+        blocks = [self.find_block(block_num=block_num)]
+        for _ in range(amount_of_blocks):
+            previous_block = self.find_previous_block(blocks[-1].get('number'))
+            if previous_block is None:
+                break
+            blocks.append(previous_block)
+        return blocks
+
+    def get_total_blocks(self) -> int:
+        count = 0
+        for _ in self._iterate_files(self.root):
+            count += 1
+        return count
+
+    def block_exists(self, block_num: str) -> bool:
+        if self.index.building:
+            # One stat instead of waiting for the startup build to finish walking the directory.
+            return os.path.exists(self.get_file_path(block_num=str(block_num).zfill(64)))
+
+        return self.index.contains(block_num=int(block_num))
+
+class SegmentLogBlockDriver(BlockDriver):
+    # Stores blocks as length-prefixed records appended to rolling segment files instead of one file per block.
+    #
+    # Segment record: [length: u32][crc32: u32][kind: u8][payload]
+    #   kind RECORD_BLOCK -> payload is the block JSON
+    #   kind RECORD_DELETE -> payload is the deleted block number
+    #
+    # Every record also gets a fixed size entry in the offset index file, which is replayed on startup:
+    #   [block_num: u64][segment: u32][offset: u64][length: u32][block_hash: 32 bytes]
+    # An entry with length 0 is a delete. Any records in the last segment which never made it into the index
+    # (crash between the two writes) are recovered by scanning the segment tail.
+
+    indexes_hashes = True
+
+    RECORD_BLOCK = 1
+    RECORD_DELETE = 2
+
+    RECORD_HEADER = struct.Struct('>IIB')
+    INDEX_ENTRY = struct.Struct('>QIQI32s')
+
+    INDEX_FILENAME = 'index'
+    SEGMENT_PREFIX = 'segment_'
+
+    def __init__(self, root: str, segment_max_bytes: int = SEGMENT_MAX_BYTES, codec: BlockCodec = None):
+        self.root = os.path.abspath(root)
+        self.segment_max_bytes = segment_max_bytes
+        self.codec = codec or BlockCodec()
+
+        self.locations = {}
+        self.hashes = {}
+        self.block_index = []
+        self.total_files = 0
+
+        self.current_segment = 0
+        self.current_segment_size = 0
+
+        self.segment_file = None
+        self.index_file = None
+        self.index_read_offset = 0
+        self.read_fds = {}
+        self.unsynced_segments = []
+
+        self.lock = threading.RLock()
+
+        self.build_index()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.root, f'{self.SEGMENT_PREFIX}{str(segment).zfill(8)}')
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, self.INDEX_FILENAME)
+
+    def _list_segments(self) -> list:
+        segments = []
+        for filename in os.listdir(self.root):
+            if filename.startswith(self.SEGMENT_PREFIX):
+                try:
+                    segments.append(int(filename[len(self.SEGMENT_PREFIX):]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _hash_to_bytes(self, block_hash: str) -> bytes:
+        try:
+            hash_bytes = bytes.fromhex(block_hash)
+        except (TypeError, ValueError):
+            return bytes(32)
+
+        if len(hash_bytes) != 32:
+            return bytes(32)
+
+        return hash_bytes
+
+    def close(self) -> None:
+        with self.lock:
+            for f in (self.segment_file, self.index_file):
+                if f is not None:
+                    f.close()
+
+            for fd in self.read_fds.values():
+                os.close(fd)
+
+            self.segment_file = None
+            self.index_file = None
+            self.read_fds = {}
+
+    def build_index(self) -> None:
+        with self.lock:
+            self.close()
+            os.makedirs(self.root, exist_ok=True)
+
+            self.locations = {}
+            self.hashes = {}
+            self.block_index = []
+            self.total_files = 0
+            self.index_read_offset = 0
+
+            segments = self._list_segments()
+            self.current_segment = segments[-1] if segments else 0
+
+            segment_ends = self._read_index_entries()
+            self._recover_segment_tail(indexed_end=segment_ends.get(self.current_segment, 0))
+
+            segment_path = self._segment_path(self.current_segment)
+            self.segment_file = open(segment_path, 'ab')
+            self.current_segment_size = self.segment_file.tell()
+
+            self.index_file = open(self._index_path(), 'ab')
+            self.index_read_offset = self.index_file.tell()
+
+    def _read_index_entries(self) -> dict:
+        # Replays the index file into memory. Returns the end offset of the last indexed record per segment.
+        segment_ends = {}
+        index_path = self._index_path()
+
+        if not os.path.exists(index_path):
+            return segment_ends
+
+        with open(index_path, 'rb') as f:
+            data = f.read()
+
+        complete = len(data) - (len(data) % self.INDEX_ENTRY.size)
+        if complete != len(data):
+            # Partial trailing entry from an interrupted write
+            with open(index_path, 'r+b') as f:
+                f.truncate(complete)
+
+        for entry in self.INDEX_ENTRY.iter_unpack(data[:complete]):
+            self._apply_index_entry(*entry)
+            block_num, segment, offset, length, _ = entry
+            end = offset + self.RECORD_HEADER.size + length
+            if end > segment_ends.get(segment, 0):
+                segment_ends[segment] = end
+
+        self.index_read_offset = complete
+
+        return segment_ends
+
+    def _apply_index_entry(self, block_num: int, segment: int, offset: int, length: int, hash_bytes: bytes) -> None:
+        old_location = self.locations.get(block_num)
+        if old_location is not None:
+            old_hash = old_location[3]
+            if self.hashes.get(old_hash) == block_num:
+                del self.hashes[old_hash]
+
+        if length == 0:
+            if old_location is not None:
+                del self.locations[block_num]
+                position = bisect_left(self.block_index, block_num)
+                del self.block_index[position]
+                self.total_files -= 1
+            return
+
+        if old_location is None:
+            position = bisect_left(self.block_index, block_num)
+            self.block_index.insert(position, block_num)
+            self.total_files += 1
+
+        self.locations[block_num] = (segment, offset, length, hash_bytes)
+
+        if hash_bytes != bytes(32):
+            self.hashes[hash_bytes] = block_num
+
+    def _recover_segment_tail(self, indexed_end: int) -> None:
+        segment_path = self._segment_path(self.current_segment)
+
+        if not os.path.exists(segment_path):
+            return
+
+        with open(segment_path, 'rb') as f:
+            f.seek(indexed_end)
+            data = f.read()
+
+        position = 0
+        recovered = []
+        while position + self.RECORD_HEADER.size <= len(data):
+            length, crc, kind = self.RECORD_HEADER.unpack_from(data, position)
+            payload_start = position + self.RECORD_HEADER.size
+            payload = data[payload_start:payload_start + length]
+
+            if len(payload) != length or zlib.crc32(bytes([kind]) + payload) != crc:
+                break
 
             try:
-                index = files.index(block_num_filled)
+                if kind == self.RECORD_BLOCK:
+                    block = self.codec.decode(payload)
+                    entry = (int(block.get('number')), self.current_segment, indexed_end + position, length,
+                             self._hash_to_bytes(block.get('hash')))
+                elif kind == self.RECORD_DELETE:
+                    entry = (int(payload), self.current_segment, indexed_end + position, 0, bytes(32))
+                else:
+                    break
             except ValueError:
-                files.append(block_num_filled)
-                files.sort()
-                index = files.index(block_num_filled)
+                break
 
-            if index < len(files) - 1:
-                return self._get_file_content(file_path=os.path.join(current_directory, files[index + 1]))
+            recovered.append(entry)
+            position = payload_start + length
 
-        next_directory = self._traverse_up(current_directory, 'next')
-        if next_directory:
-            return self._traverse_down(next_directory, 'next')
+        if indexed_end + position < indexed_end + len(data):
+            # Torn record at the end of the segment
+            with open(segment_path, 'r+b') as f:
+                f.truncate(indexed_end + position)
 
-        return None
+        if recovered:
+            with open(self._index_path(), 'ab') as f:
+                for entry in recovered:
+                    f.write(self.INDEX_ENTRY.pack(*entry))
+                    self._apply_index_entry(*entry)
 
-    def find_previous_block(self, block_num: str) -> dict:
-        block_num_filled = str(block_num).zfill(64)
-        block_path = self.get_file_path(block_num_filled)
-        current_directory = os.path.dirname(block_path)
+    def _catch_up_index(self) -> None:
+        # Picks up entries appended by another process (ie. the webserver reading a chain the node is writing)
+        index_path = self._index_path()
+        try:
+            index_size = os.path.getsize(index_path)
+        except FileNotFoundError:
+            return
+
+        if index_size - self.index_read_offset < self.INDEX_ENTRY.size:
+            return
 
-        if os.path.exists(current_directory):
+        with open(index_path, 'rb') as f:
+            f.seek(self.index_read_offset)
+            data = f.read(index_size - self.index_read_offset)
+
+        complete = len(data) - (len(data) % self.INDEX_ENTRY.size)
+        block_nums = []
+        for entry in self.INDEX_ENTRY.iter_unpack(data[:complete]):
+            self._apply_index_entry(*entry)
+            block_nums.append(entry[0])
+
+        self.index_read_offset += complete
+
+        self._blocks_changed(block_nums=block_nums)
+
+    def _append_record(self, kind: int, payload: bytes) -> tuple:
+        record_size = self.RECORD_HEADER.size + len(payload)
+
+        if self.current_segment_size > 0 and self.current_segment_size + record_size > self.segment_max_bytes:
+            self.segment_file.close()
+            self.unsynced_segments.append(self._segment_path(self.current_segment))
+            self.current_segment += 1
+            self.segment_file = open(self._segment_path(self.current_segment), 'ab')
+            self.current_segment_size = 0
+
+        offset = self.current_segment_size
+        header = self.RECORD_HEADER.pack(len(payload), zlib.crc32(bytes([kind]) + payload), kind)
+
+        self.segment_file.write(header + payload)
+        self.segment_file.flush()
+        self.current_segment_size += record_size
+
+        return self.current_segment, offset
+
+    def _append_index_entry(self, entry: tuple) -> None:
+        self._catch_up_index()
+
+        self.index_file.write(self.INDEX_ENTRY.pack(*entry))
+        self.index_file.flush()
+        self.index_read_offset += self.INDEX_ENTRY.size
+
+        self._apply_index_entry(*entry)
+
+    def _read_record(self, location: tuple) -> dict:
+        segment, offset, length, _ = location
+
+        fd = self.read_fds.get(segment)
+        if fd is None:
             try:
-                files = sorted(os.listdir(current_directory), key=lambda x: int(x.split('_')[0]))
+                fd = os.open(self._segment_path(segment), os.O_RDONLY)
             except FileNotFoundError:
                 return None
+            self.read_fds[segment] = fd
 
-            try:
-                index = files.index(block_num_filled)
-            except ValueError:
-                files.append(block_num_filled)
-                files.sort()
-                index = files.index(block_num_filled)
-
-            if index > 0:
-                return self._get_file_content(file_path=os.path.join(current_directory, files[index - 1]))
+        payload = os.pread(fd, length, offset + self.RECORD_HEADER.size)
 
-        previous_directory = self._traverse_up(current_directory, 'previous')
-        if previous_directory:
-            return self._traverse_down(previous_directory, 'previous')
+        try:
+            return self.codec.decode(payload)
+        except ValueError:
+            return None
 
+    def _find_by_position(self, position: int) -> dict:
+        if 0 <= position < len(self.block_index):
+            return self._read_record(self.locations[self.block_index[position]])
         return None
 
+    def write_block(self, block: dict) -> str:
+        block_num = int(block.get('number'))
+        payload = self.codec.encode(block)
+
+        with self.lock:
+            segment, offset = self._append_record(kind=self.RECORD_BLOCK, payload=payload)
+            self._append_index_entry((block_num, segment, offset, len(payload), self._hash_to_bytes(block.get('hash'))))
+
+        return str(block_num).zfill(64)
+
+    def write_blocks(self, block_list: list) -> None:
+        for block in block_list:
+            self.write_block(block=block)
+
+    def delete_block(self, block_num: str) -> None:
+        block_num = int(block_num)
+
+        with self.lock:
+            self._catch_up_index()
+
+            if block_num not in self.locations:
+                return
+
+            payload = str(block_num).encode()
+            segment, offset = self._append_record(kind=self.RECORD_DELETE, payload=payload)
+            self._append_index_entry((block_num, segment, offset, 0, bytes(32)))
+
+    def delete_blocks(self, block_list: list) -> None:
+        for block_num in block_list:
+            self.delete_block(block_num=block_num)
+
+    def find_block(self, block_num: str) -> dict:
+        with self.lock:
+            self._catch_up_index()
+
+            location = self.locations.get(int(block_num))
+            if location is None:
+                return None
+
+            return self._read_record(location)
+
+    def find_block_by_hash(self, block_hash: str) -> dict:
+        with self.lock:
+            self._catch_up_index()
+
+            block_num = self.hashes.get(self._hash_to_bytes(block_hash))
+            if block_num is None:
+                return None
+
+            return self._read_record(self.locations[block_num])
+
+    def find_blocks(self, block_list: list) -> list:
+        blocks = [self.find_block(block_num=block_num) for block_num in block_list]
+        return [block for block in blocks if block]
+
+    def find_next_block(self, block_num: str) -> dict:
+        with self.lock:
+            self._catch_up_index()
+            return self._find_by_position(bisect_right(self.block_index, int(block_num)))
+
+    def find_previous_block(self, block_num: str) -> dict:
+        with self.lock:
+            self._catch_up_index()
+            return self._find_by_position(bisect_left(self.block_index, int(block_num)) - 1)
+
+    def find_next_block_num(self, block_num: str) -> Union[int, None]:
+        with self.lock:
+            self._catch_up_index()
+            position = bisect_right(self.block_index, int(block_num))
+            return self.block_index[position] if position < len(self.block_index) else None
+
+    def find_previous_block_num(self, block_num: str) -> Union[int, None]:
+        with self.lock:
+            self._catch_up_index()
+            position = bisect_left(self.block_index, int(block_num))
+            return self.block_index[position - 1] if position > 0 else None
+
+    def find_block_nums(self, start: int = None, end: int = None) -> list:
+        with self.lock:
+            self._catch_up_index()
+
+            lower = 0 if start is None else bisect_left(self.block_index, int(start))
+            upper = len(self.block_index) if end is None else bisect_right(self.block_index, int(end))
+
+            return self.block_index[lower:upper]
+
     def find_next_blocks(self, block_num: str, amount_of_blocks: int) -> list:
         blocks = [self.find_block(block_num=block_num)]
         for _ in range(amount_of_blocks):
@@ -672,21 +1906,53 @@ class FSBlockDriver(BlockDriver):
             blocks.append(previous_block)
         return blocks
 
+    def catch_up(self) -> None:
+        with self.lock:
+            self._catch_up_index()
+
+    def sync(self) -> None:
+        with self.lock:
+            self.segment_file.flush()
+            self.index_file.flush()
+
+            fsync_paths(
+                paths=self.unsynced_segments + [self._segment_path(self.current_segment), self._index_path()],
+                root=self.root
+            )
+            self.unsynced_segments = []
+
+    def get_latest_block_num(self) -> Union[int, None]:
+        with self.lock:
+            self._catch_up_index()
+            return self.block_index[-1] if self.block_index else None
+
+    def get_latest_block_hash(self) -> Union[str, None]:
+        with self.lock:
+            self._catch_up_index()
+            if not self.block_index:
+                return None
+
+            hash_bytes = self.locations[self.block_index[-1]][3]
+            if hash_bytes != bytes(32):
+                return hash_bytes.hex()
+
+        return super().get_latest_block_hash()
+
     def get_total_blocks(self) -> int:
-        count = 0
-        for _ in self._iterate_files(self.root):
-            count += 1
-        return count
+        with self.lock:
+            self._catch_up_index()
+            return self.total_files
 
     def block_exists(self, block_num: str) -> bool:
-        block_num_filled = str(block_num).zfill(64)
-        block_file_path = self.get_file_path(block_num_filled)
-        return os.path.exists(block_file_path)
+        with self.lock:
+            self._catch_up_index()
+            return int(block_num) in self.locations
 
 class FSHashStorageDriver:
-    def __init__(self, root: str):
+    def __init__(self, root: str, codec: BlockCodec = None):
         assert root is not None, "Must provide a root directory for storage"
         self.root_dir = root
+        self.codec = codec or BlockCodec()
 
     def get_directory(self, hash_str: str) -> str:
         return os.path.join(self.root_dir, hash_str[:2], hash_str[2:4], hash_str[4:6])
@@ -704,8 +1970,8 @@ class FSHashStorageDriver:
         os.makedirs(dir_path, exist_ok=True)
 
         file_path = os.path.join(dir_path, hash_str)
-        with open(file_path, "w") as f:
-            json.dump(data, f)
+        with open(file_path, "wb") as f:
+            f.write(self.codec.encode(data))
 
     def delete_file(self, hash_str: str) -> None:
         dir_path = self.get_directory(hash_str=hash_str)
@@ -745,8 +2011,8 @@ class FSHashStorageDriver:
         if os.path.islink(file_path):
             file_path = os.readlink(file_path)
 
-        with open(file_path, "r") as f:
-            return json.loads(f.read())
+        with open(file_path, "rb") as f:
+            return self.codec.decode(f.read())
 
     def is_symlink_valid(self, hash_str: str) -> bool:
         dir_path = self.get_directory(hash_str)
@@ -758,9 +2024,41 @@ class FSHashStorageDriver:
         link_target = os.readlink(file_path)
         return os.path.exists(link_target)
 
+class FSTxIndex(FSHashStorageDriver):
+    # Reverse index from tx hash to the number of the block holding it. Each entry is a symlink whose target is the
+    # block number, so it fits in the inode and needs no data block.
+    def set_block_num(self, hash_str: str, block_num) -> str:
+        dir_path = self.get_directory(hash_str)
+        os.makedirs(dir_path, exist_ok=True)
+
+        file_path = os.path.join(dir_path, hash_str)
+        tmp_path = f'{file_path}.tmp'
+
+        if os.path.islink(tmp_path):
+            os.unlink(tmp_path)
+
+        os.symlink(str(int(block_num)), tmp_path)
+        os.replace(tmp_path, file_path)
+
+        return file_path
+
+    def get_block_num(self, hash_str: str) -> Union[int, None]:
+        try:
+            return int(os.readlink(os.path.join(self.get_directory(hash_str), hash_str)))
+        except (OSError, ValueError):
+            return None
+
+    def delete_block_num(self, hash_str: str, block_num=None) -> None:
+        # With block_num given, only an entry still pointing at that block is removed.
+        if block_num is not None and self.get_block_num(hash_str=hash_str) != int(block_num):
+            return
+
+        self.remove_symlink(hash_str=hash_str)
+
+
 class FSMemberHistory(FSBlockDriver):
-    def __init__(self, root: str, wallet: Wallet = None):
-        super().__init__(root=root, initialize=False)
+    def __init__(self, root: str, wallet: Wallet = None, read_only: bool = False):
+        super().__init__(root=root, initialize=False, read_only=read_only)
 
         self.wallet = wallet
 
@@ -787,6 +2085,7 @@ class FSMemberHistory(FSBlockDriver):
                 # Recreate the directory
 
             os.makedirs(self.root)
+            self.build_index()
             print(f"Purge successful. {self.root} directory recreated.")
 
         except Exception as e:
@@ -845,68 +2144,364 @@ class FSMemberHistory(FSBlockDriver):
 
         return vk in member_list
 
+class StateHistoryView:
+    # Read-only sequence over a state history file. Indexing yields block numbers so bisect can search it with one
+    # pread per probe, entry/entries return the full (block_num, value_offset, value_length) records.
+    def __init__(self, fd: int, size: int):
+        self.fd = fd
+        self.length = size // FSStateHistory.ENTRY.size
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, position: int) -> int:
+        return self.entry(position)[0]
+
+    def entry(self, position: int) -> tuple:
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError(position)
+
+        return FSStateHistory.ENTRY.unpack(
+            os.pread(self.fd, FSStateHistory.ENTRY.size, position * FSStateHistory.ENTRY.size)
+        )
+
+    def entries(self, start: int, end: int) -> list:
+        if start >= end:
+            return []
+
+        data = os.pread(self.fd, (end - start) * FSStateHistory.ENTRY.size, start * FSStateHistory.ENTRY.size)
+        return list(FSStateHistory.ENTRY.iter_unpack(data))
+
+
 class FSStateHistory(FSHashStorageDriver):
+    # Per key history of the blocks that changed it, stored as entries sorted by block number so new blocks are
+    # appended and lookups bisect the file instead of loading it. Each entry points at the [key, value] record the
+    # block wrote in the shared values log, so reading a historical value never touches the block itself.
+    #
+    # Entry: [block_num: u64][value_offset: u64][value_length: u32], value_offset NO_VALUE when it wasn't recorded.
+    # Contracts get the same kind of file listing every change made to any of their keys.
+    ENTRY = struct.Struct('>QQI')
+    NO_VALUE = 0xFFFF_FFFF_FFFF_FFFF
+
+    HISTORY_SUFFIX = '.idx'
+    CONTRACT_SUFFIX = '.cidx'
+    LEGACY_HISTORY_SUFFIX = '.hist'
+    LEGACY_ENTRY = struct.Struct('>Q')
+    VALUES_FILENAME = 'values.log'
+
+    # Returned as the value of a change recorded before values were indexed, the caller has to read the block.
+    VALUE_NOT_INDEXED = object()
+
     def __init__(self, root: str):
         super().__init__(root=root)
 
-    def write_file(self, hash_str: str, data: list) -> None:
-        dir_path = self.get_directory(hash_str)
-        os.makedirs(dir_path, exist_ok=True)
+        self.values_path = os.path.join(self.root_dir, self.VALUES_FILENAME)
+        self.lock = threading.Lock()
 
-        file_path = os.path.join(dir_path, hash_str)
-        with open(file_path, "w") as f:
-            json.dump(data, f)
+    @staticmethod
+    def contract_of(key: str) -> str:
+        return key.split('.', 1)[0]
 
-    def get_file(self, hash_str: str) -> dict:
-        dir_path = self.get_directory(hash_str)
-        file_path = os.path.join(dir_path, hash_str)
+    def _history_path(self, hash_str: str, suffix: str = HISTORY_SUFFIX) -> str:
+        return os.path.join(self.get_directory(hash_str), f'{hash_str}{suffix}')
 
-        if not os.path.exists(dir_path):
+    def _migrate_legacy_history(self, hash_str: str) -> bool:
+        # Histories written before values were indexed only hold block numbers, either as a JSON list per key or an
+        # array of u64. Convert them on first touch, their entries fall back to reading the block.
+        json_path = os.path.join(self.get_directory(hash_str), hash_str)
+        array_path = self._history_path(hash_str=hash_str, suffix=self.LEGACY_HISTORY_SUFFIX)
+
+        block_nums = set()
+        if os.path.isfile(json_path):
+            with open(json_path, 'r') as f:
+                block_nums.update(int(n) for n in json.loads(f.read()))
+        if os.path.isfile(array_path):
+            with open(array_path, 'rb') as f:
+                block_nums.update(entry[0] for entry in self.LEGACY_ENTRY.iter_unpack(f.read()))
+
+        if not os.path.isfile(json_path) and not os.path.isfile(array_path):
+            return False
+
+        self._write_entries(
+            path=self._history_path(hash_str=hash_str),
+            entries=[(n, self.NO_VALUE, 0) for n in sorted(block_nums)]
+        )
+
+        for path in [json_path, array_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+        return True
+
+    def _read_entries(self, path: str) -> list:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        return list(self.ENTRY.iter_unpack(data))
+
+    def _write_entries(self, path: str, entries: list) -> None:
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            self._remove_empty_dirs(starting_dir=os.path.dirname(path))
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(self.ENTRY.pack(*entry) for entry in entries))
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _open_history(self, path: str, hash_str: str = None):
+        # Yields a StateHistoryView, or None if there is no history. Key histories pass hash_str so legacy files
+        # are converted first.
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            if hash_str is None or not self._migrate_legacy_history(hash_str=hash_str):
+                yield None
+                return
+
+            fd = os.open(path, os.O_RDONLY)
+
+        try:
+            yield StateHistoryView(fd=fd, size=os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
+
+    def _replace_block_entries(self, path: str, block_num: int, entries: list, hash_str: str = None) -> None:
+        # Swaps whatever a block recorded in this history for entries. Newer blocks are a plain append, out of
+        # order blocks (catchup, rewrites, removals) fall back to a sorted rewrite.
+        with self._open_history(path=path, hash_str=hash_str) as history:
+            if history is None or len(history) == 0 or history[-1] < block_num:
+                if not entries:
+                    return
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'ab') as f:
+                    f.write(b''.join(self.ENTRY.pack(*entry) for entry in entries))
+                return
+
+            lower = bisect_left(history, block_num)
+            upper = bisect_right(history, block_num)
+
+            if lower == upper and not entries:
+                return
+
+        current_entries = self._read_entries(path=path)
+        current_entries[lower:upper] = entries
+        self._write_entries(path=path, entries=current_entries)
+
+    def _append_values(self, records: list) -> list:
+        # Appends all records of a block in one write and returns their (offset, length) in the values log.
+        os.makedirs(self.root_dir, exist_ok=True)
+
+        with open(self.values_path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(b''.join(records))
+
+        locations = []
+        for record in records:
+            locations.append((offset, len(record)))
+            offset += len(record)
+
+        return locations
+
+    def _read_value(self, fd: int, entry: tuple):
+        # Returns the [key, value] record of an entry, None if it was never recorded or the log lost it in a crash.
+        _, offset, length = entry
+        if offset == self.NO_VALUE:
             return None
 
-        with open(file_path, "r") as f:
-            return json.loads(f.read())
+        record = os.pread(fd, length, offset)
+        if len(record) != length:
+            return None
 
-    def save_state_change(self, key: str, block_num: str) -> None:
-        hash_str = create_hash_512(string=key)
+        try:
+            return json.loads(record)
+        except ValueError:
+            return None
+
+    @contextmanager
+    def _open_values(self):
+        try:
+            fd = os.open(self.values_path, os.O_RDONLY)
+        except FileNotFoundError:
+            yield None
+            return
+
+        try:
+            yield fd
+        finally:
+            os.close(fd)
+
+    def _value_of(self, values_fd, key: str, entry: tuple):
+        record = self._read_value(fd=values_fd, entry=entry) if values_fd is not None else None
 
-        current_history = self.get_file(hash_str=hash_str)
+        if record is None or record[0] != key:
+            return self.VALUE_NOT_INDEXED
 
-        if current_history:
-            current_history.append(int(block_num))
-            current_history = sorted(current_history, key=int, reverse=True)
+        return record[1]
+
+    def save_state_change(self, key: str, block_num: str, value=VALUE_NOT_INDEXED) -> None:
+        if value is self.VALUE_NOT_INDEXED:
+            self.save_state_changes(keys=[key], block_num=block_num)
+        else:
+            self.save_state_changes(keys=[key], block_num=block_num, values=[value])
+
+    def save_state_changes(self, keys: list, block_num: str, values: list = None) -> None:
+        # Records every key a block changed, values are in the same order as keys and the last write to a key wins.
+        block_num = int(block_num)
+
+        if values is None:
+            changes = {key: self.VALUE_NOT_INDEXED for key in keys}
         else:
-            current_history=[int(block_num)]
+            changes = dict(zip(keys, values))
 
-        self.write_file(hash_str=hash_str, data=current_history)
+        if not changes:
+            return
+
+        with self.lock:
+            indexed = [key for key, value in changes.items() if value is not self.VALUE_NOT_INDEXED]
+            locations = dict(zip(indexed, self._append_values(
+                records=[json.dumps([key, changes[key]]).encode() for key in indexed]
+            ))) if indexed else {}
+
+            contract_entries = {}
+            for key in changes:
+                offset, length = locations.get(key, (self.NO_VALUE, 0))
+                entry = (block_num, offset, length)
+
+                hash_str = create_hash_512(string=key)
+                self._replace_block_entries(
+                    path=self._history_path(hash_str=hash_str),
+                    block_num=block_num,
+                    entries=[entry],
+                    hash_str=hash_str
+                )
+
+                if offset != self.NO_VALUE:
+                    contract_entries.setdefault(self.contract_of(key), []).append(entry)
+
+            for contract, entries in contract_entries.items():
+                self._replace_block_entries(
+                    path=self._history_path(hash_str=create_hash_512(string=contract), suffix=self.CONTRACT_SUFFIX),
+                    block_num=block_num,
+                    entries=entries
+                )
+
+    def remove_state_changes(self, keys: list, block_num: str) -> None:
+        # Drops block_num from the history of every key and their contracts, used when a block is removed from storage.
+        block_num = int(block_num)
+
+        with self.lock:
+            for key in set(keys):
+                hash_str = create_hash_512(string=key)
+                self._replace_block_entries(
+                    path=self._history_path(hash_str=hash_str),
+                    block_num=block_num,
+                    entries=[],
+                    hash_str=hash_str
+                )
+
+            for contract in set(self.contract_of(key) for key in keys):
+                self._replace_block_entries(
+                    path=self._history_path(hash_str=create_hash_512(string=contract), suffix=self.CONTRACT_SUFFIX),
+                    block_num=block_num,
+                    entries=[]
+                )
 
     def rollback(self, key: str, block_num: str) -> None:
         hash_str = create_hash_512(string=key)
+        path = self._history_path(hash_str=hash_str)
 
-        current_history = self.get_file(hash_str=hash_str)
+        with self.lock:
+            with self._open_history(path=path, hash_str=hash_str) as history:
+                if history is None:
+                    return
 
-        if current_history:
-            current_history = [n for n in current_history if n <= int(block_num)]
-            self.write_file(hash_str=hash_str, data=current_history)
+                position = bisect_right(history, int(block_num))
+                if position == len(history):
+                    return
 
-    def get_previous_change(self, key: str, block_num: str) -> Union[int, None]:
+            if position == 0:
+                self._write_entries(path=path, entries=[])
+            else:
+                os.truncate(path, position * self.ENTRY.size)
+
+    def get_history(self, key: str) -> list:
         hash_str = create_hash_512(string=key)
+        path = self._history_path(hash_str=hash_str)
+
+        with self.lock:
+            with self._open_history(path=path, hash_str=hash_str):
+                return [entry[0] for entry in self._read_entries(path=path)]
 
-        current_history = self.get_file(hash_str=hash_str)
+    def get_previous_change(self, key: str, block_num: str) -> Union[int, None]:
+        change = self.get_previous_state(key=key, block_num=block_num)
+        return None if change is None else change[0]
 
-        if current_history:
-            # Convert block_num to int for comparison
-            block_num_int = int(block_num)
+    def get_previous_state(self, key: str, block_num: str) -> Union[tuple, None]:
+        # (block_num, value) of the last change strictly before block_num
+        return self.get_states_at(queries=[(key, int(block_num) - 1)])[0]
 
-            # Filter the history for blocks less than block_num_int
-            previous_blocks = [n for n in current_history if n < block_num_int]
+    def get_state_at(self, key: str, block_num: str) -> Union[tuple, None]:
+        # (block_num, value) of the last change at or before block_num
+        return self.get_states_at(queries=[(key, block_num)])[0]
 
-            if previous_blocks:
-                # If there are any previous blocks, return the maximum one
-                return max(previous_blocks)
+    def get_states_at(self, queries: list) -> list:
+        # Answers a batch of (key, block_num) point in time queries with one values log handle. Each answer is the
+        # (block_num, value) of the change in effect at that block, or None if the key hadn't been set yet.
+        results = []
 
-        # If there is no history or no previous blocks, return None
-        return None
+        with self.lock, self._open_values() as values_fd:
+            for key, block_num in queries:
+                hash_str = create_hash_512(string=key)
+
+                with self._open_history(path=self._history_path(hash_str=hash_str), hash_str=hash_str) as history:
+                    position = 0 if history is None else bisect_right(history, int(block_num))
+
+                    if position == 0:
+                        results.append(None)
+                        continue
+
+                    entry = history.entry(position - 1)
+
+                results.append((entry[0], self._value_of(values_fd=values_fd, key=key, entry=entry)))
+
+        return results
+
+    def get_contract_changes(self, contract: str, start: int = None, end: int = None, limit: int = None) -> list:
+        # Every recorded change to any key of contract from block start to end inclusive, oldest first, as
+        # (block_num, key, value).
+        path = self._history_path(hash_str=create_hash_512(string=contract), suffix=self.CONTRACT_SUFFIX)
+        changes = []
+
+        with self.lock, self._open_values() as values_fd:
+            with self._open_history(path=path) as history:
+                if history is None or values_fd is None:
+                    return changes
+
+                lower = 0 if start is None else bisect_left(history, int(start))
+                upper = len(history) if end is None else bisect_right(history, int(end))
+                if limit is not None:
+                    upper = min(upper, lower + limit)
+
+                entries = history.entries(lower, upper)
+
+            for entry in entries:
+                record = self._read_value(fd=values_fd, entry=entry)
+                if record is not None:
+                    changes.append((entry[0], record[0], record[1]))
+
+        return changes
 
 # TODO: move to component responsible for state maintenance.
 def set_latest_block_height(h, driver: ContractDriver):
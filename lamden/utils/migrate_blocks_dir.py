@@ -1,7 +1,8 @@
 import os
 import sys
 import json
-from lamden.storage import FSBlockDriver, FSHashStorageDriver
+from lamden.block_index import ChainMetadata, BlockJournal
+from lamden.storage import BlockStorage, FSBlockDriver, FSHashStorageDriver, BlockCodec, COMPRESSION_DICTIONARY_FILENAME
 import shutil
 
 
@@ -65,10 +66,143 @@ class MigrateFiles:
         shutil.rmtree(self.blocks_path_src)
         os.rename(self.blocks_path_dest, self.blocks_path_src)
 
+        # The chain metadata and journal live beside the blocks dir so they have to follow the rename.
+        for path_for in (ChainMetadata.path_for, BlockJournal.path_for):
+            path_dest = path_for(self.blocks_path_dest)
+            if os.path.exists(path_dest):
+                os.replace(path_dest, path_for(self.blocks_path_src))
+
+
+class CompressFiles:
+    # Converts the block and tx files of an existing store in place to another on-disk format. Each file is
+    # rewritten atomically, so an interrupted run can simply be started again.
+    def __init__(self, storage_path, compression='zlib', train_dictionary=False, sample_size=1000, testing=False):
+        self.testing = testing
+
+        self.storage_path = os.path.abspath(storage_path)
+        self.blocks_path = os.path.join(self.storage_path, 'blocks')
+        self.txs_path = os.path.join(self.storage_path, 'txs')
+
+        self.compression = compression
+        self.train_dictionary = train_dictionary and compression == 'zlib'
+        self.sample_size = sample_size
+
+        self.dictionary_path = os.path.join(self.storage_path, COMPRESSION_DICTIONARY_FILENAME)
+        self.pending_dictionary_path = f'{self.dictionary_path}.pending'
+
+        self.converted_files: list = []
+
+    def _iterate_files(self):
+        for path in [self.blocks_path, self.txs_path]:
+            for root, _, files in os.walk(path):
+                for filename in files:
+                    file_path = os.path.join(root, filename)
+                    # block_alias entries are symlinks to block files, those get converted through their target
+                    if not os.path.islink(file_path):
+                        yield file_path
+
+    def _read(self, file_path, codecs):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+
+        for codec in codecs:
+            try:
+                return data, codec.decompress(data)
+            except ValueError:
+                continue
+
+        raise ValueError(f'Could not decode {file_path} with any known dictionary.')
+
+    def _create_write_codec(self, read_codec):
+        if not self.train_dictionary:
+            # Keep reading and writing with the existing dictionary, zlib writes are only dictionary based if one exists.
+            return BlockCodec(compression=self.compression, dictionary=read_codec.dictionary)
+
+        # A dictionary left by an interrupted run may already be in use by converted files, keep using it.
+        if os.path.isfile(self.pending_dictionary_path):
+            with open(self.pending_dictionary_path, 'rb') as f:
+                dictionary = f.read()
+        else:
+            samples = []
+            for file_path in self._iterate_files():
+                if len(samples) >= self.sample_size:
+                    break
+                samples.append(self._read(file_path=file_path, codecs=[read_codec])[1])
+
+            dictionary = BlockCodec.train_dictionary(samples)
+
+            with open(self.pending_dictionary_path, 'wb') as f:
+                f.write(dictionary)
+                f.flush()
+                os.fsync(f.fileno())
+
+        return BlockCodec(compression=self.compression, dictionary=dictionary)
+
+    def start(self):
+        read_codec = BlockCodec.from_dictionary_file(dictionary_path=self.dictionary_path)
+        write_codec = self._create_write_codec(read_codec=read_codec)
+
+        for file_path in self._iterate_files():
+            data, payload = self._read(file_path=file_path, codecs=[read_codec, write_codec])
+            converted = write_codec.compress(payload)
+
+            if converted != data:
+                tmp_path = f'{file_path}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(converted)
+                os.replace(tmp_path, file_path)
+
+            if self.testing:
+                self.converted_files.append(file_path)
+
+        if self.train_dictionary:
+            os.replace(self.pending_dictionary_path, self.dictionary_path)
+
+
+class RebuildIndexes:
+    # Rebuilds the state history and tx index of a store written before they were kept, or whose rebuild was
+    # interrupted. Each is due as long as its floor, the lowest block it covers, is above 0.
+    def __init__(self, storage_path):
+        self.block_storage = BlockStorage(root=os.path.abspath(storage_path))
+
+    def pending(self) -> list:
+        pending = []
+
+        if self.block_storage.state_history_floor() > 0:
+            pending.append('state_history')
+
+        if self.block_storage.tx_index_floor() > 0:
+            pending.append('tx_index')
+
+        return pending
+
+    def start(self):
+        pending = self.pending()
+
+        if 'state_history' in pending:
+            self.block_storage.rebuild_state_history()
+
+        if 'tx_index' in pending:
+            self.block_storage.rebuild_tx_index()
+
 
 if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == '--compress':
+        storage_directory = sys.argv[2]
+        compression = sys.argv[3] if len(sys.argv) > 3 and not sys.argv[3].startswith('--') else 'zlib'
+
+        file_compressor = CompressFiles(
+            storage_path=storage_directory,
+            compression=None if compression == 'none' else compression,
+            train_dictionary='--train-dictionary' in sys.argv
+        )
+        file_compressor.start()
+        print("Conversion completed.")
+        sys.exit(0)
+
     if len(sys.argv) != 3:
         print("Usage: python migrate_blocks_dir.py <source_directory> <destination_directory>")
+        print("       python migrate_blocks_dir.py --compress <storage_directory> [zlib|lzma|none] [--train-dictionary]")
         sys.exit(1)
 
     source_directory = sys.argv[1]
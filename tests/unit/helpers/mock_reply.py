@@ -42,9 +42,9 @@ class MockReply(threading.Thread):
             sockets = dict(self.poller.poll(self.poll_time))
             # print(sockets[self.socket])
             if self.socket in sockets:
-                msg = self.socket.recv()
+                *request_id, msg = self.socket.recv_multipart()
                 print("Received request: ", msg)
-                self.send_msg(msg=msg)
+                self.send_msg(msg=msg, request_id=request_id)
 
             await asyncio.sleep(0)
 
@@ -57,8 +57,8 @@ class MockReply(threading.Thread):
             print(f'[{self.log.name}][ROUTER] Error Stopping Socket: {err}')
             pass
 
-    def send_msg(self, msg):
-        self.socket.send(msg)
+    def send_msg(self, msg, request_id: list = []):
+        self.socket.send_multipart(request_id + [msg])
 
     def stop(self):
         if self.running:
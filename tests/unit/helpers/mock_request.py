@@ -10,10 +10,11 @@ from contracting.db.encoder import encode
 
 
 class Result:
-    def __init__(self, success, response=None, error=None):
+    def __init__(self, success, response=None, error=None, parts=None):
         self.success = success
         self.response = response
         self.error = error
+        self.parts = parts or []
 
 class MockRequest():
     con_failed = 'con_failed'
@@ -119,13 +120,13 @@ class MockRequest():
                 self.send_string(msg_str=msg_str, socket=socket)
 
                 if await self.message_waiting(socket=socket, pollin=pollin, poll_time=timeout_ms):
-                    response = await socket.recv()
+                    response, *parts = await socket.recv_multipart()
 
                     self.log.info(' %s received: %s' % (self.id, response))
                     print(f'[{self.log.name}] %s received: %s' % (self.id, response))
 
                     self.close_socket(socket=socket)
-                    return Result(success=True, response=response)
+                    return Result(success=True, response=response, parts=parts)
 
                 else:
                     self.log.info(f'[REQUEST] No response from {to_address} in poll time.')
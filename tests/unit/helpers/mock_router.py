@@ -91,7 +91,7 @@ class MockRouter(threading.Thread):
             sockets = dict(await self.poller.poll(self.poll_time))
 
             if self.socket in sockets:
-                ident, empty, msg = await self.socket.recv_multipart()
+                ident, empty, *request_id, msg = await self.socket.recv_multipart()
                 print("[MOCK_ROUTER] Received request: ", msg)
 
                 if self.message_callback:
@@ -101,11 +101,11 @@ class MockRouter(threading.Thread):
                     msg_obj = json.loads(msg)
                     action = msg_obj.get('action')
                 except Exception as err:
-                    self.send_msg(ident=ident, msg=msg)
+                    self.send_msg(ident=ident, msg=msg, request_id=request_id)
                     continue
 
                 if action not in [ACTION_PING, ACTION_HELLO, ACTION_GET_LATEST_BLOCK, ACTION_GET_NEXT_BLOCK]:
-                    self.send_msg(ident=ident, msg=msg)
+                    self.send_msg(ident=ident, msg=msg, request_id=request_id)
                 else:
                     if action == ACTION_PING:
                         resp_msg = json.dumps({
@@ -146,12 +146,13 @@ class MockRouter(threading.Thread):
                             }
                         }).encode('UTF-8')
 
-                    self.send_msg(ident=ident, msg=resp_msg)
+                    self.send_msg(ident=ident, msg=resp_msg, request_id=request_id)
 
             await asyncio.sleep(0)
 
-    def send_msg(self, ident: str, msg):
-        self.socket.send_multipart([ident, b'', msg])
+    def send_msg(self, ident: str, msg, request_id: list = []):
+        # echoes the request id of DEALER requests
+        self.socket.send_multipart([ident, b''] + request_id + [msg])
 
     async def stopping(self):
         try:
@@ -2,7 +2,9 @@ from contracting.db.driver import ContractDriver, FSDriver
 from lamden.crypto.wallet import Wallet
 from lamden.network import Network
 from lamden.nodes.hlc import HLC_Clock
-from lamden.nodes.processors.block_contender import Block_Contender, valid_message_payload
+from lamden.nodes.processors.block_contender import Block_Contender, valid_message_payload, valid_compact_message_payload, \
+    valid_batch_message_payload
+from lamden.nodes.proof_batcher import ProofBatcher
 from pathlib import Path
 from tests.unit.helpers.mock_transactions import get_tx_message, get_processing_results
 from unittest import TestCase
@@ -92,6 +94,10 @@ class MockValidationQueue:
         hlc_timestamp = processing_results.get('hlc_timestamp')
         self.validation_results[hlc_timestamp] = processing_results
 
+    def append_batch(self, batch):
+        for solution in batch['solutions']:
+            self.validation_results[solution['hlc_timestamp']] = solution
+
     def __len__(self):
         return len(self.validation_results)
 
@@ -264,6 +270,122 @@ class TestBlockContenderProcessor(TestCase):
         # Validate test case results
         self.assertEqual(1, len(self.validation_queue))
 
+    def make_compact_message(self, node_wallet):
+        tx_message = get_tx_message(wallet=node_wallet, processor=node_wallet.verifying_key)
+        processing_results = get_processing_results(tx_message=tx_message, node_wallet=node_wallet, driver=self.driver)
+
+        return {
+            'hlc_timestamp': processing_results['hlc_timestamp'],
+            'proof': processing_results['proof']
+        }
+
+    def test_appends_compact_message_from_voted_in_node(self):
+        compact_message = self.make_compact_message(node_wallet=self.stu_wallet)
+
+        self.await_process_message(msg=compact_message)
+
+        self.assertEqual(1, len(self.validation_queue))
+        self.assertDictEqual(compact_message, self.validation_queue.validation_results[compact_message['hlc_timestamp']])
+
+    def test_does_not_append_compact_message_signed_for_other_result(self):
+        compact_message = self.make_compact_message(node_wallet=self.stu_wallet)
+        compact_message['proof']['tx_result_hash'] = 'a' * 64
+
+        with self.assertLogs(level='ERROR') as log:
+            self.await_process_message(msg=compact_message)
+            self.assertIn(f"Could not verify message signature {compact_message['proof']}", log.output[0])
+
+        self.assertEqual(0, len(self.validation_queue))
+
+    def test_does_not_append_compact_message_if_proof_is_not_from_voted_in_node(self):
+        compact_message = self.make_compact_message(node_wallet=self.stu_wallet)
+        self.driver.driver.set('masternodes.S:members', [])
+
+        with self.assertLogs(level='ERROR') as log:
+            self.await_process_message(msg=compact_message)
+            self.assertIn(f"{compact_message['proof']['signer'][:8]} is not in the consensus group. Ignoring solution!", log.output[0])
+
+        self.assertEqual(0, len(self.validation_queue))
+
+    def test__valid_compact_message_payload__TRUE_if_message_is_all_valid(self):
+        compact_message = {
+            'hlc_timestamp': '0',
+            'proof': {'signer': 'node_vk', 'signature': 'some_sig', 'tx_result_hash': 'some_hash'}
+        }
+        self.assertTrue(valid_compact_message_payload(msg=compact_message))
+
+    def test__valid_compact_message_payload__FALSE_for_full_or_incomplete_messages(self):
+        self.assertFalse(valid_compact_message_payload(msg=make_good_message()))
+        self.assertFalse(valid_compact_message_payload(msg=None))
+        self.assertFalse(valid_compact_message_payload(msg={'hlc_timestamp': '0', 'proof': {'signer': 'node_vk', 'signature': 'some_sig'}}))
+        self.assertFalse(valid_compact_message_payload(msg={'proof': {'signer': 'node_vk', 'signature': 'some_sig', 'tx_result_hash': 'some_hash'}}))
+
+    def make_batch_message(self, node_wallet, num_of_solutions=2):
+        published = []
+        proof_batcher = ProofBatcher(wallet=node_wallet, publish=published.append, max_size=num_of_solutions)
+
+        for i in range(num_of_solutions + 1):
+            proof_batcher.add(hlc_timestamp=self.hlc_clock.get_new_hlc_timestamp(), proof={
+                'signature': f'{i}' * 128,
+                'members_list_hash': 'a' * 64,
+                'num_of_members': 2,
+                'tx_result_hash': f'{i}' * 64
+            })
+        proof_batcher.stop()
+
+        # the first proof goes out on its own, the rest fill a batch
+        return published[1]
+
+    def test_appends_every_solution_in_batch_message(self):
+        batch_message = self.make_batch_message(node_wallet=self.stu_wallet)
+
+        self.await_process_message(msg=batch_message)
+
+        self.assertEqual(2, len(self.validation_queue))
+
+    def test_does_not_append_batch_message_that_does_not_match_its_root(self):
+        batch_message = self.make_batch_message(node_wallet=self.stu_wallet)
+        batch_message['batch']['solutions'][0]['tx_result_hash'] = 'f' * 64
+
+        with self.assertLogs(level='ERROR') as log:
+            self.await_process_message(msg=batch_message)
+            self.assertIn(f"does not match its root {batch_message['batch']['root']}", log.output[0])
+
+        self.assertEqual(0, len(self.validation_queue))
+
+    def test_does_not_append_batch_message_with_invalid_signature(self):
+        batch_message = self.make_batch_message(node_wallet=self.stu_wallet)
+        batch_message['batch']['signature'] = 'bad_sig'
+
+        with self.assertLogs(level='ERROR') as log:
+            self.await_process_message(msg=batch_message)
+            self.assertIn(f"Could not verify proof batch signature from {self.stu_wallet.verifying_key[:8]}", log.output[0])
+
+        self.assertEqual(0, len(self.validation_queue))
+
+    def test_does_not_append_batch_message_if_signer_is_not_voted_in(self):
+        batch_message = self.make_batch_message(node_wallet=self.stu_wallet)
+        self.driver.driver.set('masternodes.S:members', [])
+
+        with self.assertLogs(level='ERROR') as log:
+            self.await_process_message(msg=batch_message)
+            self.assertIn(f"{self.stu_wallet.verifying_key[:8]} is not in the consensus group. Ignoring proof batch!", log.output[0])
+
+        self.assertEqual(0, len(self.validation_queue))
+
+    def test__valid_batch_message_payload__TRUE_if_message_is_all_valid(self):
+        self.assertTrue(valid_batch_message_payload(msg=self.make_batch_message(node_wallet=self.stu_wallet)))
+
+    def test__valid_batch_message_payload__FALSE_for_empty_or_incomplete_batches(self):
+        batch_message = self.make_batch_message(node_wallet=self.stu_wallet)
+        self.assertFalse(valid_batch_message_payload(msg=make_good_message()))
+
+        del batch_message['batch']['solutions'][0]['signature']
+        self.assertFalse(valid_batch_message_payload(msg=batch_message))
+
+        batch_message['batch']['solutions'] = []
+        self.assertFalse(valid_batch_message_payload(msg=batch_message))
+
     def test__valid_message_payload__TRUE_if_message_is_all_valid(self):
         good_message = make_good_message()
         self.assertTrue(valid_message_payload(msg=good_message))
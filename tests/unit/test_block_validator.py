@@ -580,6 +580,14 @@ class TestBlockValidator(TestCase):
     def test_verify_proofs__returns_True_if_all_signatures_are_valid_NEW_block(self):
         self.assertTrue(block_validator.verify_proofs(block=self.block_v3, old_block=False))
 
+    def test_verify_proofs__returns_False_if_any_signature_invalid_NEW_block(self):
+        self.block_v3['proofs'].append(dict(self.block_v3['proofs'][0], signature=self.wallet.sign('TESTING')))
+        self.assertFalse(block_validator.verify_proofs(block=self.block_v3, old_block=False))
+
+    def test_verify_proofs__returns_False_if_proof_malformed_NEW_block(self):
+        self.block_v3['proofs'].append({'signer': self.wallet.verifying_key})
+        self.assertFalse(block_validator.verify_proofs(block=self.block_v3, old_block=False))
+
     def test_validate_all_signatures__returns_true_if_all_valid(self):
         self.assertTrue(block_validator.validate_all_signatures(block=self.block))
 
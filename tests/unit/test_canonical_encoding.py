@@ -104,3 +104,21 @@ class TestCanonicalCoding(TestCase):
 
         self.assertEqual('74544f9231f9509f52fbb142b8f604b4ad92e7d143de1fd48d36ab01ec16ed2c7f95d27127def4441fc5db902f4f8dffd7380f103541529cce866f332d3556684', message)
 
+    def test_proof_batch_leaves_verify_against_merkle_root(self):
+        solutions = [
+            {'hlc_timestamp': f'2022-10-10T10:10:10.00000000{i}Z_0', 'tx_result_hash': f'{i}' * 64, 'signature': 'a' * 128}
+            for i in range(3)
+        ]
+
+        leaves = canonical.proof_batch_leaves(solutions=solutions)
+        root = canonical.merklize(leaves)[0]
+
+        self.assertTrue(canonical.verify_merkle_tree(leaves, root))
+
+        solutions[1]['tx_result_hash'] = '9' * 64
+        self.assertFalse(canonical.verify_merkle_tree(canonical.proof_batch_leaves(solutions=solutions), root))
+
+    def test_create_proof_batch_message(self):
+        message = canonical.create_proof_batch_message(root='1' * 64, members_list_hash='2' * 64, num_of_members=4)
+
+        self.assertEqual('batch' + '1' * 64 + '2' * 64 + '4', message)
@@ -53,6 +53,8 @@ class MockPeer:
         wallet = Wallet()
         self.server_vk = wallet.verifying_key
 
+        self.previous_block_requests = 0
+
     @property
     def block_list(self):
         return [self.blocks[key] for key in sorted(self.blocks.keys(), key=int)]
@@ -60,6 +62,19 @@ class MockPeer:
     def find_block(self, block_num: str) -> dict:
         return self.blocks.get(block_num, None)
 
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        blocks = [
+            json.loads(encode(block)) for block in self.block_list
+            if (start_block_num is None or int(block.get('number')) >= start_block_num)
+            and (end_block_num is None or int(block.get('number')) <= end_block_num)
+        ]
+
+        if reverse:
+            blocks.reverse()
+
+        return blocks[:limit]
+
     async def get_block(self, block_num: int) -> (dict, None):
         block = self.find_block(str(block_num))
         block = json.loads(encode(block))
@@ -69,6 +84,8 @@ class MockPeer:
         return {'block_info': block}
 
     async def get_previous_block(self, block_num: int) -> (dict, None):
+        self.previous_block_requests += 1
+
         block_list = list(self.blocks.keys())
         block_list.sort()
 
@@ -96,6 +113,43 @@ class MockPeer:
             'hlc_timestamp': hlc_timestamp
         }}
 
+class MockPeerSkipsBlocks(MockPeer):
+    # Answers previous block requests with the block two back
+    async def get_previous_block(self, block_num: int) -> (dict, None):
+        res = await super().get_previous_block(block_num=block_num)
+        if res['block_info'] is None:
+            return res
+
+        return await super().get_previous_block(block_num=res['block_info'].get('number'))
+
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        blocks = await super().get_blocks_range(start_block_num=start_block_num, end_block_num=end_block_num,
+                                                reverse=reverse)
+        return blocks[1::2][:limit]
+
+class MockPeerNoRanges(MockPeer):
+    # An older peer that doesn't serve block ranges
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        return None
+
+class MockPeerBadBlock(MockPeer):
+    # Serves block ranges with one block whose signature doesn't verify
+    def __init__(self, blocks={}, bad_block_num: str = None):
+        super().__init__(blocks=blocks)
+        self.bad_block_num = bad_block_num
+
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        blocks = await super().get_blocks_range(start_block_num=start_block_num, end_block_num=end_block_num,
+                                                limit=limit, reverse=reverse)
+        for block in blocks:
+            if block.get('number') == self.bad_block_num:
+                block['origin']['signature'] = Wallet().sign('TESTING')
+
+        return blocks
+
 class TestCatchupHandler(TestCase):
     def setUp(self):
         self.loop = asyncio.new_event_loop()
@@ -495,6 +549,93 @@ class TestCatchupHandler(TestCase):
 
         self.assertEqual(1, len(self.catchup_handler.catchup_peers))
 
+    def test_METHOD_run__restarts_walk_if_lead_peer_skips_blocks(self):
+        num_of_blocks=10
+        mock_blocks = MockBlocks(num_of_blocks=num_of_blocks)
+        blocks_list = mock_blocks.block_numbers_list
+
+        self.mock_network.peers.append(MockPeerSkipsBlocks(blocks=dict(mock_blocks.blocks)))
+        self.add_peers_to_network(amount=4, blocks=mock_blocks.blocks)
+
+        self.create_catchup_handler()
+
+        tasks = asyncio.gather(
+            self.catchup_handler.run()
+        )
+        self.loop.run_until_complete(tasks)
+
+        for block_num in blocks_list:
+            if int(block_num) != 0:
+                self.assertIsNotNone(self.block_storage.get_block(block_num))
+
+    def test_METHOD_run__sources_blocks_through_lead_peer_ranges(self):
+        num_of_blocks=10
+        mock_blocks = MockBlocks(num_of_blocks=num_of_blocks)
+        blocks_list = mock_blocks.block_numbers_list
+
+        self.add_peers_to_network(amount=3, blocks=mock_blocks.blocks)
+
+        self.create_catchup_handler()
+
+        tasks = asyncio.gather(
+            self.catchup_handler.run()
+        )
+        self.loop.run_until_complete(tasks)
+
+        for block_num in blocks_list:
+            if int(block_num) != 0:
+                self.assertIsNotNone(self.block_storage.get_block(block_num))
 
+        self.assertEqual(0, sum(peer.previous_block_requests for peer in self.mock_network.peers))
 
+    def test_METHOD_run__falls_back_to_single_blocks_if_lead_peer_has_no_ranges(self):
+        num_of_blocks=10
+        mock_blocks = MockBlocks(num_of_blocks=num_of_blocks)
+        blocks_list = mock_blocks.block_numbers_list
+
+        for i in range(3):
+            self.mock_network.peers.append(MockPeerNoRanges(blocks=dict(mock_blocks.blocks)))
+
+        self.create_catchup_handler()
+
+        tasks = asyncio.gather(
+            self.catchup_handler.run()
+        )
+        self.loop.run_until_complete(tasks)
+
+        for block_num in blocks_list:
+            if int(block_num) != 0:
+                self.assertIsNotNone(self.block_storage.get_block(block_num))
+
+    def test_METHOD_run__restarts_walk_if_lead_peer_serves_invalid_block(self):
+        num_of_blocks=10
+        mock_blocks = MockBlocks(num_of_blocks=num_of_blocks)
+        blocks_list = mock_blocks.block_numbers_list
+
+        bad_peer = MockPeerBadBlock(blocks=dict(mock_blocks.blocks), bad_block_num=blocks_list[5])
+        self.mock_network.peers.append(bad_peer)
+        self.add_peers_to_network(amount=2, blocks=mock_blocks.blocks)
+
+        self.create_catchup_handler()
+
+        tasks = asyncio.gather(
+            self.catchup_handler.run()
+        )
+        self.loop.run_until_complete(tasks)
+
+        for block_num in blocks_list:
+            if int(block_num) != 0:
+                self.assertIsNotNone(self.block_storage.get_block(block_num))
+
+    def test_METHOD_source_verified_block__raises_if_block_does_not_verify(self):
+        mock_blocks = MockBlocks(num_of_blocks=5)
+        latest_block_number = mock_blocks.latest_block_number
+        mock_blocks.blocks[latest_block_number]['origin']['signature'] = Wallet().sign('TESTING')
+
+        self.add_peers_to_network(amount=3, blocks=mock_blocks.blocks)
+        self.create_catchup_handler()
 
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(
+                self.catchup_handler.source_verified_block(fetch_type='specific', block_num=int(latest_block_number))
+            )
@@ -541,7 +541,7 @@ def get():
             wallet=w,
             processor=self.ws.wallet.verifying_key,
             stamps=6000,
-            nonce=0,
+            nonce=nonce,
             contract='currency',
             function='transfer',
             kwargs={
@@ -590,6 +590,123 @@ def get():
 
         self.assertEqual(1, len(self.ws.queue))
 
+    def build_valid_transaction(self, wallet=None, nonce=0):
+        w = wallet or Wallet()
+
+        self.ws.client.set_var(
+            contract='currency',
+            variable='balances',
+            arguments=[w.verifying_key],
+            value=1_000_000
+        )
+
+        self.ws.client.set_var(
+            contract='stamp_cost',
+            variable='S',
+            arguments=['value'],
+            value=1_000_000
+        )
+
+        return build_transaction(
+            wallet=w,
+            processor=self.ws.wallet.verifying_key,
+            stamps=6000,
+            nonce=0,
+            contract='currency',
+            function='transfer',
+            kwargs={
+                'amount': {'__fixed__': '1.0'},
+                'to': 'jeff'
+            }
+        )
+
+    def test_submit_transaction_queues_tx_and_hands_it_off(self):
+        handed_off = []
+
+        class MockTxHandoff:
+            def send(self, tx_bytes, tx_hash, tx_id):
+                handed_off.append((tx_bytes, tx_hash, tx_id))
+                return True
+
+        self.ws.tx_handoff = MockTxHandoff()
+
+        tx = self.build_valid_transaction()
+        _, response = self.ws.app.test_client.post('/', data=tx)
+
+        # the queued copy is what survives a crash of either process
+        self.assertEqual(1, len(self.ws.queue))
+        self.assertEqual(1, len(handed_off))
+        self.assertEqual(tx.encode(), handed_off[0][0])
+        self.assertEqual(response.json['hash'], handed_off[0][1])
+
+        # the node matches the handed off copy to its queued record by id
+        tx_ids = []
+        self.ws.queue.pop_many(n=1, skip=lambda tx_id: tx_ids.append(tx_id))
+        self.assertListEqual([handed_off[0][2]], tx_ids)
+
+    def test_submit_transaction_queues_tx_if_hand_off_fails(self):
+        class MockTxHandoff:
+            def send(self, tx_bytes, tx_hash, tx_id):
+                return False
+
+        self.ws.tx_handoff = MockTxHandoff()
+
+        _, response = self.ws.app.test_client.post('/', data=self.build_valid_transaction())
+
+        self.assertEqual(1, len(self.ws.queue))
+
+    def test_submit_batch_queues_all_valid_txs(self):
+        w = Wallet()
+        txs = [self.build_valid_transaction(wallet=w, nonce=0), self.build_valid_transaction(wallet=w, nonce=1)]
+
+        _, response = self.ws.app.test_client.post('/batch', data='[' + ','.join(txs) + ']')
+
+        results = response.json['results']
+        self.assertEqual(2, len(results))
+        for result in results:
+            self.assertEqual('Transaction successfully submitted to the network.', result['success'])
+            self.assertIsNotNone(result['hash'])
+
+        self.assertEqual(2, len(self.ws.queue))
+        self.assertEqual(decode(txs[0]), self.ws.queue[0])
+        self.assertEqual(decode(txs[1]), self.ws.queue[1])
+
+    def test_submit_batch_returns_error_per_invalid_tx(self):
+        good_tx = self.build_valid_transaction()
+        bad_tx = build_transaction(
+            wallet=Wallet(),
+            processor='b' * 64,
+            stamps=123,
+            nonce=0,
+            contract='currency',
+            function='transfer',
+            kwargs={
+                'amount': 123,
+                'to': 'jeff'
+            }
+        )
+
+        _, response = self.ws.app.test_client.post('/batch', data='[' + bad_tx + ',' + good_tx + ']')
+
+        results = response.json['results']
+        self.assertDictEqual(
+            {'error': 'Transaction processor does not match expected processor.', 'hash': results[0]['hash']},
+            results[0]
+        )
+        self.assertIn('success', results[1])
+        self.assertEqual(1, len(self.ws.queue))
+
+    def test_submit_batch_returns_error_if_body_not_a_list(self):
+        _, response = self.ws.app.test_client.post('/batch', data=self.build_valid_transaction())
+
+        self.assertDictEqual({'error': 'Malformed request body. Expected a list of transactions.'}, response.json)
+        self.assertEqual(0, len(self.ws.queue))
+
+    def test_submit_batch_returns_error_if_too_many_txs(self):
+        _, response = self.ws.app.test_client.post('/batch', data=json.dumps([{}] * 501))
+
+        self.assertDictEqual({'error': 'Too many transactions. Max 500 per batch.'}, response.json)
+
     def test_submit_transaction_error_if_queue_full(self):
         for i in range(10_000):
             self.ws.queue.append(bytes(i))
@@ -622,7 +739,84 @@ def get():
         self.ws.blocks.store_block(copy.deepcopy(block))
 
         _, response = self.ws.app.test_client.get(f'/tx?hash={block["processed"]["hash"]}')
-        self.assertDictEqual(response.json, block['processed'])
+
+        expected = copy.deepcopy(block['processed'])
+        expected['block'] = {
+            'number': block['number'],
+            'hash': block['hash'],
+            'hlc_timestamp': block['hlc_timestamp']
+        }
+        self.assertDictEqual(response.json, expected)
+
+    def test_get_state_at_returns_value_in_effect_at_block(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0'*64,
+            prev_block_hlc=HLC_Clock().get_new_hlc_timestamp()
+        )
+        blocks[0]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 1}]
+        blocks[1]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 2}]
+        self.ws.blocks.store_blocks(copy.deepcopy(blocks))
+
+        _, response = self.ws.app.test_client.get(f'/state_at?key=currency.balances:jeff&num={blocks[0]["number"]}')
+
+        self.assertEqual(1, response.json['states'][0]['value'])
+        self.assertEqual(blocks[0]['number'], response.json['states'][0]['changed_at'])
+
+    def test_get_state_at_answers_batched_queries(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0'*64,
+            prev_block_hlc=HLC_Clock().get_new_hlc_timestamp()
+        )
+        blocks[0]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 1}]
+        blocks[1]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 2}]
+        self.ws.blocks.store_blocks(copy.deepcopy(blocks))
+
+        _, response = self.ws.app.test_client.post('/state_at', data=json.dumps({'queries': [
+            {'key': 'currency.balances:jeff', 'num': blocks[0]['number']},
+            {'key': 'currency.balances:jeff', 'num': blocks[1]['number']},
+        ]}))
+
+        self.assertEqual([1, 2], [state['value'] for state in response.json['states']])
+
+    def test_get_state_at_returns_contract_changes_in_range(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0'*64,
+            prev_block_hlc=HLC_Clock().get_new_hlc_timestamp()
+        )
+        blocks[0]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 1}]
+        blocks[1]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 2}]
+        self.ws.blocks.store_blocks(copy.deepcopy(blocks))
+
+        _, response = self.ws.app.test_client.get(f'/state_at?contract=currency&start={blocks[1]["number"]}')
+
+        self.assertEqual([{'block_num': blocks[1]['number'], 'key': 'currency.balances:jeff', 'value': 2}],
+                         response.json['changes'])
+
+    def test_get_state_at_returns_error_while_state_history_is_incomplete(self):
+        blocks = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0'*64,
+            prev_block_hlc=HLC_Clock().get_new_hlc_timestamp()
+        )
+        self.ws.blocks.store_blocks(copy.deepcopy(blocks))
+        # as left by a store written before the state history was kept
+        os.remove(self.ws.blocks.state_history_floor_path)
+
+        _, response = self.ws.app.test_client.get(f'/state_at?key=currency.balances:jeff&num={blocks[0]["number"]}')
+
+        floor = str(int(blocks[0]['number']) + 1)
+        self.assertEqual(503, response.status)
+        self.assertEqual(f'State history unavailable below block {floor}.', response.json['error'])
+        self.assertEqual(floor, response.json['available_from'])
+
+    def test_get_state_at_without_key_returns_error(self):
+        _, response = self.ws.app.test_client.get('/state_at?num=1')
+
+        self.assertEqual(400, response.status)
+        self.assertIn('error', response.json)
 
     def test_malformed_tx_returns_error(self):
         tx = b'"df:'
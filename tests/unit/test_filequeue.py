@@ -33,14 +33,13 @@ class TestProcessingQueue(TestCase):
             nonce=1
         )
 
-        # Verify the directory is currently empty
-        self.assertTrue(len(os.listdir(self.tx_queue.txq)) == 0)
+        # Verify the queue is currently empty
+        self.assertEqual(len(self.tx_queue), 0)
 
         self.tx_queue.append(tx=tx.encode())
 
-        # Verify a file has been created
+        # Verify the tx has been queued
         self.assertEqual(len(self.tx_queue), 1)
-        self.assertTrue(len(os.listdir(self.tx_queue.txq)) == 1)
 
     def test_pop_tx(self):
         receiver_wallet = Wallet()
@@ -62,17 +61,158 @@ class TestProcessingQueue(TestCase):
         tx_obj = json.loads(tx_str)
         file_signature = tx_obj['metadata'].get('signature')
 
-        # Verify the directory is currently empty
-        self.assertTrue(len(os.listdir(self.tx_queue.txq)) == 0)
+        # Verify the queue is currently empty
+        self.assertEqual(len(self.tx_queue), 0)
 
         self.tx_queue.append(tx=tx_str.encode())
 
-        # Verify a file has been created
+        # Verify the tx has been queued
         self.assertEqual(len(self.tx_queue), 1)
-        self.assertTrue(len(os.listdir(self.tx_queue.txq)) == 1)
 
         file_tx = self.tx_queue.pop(0)
 
         self.assertIsNotNone(file_tx)
         self.assertEqual(len(self.tx_queue), 0)
-        self.assertEqual(file_tx['metadata'].get('signature'), file_signature)
\ No newline at end of file
+        self.assertEqual(file_tx['metadata'].get('signature'), file_signature)
+    def append_txs(self, amount, queue=None):
+        queue = queue or self.tx_queue
+        for i in range(amount):
+            queue.append(tx=json.dumps({'i': i}).encode())
+
+    def test_METHOD_pop__is_fifo(self):
+        self.append_txs(amount=5)
+
+        self.assertListEqual([{'i': i} for i in range(5)], [self.tx_queue.pop(0) for i in range(5)])
+        self.assertIsNone(self.tx_queue.pop(0))
+
+    def test_METHOD_pop__raises_ValueError_if_not_first(self):
+        self.append_txs(amount=2)
+
+        with self.assertRaises(ValueError):
+            self.tx_queue.pop(1)
+
+    def test_METHOD_pop_many__returns_up_to_n_in_order(self):
+        self.append_txs(amount=5)
+
+        self.assertListEqual([{'i': 0}, {'i': 1}, {'i': 2}], self.tx_queue.pop_many(n=3))
+        self.assertListEqual([{'i': 3}, {'i': 4}], self.tx_queue.pop_many(n=3))
+        self.assertListEqual([], self.tx_queue.pop_many(n=3))
+
+    def test_METHOD_append_many__queues_all_in_order(self):
+        self.tx_queue.append(json.dumps({'i': 0}))
+        self.tx_queue.append_many(txs=[json.dumps({'i': i}) for i in range(1, 4)])
+        self.tx_queue.append_many(txs=[])
+
+        self.assertListEqual([{'i': i} for i in range(4)], self.tx_queue.pop_many(n=10))
+
+    def test_METHOD_append_many__returns_record_ids_other_instances_match(self):
+        producer = FileQueue(root=self.tx_queue_path)
+
+        tx_ids = producer.append_many(txs=[json.dumps({'i': i}) for i in range(3)])
+        tx_ids.append(producer.append(json.dumps({'i': 3})))
+
+        popped_ids = []
+        self.tx_queue.pop_many(n=10, skip=lambda tx_id: popped_ids.append(tx_id))
+
+        self.assertEqual(4, len(set(tx_ids)))
+        self.assertListEqual(tx_ids, popped_ids)
+
+    def test_METHOD_append_many__record_ids_are_new_after_log_is_truncated(self):
+        self.tx_queue.COMPACT_SIZE = 1
+
+        first_id = self.tx_queue.append(json.dumps({'i': 0}))
+        self.tx_queue.pop(0)
+
+        self.assertNotEqual(first_id, self.tx_queue.append(json.dumps({'i': 0})))
+
+    def test_METHOD_pop_many__skips_records_without_counting_them(self):
+        tx_ids = self.tx_queue.append_many(txs=[json.dumps({'i': i}) for i in range(5)])
+        handed_off = {tx_ids[0], tx_ids[2]}
+
+        self.assertListEqual([{'i': 1}, {'i': 3}], self.tx_queue.pop_many(n=2, skip=lambda tx_id: tx_id in handed_off))
+        self.assertListEqual([{'i': 4}], self.tx_queue.pop_many(n=2, skip=lambda tx_id: tx_id in handed_off))
+        self.assertEqual(0, len(self.tx_queue))
+
+    def test_METHOD_getitem__peeks_without_popping(self):
+        self.append_txs(amount=3)
+
+        self.assertEqual({'i': 0}, self.tx_queue[0])
+        self.assertEqual({'i': 2}, self.tx_queue[-1])
+        self.assertEqual(3, len(self.tx_queue))
+
+    def test_METHOD_len__sees_other_instances_on_the_same_root(self):
+        consumer = FileQueue(root=self.tx_queue_path)
+
+        self.append_txs(amount=3)
+        self.assertEqual(3, len(consumer))
+
+        consumer.pop(0)
+        self.assertEqual(2, len(self.tx_queue))
+
+    def test_INSTANCE_init__resumes_from_consumer_offset(self):
+        self.append_txs(amount=3)
+        self.tx_queue.pop(0)
+
+        restarted_queue = FileQueue(root=self.tx_queue_path)
+
+        self.assertEqual(2, len(restarted_queue))
+        self.assertEqual({'i': 1}, restarted_queue.pop(0))
+
+    def test_INSTANCE_init__drops_torn_record_left_by_crashed_writer(self):
+        self.append_txs(amount=2)
+
+        with open(self.tx_queue.log_path, 'ab') as f:
+            f.write(FileQueue.RECORD_HEADER.pack(100, 0) + b'{"i": ')
+
+        restarted_queue = FileQueue(root=self.tx_queue_path)
+        self.assertEqual(2, len(restarted_queue))
+
+        restarted_queue.append(tx=json.dumps({'i': 2}).encode())
+        self.assertListEqual([{'i': 0}, {'i': 1}, {'i': 2}], restarted_queue.pop_many(n=10))
+
+    def test_INSTANCE_init__migrates_legacy_tx_files(self):
+        for i in range(3):
+            legacy_file = self.tx_queue.txq.joinpath(f'legacy_{i}{FileQueue.EXTENSION}')
+            with open(legacy_file, 'wb') as f:
+                f.write(json.dumps({'i': i}).encode())
+            os.utime(legacy_file, (i, i))
+
+        migrated_queue = FileQueue(root=self.tx_queue_path)
+
+        self.assertListEqual([{'i': 0}, {'i': 1}, {'i': 2}], migrated_queue.pop_many(n=10))
+        self.assertListEqual([], list(self.tx_queue.txq.glob(f'*{FileQueue.EXTENSION}')))
+
+    def test_METHOD_pop_many__truncates_log_once_drained(self):
+        self.tx_queue.COMPACT_SIZE = 1
+        producer = FileQueue(root=self.tx_queue_path)
+
+        self.append_txs(amount=3, queue=producer)
+        self.tx_queue.pop_many(n=3)
+
+        self.assertEqual(0, os.path.getsize(self.tx_queue.log_path))
+        self.assertEqual(0, len(producer))
+
+        self.append_txs(amount=1, queue=producer)
+        self.assertEqual(1, len(producer))
+        self.assertEqual({'i': 0}, self.tx_queue.pop(0))
+
+    def test_METHOD_flush__other_instances_see_empty_queue(self):
+        producer = FileQueue(root=self.tx_queue_path)
+        self.append_txs(amount=3, queue=producer)
+
+        self.tx_queue.flush()
+
+        self.assertEqual(0, len(producer))
+        self.append_txs(amount=1, queue=producer)
+        self.assertEqual({'i': 0}, self.tx_queue.pop(0))
+
+    def test_pop_speed(self):
+        num_of_txs = 10_000
+        self.append_txs(amount=num_of_txs)
+
+        popped = []
+        while len(self.tx_queue) > 0:
+            popped.append(self.tx_queue.pop(0))
+
+        self.assertListEqual([{'i': i} for i in range(num_of_txs)], popped)
+        self.assertIsNone(self.tx_queue.pop(0))
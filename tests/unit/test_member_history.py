@@ -70,6 +70,19 @@ class MockPeer:
 
         return return_info
 
+    async def get_member_history_range(self, start_block_num: int = None, end_block_num: int = None,
+                                       limit: int = None, max_bytes: int = None) -> (list, None):
+        history = []
+        block_num = -1 if start_block_num is None else start_block_num - 1
+
+        while True:
+            res = await self.get_next_member_history(block_num=block_num)
+            if res['member_history_info'] is None:
+                return history
+
+            history.append(res['member_history_info'])
+            block_num = int(res['member_history_info'].get('number'))
+
 
 class TestMemberHistoryHandler(TestCase):
     def setUp(self):
@@ -209,6 +222,46 @@ class TestMemberHistoryHandler(TestCase):
         members_list = self.block_storage.member_history.get(block_num='99999999999999999999')
         self.assertIsNotNone(new_members, members_list)
 
+    def test_METHOD_source_history_range_from_peers__returns_history_peers_agree_on(self):
+        self.create_handler()
+        mock_blocks = MockBlocks(num_of_blocks=10)
+        new_members = list(mock_blocks.initial_members.get('masternodes'))
+        new_members.append(Wallet().verifying_key)
+
+        mock_blocks.block_list[-1]['processed']['state'].append({
+            'key': 'masternodes.S:members',
+            'value': new_members
+        })
+
+        for i in range(3):
+            self.mock_network.add_peer(blocks=mock_blocks.blocks)
+
+        self.member_history_handler.peers = self.mock_network.get_all_connected_peers()
+
+        tasks = asyncio.gather(
+            self.member_history_handler.source_history_range_from_peers(block_num=-1)
+        )
+        res = self.loop.run_until_complete(tasks)[0]
+
+        self.assertEqual(['0', mock_blocks.latest_block_number], [item.get('number') for item in res])
+        self.assertEqual(new_members, res[-1].get('members_list'))
+
+    def test_METHOD_source_history_range_from_peers__returns_empty_list_without_a_majority(self):
+        self.create_handler()
+        mock_blocks = MockBlocks(num_of_blocks=10)
+
+        self.mock_network.add_peer(blocks=mock_blocks.blocks)
+        self.mock_network.add_peer(blocks={})
+
+        self.member_history_handler.peers = self.mock_network.get_all_connected_peers()
+
+        tasks = asyncio.gather(
+            self.member_history_handler.source_history_range_from_peers(block_num=-1)
+        )
+        res = self.loop.run_until_complete(tasks)[0]
+
+        self.assertEqual([], res)
+
     def test_METHOD_catchup_history__does_not_raise_exception_if_no_peers(self):
         self.create_handler()
 
@@ -42,10 +42,25 @@ class MockPeer:
         wallet = Wallet()
         self.server_vk = wallet.verifying_key
 
+        self.block_requests = 0
+
     def find_block(self, block_num: str) -> dict:
         return self.blocks.get(block_num, None)
 
+    async def get_blocks_range(self, start_block_num: int = None, end_block_num: int = None, limit: int = None,
+                               reverse: bool = False, max_bytes: int = None) -> (list, None):
+        block_nums = [
+            block_num for block_num in sorted(self.blocks.keys(), key=int)
+            if (start_block_num is None or int(block_num) >= start_block_num)
+            and (end_block_num is None or int(block_num) <= end_block_num)
+        ]
+
+        # two at a time so the handler has to ask more than once
+        return [json.loads(encode(self.blocks[block_num])) for block_num in block_nums][:2]
+
     async def get_block(self, block_num: int) -> (dict, None):
+        self.block_requests += 1
+
         block = self.find_block(str(block_num))
         block = json.loads(encode(block))
         if block is None:
@@ -513,6 +528,27 @@ class TestMissingBlocksHandler(TestCase):
             block = self.missing_blocks_handler.block_storage.get_block(v=int(block_number))
             self.assertIsNotNone(block)
 
+    def test_METHOD_process_missing_blocks__sources_blocks_through_ranges(self):
+        self.create_missing_blocks_handler()
+
+        mock_blocks = MockBlocks(num_of_blocks=6)
+        self.add_peers_to_network(amount=3, blocks=mock_blocks.blocks)
+
+        # skip one so the range requests have to step over a block that isn't missing
+        missing_block_numbers_list = [block_num for block_num in mock_blocks.block_numbers_list if int(block_num) != 0]
+        missing_block_numbers_list.pop(2)
+
+        tasks = asyncio.gather(
+            self.missing_blocks_handler.process_missing_blocks(missing_block_numbers_list=missing_block_numbers_list)
+        )
+        self.loop.run_until_complete(tasks)
+
+        for block_number in missing_block_numbers_list:
+            block = self.missing_blocks_handler.block_storage.get_block(v=int(block_number))
+            self.assertIsNotNone(block)
+
+        self.assertEqual(0, sum(peer.block_requests for peer in self.mock_network.peers))
+
     def test_METHOD_recalc_block_hashes__fixes_hashes_in_future_blocks(self):
         mock_blocks = MockBlocks(num_of_blocks=5)
         self.wallet = mock_blocks.masternode_wallet
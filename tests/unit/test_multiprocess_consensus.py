@@ -4,7 +4,7 @@ from unittest import TestCase
 import hashlib
 import asyncio
 
-from lamden.nodes.multiprocess_consensus import MultiProcessConsensus
+from lamden.nodes.multiprocess_consensus import MultiProcessConsensus, make_consensus_job
 from lamden.crypto.wallet import Wallet
 
 from tests.unit.helpers.mock_transactions import get_tx_message, get_processing_results
@@ -31,6 +31,7 @@ class TestMultiProcessConsensus(TestCase):
 
     def tearDown(self):
         self.validation_results = {}
+        self.multiprocess_consensus.stop()
 
         try:
             self.loop.run_until_complete(self.multiprocess_consensus.wait_for_done())
@@ -179,4 +180,58 @@ class TestMultiProcessConsensus(TestCase):
         self.assertFalse(results_3.get('has_consensus'))
 
         print(f'Setup Time: {done_loading_test - start_time}')
-        print(f'Consensus Time: {(done_running_consensus - start_time ) - (done_loading_test - start_time)}')
\ No newline at end of file
+        print(f'Consensus Time: {(done_running_consensus - start_time ) - (done_loading_test - start_time)}')
+
+    def test_start_checks_in_process_without_workers(self):
+        self.validation_results = ValidationResults(my_wallet=self.wallet)
+        test_hlc_timestamp = self.validation_results.add_test(num_of_nodes=100)
+
+        self.peers = list(range(100))
+        self.multiprocess_consensus.workers = 0
+        self.multiprocess_consensus.pool_min_hlcs = 0
+
+        all_consensus_results = self.await_multiprocess_consensus(
+            validation_results=self.validation_results.get_results()
+        )
+
+        self.assertIsNone(self.multiprocess_consensus.pool)
+        self.assertTrue(all_consensus_results.get(test_hlc_timestamp).get('has_consensus'))
+
+    def test_start_pool_returns_same_results_as_in_process(self):
+        self.validation_results = ValidationResults(my_wallet=self.wallet)
+
+        self.validation_results.add_test(num_of_nodes=99, includes_me=True)
+        self.validation_results.add_test(num_of_nodes=100)
+        self.validation_results.add_test(num_of_nodes=49, includes_me=True)
+
+        self.peers = list(range(100))
+        self.multiprocess_consensus.workers = 0
+
+        in_process_results = self.await_multiprocess_consensus(
+            validation_results=self.validation_results.get_results()
+        )
+
+        self.multiprocess_consensus.workers = 1
+        self.multiprocess_consensus.pool_min_hlcs = 0
+
+        pool_results = self.await_multiprocess_consensus(
+            validation_results=self.validation_results.get_results()
+        )
+
+        self.assertIsNotNone(self.multiprocess_consensus.pool)
+        self.assertEqual(3, len(pool_results))
+        self.assertDictEqual(in_process_results, pool_results)
+
+    def test_make_consensus_job_sends_only_result_hashes(self):
+        self.validation_results = ValidationResults(my_wallet=self.wallet)
+        test_hlc_timestamp = self.validation_results.add_test(num_of_nodes=3, includes_me=True)
+
+        results = self.validation_results.get_results()[test_hlc_timestamp]
+        job = make_consensus_job(hlc_timestamp=test_hlc_timestamp, results=results, my_vk=self.wallet.verifying_key)
+
+        hlc_timestamp, result_hashes, my_index, ideal_consensus_possible, eager_consensus_possible = job
+
+        self.assertEqual(test_hlc_timestamp, hlc_timestamp)
+        self.assertEqual(tuple(results['solutions'].values()), result_hashes)
+        self.assertEqual(list(results['solutions']).index(self.wallet.verifying_key), my_index)
+        self.assertNotIn(self.wallet.verifying_key, result_hashes)
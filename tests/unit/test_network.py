@@ -3,8 +3,10 @@ from unittest import TestCase
 from lamden.crypto.wallet import Wallet
 from lamden.network import Network, EXCEPTION_PORT_NUM_NOT_INT
 from lamden.peer import Peer, ACTION_HELLO, ACTION_PING, ACTION_GET_BLOCK, ACTION_GET_LATEST_BLOCK, ACTION_GET_NEXT_BLOCK, ACTION_GET_NETWORK_MAP, ACTION_GET_NEXT_MEMBER_HISTORY
+from lamden.peer import ACTION_GET_BLOCKS_RANGE, ACTION_GET_MEMBER_HISTORY_RANGE, decode_range_payload
 from lamden.sockets.publisher import Publisher
 from lamden.sockets.router import Router
+from lamden.sockets.wire import WIRE_VERSION, encode_message, decode_message, wire_version_of
 from lamden.storage import BlockStorage
 
 from contracting.db.driver import ContractDriver, InMemDriver
@@ -107,8 +109,38 @@ class TestNetwork(TestCase):
             value=current_vks
         )
 
-    def mock_send_msg(self, to_vk, msg_str, ident_vk_bytes=None):
+    def mock_send_msg(self, to_vk, msg_str, ident_vk_bytes=None, request_id=None):
         self.router_msg = (to_vk, msg_str)
+        self.router_request_id = request_id
+
+    def mock_send_multipart_msg(self, to_vk, msg_str, parts, ident_vk_bytes=None, request_id=None):
+        self.router_msg = (to_vk, msg_str, parts)
+
+    def store_blocks_for_range(self, network, amount):
+        for i in range(1, amount + 1):
+            network.block_storage.store_block(block={
+                'number': i,
+                'hash': f'{i}' * 8,
+                'hlc_timestamp': str(i),
+                'processed': {
+                    'hash': 'testing'
+                }
+            })
+
+    def send_range_request(self, network, msg, request_id=None):
+        network.router.send_multipart_msg = self.mock_send_multipart_msg
+
+        peer_vk = Wallet().verifying_key
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(network.router_callback(ident_vk_string=peer_vk, ident_vk_bytes=peer_vk.encode(),
+                                                        msg=json.dumps(msg), request_id=request_id))
+
+        if self.router_msg is None:
+            return None, None
+
+        to_vk, msg_str, parts = self.router_msg
+        return json.loads(msg_str), decode_range_payload(parts[0])
 
     def mock_peer_update_ip(self, new_ip):
         self.called_ip_update = new_ip
@@ -483,6 +515,36 @@ class TestNetwork(TestCase):
         self.assertEqual(ACTION_PING, msg_obj.get('response'))
 
 
+    def test_METHOD_router_callback__replies_in_binary_to_binary_request(self):
+        network_1 = self.create_network()
+        network_1.router.send_msg = self.mock_send_msg
+
+        ping_msg = encode_message({'action': ACTION_PING}, WIRE_VERSION)
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(network_1.router_callback(ident_vk_string="testing_vk", ident_vk_bytes="testing_vk".encode(), msg=ping_msg))
+
+        self.assertIsNotNone(self.router_msg)
+        to_vk, msg = self.router_msg
+
+        self.assertEqual(WIRE_VERSION, wire_version_of(msg))
+        self.assertEqual(ACTION_PING, decode_message(msg).get('response'))
+
+    def test_METHOD_router_callback__hello_action_advertises_wire_versions(self):
+        network_1 = self.create_network()
+        network_1.router.send_msg = self.mock_send_msg
+        network_1.connect_peer = self.mock_connect_peer
+
+        hello_msg = json.dumps({'action': ACTION_HELLO, 'ip': 'tcp://127.0.0.1:19000', 'challenge': 'testing'})
+        peer_vk = Wallet().verifying_key
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(network_1.router_callback(ident_vk_string=peer_vk, ident_vk_bytes=peer_vk.encode(), msg=hello_msg))
+
+        to_vk, msg_str = self.router_msg
+
+        self.assertIn(WIRE_VERSION, json.loads(msg_str).get('wire'))
+
     def test_METHOD_router_callback__hello_action_creates_proper_response(self):
         network_1 = self.create_network()
         network_1.router.send_msg = self.mock_send_msg
@@ -789,6 +851,74 @@ class TestNetwork(TestCase):
         self.assertEqual("0", msg_obj['member_history_info'].get('number'))
         self.assertIsNotNone(msg_obj['member_history_info'].get('signature'))
 
+    def test_METHOD_router_callback__get_blocks_range_returns_blocks_in_range(self):
+        network_1 = self.create_network()
+        self.store_blocks_for_range(network=network_1, amount=10)
+
+        header, blocks = self.send_range_request(network=network_1, msg={
+            'action': ACTION_GET_BLOCKS_RANGE, 'start_block_num': 3, 'end_block_num': 6
+        })
+
+        self.assertEqual(ACTION_GET_BLOCKS_RANGE, header.get('response'))
+        self.assertEqual(4, header.get('count'))
+        self.assertFalse(header.get('more'))
+        self.assertEqual([3, 4, 5, 6], [block.get('number') for block in blocks])
+
+    def test_METHOD_router_callback__get_blocks_range_stops_at_limit_and_reverses(self):
+        network_1 = self.create_network()
+        self.store_blocks_for_range(network=network_1, amount=10)
+
+        header, blocks = self.send_range_request(network=network_1, msg={
+            'action': ACTION_GET_BLOCKS_RANGE, 'end_block_num': 8, 'limit': 3, 'reverse': True
+        })
+
+        self.assertTrue(header.get('more'))
+        self.assertEqual([8, 7, 6], [block.get('number') for block in blocks])
+
+    def test_METHOD_router_callback__get_blocks_range_stops_at_max_bytes_but_always_sends_one(self):
+        network_1 = self.create_network()
+        self.store_blocks_for_range(network=network_1, amount=10)
+
+        header, blocks = self.send_range_request(network=network_1, msg={
+            'action': ACTION_GET_BLOCKS_RANGE, 'max_bytes': 1
+        })
+
+        self.assertTrue(header.get('more'))
+        self.assertEqual([1], [block.get('number') for block in blocks])
+
+    def test_METHOD_router_callback__get_blocks_range_replies_with_error_to_malformed_request(self):
+        network_1 = self.create_network()
+        self.store_blocks_for_range(network=network_1, amount=10)
+
+        sent = []
+        network_1.router.send_msg = lambda **kwargs: sent.append(kwargs)
+
+        header, blocks = self.send_range_request(network=network_1, request_id=b'1', msg={
+            'action': ACTION_GET_BLOCKS_RANGE, 'start_block_num': 'one'
+        })
+
+        self.assertIsNone(header)
+        self.assertEqual(1, len(sent))
+        self.assertEqual(b'1', sent[0].get('request_id'))
+        self.assertEqual(ACTION_GET_BLOCKS_RANGE, json.loads(sent[0].get('msg_str')).get('response'))
+        self.assertIn('error', json.loads(sent[0].get('msg_str')))
+
+    def test_METHOD_router_callback__get_member_history_range_returns_signed_history(self):
+        network_1 = self.create_network()
+
+        network_1.block_storage.member_history.wallet = network_1.wallet
+        for block_num in ["0", "5", "10"]:
+            network_1.block_storage.member_history.set(block_num=block_num, members_list=[block_num])
+
+        header, history = self.send_range_request(network=network_1, msg={
+            'action': ACTION_GET_MEMBER_HISTORY_RANGE, 'start_block_num': 1
+        })
+
+        self.assertEqual(ACTION_GET_MEMBER_HISTORY_RANGE, header.get('response'))
+        self.assertEqual(["5", "10"], [item.get('number') for item in history])
+        for item in history:
+            self.assertTrue(network_1.block_storage.member_history.verify_signature(data=item))
+
     def test_METHOD_make_network_map(self):
         network_1 = self.create_network()
 
@@ -883,6 +1013,59 @@ class TestNetwork(TestCase):
 
         self.assertTrue(task.done())
 
+    def test_METHOD_refresh_publisher_wire_version__binary_only_once_every_peer_agreed(self):
+        network_1 = self.create_network()
+
+        for i in range(2):
+            peer_vk = Wallet().verifying_key
+            network_1.peers[peer_vk] = network_1.create_peer(ip=f'1.1.1.{i}', vk=peer_vk)
+
+        peers = network_1.peer_list
+
+        peers[0].wire_version = WIRE_VERSION
+        network_1.refresh_publisher_wire_version()
+        self.assertIsNone(network_1.publisher.wire_version)
+
+        peers[1].wire_version = WIRE_VERSION
+        network_1.refresh_publisher_wire_version()
+        self.assertEqual(WIRE_VERSION, network_1.publisher.wire_version)
+
+        network_1.delete_peer(peer_vk=peers[1].server_vk)
+        network_1.add_peer(ip='1.1.1.2', peer_vk=Wallet().verifying_key)
+        self.assertIsNone(network_1.publisher.wire_version)
+
+    def test_METHOD_peers_take_compact_contenders__only_once_every_peer_does(self):
+        network_1 = self.create_network()
+        self.assertFalse(network_1.peers_take_compact_contenders())
+
+        for i in range(2):
+            peer_vk = Wallet().verifying_key
+            network_1.peers[peer_vk] = network_1.create_peer(ip=f'1.1.1.{i}', vk=peer_vk)
+
+        peers = network_1.peer_list
+
+        peers[0].compact_contenders = True
+        self.assertFalse(network_1.peers_take_compact_contenders())
+
+        peers[1].compact_contenders = True
+        self.assertTrue(network_1.peers_take_compact_contenders())
+
+    def test_METHOD_peers_take_proof_batches__only_once_every_peer_does(self):
+        network_1 = self.create_network()
+        self.assertFalse(network_1.peers_take_proof_batches())
+
+        for i in range(2):
+            peer_vk = Wallet().verifying_key
+            network_1.peers[peer_vk] = network_1.create_peer(ip=f'1.1.1.{i}', vk=peer_vk)
+
+        peers = network_1.peer_list
+
+        peers[0].proof_batches = True
+        self.assertFalse(network_1.peers_take_proof_batches())
+
+        peers[1].proof_batches = True
+        self.assertTrue(network_1.peers_take_proof_batches())
+
     def test_METHOD_connected_to_peer_callback__returns_if_peer_is_None(self):
         network_1 = self.create_network()
 
@@ -1140,6 +1323,14 @@ class TestNetwork(TestCase):
         self.assertEqual("0", hello_obj.get("latest_hlc_timestamp"))
         self.assertEqual("", hello_obj.get("challenge_response"))
 
+    def test_METHOD_hello_response_advertises_compact_contenders_and_proof_batches(self):
+        network_1 = self.create_network()
+
+        hello_obj = json.loads(network_1.hello_response(challenge='testing'))
+        self.assertTrue(hello_obj.get("compact_contenders"))
+        self.assertTrue(hello_obj.get("proof_batches"))
+        self.assertTrue(hello_obj.get("request_ids"))
+
     def test_METHOD_get_node_list(self):
         network_1 = self.create_network()
 
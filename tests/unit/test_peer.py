@@ -1,8 +1,10 @@
 import json
 
 from lamden.peer import Peer, ACTION_HELLO, ACTION_PING, ACTION_GET_BLOCK, ACTION_GET_LATEST_BLOCK, ACTION_GET_NEXT_BLOCK, ACTION_GET_NETWORK_MAP, TOPIC_PEER_SHUTDOWN, ACTION_GET_NEXT_MEMBER_HISTORY
+from lamden.peer import ACTION_GET_BLOCKS_RANGE, encode_range_payload, decode_range_payload
 from lamden.sockets.request import Request, Result
 from lamden.sockets.subscriber import Subscriber
+from lamden.sockets.wire import WIRE_VERSION, encode_message, wire_version_of
 from lamden.crypto.wallet import Wallet, verify
 from contracting.db.driver import ContractDriver, InMemDriver
 
@@ -86,7 +88,7 @@ class TestPeer(unittest.TestCase):
             except RuntimeError:
                 pass
 
-    def disable_send_string(self, str_msg):
+    def disable_send_string(self, str_msg, request_id=b''):
         pass
 
     def connected_callback(self, peer_vk):
@@ -629,12 +631,129 @@ class TestPeer(unittest.TestCase):
 
         self.assertIsNone(res)
 
+    def test_METHOD_handle_result__adds_extra_frames_as_parts(self):
+        result = Result(success=True, response=json.dumps({}).encode('UTF-8'), parts=[b'payload'])
+        msg = self.peer.handle_result(result=result)
+
+        self.assertEqual([b'payload'], msg.get('parts'))
+
+    def test_METHOD_handle_result__decodes_binary_wire_response(self):
+        result = Result(success=True, response=encode_message({'hash': 'a' * 64}, WIRE_VERSION))
+        msg = self.peer.handle_result(result=result)
+
+        self.assertEqual('a' * 64, msg.get('hash'))
+        self.assertTrue(msg.get('success'))
+
+    def test_METHOD_send_request__sends_binary_once_wire_version_agreed(self):
+        self.peer.setup_request()
+        self.peer.wire_version = WIRE_VERSION
+
+        send = self.peer.request.send
+        sent = []
+
+        async def send_and_record(str_msg, timeout, attempts):
+            sent.append(str_msg)
+            return await send(str_msg=str_msg, timeout=timeout, attempts=attempts)
+
+        self.peer.request.send = send_and_record
+
+        msg = self.await_sending_request(process=self.peer.send_request, args={
+            'msg_obj': {'action': 'test_send'}
+        })
+
+        self.assertEqual(WIRE_VERSION, wire_version_of(sent[0]))
+        self.assertDictEqual({'action': 'test_send', 'success': True}, msg)
+
+    def test_METHOD_hello__advertises_wire_versions(self):
+        sent = []
+
+        async def send_request(msg_obj, timeout, attempts):
+            sent.append(msg_obj)
+            return None
+
+        self.peer.send_request = send_request
+        self.await_sending_request(process=self.peer.hello)
+
+        self.assertIn(WIRE_VERSION, sent[0].get('wire'))
+
+    def test_METHOD_verify_peer__agrees_wire_version_from_hello(self):
+        self.peer.setup_request()
+        self.peer.running = True
+
+        async def hello():
+            return {'success': True, 'response': ACTION_HELLO, 'latest_block_number': 1,
+                    'latest_hlc_timestamp': '1', 'wire': [WIRE_VERSION], 'compact_contenders': True,
+                    'proof_batches': True, 'request_ids': True}
+
+        self.peer.hello = hello
+        self.await_sending_request(process=self.peer.verify_peer)
+
+        self.assertTrue(self.peer.is_verified)
+        self.assertEqual(WIRE_VERSION, self.peer.wire_version)
+        self.assertTrue(self.peer.compact_contenders)
+        self.assertTrue(self.peer.proof_batches)
+        self.assertTrue(self.peer.request.multiplex)
+
+    def test_METHOD_verify_peer__stays_on_json_with_peers_that_dont_advertise_wire_versions(self):
+        self.peer.setup_request()
+        self.peer.running = True
+
+        self.await_sending_request(process=self.peer.verify_peer)
+
+        self.assertTrue(self.peer.is_verified)
+        self.assertIsNone(self.peer.wire_version)
+        self.assertFalse(self.peer.compact_contenders)
+        self.assertFalse(self.peer.proof_batches)
+        self.assertFalse(self.peer.request.multiplex)
+
+    def test_METHOD_get_blocks_range__returns_blocks_from_payload(self):
+        blocks = [{'number': 2}, {'number': 1}]
+        sent = []
+
+        async def send_request(msg_obj, timeout, attempts):
+            sent.append(msg_obj)
+            return {
+                'response': ACTION_GET_BLOCKS_RANGE,
+                'parts': [encode_range_payload([json.dumps(block) for block in blocks])]
+            }
+
+        self.peer.send_request = send_request
+        res = self.await_sending_request(process=self.peer.get_blocks_range, args={'end_block_num': 2, 'reverse': True})
+
+        self.assertEqual(blocks, res)
+        self.assertEqual(2, sent[0].get('end_block_num'))
+        self.assertTrue(sent[0].get('reverse'))
+
+    def test_METHOD_get_blocks_range__returns_NONE_if_reply_has_no_payload(self):
+        async def send_request(msg_obj, timeout, attempts):
+            return {'response': ACTION_GET_BLOCKS_RANGE}
+
+        self.peer.send_request = send_request
+        res = self.await_sending_request(process=self.peer.get_blocks_range, args={})
+
+        self.assertIsNone(res)
+
+    def test_METHOD_get_blocks_range__returns_NONE_if_peer_refuses_request(self):
+        async def send_request(msg_obj, timeout, attempts):
+            return {'response': ACTION_GET_BLOCKS_RANGE, 'error': 'Malformed range request.'}
+
+        self.peer.send_request = send_request
+        res = self.await_sending_request(process=self.peer.get_blocks_range, args={})
+
+        self.assertIsNone(res)
+
+    def test_decode_range_payload__raises_if_payload_inflates_past_max_bytes(self):
+        payload = encode_range_payload([json.dumps('a' * 1000)])
+
+        with self.assertRaises(ValueError):
+            decode_range_payload(payload=payload, max_bytes=100)
+
     def test_METHOD_reconnect_loop__loops_until_peer_is_available(self):
         self.peer.setup_request()
         self.peer.timeouts['ping'] = 5000
         self.peer.running = True
 
-        def send_string_disabled(str_msg: str):
+        def send_string_disabled(str_msg: str, request_id: bytes = b''):
             pass
 
         send_string_proper = self.peer.request.send_string
@@ -497,4 +497,76 @@ class TestProcessingQueue(TestCase):
             processing_results = loop.run_until_complete(self.main_processing_queue.process_next())
             tx_result = processing_results.get('tx_result')
             self.assertGreater(len(tx_result['state']), 0)
-            self.driver.soft_apply(tx.get('hlc_timestamp'))
\ No newline at end of file
+            self.driver.soft_apply(tx.get('hlc_timestamp'))
+
+    def test_METHOD_append__out_of_order_hlcs_are_processed_in_order(self):
+        hlcs = [str(i) for i in range(10)]
+        random.shuffle(hlcs)
+
+        for hlc in hlcs:
+            self.main_processing_queue.append(tx=self.make_tx_message(tx=get_new_tx(), hlc=hlc))
+
+        popped = [self.main_processing_queue.pop()['hlc_timestamp'] for i in range(10)]
+
+        self.assertListEqual([str(i) for i in range(10)], popped)
+        self.assertEqual(0, len(self.main_processing_queue))
+        self.assertFalse(self.main_processing_queue.hlc_already_in_queue(hlc_timestamp='0'))
+
+    def test_METHOD_append__ignores_duplicate_hlc(self):
+        tx = self.make_tx_message(tx=get_new_tx(), hlc='1')
+
+        self.main_processing_queue.append(tx=tx)
+        self.main_processing_queue.append(tx=dict(tx))
+
+        self.assertEqual(1, len(self.main_processing_queue))
+
+    def test_METHOD_flush__clears_queued_hlcs(self):
+        self.main_processing_queue.append(tx=self.make_tx_message(tx=get_new_tx(), hlc='1'))
+        self.main_processing_queue.flush()
+
+        self.assertFalse(self.main_processing_queue.hlc_already_in_queue(hlc_timestamp='1'))
+
+    def test_append_and_filter_speed(self):
+        num_of_transactions = 10_000
+        tx = get_new_tx()
+
+        hlcs = [f'{i:010d}' for i in range(num_of_transactions)]
+        random.shuffle(hlcs)
+
+        start = time.time()
+        for hlc in hlcs:
+            self.main_processing_queue.append(tx={'tx': tx, 'hlc_timestamp': hlc})
+        append_time = time.time() - start
+
+        self.last_hlc_in_consensus = f'{num_of_transactions // 2:010d}'
+
+        start = time.time()
+        self.main_processing_queue.filter_queue()
+        remaining = len(self.main_processing_queue)
+        drained = [self.main_processing_queue.pop()['hlc_timestamp'] for i in range(remaining)]
+        drain_time = time.time() - start
+
+        self.assertListEqual(sorted(hlcs)[num_of_transactions // 2 + 1:], drained)
+
+        # The old sorted list re-sorted and scanned the whole queue on every append, O(n^2) overall.
+        self.assertLess(append_time, 5)
+        self.assertLess(drain_time, 5)
+
+    def test_METHOD_process_next__held_tx_wakes_queue_when_hold_time_is_up(self):
+        self.main_processing_queue.append(tx=self.make_tx_message(get_new_tx()))
+        hold_time = self.processing_delay_secs['base'] + self.processing_delay_secs['self']
+
+        async def process_and_wait():
+            await self.main_processing_queue.wait_until_ready(timeout=0)
+            await self.main_processing_queue.process_next()
+
+            start = time.time()
+            ready = await self.main_processing_queue.wait_until_ready(timeout=hold_time + 5)
+            return ready, time.time() - start
+
+        loop = asyncio.get_event_loop()
+        ready, waited = loop.run_until_complete(process_and_wait())
+
+        self.assertTrue(ready)
+        self.assertLess(waited, hold_time + 1)
+        self.assertEqual(1, len(self.main_processing_queue))
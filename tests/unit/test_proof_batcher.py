@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from lamden.crypto.canonical import proof_batch_leaves, create_proof_batch_message, verify_merkle_tree
+from lamden.crypto.wallet import Wallet, verify
+from lamden.nodes.proof_batcher import ProofBatcher
+
+
+class TestProofBatcher(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.wallet = Wallet()
+        self.published = []
+
+        self.proof_batcher = ProofBatcher(wallet=self.wallet, publish=self.published.append, window=0.1, max_size=3)
+
+    def tearDown(self):
+        self.proof_batcher.stop()
+        self.loop.close()
+
+    def make_proof(self, i, members_list_hash='m' * 64):
+        return {
+            'signer': self.wallet.verifying_key,
+            'signature': f'{i}' * 128,
+            'members_list_hash': members_list_hash,
+            'num_of_members': 4,
+            'tx_result_hash': f'{i}' * 64
+        }
+
+    def sleep(self, delay):
+        self.loop.run_until_complete(asyncio.sleep(delay))
+
+    def test_METHOD_add__sends_first_proof_straight_away(self):
+        self.proof_batcher.add(hlc_timestamp='1', proof=self.make_proof(1))
+
+        self.assertEqual(1, len(self.published))
+
+        batch = self.published[0]['batch']
+        self.assertEqual([{'hlc_timestamp': '1', 'tx_result_hash': '1' * 64, 'signature': '1' * 128}], batch['solutions'])
+        self.assertTrue(verify_merkle_tree(proof_batch_leaves(solutions=batch['solutions']), batch['root']))
+        self.assertTrue(verify(
+            vk=self.wallet.verifying_key,
+            msg=create_proof_batch_message(root=batch['root'], members_list_hash='m' * 64, num_of_members=4),
+            signature=batch['signature']
+        ))
+
+    def test_METHOD_add__holds_proofs_back_until_window_closes(self):
+        self.proof_batcher.add(hlc_timestamp='1', proof=self.make_proof(1))
+        self.proof_batcher.add(hlc_timestamp='2', proof=self.make_proof(2))
+        self.proof_batcher.add(hlc_timestamp='3', proof=self.make_proof(3))
+
+        self.assertEqual(1, len(self.published))
+
+        self.sleep(0.2)
+
+        self.assertEqual(2, len(self.published))
+        self.assertEqual(['2', '3'], [s['hlc_timestamp'] for s in self.published[1]['batch']['solutions']])
+
+    def test_METHOD_add__sends_full_batch_without_waiting(self):
+        for i in range(4):
+            self.proof_batcher.add(hlc_timestamp=f'{i}', proof=self.make_proof(i))
+
+        self.assertEqual(2, len(self.published))
+        self.assertEqual(3, len(self.published[1]['batch']['solutions']))
+
+    def test_METHOD_add__sends_pending_proofs_when_members_change(self):
+        self.proof_batcher.add(hlc_timestamp='1', proof=self.make_proof(1))
+        self.proof_batcher.add(hlc_timestamp='2', proof=self.make_proof(2))
+        self.proof_batcher.add(hlc_timestamp='3', proof=self.make_proof(3, members_list_hash='n' * 64))
+
+        self.assertEqual(2, len(self.published))
+        self.assertEqual('m' * 64, self.published[1]['batch']['members_list_hash'])
+
+        self.sleep(0.2)
+
+        self.assertEqual(3, len(self.published))
+        self.assertEqual('n' * 64, self.published[2]['batch']['members_list_hash'])
+
+    def test_METHOD_stop__sends_pending_proofs(self):
+        self.proof_batcher.add(hlc_timestamp='1', proof=self.make_proof(1))
+        self.proof_batcher.add(hlc_timestamp='2', proof=self.make_proof(2))
+
+        self.proof_batcher.stop()
+
+        self.assertEqual(2, len(self.published))
+        self.assertIsNone(self.proof_batcher.window_timer)
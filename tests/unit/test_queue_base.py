@@ -2,6 +2,7 @@ from unittest import TestCase
 from lamden.nodes.queue_base import ProcessingQueue
 
 import time
+import threading
 import asyncio
 
 class TestProcessingQueue(TestCase):
@@ -136,3 +137,87 @@ class TestProcessingQueue(TestCase):
         self.assertFalse(self.processing_queue.allow_append)
         self.processing_queue.enable_append()
         self.assertTrue(self.processing_queue.allow_append)
+
+    def test_METHOD_wait_until_ready__wakes_on_append(self):
+        loop = asyncio.new_event_loop()
+
+        async def append_later():
+            await asyncio.sleep(0.05)
+            self.processing_queue.append("testing")
+
+        async def wait():
+            self.processing_queue.notify()
+            start = time.time()
+            ready, _ = await asyncio.gather(self.processing_queue.wait_until_ready(timeout=5), append_later())
+            return ready, time.time() - start
+
+        ready, waited = loop.run_until_complete(wait())
+        loop.close()
+
+        self.assertTrue(ready)
+        self.assertLess(waited, 1)
+
+    def test_METHOD_wait_until_ready__returns_False_after_timeout(self):
+        loop = asyncio.new_event_loop()
+        ready = loop.run_until_complete(self.processing_queue.wait_until_ready(timeout=0.05))
+        loop.close()
+
+        self.assertFalse(ready)
+
+    def test_METHOD_wait_until_ready__returns_right_away_if_notified_while_busy(self):
+        loop = asyncio.new_event_loop()
+
+        async def wait():
+            await self.processing_queue.wait_until_ready(timeout=0)
+            self.processing_queue.notify()
+            return await self.processing_queue.wait_until_ready(timeout=0)
+
+        ready = loop.run_until_complete(wait())
+        loop.close()
+
+        self.assertTrue(ready)
+
+    def test_METHOD_notify_in__wakes_after_delay(self):
+        loop = asyncio.new_event_loop()
+
+        async def wait():
+            await self.processing_queue.wait_until_ready(timeout=0)
+            self.processing_queue.notify_in(delay=0.1)
+            self.processing_queue.notify_in(delay=10)
+
+            start = time.time()
+            ready = await self.processing_queue.wait_until_ready(timeout=5)
+            return ready, time.time() - start
+
+        ready, waited = loop.run_until_complete(wait())
+        loop.close()
+
+        self.assertTrue(ready)
+        self.assertGreaterEqual(waited, 0.09)
+        self.assertLess(waited, 1)
+
+    def test_METHOD_notify__wakes_from_another_thread(self):
+        loop = asyncio.new_event_loop()
+
+        async def wait():
+            await self.processing_queue.wait_until_ready(timeout=0)
+            threading.Timer(0.05, self.processing_queue.notify).start()
+            return await self.processing_queue.wait_until_ready(timeout=5)
+
+        ready = loop.run_until_complete(wait())
+        loop.close()
+
+        self.assertTrue(ready)
+
+    def test_METHOD_stop__wakes_waiting_loop(self):
+        loop = asyncio.new_event_loop()
+
+        async def wait():
+            await self.processing_queue.wait_until_ready(timeout=0)
+            loop.call_later(0.05, self.processing_queue.stop)
+            return await self.processing_queue.wait_until_ready(timeout=5)
+
+        ready = loop.run_until_complete(wait())
+        loop.close()
+
+        self.assertTrue(ready)
@@ -405,7 +405,7 @@ class TestRequestSocket(unittest.TestCase):
         self.request.create_socket()
         self.request.connect_socket()
         with self.assertRaises(TypeError):
-            self.request.send_string(str_msg=self.ping_msg.encode('UTF-8'))
+            self.request.send_string(str_msg={"action": "ping"})
 
     def test_METHOD_socket_is_bound__ret_TRUE(self):
         self.create_request()
@@ -494,6 +494,63 @@ class TestRequestSocket(unittest.TestCase):
         passed = all([int(result.response.decode('UTF-8')) == index for index, result in enumerate(task_results) ])
         self.assertTrue(passed)
 
+    def test_METHOD_send__uses_plain_framing_until_peer_takes_request_ids(self):
+        # a Router from before request ids unpacks exactly [ident, b'', msg] and replies [ident, b'', response]
+        router = self.ctx.socket(zmq.ROUTER)
+        router.bind(self.peer_address)
+
+        async def legacy_router():
+            frames = await router.recv_multipart()
+            ident, empty, msg = frames
+            await router.send_multipart([ident, b'', msg])
+            return frames
+
+        self.create_request()
+        self.request.start()
+
+        router_task = asyncio.ensure_future(legacy_router())
+        res = self.await_async_process(process=self.request.send, args={'str_msg': "LEGACY", 'attempts': 1})[0]
+
+        loop = asyncio.get_event_loop()
+        frames = loop.run_until_complete(router_task)
+        router.close(linger=0)
+
+        self.assertEqual(3, len(frames))
+        self.assertTrue(res.success)
+        self.assertEqual("LEGACY", res.response.decode('UTF-8'))
+
+    def test_METHOD_send__multiplexed_requests_get_their_own_replies(self):
+        self.start_peer()
+        self.create_request()
+        self.request.start()
+        self.request.multiplex = True
+
+        task_list = [
+            asyncio.ensure_future(self.request.send(str_msg=f"{i}", timeout=2000, attempts=1)) for i in range(20)
+        ]
+
+        loop = asyncio.get_event_loop()
+        task_results = loop.run_until_complete(asyncio.gather(*task_list))
+
+        self.assertEqual([str(i) for i in range(20)], [result.response.decode('UTF-8') for result in task_results])
+
+    def test_METHOD_send__timed_out_request_does_not_hold_up_the_others(self):
+        self.create_request()
+        self.request.start()
+
+        # the peer only comes up after the first request has already timed out
+        first = asyncio.ensure_future(self.request.send(str_msg="FIRST", timeout=100, attempts=1))
+        loop = asyncio.get_event_loop()
+        first_result = loop.run_until_complete(first)
+
+        self.start_peer()
+        res = self.await_async_process(process=self.request.send, args={'str_msg': "SECOND", 'timeout': 2000, 'attempts': 1})[0]
+
+        self.assertFalse(first_result.success)
+        self.assertTrue(res.success)
+        self.assertEqual("SECOND", res.response.decode('UTF-8'))
+        self.assertEqual(0, len(self.request.pending))
+
     def test_METHOD_send__can_send_multiple_SECURE_requests_to_router_and_get_responses_back(self):
         self.start_secure_peer()
         self.create_secure_request()
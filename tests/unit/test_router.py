@@ -7,6 +7,7 @@ from lamden.sockets.router import Router, EXCEPTION_IDENT_VK_BYTES_NOT_BYTES, EX
 from lamden.crypto.wallet import Wallet
 
 from tests.unit.helpers.mock_request import MockRequest
+from lamden.sockets.request import Request
 from tests.unit.helpers.mock_reply import MockReply
 from contracting.db.encoder import encode
 
@@ -32,6 +33,7 @@ class TestRouter(unittest.TestCase):
         self.request = None
 
         self.callback_data = None
+        self.callback_request_id = None
 
         self.all_peers = list([])
 
@@ -56,8 +58,9 @@ class TestRouter(unittest.TestCase):
     def get_all_peers(self):
         return self.all_peers
 
-    async def get_data(self, ident_vk_bytes, ident_vk_string, msg=None):
+    async def get_data(self, ident_vk_bytes, ident_vk_string, msg=None, request_id=None):
         self.callback_data = (ident_vk_bytes, ident_vk_string, msg)
+        self.callback_request_id = request_id
 
     def create_router(self):
         self.router = Router(
@@ -603,6 +606,60 @@ class TestRouter(unittest.TestCase):
         self.assertTrue(result.success)
         self.assertEqual(msg_str.encode('UTF-8'), result.response)
 
+    def test_METHOD_send_multipart_msg__sends_parts_after_msg(self):
+        self.start_secure_router()
+        self.create_secure_request()
+        self.async_sleep(1)
+
+        loop = asyncio.get_event_loop()
+
+        to_address = 'tcp://127.0.0.1:19000'
+        task = asyncio.ensure_future(self.request.send(to_address=to_address, msg_str="Testing", timeout_ms=1000))
+
+        while self.callback_data is None:
+            loop.run_until_complete(asyncio.sleep(0.1))
+
+        msg_str = "Test_Test"
+        ident_vk_bytes=json.dumps(self.request_wallet.verifying_key).encode('utf-8')
+
+        self.router.send_multipart_msg(ident_vk_bytes=ident_vk_bytes, to_vk=self.request_wallet.verifying_key,
+                                       msg_str=msg_str, parts=[b'\x00\x01'])
+
+        while not task.done():
+            self.async_sleep(0.1)
+
+        result = loop.run_until_complete(task)
+
+        self.assertTrue(result.success)
+        self.assertEqual(msg_str.encode('UTF-8'), result.response)
+        self.assertEqual([b'\x00\x01'], result.parts)
+
+    def test_METHOD_send_msg__echoes_request_id_so_replies_can_come_back_out_of_order(self):
+        self.start_secure_router()
+
+        async def reply_slowest_first(ident_vk_bytes, ident_vk_string, msg, request_id=None):
+            await asyncio.sleep(0.5 - int(msg) * 0.1)
+            self.router.send_msg(ident_vk_bytes=ident_vk_bytes, to_vk=ident_vk_string, msg_str=msg.decode(),
+                                 request_id=request_id)
+
+        self.router.message_callback = reply_slowest_first
+
+        request = Request(
+            to_address='tcp://127.0.0.1:19000',
+            server_curve_vk=self.router_wallet.curve_vk,
+            local_wallet=self.request_wallet,
+            ctx=self.ctx
+        )
+        request.start()
+
+        loop = asyncio.get_event_loop()
+        results = loop.run_until_complete(asyncio.gather(*[
+            request.send(str_msg=str(i), timeout=2000, attempts=1) for i in range(5)
+        ]))
+        loop.run_until_complete(request.stop())
+
+        self.assertEqual([str(i).encode() for i in range(5)], [result.response for result in results])
+
     def test_METHOD_send_msg__Handle_host_unreachable(self):
         self.start_secure_router()
         self.create_secure_request()
@@ -1,12 +1,14 @@
 from lamden.nodes.hlc import HLC_Clock
 from lamden.utils import hlc
-from lamden.storage import BlockStorage, NonceStorage, FSBlockDriver, FSHashStorageDriver, FSMemberHistory
+from lamden.storage import BlockStorage, NonceStorage, FSBlockDriver, FSHashStorageDriver, FSMemberHistory, FSStateHistory, SegmentLogBlockDriver, BlockCache, BlockCodec, StateHistoryUnavailable, MAX_BLOCK
+from lamden.block_index import BlockIndex, ChainMetadata
 from tests.unit.helpers.mock_blocks import generate_blocks, GENESIS_BLOCK
 from unittest import TestCase
 from lamden.crypto.wallet import Wallet
+from lamden.crypto.canonical import create_hash_512
 
 from pathlib import Path
-import os, copy, time, random, shutil, json
+import os, copy, time, random, shutil, json, tempfile
 
 
 class TestNonce(TestCase):
@@ -459,6 +461,684 @@ class TestBlockStorage(TestCase):
         self.assertEqual(block_num, data.get('number'))
         self.assertEqual(members_list, data.get('members_list'))
 
+    def test_METHOD_store_blocks__stores_all_blocks_and_clears_marker(self):
+        blocks = generate_blocks(
+            number_of_blocks=5,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        for block in blocks:
+            self.assertDictEqual(block, self.bs.get_block(block.get('number')))
+
+        self.assertFalse(self.bs.write_batch_marker.exists())
+
+    def test_METHOD_write_batch__marker_lists_blocks_until_commit(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        with self.bs.write_batch():
+            for block in blocks:
+                self.bs.store_block(copy.deepcopy(block))
+
+            with open(self.bs.write_batch_marker) as f:
+                marked = f.read().split()
+
+            self.assertEqual([block.get('number') for block in blocks], marked)
+
+        self.assertFalse(self.bs.write_batch_marker.exists())
+
+    def test_METHOD_write_batch__nested_batches_join_the_outer_batch(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        with self.bs.write_batch():
+            self.bs.store_blocks([copy.deepcopy(blocks[0])])
+            self.assertTrue(self.bs.write_batch_marker.exists())
+
+            self.bs.store_block(copy.deepcopy(blocks[1]))
+
+        self.assertFalse(self.bs.write_batch_marker.exists())
+        self.assertEqual(2, self.bs.total_blocks())
+
+    def test_INSTANCE_init__removes_incomplete_blocks_from_uncommitted_batch(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        self.bs.begin_write_batch(block_numbers=[block.get('number') for block in blocks])
+        for block in blocks:
+            self.bs.store_block(copy.deepcopy(block))
+
+        # Simulate a crash before the second block's tx made it to disk
+        self.bs.tx_driver.delete_file(hash_str=blocks[1]['processed']['hash'])
+
+        bs = BlockStorage(root=str(self.temp_storage_dir))
+
+        self.assertEqual([blocks[1].get('number')], bs.incomplete_batch_blocks)
+        self.assertTrue(bs.block_exists(block_num=blocks[0].get('number')))
+        self.assertFalse(bs.block_exists(block_num=blocks[1].get('number')))
+        self.assertFalse(bs.write_batch_marker.exists())
+
+    def test_INSTANCE_init__read_only_leaves_open_batch_of_writer_alone(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        self.bs.begin_write_batch(block_numbers=[block.get('number') for block in blocks])
+        self.bs.store_block(copy.deepcopy(blocks[0]))
+
+        bs = BlockStorage(root=str(self.temp_storage_dir), read_only=True)
+
+        self.assertEqual([], bs.incomplete_batch_blocks)
+        self.assertTrue(bs.block_exists(block_num=blocks[0].get('number')))
+        self.assertTrue(self.bs.write_batch_marker.exists())
+
+        self.bs.store_block(copy.deepcopy(blocks[1]))
+        self.bs.commit_write_batch()
+
+        self.assertEqual(blocks[1].get('number'), bs.get_latest_block().get('number'))
+
+    def test_METHOD_write_batch__removes_incomplete_blocks_if_batch_raises(self):
+        blocks = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        block = blocks[0]
+
+        with self.assertRaises(ValueError):
+            with self.bs.write_batch():
+                self.bs.store_block(copy.deepcopy(block))
+                self.bs.tx_driver.delete_file(hash_str=block['processed']['hash'])
+                raise ValueError('write failed')
+
+        self.assertFalse(self.bs.block_exists(block_num=block.get('number')))
+        self.assertFalse(self.bs.write_batch_marker.exists())
+
+    def test_METHOD_get_block__served_from_cache_after_store(self):
+        block = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )[0]
+
+        self.bs.store_block(copy.deepcopy(block))
+
+        self.assertDictEqual(block, self.bs.get_block(block.get('number')))
+        self.assertDictEqual(block, self.bs.get_block(block.get('hash')))
+        self.assertEqual(2, self.bs.block_cache.hits)
+
+    def test_METHOD_get_block__cached_block_can_be_mutated_by_caller(self):
+        block = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )[0]
+
+        self.bs.store_block(copy.deepcopy(block))
+
+        self.bs.get_block(block.get('number'))['hash'] = 'changed'
+
+        self.assertEqual(block.get('hash'), self.bs.get_block(block.get('number')).get('hash'))
+
+    def test_METHOD_remove_block__invalidates_cache(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+
+        for block in blocks:
+            self.bs.store_block(copy.deepcopy(block))
+
+        self.bs.remove_block(blocks[1].get('number'))
+
+        self.assertIsNone(self.bs.get_block(blocks[1].get('number')))
+        self.assertIsNone(self.bs.get_block(blocks[1].get('hash')))
+        self.assertDictEqual(blocks[0], self.bs.get_latest_block())
+
+    def test_METHOD_store_block__replaces_cached_block(self):
+        block = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )[0]
+
+        self.bs.store_block(copy.deepcopy(block))
+        old_hash = block.get('hash')
+
+        block['hash'] = 'a' * 64
+        self.bs.store_block(copy.deepcopy(block))
+
+        self.assertEqual('a' * 64, self.bs.get_block(block.get('number')).get('hash'))
+        self.assertIsNone(self.bs.block_cache.get_by_hash(old_hash))
+
+    def test_METHOD_get_block__drops_cached_blocks_another_instance_replaced(self):
+        reader = BlockStorage(root=str(self.temp_storage_dir), read_only=True)
+
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        old_hash = blocks[1].get('hash')
+        self.assertEqual(old_hash, reader.get_block(blocks[1].get('number')).get('hash'))
+        self.assertEqual(old_hash, reader.get_block(old_hash).get('hash'))
+
+        self.bs.remove_block(v=blocks[1].get('number'))
+        blocks[1]['hash'] = 'a' * 64
+        self.bs.store_block(copy.deepcopy(blocks[1]))
+
+        self.assertEqual('a' * 64, reader.get_block(blocks[1].get('number')).get('hash'))
+        self.assertIsNone(reader.get_block(old_hash))
+
+    def test_METHOD_get_block__clears_cache_when_another_instance_starts_a_new_journal(self):
+        reader = BlockStorage(root=str(self.temp_storage_dir), read_only=True)
+
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        reader.get_block(blocks[0].get('number'))
+        self.assertEqual(1, len(reader.block_cache))
+
+        self.bs.block_driver.build_index()
+        reader.get_block(blocks[1].get('number'))
+
+        self.assertEqual(1, len(reader.block_cache))
+        self.assertIsNone(reader.block_cache.get(blocks[0].get('number')))
+
+    def test_METHOD_get_block__reads_from_disk_when_not_cached(self):
+        block = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )[0]
+
+        self.bs.store_block(copy.deepcopy(block))
+        self.bs.block_cache.clear()
+
+        self.assertDictEqual(block, self.bs.get_block(block.get('number')))
+        self.assertEqual(1, self.bs.block_cache.misses)
+        self.assertEqual(1, len(self.bs.block_cache))
+
+    def test_METHOD_get_blocks_range__yields_blocks_in_order(self):
+        blocks = generate_blocks(
+            number_of_blocks=10,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        self.assertEqual(blocks, list(self.bs.get_blocks_range()))
+        self.assertEqual(blocks, list(self.bs.get_blocks_range(prefetch=3)))
+        self.assertEqual(list(reversed(blocks)), list(self.bs.get_blocks_range(reverse=True, prefetch=3)))
+
+    def test_METHOD_get_blocks_range__honours_bounds_and_limit(self):
+        blocks = generate_blocks(
+            number_of_blocks=10,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        start = int(blocks[2].get('number'))
+        end = int(blocks[6].get('number'))
+
+        self.assertEqual(blocks[2:7], list(self.bs.get_blocks_range(start=start, end=end)))
+        self.assertEqual(blocks[2:4], list(self.bs.get_blocks_range(start=start, end=end, limit=2)))
+        self.assertEqual([blocks[6], blocks[5]], list(self.bs.get_blocks_range(start=start, end=end, limit=2, reverse=True)))
+        self.assertEqual(blocks[3:], list(self.bs.get_blocks_range(start=start + 1)))
+
+    def test_METHOD_get_blocks_range__does_not_fill_block_cache(self):
+        blocks = generate_blocks(
+            number_of_blocks=5,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        self.bs.block_cache.clear()
+
+        list(self.bs.get_blocks_range(prefetch=2))
+
+        self.assertEqual(0, len(self.bs.block_cache))
+
+    def test_METHOD_get_blocks_range__does_not_count_towards_cache_hit_rate(self):
+        blocks = generate_blocks(
+            number_of_blocks=5,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        self.bs.block_cache.clear()
+        self.bs.get_block(blocks[0].get('number'))
+
+        self.assertEqual(blocks, list(self.bs.get_blocks_range()))
+        self.assertEqual(blocks, list(self.bs.get_blocks_range(prefetch=2)))
+
+        self.assertEqual(0, self.bs.block_cache.hits)
+        self.assertEqual(1, self.bs.block_cache.misses)
+
+    def test_METHOD_store_block__compressed_storage_reads_back_blocks_and_txs(self):
+        bs = BlockStorage(root=str(self.temp_storage_dir), compression='zlib')
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        bs.store_blocks(copy.deepcopy(blocks))
+        bs.block_cache.clear()
+
+        block_path = bs.block_driver.get_file_path(block_num=blocks[0].get('number').zfill(64))
+        with open(block_path, 'rb') as f:
+            self.assertTrue(BlockCodec.is_compressed(f.read()))
+
+        for block in blocks:
+            self.assertDictEqual(block, bs.get_block(block.get('number')))
+            self.assertDictEqual(block, bs.get_block(block.get('hash')))
+            self.assertDictEqual(block.get('processed'), bs.get_tx(block['processed'].get('hash')))
+
+    def test_METHOD_get_previous_state_value__returns_value_from_previous_change(self):
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        blocks[0]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 1}]
+        blocks[1]['processed']['state'] = [{'key': 'other', 'value': 'x'}]
+        blocks[2]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 2}]
+        blocks[2]['rewards'] = [{'key': 'currency.balances:jeff', 'value': 3}]
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        key = 'currency.balances:jeff'
+        self.assertIsNone(self.bs.get_previous_state_value(key=key, block_num=blocks[0].get('number')))
+        self.assertEqual(1, self.bs.get_previous_state_value(key=key, block_num=blocks[2].get('number')))
+        self.assertEqual(3, self.bs.get_previous_state_value(key=key, block_num=MAX_BLOCK))
+
+    def test_METHOD_get_states_at__answers_point_in_time_queries_without_reading_blocks(self):
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        blocks[0]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': 1}]
+        blocks[2]['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': {'__fixed__': '2.5'}}]
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        self.bs.block_cache.clear()
+
+        block_nums = [block.get('number') for block in blocks]
+        states = self.bs.get_states_at(queries=[
+            ('currency.balances:jeff', int(block_nums[0]) - 1),
+            ('currency.balances:jeff', block_nums[1]),
+            ('currency.balances:jeff', block_nums[2]),
+        ])
+
+        self.assertEqual([None, 1, {'__fixed__': '2.5'}], [state.get('value') for state in states])
+        self.assertEqual([None, block_nums[0], block_nums[2]], [state.get('changed_at') for state in states])
+        self.assertEqual(0, self.bs.block_cache.misses)
+
+    def test_METHOD_get_state_at__falls_back_to_block_for_unindexed_values(self):
+        blocks = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        self.bs.state_history.remove_state_changes(keys=['lets'], block_num=blocks[0].get('number'))
+        self.bs.state_history.save_state_change(key='lets', block_num=blocks[0].get('number'))
+
+        self.assertEqual('go', self.bs.get_state_at(key='lets', block_num=blocks[0].get('number')))
+
+    def test_METHOD_get_contract_changes__returns_changes_in_range(self):
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        for index, block in enumerate(blocks):
+            block['processed']['state'] = [
+                {'key': 'currency.balances:jeff', 'value': index},
+                {'key': 'con_other.x', 'value': index}
+            ]
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        changes = self.bs.get_contract_changes(
+            contract='currency',
+            start=int(blocks[1].get('number')),
+            end=int(blocks[2].get('number'))
+        )
+
+        self.assertEqual([
+            {'block_num': blocks[1].get('number'), 'key': 'currency.balances:jeff', 'value': 1},
+            {'block_num': blocks[2].get('number'), 'key': 'currency.balances:jeff', 'value': 2},
+        ], changes)
+
+    def test_METHOD_rebuild_state_history__rebuilds_from_stored_blocks(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        shutil.rmtree(self.bs.state_history_dir)
+
+        self.bs.rebuild_state_history()
+
+        self.assertEqual([int(block.get('number')) for block in blocks], self.bs.state_history.get_history(key='lets'))
+        self.assertEqual('jays', self.bs.get_state_at(key='blue', block_num=MAX_BLOCK))
+
+    def test_METHOD_deferred_state_history__records_blocks_stored_newest_first_in_order(self):
+        blocks = generate_blocks(
+            number_of_blocks=20,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        for index, block in enumerate(blocks):
+            block['processed']['state'] = [{'key': 'currency.balances:jeff', 'value': index}]
+
+        rewrites = []
+        write_entries = self.bs.state_history._write_entries
+
+        def counting_write_entries(path, entries):
+            rewrites.append(path)
+            write_entries(path=path, entries=entries)
+
+        self.bs.state_history._write_entries = counting_write_entries
+
+        with self.bs.deferred_state_history():
+            for block in reversed(blocks):
+                self.bs.store_block(copy.deepcopy(block))
+
+            self.assertEqual([], self.bs.state_history.get_history(key='currency.balances:jeff'))
+
+        block_nums = [int(block.get('number')) for block in blocks]
+        self.assertEqual(block_nums, self.bs.state_history.get_history(key='currency.balances:jeff'))
+        self.assertEqual(
+            list(range(20)),
+            [self.bs.get_state_at(key='currency.balances:jeff', block_num=block_num) for block_num in block_nums]
+        )
+        self.assertEqual([], rewrites)
+        self.assertFalse(self.bs.state_history_marker.exists())
+
+    def test_INSTANCE_init__records_state_history_left_deferred(self):
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.begin_deferred_state_history()
+        for block in reversed(blocks):
+            self.bs.store_block(copy.deepcopy(block))
+
+        bs = BlockStorage(root=str(self.temp_storage_dir))
+
+        self.assertEqual([int(block.get('number')) for block in blocks], bs.state_history.get_history(key='lets'))
+        self.assertFalse(bs.state_history_marker.exists())
+
+    def test_METHOD_get_states_at__raises_until_state_history_covers_the_chain(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_block(copy.deepcopy(blocks[0]))
+        # as left by a store written before the state history was kept
+        shutil.rmtree(self.bs.state_history_dir)
+        os.remove(self.bs.state_history_floor_path)
+
+        bs = BlockStorage(root=str(self.temp_storage_dir))
+        bs.store_block(copy.deepcopy(blocks[1]))
+
+        floor = int(blocks[0].get('number')) + 1
+        self.assertEqual(floor, bs.state_history_floor())
+        with self.assertRaises(StateHistoryUnavailable):
+            bs.get_states_at(queries=[('lets', blocks[0].get('number'))])
+        # blocks[1] changed it, that answer is complete
+        self.assertEqual('go', bs.get_state_at(key='lets', block_num=blocks[1].get('number')))
+
+        bs.rebuild_state_history()
+
+        self.assertEqual(0, bs.state_history_floor())
+        self.assertEqual('go', bs.get_states_at(queries=[('lets', blocks[0].get('number'))])[0].get('value'))
+
+    def test_METHOD_remove_block__removes_block_from_state_history(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        self.bs.remove_block(v=blocks[1].get('number'))
+
+        self.assertEqual([int(blocks[0].get('number'))], self.bs.state_history.get_history(key='lets'))
+
+    def test_METHOD_get_tx_block__returns_enclosing_block_metadata(self):
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        for block in blocks:
+            tx_hash = block['processed'].get('hash')
+
+            self.assertEqual(int(block.get('number')), self.bs.get_tx_block_num(tx_hash))
+            self.assertDictEqual({
+                'number': block.get('number'),
+                'hash': block.get('hash'),
+                'hlc_timestamp': block.get('hlc_timestamp')
+            }, self.bs.get_tx_block(tx_hash))
+
+    def test_METHOD_get_tx_block__returns_None_for_unknown_tx(self):
+        self.assertIsNone(self.bs.get_tx_block('a' * 64))
+
+    def test_METHOD_remove_block__removes_tx_from_index(self):
+        blocks = generate_blocks(
+            number_of_blocks=1,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        self.bs.remove_block(v=blocks[0].get('number'))
+
+        self.assertIsNone(self.bs.get_tx_block_num(blocks[0]['processed'].get('hash')))
+
+    def test_METHOD_rebuild_tx_index__rebuilds_from_stored_blocks(self):
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks))
+        shutil.rmtree(self.bs.tx_index_dir)
+
+        self.bs.rebuild_tx_index()
+
+        for block in blocks:
+            self.assertEqual(int(block.get('number')), self.bs.get_tx_block_num(block['processed'].get('hash')))
+
+    def test_METHOD_get_latest_block__read_only_sees_blocks_stored_by_writer(self):
+        reader = BlockStorage(root=str(self.temp_storage_dir), read_only=True)
+        self.assertIsNone(reader.get_latest_block())
+
+        blocks = generate_blocks(
+            number_of_blocks=2,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_block(copy.deepcopy(GENESIS_BLOCK))
+
+        self.assertEqual('0', reader.get_latest_block().get('number'))
+
+        self.bs.store_blocks(copy.deepcopy(blocks))
+
+        self.assertEqual(blocks[-1].get('number'), reader.get_latest_block().get('number'))
+        self.assertEqual(int(blocks[-1].get('number')), reader.get_latest_block_number())
+        self.assertEqual(blocks[-1].get('hash'), reader.get_latest_block_hash())
+        self.assertEqual(3, reader.total_blocks())
+
+        self.bs.remove_block(v=blocks[-1].get('number'))
+
+        with open(ChainMetadata.path_for(self.bs.blocks_dir), 'rb') as f:
+            written = f.read()
+
+        self.assertEqual(blocks[0].get('number'), reader.get_latest_block().get('number'))
+        self.assertEqual(blocks[0].get('hash'), reader.get_latest_block_hash())
+        self.assertEqual(2, reader.total_blocks())
+
+        with open(ChainMetadata.path_for(self.bs.blocks_dir), 'rb') as f:
+            self.assertEqual(written, f.read())
+
+    def test_METHOD_get_block__reads_mixed_plain_and_compressed_files(self):
+        blocks = generate_blocks(
+            number_of_blocks=4,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=self.hlc_clock.get_new_hlc_timestamp()
+        )
+        self.bs.store_blocks(copy.deepcopy(blocks[:2]))
+
+        bs = BlockStorage(root=str(self.temp_storage_dir), compression='lzma')
+        bs.store_blocks(copy.deepcopy(blocks[2:]))
+        bs.block_cache.clear()
+
+        self.assertEqual(blocks, list(bs.get_blocks_range()))
+
+
+class TestBlockCodec(TestCase):
+    def create_block(self, number: int) -> dict:
+        return {
+            'number': str(number),
+            'hash': f'{number:064x}',
+            'hlc_timestamp': f'2023-01-01T00:00:{number % 60:02d}.000000000Z_0',
+            'processed': {'transaction': {'payload': {'contract': 'currency', 'function': 'transfer'}}},
+        }
+
+    def test_METHOD_decode__reads_plain_json(self):
+        block = self.create_block(1)
+
+        self.assertDictEqual(block, BlockCodec(compression='zlib').decode(json.dumps(block).encode()))
+
+    def test_METHOD_encode__round_trips_each_compression(self):
+        block = self.create_block(1)
+
+        for compression in BlockCodec.COMPRESSIONS:
+            codec = BlockCodec(compression=compression)
+            encoded = codec.encode(block)
+
+            self.assertEqual(compression is not None, BlockCodec.is_compressed(encoded))
+            self.assertDictEqual(block, BlockCodec().decode(encoded))
+
+    def test_METHOD_encode__round_trips_with_dictionary(self):
+        samples = [json.dumps(self.create_block(i)).encode() for i in range(50)]
+        dictionary = BlockCodec.train_dictionary(samples)
+        codec = BlockCodec(compression='zlib', dictionary=dictionary)
+
+        block = self.create_block(99)
+        encoded = codec.encode(block)
+
+        self.assertDictEqual(block, codec.decode(encoded))
+        self.assertLess(len(encoded), len(BlockCodec(compression='zlib').encode(block)))
+
+    def test_METHOD_decode__raises_ValueError_if_dictionary_not_loaded(self):
+        dictionary = BlockCodec.train_dictionary([json.dumps(self.create_block(i)).encode() for i in range(5)])
+        encoded = BlockCodec(compression='zlib', dictionary=dictionary).encode(self.create_block(1))
+
+        with self.assertRaises(ValueError):
+            BlockCodec().decode(encoded)
+
+    def test_METHOD_train_dictionary__respects_max_bytes(self):
+        samples = [json.dumps(self.create_block(i)).encode() for i in range(50)]
+
+        self.assertLessEqual(len(BlockCodec.train_dictionary(samples, max_bytes=64)), 64)
+
+    def test_INSTANCE_init__raises_ValueError_on_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            BlockCodec(compression='bz2')
+
+
+class TestBlockCache(TestCase):
+    def create_block(self, number: int, size: int = 10) -> dict:
+        return {'number': str(number), 'hash': str(number).zfill(64), 'data': 'x' * size}
+
+    def test_METHOD_put__evicts_least_recently_used_past_max_entries(self):
+        cache = BlockCache(max_entries=2)
+
+        cache.put(self.create_block(1))
+        cache.put(self.create_block(2))
+        cache.get(1)
+        cache.put(self.create_block(3))
+
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNone(cache.get(2))
+        self.assertIsNone(cache.get_by_hash(str(2).zfill(64)))
+        self.assertIsNotNone(cache.get(3))
+
+    def test_METHOD_put__evicts_past_max_bytes(self):
+        block_size = len(json.dumps(self.create_block(1, size=100)))
+        cache = BlockCache(max_entries=100, max_bytes=block_size * 2)
+
+        for number in range(5):
+            cache.put(self.create_block(number, size=100))
+
+        self.assertEqual(2, len(cache))
+        self.assertLessEqual(cache.total_bytes, block_size * 2)
+
+    def test_METHOD_stats__counts_hits_and_misses(self):
+        cache = BlockCache()
+
+        cache.put(self.create_block(1))
+        cache.get(1)
+        cache.get(2)
+
+        stats = cache.stats()
+
+        self.assertEqual(1, stats.get('hits'))
+        self.assertEqual(1, stats.get('misses'))
+        self.assertEqual(0.5, stats.get('hit_rate'))
+
+    def test_METHOD_peek__does_not_count_or_reorder(self):
+        cache = BlockCache(max_entries=2)
+
+        cache.put(self.create_block(1))
+        cache.put(self.create_block(2))
+
+        self.assertEqual('1', cache.peek(1).get('number'))
+        self.assertIsNone(cache.peek(3))
+
+        cache.put(self.create_block(3))
+
+        self.assertIsNone(cache.peek(1))
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_METHOD_put__disabled_when_max_entries_zero(self):
+        cache = BlockCache(max_entries=0)
+
+        cache.put(self.create_block(1))
+
+        self.assertEqual(0, len(cache))
+
 
 class TestFSBlockDriver(TestCase):
     def setUp(self):
@@ -794,6 +1474,237 @@ class TestFSBlockDriver(TestCase):
 
         self.assertIsNone(dir)
 
+    def test_METHOD_build_index__loads_existing_blocks_on_startup(self):
+        block_list = self.create_block_list(amount=50)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block_driver = FSBlockDriver(root=self.blocks_path)
+
+        expected = sorted([int(block.get('number')) for block in block_list])
+        self.assertEqual(expected, block_driver.find_block_nums())
+        self.assertEqual(50, block_driver.total_files)
+
+    def test_METHOD_get_latest_block_num__returns_highest_block_number(self):
+        block_list = self.create_block_list(amount=20)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        expected = max([int(block.get('number')) for block in block_list])
+        self.assertEqual(expected, self.block_driver.get_latest_block_num())
+
+    def test_METHOD_get_latest_block_num__returns_None_if_no_blocks(self):
+        self.assertIsNone(self.block_driver.get_latest_block_num())
+
+    def test_METHOD_delete_block__removes_block_from_index(self):
+        block_list = self.create_block_list(amount=3)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block_list.sort(key=lambda x: int(x.get('number')))
+        middle_block_num = block_list[1].get('number')
+
+        self.block_driver.delete_block(block_num=middle_block_num)
+
+        self.assertFalse(self.block_driver.block_exists(block_num=middle_block_num))
+        self.assertEqual(2, self.block_driver.total_files)
+
+        next_block = self.block_driver.find_next_block(block_num=block_list[0].get('number'))
+        self.assertEqual(int(block_list[2].get('number')), int(next_block.get('number')))
+
+    def test_METHOD_write_block__rewriting_a_block_does_not_duplicate_index_entry(self):
+        block_num = self.create_block_num()
+
+        self.block_driver.write_block({'number': block_num})
+        self.block_driver.write_block({'number': block_num})
+
+        self.assertEqual([int(block_num)], self.block_driver.index.block_nums)
+        self.assertEqual(1, self.block_driver.total_files)
+
+    def test_METHOD_move_block__adds_block_to_index(self):
+        block_num = self.create_block_num().zfill(64)
+        src_file = os.path.join(self.test_dir, block_num)
+
+        with open(src_file, 'w') as f:
+            f.write(json.dumps({'number': block_num}))
+
+        self.block_driver.move_block(src_file=src_file, block_num=block_num)
+
+        self.assertTrue(self.block_driver.block_exists(block_num=block_num))
+        self.assertEqual(int(block_num), int(self.block_driver.find_next_block(block_num=-1).get('number')))
+
+    def test_METHOD_find_block_nums__read_only_sees_blocks_written_and_deleted_by_writer(self):
+        reader = FSBlockDriver(root=self.blocks_path, read_only=True)
+
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list)
+        self.block_driver.delete_block(block_num=block_list[0].get('number'))
+
+        expected = sorted([int(block.get('number')) for block in block_list[1:]])
+        self.assertEqual(expected, reader.find_block_nums())
+        self.assertEqual(expected[-1], reader.get_latest_block_num())
+        self.assertEqual(4, reader.total_files)
+
+    def test_METHOD_find_block_nums__read_only_rebuilds_from_disk_when_journal_is_started_over(self):
+        reader = FSBlockDriver(root=self.blocks_path, read_only=True)
+
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list[:3])
+        self.block_driver.index.journal.rotate()
+        self.block_driver.write_blocks(block_list=block_list[3:])
+
+        expected = sorted([int(block.get('number')) for block in block_list])
+        self.assertEqual(expected, reader.find_block_nums())
+
+    def test_METHOD_find_block_nums__writer_does_not_replay_own_writes(self):
+        block_list = self.create_block_list(amount=3)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        replayed = []
+        self.block_driver.index.journal.read_changes = lambda: replayed.append(True) or []
+
+        expected = sorted([int(block.get('number')) for block in block_list])
+        self.assertEqual(expected, self.block_driver.find_block_nums())
+        self.assertEqual([], replayed)
+
+    def test_METHOD_write_block__persists_chain_metadata(self):
+        block_list = self.create_block_list(amount=10)
+        for block in block_list:
+            block['hash'] = f'{int(block.get("number")):064x}'
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block_nums = sorted([int(block.get('number')) for block in block_list])
+
+        metadata = ChainMetadata(path=ChainMetadata.path_for(self.blocks_path))
+        self.assertTrue(metadata.load())
+        self.assertEqual(10, metadata.total_blocks)
+        self.assertEqual(block_nums[0], metadata.lowest_block_num)
+        self.assertEqual(block_nums[-1], metadata.latest_block_num)
+        self.assertEqual(f'{block_nums[-1]:064x}', metadata.latest_block_hash)
+
+    def test_METHOD_delete_block__updates_chain_metadata_edges(self):
+        block_list = self.create_block_list(amount=5)
+        for block in block_list:
+            block['hash'] = f'{int(block.get("number")):064x}'
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block_nums = sorted([int(block.get('number')) for block in block_list])
+        self.block_driver.delete_block(block_num=str(block_nums[-1]))
+        self.block_driver.delete_block(block_num=str(block_nums[0]))
+
+        metadata = ChainMetadata(path=ChainMetadata.path_for(self.blocks_path))
+        metadata.load()
+        self.assertEqual(3, metadata.total_blocks)
+        self.assertEqual(block_nums[1], metadata.lowest_block_num)
+        self.assertEqual(block_nums[-2], metadata.latest_block_num)
+        self.assertEqual(f'{block_nums[-2]:064x}', metadata.latest_block_hash)
+
+    def test_INSTANCE_init__uses_chain_metadata_without_walking_blocks(self):
+        block_list = self.create_block_list(amount=20)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        walked = []
+        verify_metadata = BlockIndex._verify_metadata
+        BlockIndex._verify_metadata = lambda index: None
+        iterate_files = FSBlockDriver._iterate_files
+        FSBlockDriver._iterate_files = lambda driver, path: walked.append(path) or iter([])
+        try:
+            block_driver = FSBlockDriver(root=self.blocks_path)
+        finally:
+            BlockIndex._verify_metadata = verify_metadata
+            FSBlockDriver._iterate_files = iterate_files
+
+        self.assertEqual([], walked)
+        self.assertIsNone(block_driver.index.block_nums)
+        self.assertEqual(20, block_driver.total_files)
+
+    def test_INSTANCE_init__verifies_stale_metadata_in_background(self):
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        metadata = ChainMetadata(path=ChainMetadata.path_for(self.blocks_path))
+        metadata.load()
+        metadata.total_blocks = 500
+        metadata.latest_block_num = 1
+        metadata.save()
+
+        block_driver = FSBlockDriver(root=self.blocks_path)
+        block_driver.index.build_thread.join()
+
+        expected = max([int(block.get('number')) for block in block_list])
+        self.assertEqual(5, block_driver.total_files)
+        self.assertEqual(expected, block_driver.get_latest_block_num())
+
+        metadata.load()
+        self.assertEqual(5, metadata.total_blocks)
+        self.assertEqual(expected, metadata.latest_block_num)
+
+    def test_INSTANCE_init__read_only_reloads_stale_metadata_without_saving_it(self):
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        metadata = ChainMetadata(path=ChainMetadata.path_for(self.blocks_path))
+        metadata.load()
+        metadata.total_blocks = 500
+        metadata.latest_block_num = 1
+        metadata.save()
+
+        block_driver = FSBlockDriver(root=self.blocks_path, read_only=True)
+        block_driver.index.build_thread.join()
+
+        expected = max([int(block.get('number')) for block in block_list])
+        self.assertEqual(5, block_driver.total_files)
+        self.assertEqual(expected, block_driver.get_latest_block_num())
+
+        metadata.load()
+        self.assertEqual(500, metadata.total_blocks)
+        self.assertEqual(1, metadata.latest_block_num)
+
+    def test_METHOD_find_block_nums__read_only_never_rewrites_writers_metadata(self):
+        reader = FSBlockDriver(root=self.blocks_path, read_only=True)
+        metadata_path = ChainMetadata.path_for(self.blocks_path)
+
+        block_list = self.create_block_list(amount=6)
+        for block in block_list:
+            block['hash'] = f'{int(block.get("number")):064x}'
+
+        self.block_driver.write_blocks(block_list=block_list[:3])
+        reader.find_block_nums()
+        self.block_driver.write_blocks(block_list=block_list[3:])
+        self.block_driver.delete_block(block_num=str(self.block_driver.get_latest_block_num()))
+
+        with open(metadata_path, 'rb') as f:
+            written = f.read()
+
+        block_nums = sorted([int(block.get('number')) for block in block_list])[:-1]
+        self.assertEqual(block_nums, reader.find_block_nums())
+        self.assertEqual(f'{block_nums[-1]:064x}', reader.get_latest_block_hash())
+
+        reader.build_index()
+
+        with open(metadata_path, 'rb') as f:
+            self.assertEqual(written, f.read())
+
+    def test_INSTANCE_init__writes_during_background_verify_are_kept(self):
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list[:4])
+
+        block_driver = FSBlockDriver(root=self.blocks_path)
+        block_driver.write_block(block=block_list[4])
+        block_driver.index.build_thread.join()
+
+        expected = sorted([int(block.get('number')) for block in block_list])
+        self.assertEqual(expected, block_driver.find_block_nums())
+        self.assertEqual(5, block_driver.total_files)
+
+    def test_INSTANCE_init__ignores_metadata_if_blocks_dir_is_empty(self):
+        metadata = ChainMetadata(path=ChainMetadata.path_for(self.blocks_path))
+        metadata.total_blocks = 10
+        metadata.latest_block_num = 10
+        metadata.save()
+
+        block_driver = FSBlockDriver(root=self.blocks_path)
+
+        self.assertEqual(0, block_driver.total_files)
+        self.assertIsNone(block_driver.get_latest_block_num())
+
     def test_METHOD_delete_block__removes_a_block_file(self):
         block_num = self.create_block_num().zfill(64)
 
@@ -889,6 +1800,153 @@ class TestFSBlockDriver(TestCase):
         # Removed all the way to root
         self.assertTrue(os.path.exists(new_dir))
 
+class TestSegmentLogBlockDriver(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.blocks_path = os.path.join(self.test_dir, 'blocks')
+
+        os.makedirs(self.blocks_path)
+
+        self.block_driver = SegmentLogBlockDriver(root=self.blocks_path)
+
+    def tearDown(self):
+        self.block_driver.close()
+        shutil.rmtree(self.test_dir)
+
+    def create_block_list(self, amount):
+        block_list = set()
+
+        while len(block_list) < amount:
+            rand_int = random.randint(int(time.time()) - 2 * 365 * 24 * 60 * 60, int(time.time()))
+            block_list.add(f'{rand_int}000000000')
+
+        return [{'number': block_num, 'hash': os.urandom(32).hex()} for block_num in block_list]
+
+    def test_METHOD_write_block__can_write_and_find_a_block(self):
+        block = self.create_block_list(amount=1)[0]
+        self.block_driver.write_block(block=block)
+
+        self.assertEqual(block, self.block_driver.find_block(block_num=block.get('number')))
+        self.assertTrue(self.block_driver.block_exists(block_num=block.get('number')))
+        self.assertEqual(1, self.block_driver.total_files)
+
+    def test_METHOD_find_block_by_hash__returns_block(self):
+        block = self.create_block_list(amount=1)[0]
+        self.block_driver.write_block(block=block)
+
+        self.assertEqual(block, self.block_driver.find_block_by_hash(block_hash=block.get('hash')))
+
+    def test_METHOD_find_next_block_and_find_previous_block__walk_in_order(self):
+        block_list = self.create_block_list(amount=200)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block_list.sort(key=lambda x: int(x.get('number')))
+
+        for index in range(len(block_list) - 1):
+            next_block = self.block_driver.find_next_block(block_num=block_list[index].get('number'))
+            self.assertEqual(block_list[index + 1], next_block)
+
+            previous_block = self.block_driver.find_previous_block(block_num=block_list[index + 1].get('number'))
+            self.assertEqual(block_list[index], previous_block)
+
+        self.assertIsNone(self.block_driver.find_next_block(block_num=block_list[-1].get('number')))
+        self.assertEqual(block_list[-1], self.block_driver.find_previous_block(block_num=MAX_BLOCK))
+
+    def test_METHOD_delete_block__removes_block(self):
+        block_list = self.create_block_list(amount=3)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        block = block_list[1]
+        self.block_driver.delete_block(block_num=block.get('number'))
+
+        self.assertFalse(self.block_driver.block_exists(block_num=block.get('number')))
+        self.assertIsNone(self.block_driver.find_block(block_num=block.get('number')))
+        self.assertIsNone(self.block_driver.find_block_by_hash(block_hash=block.get('hash')))
+        self.assertEqual(2, self.block_driver.get_total_blocks())
+
+    def test_METHOD_write_block__rolls_to_new_segment_when_full(self):
+        self.block_driver.close()
+        self.block_driver = SegmentLogBlockDriver(root=self.blocks_path, segment_max_bytes=512)
+
+        block_list = self.create_block_list(amount=50)
+        self.block_driver.write_blocks(block_list=block_list)
+
+        self.assertGreater(self.block_driver.current_segment, 0)
+
+        for block in block_list:
+            self.assertEqual(block, self.block_driver.find_block(block_num=block.get('number')))
+
+    def test_INSTANCE_reopen__rebuilds_index_from_disk(self):
+        block_list = self.create_block_list(amount=20)
+        self.block_driver.write_blocks(block_list=block_list)
+        self.block_driver.delete_block(block_num=block_list[0].get('number'))
+        self.block_driver.close()
+
+        self.block_driver = SegmentLogBlockDriver(root=self.blocks_path)
+
+        self.assertEqual(19, self.block_driver.total_files)
+        self.assertFalse(self.block_driver.block_exists(block_num=block_list[0].get('number')))
+        for block in block_list[1:]:
+            self.assertEqual(block, self.block_driver.find_block(block_num=block.get('number')))
+
+    def test_INSTANCE_reopen__recovers_records_missing_from_index_and_drops_torn_record(self):
+        block_list = self.create_block_list(amount=5)
+        self.block_driver.write_blocks(block_list=block_list)
+        self.block_driver.close()
+
+        # Simulate a crash after the last two segment writes but before their index entries
+        index_path = os.path.join(self.blocks_path, SegmentLogBlockDriver.INDEX_FILENAME)
+        with open(index_path, 'r+b') as f:
+            f.truncate(3 * SegmentLogBlockDriver.INDEX_ENTRY.size)
+
+        # and a half written record at the end of the segment
+        with open(self.block_driver._segment_path(0), 'ab') as f:
+            f.write(b'\x00\x00\x01\x00garbage')
+
+        self.block_driver = SegmentLogBlockDriver(root=self.blocks_path)
+
+        self.assertEqual(5, self.block_driver.total_files)
+        for block in block_list:
+            self.assertEqual(block, self.block_driver.find_block(block_num=block.get('number')))
+
+    def test_METHOD_find_block__sees_blocks_written_by_another_instance(self):
+        reader = SegmentLogBlockDriver(root=self.blocks_path)
+
+        block = self.create_block_list(amount=1)[0]
+        self.block_driver.write_block(block=block)
+
+        self.assertEqual(block, reader.find_block(block_num=block.get('number')))
+        reader.close()
+
+    def test_BlockStorage__can_use_segment_log_driver(self):
+        storage_dir = os.path.abspath(self.test_dir)
+        self.block_driver.close()
+        self.block_driver = SegmentLogBlockDriver(root=os.path.join(storage_dir, 'blocks'))
+
+        bs = BlockStorage(root=storage_dir, block_diver=self.block_driver)
+
+        blocks = generate_blocks(
+            number_of_blocks=3,
+            prev_block_hash='0' * 64,
+            prev_block_hlc=HLC_Clock().get_new_hlc_timestamp()
+        )
+
+        for block in blocks:
+            bs.store_block(copy.deepcopy(block))
+
+        self.assertEqual(3, bs.total_blocks())
+        self.assertEqual([], os.listdir(bs.blocks_alias_dir))
+
+        by_hash = bs.get_block(blocks[1].get('hash'))
+        self.assertEqual(blocks[1].get('number'), by_hash.get('number'))
+        self.assertIsInstance(by_hash.get('processed'), dict)
+
+        self.assertEqual(blocks[-1].get('number'), bs.get_latest_block().get('number'))
+
+        bs.remove_block(blocks[-1].get('number'))
+        self.assertEqual(blocks[1].get('number'), bs.get_latest_block().get('number'))
+
+
 class TestFSHashStorageDriver(TestCase):
     def setUp(self):
         self.test_dir = './.lamden'
@@ -1186,4 +2244,112 @@ class TestFSMemberHistory(TestCase):
         self.assertTrue(self.member_history.has_history())
 
     def test_METHOD_has_history__returns_TRUE_if_HAS_history(self):
-        self.assertFalse(self.member_history.has_history())
\ No newline at end of file
+        self.assertFalse(self.member_history.has_history())
+
+
+class TestFSStateHistory(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.state_history_path = os.path.join(self.test_dir, 'state_history')
+
+        os.makedirs(self.state_history_path)
+
+        self.state_history = FSStateHistory(root=self.state_history_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_METHOD_save_state_changes__appends_in_order(self):
+        for block_num in [10, 20, 30]:
+            self.state_history.save_state_changes(keys=['a', 'b', 'a'], block_num=str(block_num))
+
+        self.assertEqual([10, 20, 30], self.state_history.get_history(key='a'))
+        self.assertEqual([10, 20, 30], self.state_history.get_history(key='b'))
+
+    def test_METHOD_save_state_change__keeps_history_sorted_and_unique_out_of_order(self):
+        for block_num in [30, 10, 20, 10]:
+            self.state_history.save_state_change(key='a', block_num=str(block_num))
+
+        self.assertEqual([10, 20, 30], self.state_history.get_history(key='a'))
+
+    def test_METHOD_get_previous_change__returns_latest_change_before_block(self):
+        for block_num in [10, 20, 30]:
+            self.state_history.save_state_change(key='a', block_num=str(block_num))
+
+        self.assertIsNone(self.state_history.get_previous_change(key='a', block_num='10'))
+        self.assertEqual(10, self.state_history.get_previous_change(key='a', block_num='11'))
+        self.assertEqual(20, self.state_history.get_previous_change(key='a', block_num='30'))
+        self.assertEqual(30, self.state_history.get_previous_change(key='a', block_num=MAX_BLOCK))
+        self.assertIsNone(self.state_history.get_previous_change(key='missing', block_num=MAX_BLOCK))
+
+    def test_METHOD_rollback__drops_changes_after_block(self):
+        for block_num in [10, 20, 30]:
+            self.state_history.save_state_change(key='a', block_num=str(block_num))
+
+        self.state_history.rollback(key='a', block_num='20')
+        self.assertEqual([10, 20], self.state_history.get_history(key='a'))
+
+        self.state_history.rollback(key='a', block_num='5')
+        self.assertEqual([], self.state_history.get_history(key='a'))
+
+    def test_METHOD_remove_state_changes__removes_one_block(self):
+        for block_num in [10, 20, 30]:
+            self.state_history.save_state_changes(keys=['a', 'b'], block_num=str(block_num))
+
+        self.state_history.remove_state_changes(keys=['a'], block_num='20')
+
+        self.assertEqual([10, 30], self.state_history.get_history(key='a'))
+        self.assertEqual([10, 20, 30], self.state_history.get_history(key='b'))
+
+    def test_METHOD_get_states_at__returns_values_in_effect(self):
+        self.state_history.save_state_changes(keys=['a', 'b', 'a'], values=[1, 2, 3], block_num='10')
+        self.state_history.save_state_changes(keys=['a'], values=[4], block_num='20')
+
+        self.assertEqual(
+            [None, (10, 3), (10, 3), (20, 4), (10, 2)],
+            self.state_history.get_states_at(queries=[('a', 9), ('a', 10), ('a', 19), ('a', 20), ('b', 30)])
+        )
+        self.assertEqual((10, 3), self.state_history.get_previous_state(key='a', block_num='20'))
+
+    def test_METHOD_save_state_changes__rewriting_a_block_replaces_its_entries(self):
+        self.state_history.save_state_changes(keys=['con.a', 'con.b'], values=[1, 2], block_num='10')
+        self.state_history.save_state_changes(keys=['con.a'], values=[3], block_num='20')
+        self.state_history.save_state_changes(keys=['con.a'], values=[5], block_num='10')
+
+        self.assertEqual((10, 5), self.state_history.get_state_at(key='con.a', block_num='15'))
+        self.assertEqual(
+            [(10, 'con.a', 5), (20, 'con.a', 3)],
+            self.state_history.get_contract_changes(contract='con')
+        )
+
+    def test_METHOD_get_contract_changes__honours_bounds_and_limit(self):
+        for block_num in [10, 20, 30]:
+            self.state_history.save_state_changes(keys=['con.a', 'other.a'], values=[block_num, 0], block_num=str(block_num))
+
+        self.assertEqual([(20, 'con.a', 20), (30, 'con.a', 30)], self.state_history.get_contract_changes(contract='con', start=15))
+        self.assertEqual([(10, 'con.a', 10)], self.state_history.get_contract_changes(contract='con', end=19, limit=5))
+        self.assertEqual([(10, 'con.a', 10)], self.state_history.get_contract_changes(contract='con', limit=1))
+        self.assertEqual([], self.state_history.get_contract_changes(contract='missing'))
+
+    def test_METHOD_get_state_at__migrates_legacy_array_history(self):
+        hash_str = create_hash_512(string='a')
+        legacy_dir = self.state_history.get_directory(hash_str)
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, f'{hash_str}.hist'), 'wb') as f:
+            f.write(b''.join(n.to_bytes(8, 'big') for n in [10, 20]))
+
+        self.assertEqual((20, FSStateHistory.VALUE_NOT_INDEXED), self.state_history.get_state_at(key='a', block_num='25'))
+        self.assertFalse(os.path.exists(os.path.join(legacy_dir, f'{hash_str}.hist')))
+
+    def test_METHOD_get_previous_change__migrates_legacy_json_history(self):
+        hash_str = create_hash_512(string='a')
+        legacy_dir = self.state_history.get_directory(hash_str)
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, hash_str), 'w') as f:
+            json.dump([30, 10, 20], f)
+
+        self.assertEqual(20, self.state_history.get_previous_change(key='a', block_num='30'))
+        self.assertFalse(os.path.exists(os.path.join(legacy_dir, hash_str)))
+
+        self.state_history.save_state_change(key='a', block_num='40')
+        self.assertEqual([10, 20, 30, 40], self.state_history.get_history(key='a'))
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import zmq
+import zmq.asyncio
+
+from lamden.sockets.tx_handoff import TxHandoffSender, TxHandoffReceiver, ipc_address, MAX_UNMATCHED_TXS
+
+
+class TestTxHandoff(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.ipc_dir = tempfile.mkdtemp()
+        self.ipc_path = os.path.join(self.ipc_dir, 'tx.ipc')
+
+        self.ctx = zmq.Context()
+        self.async_ctx = zmq.asyncio.Context()
+
+        self.sender = TxHandoffSender(ipc_path=self.ipc_path, ctx=self.ctx)
+        self.receiver = TxHandoffReceiver(ipc_path=self.ipc_path, ctx=self.async_ctx)
+
+    def tearDown(self):
+        self.sender.stop()
+        self.receiver.stop()
+
+        self.ctx.destroy(linger=0)
+        self.async_ctx.destroy(linger=0)
+
+        if os.path.isdir(self.ipc_dir):
+            shutil.rmtree(self.ipc_dir)
+
+        try:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+        except RuntimeError:
+            pass
+
+    def send_when_connected(self, tx_bytes, tx_hash, tx_id='0:0', timeout=2):
+        async def send():
+            for i in range(int(timeout / 0.01)):
+                if self.sender.send(tx_bytes=tx_bytes, tx_hash=tx_hash, tx_id=tx_id):
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+
+        return self.loop.run_until_complete(send())
+
+    def test_ipc_address__is_absolute(self):
+        self.assertEqual(f'ipc://{os.path.abspath("tx.ipc")}', ipc_address('tx.ipc'))
+
+    def test_METHOD_send__returns_False_if_receiver_not_running(self):
+        self.assertFalse(self.sender.send(tx_bytes=b'{}', tx_hash='beef', tx_id='0:0'))
+
+    def test_METHOD_recv__gets_tx_hash_and_id_sent(self):
+        self.receiver.start()
+
+        self.assertTrue(self.send_when_connected(tx_bytes=json.dumps({'a': 1}).encode(), tx_hash='beef', tx_id='0:64'))
+
+        tx, tx_hash, tx_id = self.loop.run_until_complete(asyncio.wait_for(self.receiver.recv(), 2))
+
+        self.assertDictEqual({'a': 1}, tx)
+        self.assertEqual('beef', tx_hash)
+        self.assertEqual('0:64', tx_id)
+
+    def test_METHOD_recv__returns_None_tx_if_it_cannot_be_decoded(self):
+        self.receiver.start()
+
+        self.assertTrue(self.send_when_connected(tx_bytes=b'not json', tx_hash='beef'))
+
+        tx, tx_hash, tx_id = self.loop.run_until_complete(asyncio.wait_for(self.receiver.recv(), 2))
+
+        self.assertIsNone(tx)
+        self.assertEqual('beef', tx_hash)
+
+    def test_METHOD_stop__sender_falls_back_once_receiver_stops(self):
+        self.receiver.start()
+        self.assertTrue(self.send_when_connected(tx_bytes=b'{}', tx_hash='beef'))
+
+        self.receiver.stop()
+
+        async def wait_for_disconnect():
+            for i in range(200):
+                if not self.sender.send(tx_bytes=b'{}', tx_hash='beef', tx_id='0:0'):
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+
+        self.assertTrue(self.loop.run_until_complete(wait_for_disconnect()))
+
+    def test_METHOD_is_first_copy__only_the_first_of_two_copies_is_used(self):
+        self.assertTrue(self.receiver.is_first_copy(tx_id='beef'))
+        self.assertFalse(self.receiver.is_first_copy(tx_id='beef'))
+
+        # both copies are in, a resubmitted tx counts as new again
+        self.assertTrue(self.receiver.is_first_copy(tx_id='beef'))
+
+    def test_METHOD_is_first_copy__forgets_oldest_unmatched_ids(self):
+        for i in range(MAX_UNMATCHED_TXS + 1):
+            self.receiver.is_first_copy(tx_id=str(i))
+
+        self.assertEqual(MAX_UNMATCHED_TXS, len(self.receiver.unmatched))
+        self.assertTrue(self.receiver.is_first_copy(tx_id='0'))
+        self.assertFalse(self.receiver.is_first_copy(tx_id=str(MAX_UNMATCHED_TXS)))
@@ -5,6 +5,7 @@ from lamden.crypto.wallet import Wallet, verify
 from contracting.db.encoder import encode, decode
 from lamden import storage
 from contracting.client import ContractingClient
+import asyncio
 import decimal
 import time
 
@@ -549,6 +550,103 @@ class TestValidator(TestCase):
             nonces=self.driver
         )
 
+    def build_funded_transactions(self, client, wallet, nonces):
+        client.set_var(
+            contract='currency',
+            variable='balances',
+            arguments=[wallet.verifying_key],
+            value=1_000_000
+        )
+
+        client.set_var(
+            contract='stamp_cost',
+            variable='S',
+            arguments=['value'],
+            value=20_000
+        )
+
+        return [decode(build_transaction(
+            wallet=wallet,
+            processor='b' * 64,
+            stamps=123,
+            nonce=nonce,
+            contract='currency',
+            function='transfer',
+            kwargs={
+                'amount': {'__fixed__': '1.0'},
+                'to': 'jeff'
+            }
+        )) for nonce in nonces]
+
+    def test_transactions_are_valid_accepts_sequential_nonces_in_one_batch(self):
+        client = ContractingClient(submission_filename='./helpers/submission.py')
+        client.flush()
+
+        txs = self.build_funded_transactions(client=client, wallet=Wallet(), nonces=range(10))
+
+        results = transaction.transactions_are_valid(
+            transactions=txs,
+            expected_processor='b' * 64,
+            client=client,
+            nonces=self.driver
+        )
+
+        self.assertListEqual([None] * 10, results)
+
+    def test_transactions_are_valid_returns_exception_per_invalid_tx(self):
+        client = ContractingClient(submission_filename='./helpers/submission.py')
+        client.flush()
+
+        w = Wallet()
+        txs = self.build_funded_transactions(client=client, wallet=w, nonces=[0, 0, 1, 2])
+
+        # bad signature
+        txs[2]['metadata']['signature'] = Wallet().sign(encode(txs[2]['payload']))
+
+        results = transaction.transactions_are_valid(
+            transactions=txs + [{'payload': {}}, 'not a tx'],
+            expected_processor='b' * 64,
+            client=client,
+            nonces=self.driver
+        )
+
+        self.assertListEqual([
+            None,
+            transaction.TransactionNonceInvalid,
+            transaction.TransactionSignatureInvalid,
+            None,
+            transaction.TransactionFormattingError,
+            transaction.TransactionFormattingError
+        ], results)
+
+    def test_transactions_are_valid_async_returns_exception_per_invalid_tx(self):
+        client = ContractingClient(submission_filename='./helpers/submission.py')
+        client.flush()
+
+        w = Wallet()
+        txs = self.build_funded_transactions(client=client, wallet=w, nonces=[0, 0, 1, 2])
+
+        # bad signature
+        txs[2]['metadata']['signature'] = Wallet().sign(encode(txs[2]['payload']))
+
+        loop = asyncio.new_event_loop()
+        results = loop.run_until_complete(transaction.transactions_are_valid_async(
+            transactions=txs + [{'payload': {}}, 'not a tx'],
+            expected_processor='b' * 64,
+            client=client,
+            nonces=self.driver
+        ))
+        loop.close()
+
+        self.assertListEqual([
+            None,
+            transaction.TransactionNonceInvalid,
+            transaction.TransactionSignatureInvalid,
+            None,
+            transaction.TransactionFormattingError,
+            transaction.TransactionFormattingError
+        ], results)
+
     def test_iterate_kwargs_finds_fixed_good(self):
         pass
 
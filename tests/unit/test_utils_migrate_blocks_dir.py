@@ -1,8 +1,9 @@
-from lamden.utils.migrate_blocks_dir import MigrateFiles
-from lamden.storage import FSBlockDriver
+from lamden.utils.migrate_blocks_dir import MigrateFiles, CompressFiles, RebuildIndexes
+from lamden.storage import FSBlockDriver, BlockCodec, BlockStorage, COMPRESSION_DICTIONARY_FILENAME
 
 import os
 import shutil
+import tempfile
 from pathlib import Path
 from unittest import TestCase
 import random
@@ -13,7 +14,7 @@ import hashlib
 
 class TestMigrateBlocksDir(TestCase):
     def setUp(self):
-        self.test_dir = './.lamden'
+        self.test_dir = tempfile.mkdtemp()
         self.blocks_dir = 'blocks'
         self.alias_dir = 'alias'
         self.txs_dir = 'txs'
@@ -35,7 +36,7 @@ class TestMigrateBlocksDir(TestCase):
 
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self.test_dir)
 
     def create_directories(self):
         if os.path.exists(Path(self.test_dir)):
@@ -116,5 +117,66 @@ class TestMigrateBlocksDir(TestCase):
             block = self.create_block(block_num=filename)
             self.assertDictEqual(block, migrated_file)
 
+    def migrate_block_files(self, num_files):
+        self.create_block_files(num_files)
 
+        block_migration = MigrateFiles(
+            src_path=self.blocks_path,
+            dest_path=self.blocks_dest_path,
+            testing=True
+        )
+        block_migration.start()
+
+        return block_migration.migrated_files
+
+    def read_raw(self, block_driver, block_num):
+        with open(block_driver.get_file_path(block_num=block_num), 'rb') as f:
+            return f.read()
+
+    def test_rebuild_indexes_rebuilds_store_written_before_them(self):
+        migrated_files = self.migrate_block_files(10)
+
+        index_rebuild = RebuildIndexes(storage_path=self.test_dir)
+        self.assertEqual(['state_history', 'tx_index'], index_rebuild.pending())
+
+        index_rebuild.start()
+
+        storage = BlockStorage(root=self.test_dir)
+        self.assertEqual([], RebuildIndexes(storage_path=self.test_dir).pending())
+        self.assertEqual(0, storage.state_history_floor())
+        self.assertEqual(0, storage.tx_index_floor())
+        for filename in migrated_files:
+            tx_hash = self.create_block(block_num=filename)['processed']['hash']
+            self.assertEqual(int(filename), storage.get_tx_block_num(tx_hash))
+
+    def test_compress_files_converts_store_in_place(self):
+        migrated_files = self.migrate_block_files(10)
+
+        file_compressor = CompressFiles(storage_path=self.test_dir, compression='zlib', testing=True)
+        file_compressor.start()
+
+        block_driver = FSBlockDriver(root=self.blocks_path)
+        storage = BlockStorage(root=self.test_dir)
+        for filename in migrated_files:
+            self.assertTrue(BlockCodec.is_compressed(self.read_raw(block_driver, filename)))
+
+            block = self.create_block(block_num=filename)
+            tx = block.pop('processed')
+            block['processed'] = tx.get('hash')
+
+            self.assertDictEqual(block, block_driver.find_block(block_num=filename))
+            self.assertDictEqual(tx, storage.get_tx(tx.get('hash')))
+
+    def test_compress_files_trains_dictionary_and_can_decompress_again(self):
+        migrated_files = self.migrate_block_files(10)
+
+        CompressFiles(storage_path=self.test_dir, compression='zlib', train_dictionary=True).start()
+        self.assertTrue(os.path.isfile(os.path.join(self.test_dir, COMPRESSION_DICTIONARY_FILENAME)))
+
+        CompressFiles(storage_path=self.test_dir, compression=None).start()
 
+        block_driver = FSBlockDriver(root=self.blocks_path)
+        for filename in migrated_files:
+            raw = self.read_raw(block_driver, filename)
+            self.assertFalse(BlockCodec.is_compressed(raw))
+            self.assertEqual(filename, json.loads(raw).get('number'))
@@ -4,7 +4,7 @@ from lamden.nodes import validation_queue
 from lamden.crypto.wallet import Wallet
 from lamden.nodes.hlc import HLC_Clock
 
-from lamden.crypto.canonical import tx_result_hash_from_tx_result_object
+from lamden.crypto.canonical import tx_result_hash_from_tx_result_object, create_proof_message_from_proof
 from tests.unit.helpers.mock_transactions import get_new_currency_tx, get_tx_message, get_processing_results, get_new_processing_result
 import asyncio
 import hashlib
@@ -821,6 +821,147 @@ class TestValidationQueue(TestCase):
         self.assertNotEqual(self.validation_queue.last_hlc_in_consensus, hlc)
         self.assertEqual(len(self.validation_queue.validation_results), 0)
 
+    def add_compact_solution(self):
+        node_wallet = Wallet()
+        tx_message = get_tx_message(wallet=self.wallet, node_wallet=node_wallet)
+        processing_results = get_processing_results(driver=self.driver, tx_message=tx_message, node_wallet=node_wallet)
+
+        compact_results = {
+            'hlc_timestamp': processing_results['hlc_timestamp'],
+            'proof': processing_results['proof']
+        }
+        self.validation_queue.append(processing_results=compact_results)
+
+        return compact_results
+
+    def set_consensus(self, hlc, solution):
+        self.validation_queue.validation_results[hlc]['last_check_info']['has_consensus'] = True
+        self.validation_queue.validation_results[hlc]['last_check_info']['solution'] = solution
+
+    def test_append_compact_solution_isnt_added_to_result_lookup(self):
+        compact_results = self.add_compact_solution()
+        hlc = compact_results['hlc_timestamp']
+
+        self.assertEqual(
+            compact_results['proof']['tx_result_hash'],
+            self.validation_queue.get_result_hash_for_vk(hlc, compact_results['proof']['signer'])
+        )
+        self.assertDictEqual({}, self.validation_queue.validation_results[hlc]['result_lookup'])
+
+    def test_commit_consensus_block_gets_block_from_network_if_only_compact_solutions(self):
+        compact_results = self.add_compact_solution()
+        hlc = compact_results['hlc_timestamp']
+        self.set_consensus(hlc=hlc, solution=compact_results['proof']['tx_result_hash'])
+
+        self.commit_consensus_block(hlc)
+
+        self.assertTrue(self.hard_apply_block_called)
+        self.assertEqual(hlc, self.validation_queue.last_hlc_in_consensus)
+        self.assertEqual(len(self.validation_queue.validation_results), 0)
+
+    def test_commit_consensus_block_keeps_hlc_until_network_has_block(self):
+        async def get_block_from_network(hlc_timestamp):
+            return None
+
+        self.validation_queue.get_block_from_network = get_block_from_network
+
+        compact_results = self.add_compact_solution()
+        hlc = compact_results['hlc_timestamp']
+        self.set_consensus(hlc=hlc, solution=compact_results['proof']['tx_result_hash'])
+
+        self.commit_consensus_block(hlc)
+
+        self.assertFalse(self.hard_apply_block_called)
+        self.assertTrue(self.validation_queue.hlc_has_consensus(hlc))
+
+    def test_commit_consensus_block_drops_hlc_if_network_never_has_block(self):
+        async def get_block_from_network(hlc_timestamp):
+            return None
+
+        self.validation_queue.get_block_from_network = get_block_from_network
+        self.validation_queue.max_block_retries = 3
+
+        compact_results = self.add_compact_solution()
+        hlc = compact_results['hlc_timestamp']
+        self.set_consensus(hlc=hlc, solution=compact_results['proof']['tx_result_hash'])
+
+        for i in range(2):
+            self.commit_consensus_block(hlc)
+            self.assertTrue(self.validation_queue.hlc_has_consensus(hlc))
+
+        self.commit_consensus_block(hlc)
+
+        self.assertFalse(self.hard_apply_block_called)
+        self.assertIsNone(self.validation_queue.get_validation_result(hlc))
+        self.assertDictEqual({}, self.validation_queue.block_retries)
+        self.assertNotEqual(hlc, self.validation_queue.last_hlc_in_consensus)
+
+    def make_batch(self, node_wallet, num_of_solutions=2):
+        solutions = []
+        for i in range(num_of_solutions):
+            proof = {'members_list_hash': 'a' * 64, 'num_of_members': 2, 'tx_result_hash': f'{i}' * 64}
+            solutions.append({
+                'hlc_timestamp': self.hlc_clock.get_new_hlc_timestamp(),
+                'tx_result_hash': proof['tx_result_hash'],
+                'signature': node_wallet.sign(create_proof_message_from_proof(proof=proof, tx_result_hash=proof['tx_result_hash']))
+            })
+
+        return {
+            'signer': node_wallet.verifying_key,
+            'members_list_hash': 'a' * 64,
+            'num_of_members': 2,
+            'solutions': solutions
+        }
+
+    def test_append_batch_credits_solution_to_every_hlc(self):
+        node_wallet = Wallet()
+        batch = self.make_batch(node_wallet=node_wallet)
+
+        self.validation_queue.append_batch(batch=batch)
+
+        self.assertEqual(2, len(self.validation_queue))
+        for solution in batch['solutions']:
+            hlc = solution['hlc_timestamp']
+            self.assertEqual(solution['tx_result_hash'], self.validation_queue.get_result_hash_for_vk(hlc, node_wallet.verifying_key))
+            self.assertIn(node_wallet.verifying_key, self.validation_queue.validation_results[hlc]['unverified_proofs'])
+
+    def test_get_proofs_from_results_checks_batched_proofs(self):
+        node_wallet = Wallet()
+        batch = self.make_batch(node_wallet=node_wallet)
+        batch['solutions'][1]['signature'] = 'b' * 128
+
+        self.validation_queue.append_batch(batch=batch)
+
+        for solution in batch['solutions']:
+            self.set_consensus(hlc=solution['hlc_timestamp'], solution=solution['tx_result_hash'])
+
+        good_hlc, bad_hlc = [solution['hlc_timestamp'] for solution in batch['solutions']]
+
+        self.assertEqual(1, len(self.validation_queue.get_proofs_from_results(good_hlc)))
+        self.assertEqual(set(), self.validation_queue.validation_results[good_hlc]['unverified_proofs'])
+
+        self.assertEqual([], self.validation_queue.get_proofs_from_results(bad_hlc))
+        self.assertEqual([], self.validation_queue.get_proofs_from_results(bad_hlc))
+
+    def test_verify_batched_proofs_drops_invalid_proofs(self):
+        node_wallet = Wallet()
+        batch = self.make_batch(node_wallet=node_wallet)
+        batch['solutions'][1]['signature'] = 'b' * 128
+
+        self.validation_queue.append_batch(batch=batch)
+
+        for solution in batch['solutions']:
+            self.set_consensus(hlc=solution['hlc_timestamp'], solution=solution['tx_result_hash'])
+
+        good_hlc, bad_hlc = [solution['hlc_timestamp'] for solution in batch['solutions']]
+
+        for hlc in [good_hlc, bad_hlc]:
+            self.loop.run_until_complete(self.validation_queue.verify_batched_proofs(hlc_timestamp=hlc))
+            self.assertEqual(set(), self.validation_queue.validation_results[hlc]['unverified_proofs'])
+
+        self.assertEqual(1, len(self.validation_queue.get_proofs_from_results(good_hlc)))
+        self.assertEqual([], self.validation_queue.get_proofs_from_results(bad_hlc))
+
     def test_hlc_has_solutions_returns_false_if_results_not_found_by_stamp(self):
         self.assertFalse(self.validation_queue.hlc_has_solutions('sample_stamp'))
 
@@ -1011,3 +1152,64 @@ class TestValidationQueue(TestCase):
         self.assertIsNone(self.validation_queue.validation_results.get(hlc))
         self.assertIsNone(self.validation_queue.started_checking.get(hlc))
 
+
+    def test_METHOD_process_all__only_rechecks_hlcs_with_new_solutions(self):
+        hlc_1 = self.add_solution()['hlc_timestamp']
+        tx_message_2 = get_tx_message(wallet=self.wallet)
+        hlc_2 = self.add_solution(tx_message=tx_message_2)['hlc_timestamp']
+        self.num_of_peers = 3
+
+        checked = []
+        check_one = self.validation_queue.check_one
+
+        def record_check_one(hlc_timestamp):
+            checked.append(hlc_timestamp)
+            check_one(hlc_timestamp=hlc_timestamp)
+
+        self.validation_queue.check_one = record_check_one
+
+        self.process_next()
+        self.assertListEqual([hlc_1, hlc_2], checked)
+
+        checked.clear()
+        self.process_next()
+        self.assertListEqual([], checked)
+
+        # a solution from another node
+        self.add_solution(tx_message=tx_message_2)
+        self.process_next()
+        self.assertListEqual([hlc_2], checked)
+
+    def test_METHOD_process_all__rechecks_all_hlcs_when_peers_change(self):
+        hlc_1 = self.add_solution()['hlc_timestamp']
+        hlc_2 = self.add_solution()['hlc_timestamp']
+        self.num_of_peers = 3
+
+        self.process_next()
+
+        checked = []
+        check_one = self.validation_queue.check_one
+
+        def record_check_one(hlc_timestamp):
+            checked.append(hlc_timestamp)
+            check_one(hlc_timestamp=hlc_timestamp)
+
+        self.validation_queue.check_one = record_check_one
+
+        self.num_of_peers = 4
+        self.process_next()
+
+        self.assertListEqual([hlc_1, hlc_2], checked)
+
+    def test_METHOD_getitem__returns_hlcs_in_order_when_appended_out_of_order(self):
+        self.validation_queue.validation_results['3'] = {}
+        self.validation_queue.validation_results['1'] = {}
+        self.validation_queue.validation_results['2'] = {}
+
+        self.assertEqual('1', self.validation_queue[0])
+        self.assertEqual('3', self.validation_queue[-1])
+
+        self.validation_queue.prune_earlier_results(consensus_hlc_timestamp='2')
+
+        self.assertEqual('2', self.validation_queue[0])
+        self.assertListEqual(['2', '3'], self.validation_queue.get_key_list())
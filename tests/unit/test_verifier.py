@@ -0,0 +1,98 @@
+from lamden.crypto.verifier import SignatureVerifier, POOL_MIN_BATCH
+from lamden.crypto.wallet import Wallet, verified_signatures
+from unittest import TestCase
+import asyncio
+
+
+class TestSignatureVerifier(TestCase):
+    def setUp(self):
+        self.verifier = SignatureVerifier(workers=2)
+        self.wallet = Wallet()
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.verifier.stop()
+        self.loop.close()
+
+    def make_signatures(self, amount: int) -> list:
+        signatures = []
+        for i in range(amount):
+            msg = f'message {i}'
+            # every third signature is for a different message
+            signed = msg if i % 3 != 0 else 'something else'
+            signatures.append((self.wallet.verifying_key, msg, self.wallet.sign(signed)))
+
+        return signatures
+
+    def expected(self, amount: int) -> list:
+        return [i % 3 != 0 for i in range(amount)]
+
+    def test_METHOD_verify_many__small_batch_verified_without_pool(self):
+        self.assertListEqual(self.expected(3), self.verifier.verify_many(self.make_signatures(amount=3)))
+        self.assertIsNone(self.verifier.pool)
+
+    def test_METHOD_verify_many__large_batch_verified_on_pool_in_order(self):
+        amount = POOL_MIN_BATCH * 4
+
+        self.assertListEqual(self.expected(amount), self.verifier.verify_many(self.make_signatures(amount=amount)))
+        self.assertIsNotNone(self.verifier.pool)
+
+    def test_METHOD_verify_many__malformed_signatures_are_invalid(self):
+        signatures = [('not a key', 'msg', 'not a signature')] * POOL_MIN_BATCH
+
+        self.assertListEqual([False] * POOL_MIN_BATCH, self.verifier.verify_many(signatures))
+
+    def test_METHOD_verify_many_async__returns_results_in_order(self):
+        results = self.loop.run_until_complete(self.verifier.verify_many_async(self.make_signatures(amount=10)))
+
+        self.assertListEqual(self.expected(10), results)
+
+    def test_METHOD_verify_many_async__small_batch_verified_without_pool(self):
+        results = self.loop.run_until_complete(self.verifier.verify_many_async(self.make_signatures(amount=3)))
+
+        self.assertListEqual(self.expected(3), results)
+        self.assertIsNone(self.verifier.pool)
+
+    def test_METHOD_verify_many_async__large_batch_verified_on_pool_in_order(self):
+        amount = POOL_MIN_BATCH * 4
+        results = self.loop.run_until_complete(self.verifier.verify_many_async(self.make_signatures(amount=amount)))
+
+        self.assertListEqual(self.expected(amount), results)
+        self.assertIsNotNone(self.verifier.pool)
+
+    def test_METHOD_verify_async__returns_bool(self):
+        self.assertTrue(self.loop.run_until_complete(
+            self.verifier.verify_async(vk=self.wallet.verifying_key, msg='howdy', signature=self.wallet.sign('howdy'))
+        ))
+        self.assertFalse(self.loop.run_until_complete(
+            self.verifier.verify_async(vk=self.wallet.verifying_key, msg='hello', signature=self.wallet.sign('howdy'))
+        ))
+        self.assertIsNone(self.verifier.pool)
+
+    def test_METHOD_verify_many__answers_already_verified_signatures_without_pool(self):
+        signatures = self.make_signatures(amount=POOL_MIN_BATCH * 2)
+        valid = [signature for signature, expected in zip(signatures, self.expected(len(signatures))) if expected]
+
+        self.verifier.verify_many(valid)
+        self.verifier.stop()
+
+        self.assertListEqual([True] * len(valid), self.verifier.verify_many(valid))
+        self.assertIsNone(self.verifier.pool)
+
+    def test_METHOD_verify_async__already_verified_signature_skips_pool(self):
+        signature = self.wallet.sign('howdy')
+        verified_signatures.add(vk=self.wallet.verifying_key, msg='howdy', signature=signature)
+
+        self.assertTrue(self.loop.run_until_complete(
+            self.verifier.verify_async(vk=self.wallet.verifying_key, msg='howdy', signature=signature)
+        ))
+        self.assertIsNone(self.verifier.pool)
+
+    def test_METHOD_verify_blocks__invalid_blocks_return_False(self):
+        self.assertListEqual([False, False], self.verifier.verify_blocks(blocks=[{}, {'number': '1'}], old_blocks=[False, True]))
+
+    def test_METHOD_chunks__spreads_items_over_workers(self):
+        self.assertListEqual([[0, 1], [2, 3]], self.verifier.chunks([0, 1, 2, 3]))
+        self.assertListEqual([[0]], self.verifier.chunks([0]))
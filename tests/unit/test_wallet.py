@@ -1,5 +1,5 @@
 from unittest import TestCase
-from lamden.crypto.wallet import Wallet, verify
+from lamden.crypto.wallet import Wallet, verify, verify_many, get_verify_key, VerifiedSignatureCache, verified_signatures
 from lamden.crypto.zbase import bytes_to_zbase32
 
 
@@ -71,6 +71,84 @@ class TestWallet(TestCase):
 
         self.assertFalse(verify(a.verifying_key, message, signature))
 
+    def test_verify_many_returns_result_per_signature(self):
+        w = Wallet()
+
+        self.assertListEqual([True, False, False], verify_many([
+            (w.verifying_key, 'howdy', w.sign('howdy')),
+            (w.verifying_key, 'hello', w.sign('howdy')),
+            ('not a key', 'howdy', w.sign('howdy'))
+        ]))
+
+    def test_get_verify_key_caches_parsed_keys(self):
+        w = Wallet()
+
+        self.assertIs(get_verify_key(w.verifying_key), get_verify_key(w.verifying_key))
+        self.assertEqual(w.vk, get_verify_key(w.verifying_key))
+
+    def test_verify_caches_successful_verifications(self):
+        w = Wallet()
+        signature = w.sign('howdy')
+
+        verified_signatures.clear()
+
+        self.assertTrue(verify(w.verifying_key, 'howdy', signature))
+        self.assertTrue(verify(w.verifying_key, 'howdy', signature))
+
+        stats = verified_signatures.stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(0.5, stats['hit_rate'])
+
+    def test_verify_doesnt_cache_failed_verifications(self):
+        w = Wallet()
+        signature = w.sign('howdy')
+
+        verified_signatures.clear()
+
+        self.assertFalse(verify(w.verifying_key, 'hello', signature))
+        self.assertFalse(verify(w.verifying_key, 'hello', signature))
+        self.assertEqual(0, len(verified_signatures))
+
+    def test_verified_signature_cache_only_matches_exact_triple(self):
+        cache = VerifiedSignatureCache()
+        cache.add(vk='a', msg='bc', signature='d')
+
+        self.assertTrue(cache.contains(vk='a', msg='bc', signature='d'))
+        self.assertFalse(cache.contains(vk='ab', msg='c', signature='d'))
+        self.assertFalse(cache.contains(vk='a', msg='bc', signature='e'))
+
+    def test_verified_signature_cache_evicts_least_recently_used(self):
+        cache = VerifiedSignatureCache(max_entries=2)
+        cache.add(vk='a', msg='1', signature='s')
+        cache.add(vk='a', msg='2', signature='s')
+        cache.contains(vk='a', msg='1', signature='s')
+        cache.add(vk='a', msg='3', signature='s')
+
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.contains(vk='a', msg='1', signature='s'))
+        self.assertFalse(cache.contains(vk='a', msg='2', signature='s'))
+
+    def test_verified_signature_cache_disabled_never_hits(self):
+        cache = VerifiedSignatureCache(enabled=False)
+        cache.add(vk='a', msg='1', signature='s')
+
+        self.assertFalse(cache.contains(vk='a', msg='1', signature='s'))
+        self.assertEqual(0, len(cache))
+
+    def test_verify_checks_signature_again_when_cache_disabled(self):
+        w = Wallet()
+        signature = w.sign('howdy')
+
+        verified_signatures.clear()
+        verified_signatures.enabled = False
+        try:
+            self.assertTrue(verify(w.verifying_key, 'howdy', signature))
+            self.assertTrue(verify(w.verifying_key, 'howdy', signature))
+            self.assertEqual(0, verified_signatures.stats()['hits'])
+        finally:
+            verified_signatures.enabled = True
+
     def test_pretty_vk_works(self):
         w = Wallet()
 
@@ -0,0 +1,113 @@
+import json
+import unittest
+
+from contracting.db.encoder import encode, decode
+from contracting.stdlib.bridge.decimal import ContractingDecimal
+from contracting.stdlib.bridge.time import Datetime, Timedelta
+
+from lamden.sockets.wire import encode_message, decode_message, negotiate_wire_version, wire_version_of, \
+    WIRE_VERSION, MAX_DEPTH
+
+
+class TestWire(unittest.TestCase):
+    def setUp(self):
+        self.msg = {
+            'hlc_timestamp': '2022-10-10T10:10:10.123456789Z_0',
+            'tx_result': {
+                'hash': 'a' * 64,
+                'stamps_used': 20,
+                'status': 0,
+                'state': [
+                    {'key': 'currency.balances:' + 'b' * 64, 'value': ContractingDecimal('123.456')}
+                ],
+                'result': None
+            },
+            'proof': {
+                'signature': 'c' * 128,
+                'signer': 'd' * 64,
+                'num_of_members': 4
+            },
+            'rewards': [],
+            'flags': [True, False],
+            'numbers': [0, -1, 127, 128, -2 ** 70, 2 ** 200]
+        }
+
+    def test_METHOD_encode_message__returns_json_str_without_wire_version(self):
+        self.assertEqual(encode(self.msg), encode_message(self.msg))
+
+    def test_METHOD_encode_message__binary_message_decodes_to_what_json_does(self):
+        msg_bytes = encode_message(self.msg, WIRE_VERSION)
+
+        self.assertIsInstance(msg_bytes, bytes)
+        self.assertEqual(WIRE_VERSION, wire_version_of(msg_bytes))
+        self.assertEqual(encode(decode(encode(self.msg))), encode(decode_message(msg_bytes)))
+
+    def test_METHOD_encode_message__sends_hex_strings_as_raw_bytes(self):
+        msg_bytes = encode_message(self.msg, WIRE_VERSION)
+
+        self.assertLess(len(msg_bytes), len(encode(self.msg)))
+        self.assertNotIn(b'a' * 64, msg_bytes)
+        self.assertEqual('a' * 64, decode_message(msg_bytes)['tx_result']['hash'])
+
+    def test_METHOD_encode_message__strings_that_only_look_like_hex_come_back_unchanged(self):
+        msg = {'upper': 'AB' * 32, 'spaced': 'ab ' * 20, 'odd': 'a' * 63}
+
+        self.assertDictEqual(msg, decode_message(encode_message(msg, WIRE_VERSION)))
+
+    def test_METHOD_encode_message__round_trips_decimals_times_and_bytes_exactly(self):
+        msg = {
+            'decimal': ContractingDecimal('0.000000000000000000000000000001'),
+            'float': 1.5,
+            'time': Datetime(2022, 10, 10, 10, 10, 10, 123456),
+            'delta': Timedelta(days=2, seconds=30),
+            'bytes': b'\x00\x01'
+        }
+
+        decoded = decode_message(encode_message(msg, WIRE_VERSION))
+        expected = decode(encode(msg))
+
+        self.assertEqual(expected['decimal'], decoded['decimal'])
+        self.assertEqual(expected['float'], decoded['float'])
+        self.assertIsInstance(decoded['float'], ContractingDecimal)
+        self.assertEqual(expected['time'], decoded['time'])
+        self.assertEqual(expected['delta'], decoded['delta'])
+        self.assertEqual(b'\x00\x01', decoded['bytes'])
+
+    def test_METHOD_encode_message__falls_back_to_json_for_non_string_keys(self):
+        msg = encode_message({1: 'one'}, WIRE_VERSION)
+
+        self.assertIsInstance(msg, str)
+        self.assertDictEqual({'1': 'one'}, decode_message(msg))
+
+    def test_METHOD_encode_message__raises_ValueError_on_unsupported_wire_version(self):
+        with self.assertRaises(ValueError):
+            encode_message(self.msg, 255)
+
+    def test_METHOD_decode_message__reads_json(self):
+        self.assertDictEqual({'action': 'ping'}, decode_message(json.dumps({'action': 'ping'}).encode()))
+
+    def test_METHOD_decode_message__returns_None_for_truncated_or_padded_messages(self):
+        msg_bytes = encode_message(self.msg, WIRE_VERSION)
+
+        self.assertIsNone(decode_message(msg_bytes[:-1]))
+        self.assertIsNone(decode_message(msg_bytes + b'\x00'))
+
+    def test_METHOD_decode_message__returns_None_for_unknown_version_or_tag(self):
+        self.assertIsNone(decode_message(b'\x00\xff\x00'))
+        self.assertIsNone(decode_message(bytes([0, WIRE_VERSION, 200])))
+
+    def test_METHOD_decode_message__returns_None_if_nested_too_deep(self):
+        msg = []
+        for i in range(MAX_DEPTH + 1):
+            msg = [msg]
+
+        self.assertIsNone(decode_message(encode_message(msg, WIRE_VERSION)))
+
+    def test_METHOD_negotiate_wire_version__picks_highest_common_version(self):
+        self.assertEqual(WIRE_VERSION, negotiate_wire_version([WIRE_VERSION, 255]))
+
+    def test_METHOD_negotiate_wire_version__returns_None_for_peers_without_binary_format(self):
+        self.assertIsNone(negotiate_wire_version(None))
+        self.assertIsNone(negotiate_wire_version([]))
+        self.assertIsNone(negotiate_wire_version([255]))
+        self.assertIsNone(negotiate_wire_version('1'))
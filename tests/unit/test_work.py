@@ -165,6 +165,19 @@ class TestWorkValidator(TestCase):
 
         self.assertFalse(self.wv.valid_signature(msg))
 
+    def test_valid_signature_async_returns_true_if_valid(self):
+        msg = self.make_tx(wallet=self.wallet)
+
+        loop = asyncio.get_event_loop()
+        self.assertTrue(loop.run_until_complete(self.wv.valid_signature_async(msg)))
+
+    def test_valid_signature_async_returns_false_if_invalid(self):
+        msg = self.make_tx()
+        msg['sender'] = Wallet().verifying_key
+
+        loop = asyncio.get_event_loop()
+        self.assertFalse(loop.run_until_complete(self.wv.valid_signature_async(msg)))
+
     def test_older_than_last_processed_returns_true_if_older(self):
         msg = self.make_tx()
         self.last_processed_hlc = HLC_Clock().get_new_hlc_timestamp()